@@ -0,0 +1,113 @@
+"""
+Worker CPU per request of response compression, with the Flask-Compress defaults the API used before and with
+CompressionPolicy (ibm.web.common.compression) configured as in config.CompressionConfig.
+
+The endpoints mimic the payloads the policy is tuned for: the workspace regional resources snapshot (big, ETag'd and
+served again and again), a paginated idle resources listing and a small workflow status. CPU time is the process time
+of the worker serving the requests, so it includes compression wherever it runs.
+
+Usage (from the repository root):
+    python benchmarks/compression_benchmark.py [--requests 50] [--resources 2000]
+"""
+import argparse
+import json
+import random
+import string
+import time
+
+from flask import Blueprint, Flask, jsonify, Response
+from flask_compress import Compress
+
+from config import CompressionConfig
+from ibm.web.common.compression import CompressionPolicy
+
+ACCEPT_ENCODINGS = ["gzip, deflate, br", "gzip"]
+
+
+def generate_resources(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": "".join(rng.choices(string.hexdigits.lower(), k=32)),
+            "name": f"resource-{index}",
+            "crn": f"crn:v1:bluemix:public:is:us-south:a/{rng.getrandbits(64):x}::instance:{index}",
+            "status": rng.choice(["CREATED", "CREATING", "DELETED"]),
+            "region": {"id": "".join(rng.choices(string.hexdigits.lower(), k=32)), "name": "us-south"},
+            "usage": {"cpu": rng.random() * 100, "memory": rng.random() * 100},
+            "tags": [rng.choice(["prod", "dev", "staging"]) for _ in range(rng.randint(0, 3))],
+        } for index in range(count)
+    ]
+
+
+def create_benchmark_app(compress, resources_count, **config):
+    app = Flask(__name__)
+    app.config.update(config)
+
+    snapshot = json.dumps({"instances": generate_resources(resources_count)})
+    snapshot_etag = str(hash(snapshot))
+    idle_resources = generate_resources(resources_count // 10, seed=1)
+
+    workspace = Blueprint("workspace", __name__)
+    ibm_idle_resources = Blueprint("ibm_idle_resources", __name__)
+    ibm_workflows = Blueprint("ibm_workflows", __name__)
+
+    @workspace.get("/all-regional-resources")
+    def list_ibm_resources():
+        response = Response(snapshot, mimetype="application/json")
+        response.set_etag(snapshot_etag)
+        return response
+
+    @ibm_idle_resources.get("/idle-resources")
+    def list_ibm_idle_resources():
+        return jsonify({"items": idle_resources, "total_pages": 1})
+
+    @ibm_workflows.get("/workflows/status")
+    def get_workflow_status():
+        return jsonify({"id": "0" * 32, "status": "RUNNING"})
+
+    for blueprint in [workspace, ibm_idle_resources, ibm_workflows]:
+        app.register_blueprint(blueprint)
+
+    compress.init_app(app)
+    return app
+
+
+def measure(app, path, accept_encoding, requests_count):
+    client = app.test_client()
+    headers = {"Accept-Encoding": accept_encoding}
+    response = client.get(path, headers=headers)
+    body_size = len(response.get_data())
+
+    start = time.process_time()
+    for _ in range(requests_count):
+        client.get(path, headers=headers)
+
+    cpu_ms = (time.process_time() - start) * 1000 / requests_count
+    return response.headers.get("Content-Encoding", "identity"), body_size, cpu_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint and scenario")
+    parser.add_argument("--resources", type=int, default=2000, help="resources in the regional resources snapshot")
+    args = parser.parse_args()
+
+    policy_config = {key: getattr(CompressionConfig, key) for key in dir(CompressionConfig) if key.isupper()}
+    scenarios = [
+        ("flask-compress defaults", Compress, {}),
+        ("compression policy", CompressionPolicy, dict(policy_config, COMPRESS_OFFLOAD_TO_PROXY=False)),
+        ("compression policy, offloaded", CompressionPolicy, dict(policy_config, COMPRESS_OFFLOAD_TO_PROXY=True)),
+    ]
+    paths = ["/all-regional-resources", "/idle-resources", "/workflows/status"]
+
+    print(f"{'scenario':<32}{'path':<26}{'accept-encoding':<20}{'encoding':<10}{'bytes':>10}{'cpu ms/req':>12}")
+    for name, compress_class, config in scenarios:
+        app = create_benchmark_app(compress_class(), args.resources, **config)
+        for path in paths:
+            for accept_encoding in ACCEPT_ENCODINGS:
+                encoding, body_size, cpu_ms = measure(app, path, accept_encoding, args.requests)
+                print(f"{name:<32}{path:<26}{accept_encoding:<20}{encoding:<10}{body_size:>10}{cpu_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Resource instance cost ingestion of a synthetic billing month, with the per CRN implementation cost syncs used before
+(three SELECTs and a commit per CRN) and with ibm.common.cost_utils.update_resource_instances_cost (grouped reads and
+chunked bulk upserts in one transaction).
+
+Two syncs of the month are ingested: the first one of the day, which creates the costs and daily costs, and the one of
+the next day, which updates the costs and adds a daily cost per CRN. Both implementations must leave the same costs
+and daily costs behind. Statements are the statements sent to the database, a proxy of the round trips which dominate
+with a remote MySQL; the default in memory SQLite database has none of the network latency.
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/cost_ingestion_benchmark.py [--resources 30000] [--database-uri sqlite://] [--skip-legacy]
+"""
+import argparse
+import random
+import time
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import configure_mappers, sessionmaker
+
+from ibm.common.cost_utils import update_resource_instances_cost
+from ibm.models import IBMCost, IBMResourceInstancesCost, IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost
+from ibm.models.base import Base
+from tests.utils import register_mysql_functions
+
+CLOUD_ID = "0" * 32
+COST_ID = "1" * 32
+MODELS = [IBMCost, IBMResourceInstancesCost, IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost]
+SERVICES = ["is.instance", "is.volume", "is.floating-ip", "is.load-balancer", "is.snapshot", "containers-kubernetes"]
+
+
+def legacy_update_individual_cost(cloud_id, cost_id, m_resources_cost, m_ibm_cost_time, db_session):
+    """
+    update_individual_cost as cost syncs ran it before update_resource_instances_cost
+    """
+    for m_resource_cost in m_resources_cost:
+        crn = m_resource_cost['resource_instance_id']
+        resource_id = m_resource_cost['resource_id']
+        m_month = m_resource_cost['month']
+        m_month_datetime = datetime(int(m_month.split('-')[0]), int(m_month.split('-')[1]), 1)
+
+        cost_mtd = 0.0
+        for usage_and_cost in m_resource_cost['usage']:
+            cost_mtd = round(sum([cost_mtd, float(usage_and_cost['cost'])]))
+
+        if resource_id == 'is.floating-ip':
+            esitmated_cost = cost_mtd
+        else:
+            time_now = datetime.now()
+            days_passed = time_now.day
+            current_date = date.today()
+            days_in_month = monthrange(current_date.year, current_date.month)[1]
+            utcnow = datetime.utcnow()
+            if f'{utcnow.year}-{utcnow.month}' == m_month:
+                esitmated_cost = round((cost_mtd / days_passed) * days_in_month)
+            else:
+                esitmated_cost = round(cost_mtd)
+
+        resource_instance_cost = IBMResourceInstancesCost(resource_id=resource_id, cost=cost_mtd,
+                                                          estimated_cost=esitmated_cost, crn=crn)
+        db_resource_instance_cost = db_session.query(IBMResourceInstancesCost).filter_by(
+            resource_id=resource_id, cloud_id=cloud_id, cost_id=cost_id, crn=crn).first()
+
+        db_daily_cost_obj = db_session.query(IBMResourceInstancesDailyCost).filter_by(
+            cloud_id=cloud_id, cost_id=cost_id, resource_id=resource_id, crn=crn
+        ).order_by(IBMResourceInstancesDailyCost.created_at.desc()).first()
+        db_daily_mtd_cost = db_session.query(func.sum(IBMResourceInstancesDailyCost.daily_cost).label('cost')). \
+            filter_by(cloud_id=cloud_id, cost_id=cost_id, resource_id=resource_id, crn=crn).first().cost or 0.0
+        current_time_datetime = datetime.strptime(m_ibm_cost_time, "%Y-%m-%d %H:%M:%S")
+        if db_daily_cost_obj:
+            created_time = str(db_daily_cost_obj.created_at).split('.')[0]
+            created_datetime = datetime.strptime(str(created_time), "%Y-%m-%d %H:%M:%S")
+            hour_lapsed = (current_time_datetime - created_datetime).total_seconds() / 3600
+            if hour_lapsed > 24:
+                date_ = db_daily_cost_obj.date + timedelta(days=1)
+                if int(date_.month) == int(m_month.split('-')[1]):
+                    daily_cost = IBMResourceInstancesDailyCost(resource_id=resource_id, crn=crn, date=date_,
+                                                               daily_cost=round(abs(cost_mtd - db_daily_mtd_cost)))
+                    daily_cost.cost_id = cost_id
+                    daily_cost.cloud_id = cloud_id
+                    db_session.add(daily_cost)
+        else:
+            current_time_datetime_est = current_time_datetime - timedelta(hours=1)
+            date_ = None
+            if current_time_datetime_est.date().day == 1 and \
+                    current_time_datetime_est.date().month == m_month_datetime.month:
+                date_ = datetime(m_month_datetime.year, m_month_datetime.month, 1).date()
+            elif current_time_datetime_est.date().month == m_month_datetime.month:
+                date_ = current_time_datetime.date()
+            if date_:
+                daily_cost = IBMResourceInstancesDailyCost(resource_id=resource_id, daily_cost=cost_mtd, crn=crn,
+                                                           date=date_)
+                daily_cost.cost_id = cost_id
+                daily_cost.cloud_id = cloud_id
+                db_session.add(daily_cost)
+
+        if db_resource_instance_cost:
+            db_resource_instance_cost.update_from_obj(resource_instance_cost)
+        else:
+            resource_instance_cost.cloud_id = cloud_id
+            resource_instance_cost.cost_id = cost_id
+            db_session.add(resource_instance_cost)
+        db_session.commit()
+
+
+def bulk_update_resource_instances_cost(cloud_id, cost_id, m_resources_cost, m_ibm_cost_time, db_session):
+    update_resource_instances_cost(cloud_id=cloud_id, cost_id=cost_id, m_resources_cost=m_resources_cost,
+                                   m_ibm_cost_time=m_ibm_cost_time, db_session=db_session)
+    db_session.commit()
+
+
+def generate_month_costs(resources_count, month, growth=0.0, seed=0):
+    """
+    Cost response resources of a month, `growth` is the share the cost of every usage grew by since the first sync
+    """
+    rng = random.Random(seed)
+    resources_cost = []
+    for index in range(resources_count):
+        service = SERVICES[index % len(SERVICES)]
+        resources_cost.append({
+            "month": month,
+            "resource_id": service,
+            "resource_instance_id": f"crn:v1:bluemix:public:{service}:us-south:a/{CLOUD_ID}::instance:{index:06}",
+            "usage": [
+                {"cost": rng.uniform(1, 500) * (1 + growth), "metric": f"METRIC_{metric}", "unit": "UNIT"}
+                for metric in range(rng.randint(1, 3))
+            ],
+        })
+
+    return resources_cost
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self.count_statement)
+        event.listen(engine, "commit", self.count_commit)
+
+    def count_statement(self, *args):
+        self.statements += 1
+
+    def count_commit(self, *args):
+        self.commits += 1
+
+
+def create_database(database_uri):
+    engine = create_engine(database_uri)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", register_mysql_functions)
+
+    tables = [model.__table__ for model in MODELS]
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    with engine.begin() as connection:
+        connection.execute(IBMCost.__table__.insert().values(
+            id=COST_ID, account_id="account", billing_month=datetime.utcnow().replace(day=1), billable_cost=0.0,
+            non_billable_cost=0.0, billing_country_code="USA", billing_currency_code="USD", final=False,
+            cloud_id=CLOUD_ID
+        ))
+
+    return engine
+
+
+def get_ingested_costs(db_session):
+    costs = sorted(db_session.query(
+        IBMResourceInstancesCost.resource_id, IBMResourceInstancesCost.crn, IBMResourceInstancesCost.cost,
+        IBMResourceInstancesCost.estimated_cost
+    ).all())
+    daily_costs = sorted(db_session.query(
+        IBMResourceInstancesDailyCost.resource_id, IBMResourceInstancesDailyCost.crn,
+        IBMResourceInstancesDailyCost.date, IBMResourceInstancesDailyCost.daily_cost
+    ).all())
+    return costs, daily_costs
+
+
+def run(name, update_cost, database_uri, resources_count):
+    engine = create_database(database_uri)
+    db_session = sessionmaker(bind=engine)()
+    counter = StatementCounter(engine)
+
+    utcnow = datetime.utcnow()
+    month = f"{utcnow.year}-{utcnow.month:02}"
+    syncs = [("first sync", generate_month_costs(resources_count, month)),
+             ("next day sync", generate_month_costs(resources_count, month, growth=0.05))]
+    for index, (sync_name, m_resources_cost) in enumerate(syncs):
+        if index:
+            # the daily costs of the first sync were ingested a day ago
+            a_day_ago = datetime.utcnow() - timedelta(hours=25)
+            with engine.begin() as connection:
+                connection.execute(IBMResourceInstancesDailyCost.__table__.update().values(created_at=a_day_ago))
+                connection.execute(IBMResourceInstancesMTDCost.__table__.update().values(
+                    last_daily_cost_created_at=a_day_ago))
+
+        counter.statements = counter.commits = 0
+        start = time.perf_counter()
+        update_cost(CLOUD_ID, COST_ID, m_resources_cost, datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"), db_session)
+        seconds = time.perf_counter() - start
+        print(f"{name:<16}{sync_name:<16}{resources_count:>10}{counter.statements:>12}{counter.commits:>10}"
+              f"{seconds:>10.2f}")
+
+    ingested_costs = get_ingested_costs(db_session)
+    db_session.close()
+    engine.dispose()
+    return ingested_costs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=30000, help="billable resources in the month")
+    parser.add_argument("--database-uri", default="sqlite://",
+                        help="database to ingest into, its cost tables are dropped and created again")
+    parser.add_argument("--skip-legacy", action="store_true", help="only run update_resource_instances_cost")
+    args = parser.parse_args()
+
+    configure_mappers()
+    print(f"{'implementation':<16}{'sync':<16}{'resources':>10}{'statements':>12}{'commits':>10}{'seconds':>10}")
+    bulk_costs = run("bulk", bulk_update_resource_instances_cost, args.database_uri, args.resources)
+    if not args.skip_legacy:
+        legacy_costs = run("legacy", legacy_update_individual_cost, args.database_uri, args.resources)
+        print(f"costs and daily costs match: {bulk_costs == legacy_costs}")
+
+
+if __name__ == "__main__":
+    main()
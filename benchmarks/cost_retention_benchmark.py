@@ -0,0 +1,242 @@
+"""
+Query latency and storage of the cost tables on a synthetic multi-year history, with the indexes the tables had
+before the cloud scoped cost indexes, with the current ones, and with the current ones once the history older than the
+retention of IBMCostConfig was purged (ibm.common.cost_utils.purge_expired_cost_data).
+
+Every cloud gets an IBMCost per month, a resource instance cost and a month to date total per resource and month, a
+daily cost per resource and day and a number of resource tracking actions per day. The queries are the access patterns
+of the cost syncs and reports, for the first cloud: the costs of a batch of CRNs of the latest month, the daily costs
+of a CRN, the daily spend of the latest month and the actions of the last 30 days. Latencies are medians.
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/cost_retention_benchmark.py [--years 3] [--clouds 4] [--resources 250]
+        [--database-uri sqlite://]
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import create_engine, event, func, Index, select, text
+from sqlalchemy.orm import configure_mappers, sessionmaker
+
+from config import IBMCostConfig
+from ibm.common.cost_utils import purge_expired_cost_data
+from ibm.models import IBMCost, IBMCostTrackingRollup, IBMResourceInstancesCost, IBMResourceInstancesDailyCost, \
+    IBMResourceInstancesMTDCost, IBMResourceTracking
+from ibm.models.base import Base
+from tests.utils import register_mysql_functions
+
+MODELS = [
+    IBMCost, IBMResourceInstancesCost, IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost, IBMResourceTracking,
+    IBMCostTrackingRollup
+]
+SERVICES = ["is.instance", "is.volume", "is.floating-ip", "is.load-balancer", "is.snapshot", "containers-kubernetes"]
+INSERT_CHUNK_SIZE = 10000
+
+# the composite indexes of the current schema
+CURRENT_INDEXES = [
+    index for model in [IBMResourceInstancesCost, IBMResourceInstancesDailyCost, IBMResourceTracking]
+    for index in model.__table__.indexes if len(index.columns) > 1
+]
+
+
+def get_crn(cloud_id, index):
+    return f"crn:v1:bluemix:public:{SERVICES[index % len(SERVICES)]}:us-south:a/{cloud_id}::instance:{index:06}"
+
+
+def generate_history(engine, cloud_ids, months, resources_count, actions_per_day, seed=0):
+    """
+    :return: <dict> cloud id -> [cost ids of the months, oldest first]
+    """
+    rng = random.Random(seed)
+    utcnow = datetime.utcnow()
+    current_month = utcnow.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    rows = {model: [] for model in MODELS}
+    cost_ids = {}
+
+    def flush(connection, force=False):
+        for model, model_rows in rows.items():
+            if model_rows and (force or len(model_rows) >= INSERT_CHUNK_SIZE):
+                connection.execute(model.__table__.insert(), model_rows)
+                model_rows.clear()
+
+    with engine.begin() as connection:
+        for cloud_id in cloud_ids:
+            cost_ids[cloud_id] = []
+            for months_ago in reversed(range(months)):
+                month = current_month - relativedelta(months=months_ago)
+                days = utcnow.day if not months_ago else monthrange(month.year, month.month)[1]
+                cost_id = uuid.uuid4().hex
+                cost_ids[cloud_id].append(cost_id)
+                rows[IBMCost].append({
+                    "id": cost_id, "account_id": "account", "billing_month": month, "billable_cost": 0.0,
+                    "non_billable_cost": 0.0, "billing_country_code": "USA", "billing_currency_code": "USD",
+                    "final": bool(months_ago), "cloud_id": cloud_id
+                })
+                for index in range(resources_count):
+                    resource_id, crn = SERVICES[index % len(SERVICES)], get_crn(cloud_id, index)
+                    daily_costs = [round(rng.uniform(0, 20)) for _ in range(days)]
+                    rows[IBMResourceInstancesCost].append({
+                        "id": uuid.uuid4().hex, "resource_id": resource_id, "crn": crn, "cost": sum(daily_costs),
+                        "estimated_cost": sum(daily_costs), "cost_id": cost_id, "cloud_id": cloud_id
+                    })
+                    rows[IBMResourceInstancesMTDCost].append({
+                        "id": IBMResourceInstancesMTDCost.generate_id(cost_id, resource_id, crn),
+                        "resource_id": resource_id, "crn": crn, "mtd_cost": sum(daily_costs),
+                        "last_daily_cost_date": (month + timedelta(days=days - 1)).date(),
+                        "last_daily_cost_created_at": month + timedelta(days=days - 1), "updated_at": utcnow,
+                        "cost_id": cost_id, "cloud_id": cloud_id
+                    })
+                    rows[IBMResourceInstancesDailyCost].extend({
+                        "id": uuid.uuid4().hex, "resource_id": resource_id, "crn": crn, "daily_cost": daily_cost,
+                        "date": (month + timedelta(days=day)).date(), "created_at": month + timedelta(days=day),
+                        "cost_id": cost_id, "cloud_id": cloud_id
+                    } for day, daily_cost in enumerate(daily_costs))
+                    flush(connection)
+
+                rows[IBMResourceTracking].extend({
+                    "id": uuid.uuid4().hex, "resource_type": "IBMInstance",
+                    "estimated_savings": round(rng.uniform(1, 100), 2), "action_type": "DELETED",
+                    "action_taken_at": month + timedelta(days=day, seconds=rng.randrange(86400)), "resource_json": {},
+                    "cloud_id": cloud_id
+                } for day in range(days) for _ in range(actions_per_day))
+
+        flush(connection, force=True)
+
+    return cost_ids
+
+
+def get_table_sizes(engine):
+    """
+    :return: <dict> table name -> (rows, bytes of the table and its indexes)
+    """
+    sizes = {}
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            table_bytes = dict(connection.execute(text(
+                "SELECT sqlite_master.tbl_name, SUM(dbstat.pgsize) FROM dbstat "
+                "JOIN sqlite_master ON sqlite_master.name = dbstat.name GROUP BY sqlite_master.tbl_name"
+            )).all())
+        else:
+            table_bytes = dict(connection.execute(text(
+                "SELECT table_name, data_length + index_length FROM information_schema.tables "
+                "WHERE table_schema = DATABASE()"
+            )).all())
+
+        for model in MODELS:
+            table_name = model.__tablename__
+            rows = connection.execute(select(func.count()).select_from(model.__table__)).scalar()
+            sizes[table_name] = (rows, table_bytes.get(table_name) or 0)
+
+    return sizes
+
+
+def measure_query(query, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        query.all()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(latencies)
+
+
+def get_queries(db_session, cloud_id, cost_id, resources_count):
+    crns = [get_crn(cloud_id, index) for index in range(min(resources_count, 100))]
+    return [
+        ("instance costs of 100 CRNs", db_session.query(IBMResourceInstancesCost).filter(
+            IBMResourceInstancesCost.cloud_id == cloud_id, IBMResourceInstancesCost.cost_id == cost_id,
+            IBMResourceInstancesCost.crn.in_(crns)
+        )),
+        ("daily costs of a CRN", db_session.query(IBMResourceInstancesDailyCost).filter(
+            IBMResourceInstancesDailyCost.cloud_id == cloud_id, IBMResourceInstancesDailyCost.cost_id == cost_id,
+            IBMResourceInstancesDailyCost.crn == crns[0]
+        ).order_by(IBMResourceInstancesDailyCost.date)),
+        ("daily spend of the month", db_session.query(
+            IBMResourceInstancesDailyCost.date, func.sum(IBMResourceInstancesDailyCost.daily_cost)
+        ).filter(
+            IBMResourceInstancesDailyCost.cloud_id == cloud_id, IBMResourceInstancesDailyCost.cost_id == cost_id
+        ).group_by(IBMResourceInstancesDailyCost.date)),
+        ("actions of the last 30 days", db_session.query(IBMResourceTracking).filter(
+            IBMResourceTracking.cloud_id == cloud_id,
+            IBMResourceTracking.action_taken_at >= datetime.utcnow() - timedelta(days=30)
+        )),
+    ]
+
+
+def report(scenario, engine, db_session, cloud_id, cost_id, resources_count, repeats):
+    for name, query in get_queries(db_session, cloud_id, cost_id, resources_count):
+        print(f"{scenario:<26}{name:<32}{measure_query(query, repeats):>12.2f} ms")
+
+    for table_name, (rows, size) in get_table_sizes(engine).items():
+        print(f"{scenario:<26}{table_name:<40}{rows:>10} rows{size / 2 ** 20:>10.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=3, help="years of history")
+    parser.add_argument("--clouds", type=int, default=4, help="clouds sharing the tables")
+    parser.add_argument("--resources", type=int, default=250, help="billable resources per cloud")
+    parser.add_argument("--actions-per-day", type=int, default=20, help="resource tracking actions per cloud and day")
+    parser.add_argument("--repeats", type=int, default=20, help="runs per query")
+    parser.add_argument("--database-uri", default="sqlite://",
+                        help="database to fill, its cost tables are dropped and created again")
+    args = parser.parse_args()
+
+    configure_mappers()
+    engine = create_engine(args.database_uri)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", register_mysql_functions)
+
+    tables = [model.__table__ for model in MODELS]
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    for index in CURRENT_INDEXES:
+        index.drop(engine)
+    # the index the current ones replaced, created once the tables are so it is not part of the current schema
+    original_indexes = [
+        Index("ix_ibm_resource_instances_cost_cost_id_crn", IBMResourceInstancesCost.__table__.c.cost_id,
+              IBMResourceInstancesCost.__table__.c.crn)
+    ]
+    for index in original_indexes:
+        index.create(engine)
+
+    cloud_ids = [f"{index:032}" for index in range(args.clouds)]
+    start = time.perf_counter()
+    cost_ids = generate_history(engine, cloud_ids, args.years * 12, args.resources, args.actions_per_day)
+    print(f"history of {args.years} years generated in {time.perf_counter() - start:.1f}s")
+
+    db_session = sessionmaker(bind=engine)()
+    cloud_id, latest_cost_id = cloud_ids[0], cost_ids[cloud_ids[0]][-1]
+    report("original indexes", engine, db_session, cloud_id, latest_cost_id, args.resources, args.repeats)
+
+    for index in original_indexes:
+        index.drop(engine)
+    for index in CURRENT_INDEXES:
+        index.create(engine)
+    report("current indexes", engine, db_session, cloud_id, latest_cost_id, args.resources, args.repeats)
+
+    start = time.perf_counter()
+    for purged_cloud_id in cloud_ids:
+        purge_expired_cost_data(purged_cloud_id, db_session)
+    print(
+        f"purged in {time.perf_counter() - start:.1f}s, retention of "
+        f"{IBMCostConfig.IBM_DAILY_COST_RETENTION_MONTHS} months for the daily costs, "
+        f"{IBMCostConfig.IBM_RESOURCE_INSTANCES_COST_RETENTION_MONTHS} for the instance costs and "
+        f"{IBMCostConfig.IBM_RESOURCE_TRACKING_RETENTION_MONTHS} for the resource tracking"
+    )
+    if engine.dialect.name == "sqlite":
+        # deleted pages are only given back by a VACUUM, OPTIMIZE TABLE does the same on MySQL
+        with engine.connect() as connection:
+            connection.execute(text("VACUUM"))
+    report("current indexes, purged", engine, db_session, cloud_id, latest_cost_id, args.resources, args.repeats)
+    db_session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Vyatta 5600 config analysis of a large synthetic gateway config, as the SoftLayer discovery runs it
+(ibm.tasks.ibm.softlayer.softlayer_tasks): the private subnets, their public gateway and attached firewalls, and the
+IPSec VPNs.
+
+The config has VIFs with one or two subnets and firewalls in and out, NAT source rules masquerading a part of the
+subnets, firewalls whose rules refer to address and port groups, and site-to-site peers with tunnels. Its size grows
+linearly with --scale. A previous implementation of the analyzer can be given with --baseline to time it on the same
+configs and check it returns the same results, for instance the one before the config was indexed:
+
+    git show 37432b4^:ibm/common/clients/softlayer_clients/vyatta56analyzer/vyatta56analyzer.py > /tmp/baseline.py
+
+Usage (from the repository root):
+    PYTHONPATH=. python benchmarks/vyatta56_analyzer_benchmark.py [--scale 1 2 4] [--baseline /tmp/baseline.py]
+"""
+import argparse
+import importlib.util
+import json
+import random
+import time
+
+from ibm.common.clients.softlayer_clients.vyatta56analyzer import Vyatta56Analyzer
+from tests.test_vyatta56_analyzer import to_data
+
+PROTOCOLS = ["tcp", "udp", "icmp", "all"]
+
+
+def generate_config(scale, seed=0):
+    """
+    Config of 250 VIFs, 100 firewalls of 10 rules, 50 address and port groups and 10 peers of 5 tunnels per unit of
+    scale, about 6k lines
+    """
+    rng = random.Random(seed)
+    vifs, firewalls, groups, peers = 250 * scale, 100 * scale, 50 * scale, 10 * scale
+    firewall_names = [f"FW-{index:05}" for index in range(firewalls)]
+    lines = ["set interfaces bonding dp0bond0 address '10.0.0.1/26'", "set interfaces bonding dp0bond0 mode 'lacp'"]
+    nat_lines = []
+    for index in range(vifs):
+        vif_prefix = f"set interfaces bonding dp0bond0 vif {100 + index}"
+        network = f"10.{1 + index // 256}.{index % 256}.0/24"
+        lines.append(f"{vif_prefix} address '{network[:-4]}1/24'")
+        if index % 2:
+            transit_address = f"172.{16 + index // 16384}.{index // 64 % 256}.{index % 64 * 4 + 1}/30"
+            lines.append(f"{vif_prefix} address '{transit_address}'")
+        lines.append(f"{vif_prefix} description 'VIF {index}'")
+        lines.append(f"{vif_prefix} firewall in '{rng.choice(firewall_names)}'")
+        lines.append(f"{vif_prefix} firewall out '{rng.choice(firewall_names)}'")
+        if not index % 3:
+            rule_prefix = f"set service nat source rule {1000 + index}"
+            nat_lines.extend([
+                f"{rule_prefix} outbound-interface 'dp0bond1'", f"{rule_prefix} source address '{network}'",
+                f"{rule_prefix} translation address 'masquerade'"
+            ])
+
+    for index in range(groups):
+        lines.extend([
+            f"set resources group address-group AG-{index:05} address '10.200.{index % 256}.{index // 256 + 1}'",
+            f"set resources group address-group AG-{index:05} address '10.201.{index % 256}.{index // 256 + 1}'",
+            f"set resources group port-group PG-{index:05} port '{8000 + index}'",
+            f"set resources group port-group PG-{index:05} port 'https'",
+        ])
+
+    for name in firewall_names:
+        lines.append(f"set security firewall name {name} default-action 'drop'")
+        for rule_no in range(10, 110, 10):
+            rule_prefix = f"set security firewall name {name} rule {rule_no}"
+            protocol = rng.choice(PROTOCOLS)
+            lines.extend([f"{rule_prefix} action '{rng.choice(['accept', 'drop'])}'",
+                          f"{rule_prefix} description 'Rule {rule_no} of {name}'"])
+            if protocol in ["tcp", "udp"]:
+                port = f"PG-{rng.randrange(groups):05}" if rng.random() < 0.3 else str(rng.randrange(1, 65536))
+                lines.append(f"{rule_prefix} destination port '{port}'")
+            address = f"AG-{rng.randrange(groups):05}" if rng.random() < 0.3 else \
+                f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/24"
+            lines.append(f"{rule_prefix} {rng.choice(['source', 'destination'])} address '{address}'")
+            if protocol != "all":
+                lines.append(f"{rule_prefix} protocol '{protocol}'")
+
+    lines.extend(nat_lines)
+    for group_type, group_lines in [
+        ("esp-group", ["lifetime '3600'", "mode 'tunnel'", "pfs 'dh-group14'", "proposal 1 encryption 'aes256'",
+                       "proposal 1 hash 'sha256'"]),
+        ("ike-group", ["lifetime '28800'", "proposal 1 dh-group '14'", "proposal 1 encryption 'aes256'",
+                       "proposal 1 hash 'sha256'"]),
+    ]:
+        for index in range(4):
+            lines.extend(f"set security vpn ipsec {group_type} {group_type.upper()}-{index} {group_line}"
+                         for group_line in group_lines)
+
+    for index in range(peers):
+        peer_prefix = f"set security vpn ipsec site-to-site peer 50.23.{index // 256}.{index % 256}"
+        lines.extend([
+            f"{peer_prefix} authentication mode 'pre-shared-secret'",
+            f"{peer_prefix} authentication pre-shared-secret 'secret-{index}'",
+            f"{peer_prefix} default-esp-group 'ESP-GROUP-{index % 4}'",
+            f"{peer_prefix} ike-group 'IKE-GROUP-{index % 4}'",
+        ])
+        for tunnel_no in range(5):
+            lines.extend([
+                f"{peer_prefix} tunnel {tunnel_no} local prefix '10.{1 + index // 256}.{index % 256}.0/24'",
+                f"{peer_prefix} tunnel {tunnel_no} remote prefix '192.168.{index % 256}.{tunnel_no * 32}/27'",
+            ])
+
+    lines.append("set system host-name 'vyatta-benchmark'")
+    return "\n".join(lines)
+
+
+def discover(analyzer_class, configs):
+    """
+    Analysis of a config as the SoftLayer discovery runs it
+    :return: (<dict> step -> seconds, plain data of the results)
+    """
+    seconds = {}
+    start = time.perf_counter()
+    analyzer = analyzer_class(configs)
+    seconds["index"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    subnets = analyzer.get_private_subnets()
+    seconds["private subnets"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for subnet in subnets:
+        subnet.public_gateway = analyzer.has_public_gateway(subnet.network)
+        subnet.firewalls = analyzer.get_attached_firewalls(subnet.vif_id)
+    seconds["gateways and firewalls"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vpns = analyzer.get_ipsec()
+    seconds["ipsec"] = time.perf_counter() - start
+
+    return seconds, json.loads(json.dumps(to_data([subnets, vpns])))
+
+
+def load_analyzer_class(path):
+    spec = importlib.util.spec_from_file_location("baseline_vyatta56analyzer", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Vyatta56Analyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 2, 4], help="sizes of the configs")
+    parser.add_argument("--baseline", help="file of a previous implementation of Vyatta56Analyzer to compare with")
+    args = parser.parse_args()
+
+    implementations = [("indexed", Vyatta56Analyzer)]
+    if args.baseline:
+        implementations.append(("baseline", load_analyzer_class(args.baseline)))
+
+    steps = ["index", "private subnets", "gateways and firewalls", "ipsec"]
+    print(f"{'implementation':<16}{'lines':>8}" + "".join(f"{step:>24}" for step in steps) + f"{'total s':>12}")
+    for scale in args.scale:
+        configs = generate_config(scale)
+        lines_count = configs.count("\n") + 1
+        results = {}
+        for name, analyzer_class in implementations:
+            seconds, results[name] = discover(analyzer_class, configs)
+            print(f"{name:<16}{lines_count:>8}" + "".join(f"{seconds[step]:>24.3f}" for step in steps) +
+                  f"{sum(seconds.values()):>12.3f}")
+
+        if args.baseline:
+            print(f"{'':<16}{lines_count:>8} results match: {results['indexed'] == results['baseline']}")
+
+
+if __name__ == "__main__":
+    main()
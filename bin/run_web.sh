@@ -1,8 +1,7 @@
 #!/usr/bin/env bash
 
-LOGGING_LEVEL="${LOGGING_LEVEL:DEBUG}"
-
 #run and deploy latest migrations
 flask deploy
 
-gunicorn --reload --access-logfile "-" --error-logfile "-" --log-level LOGGING_LEVEL --worker-class gevent --workers=3 --timeout 60 --bind 0.0.0.0:8081 app:app
+# Worker model, DB pool and reload/preload are configured through WEB_* env variables, see gunicorn.conf.py
+gunicorn --config gunicorn.conf.py app:app
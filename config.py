@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 
@@ -30,10 +31,39 @@ class DatabaseConfig:
                   "IBM_DB_NAME}".format(**IBM_DB_PARAMS)
 
 
+class WebServerConfig:
+    """
+    gunicorn serving model of the web tier, see gunicorn.conf.py
+    """
+    WEB_BIND = os.environ.get("WEB_BIND", "0.0.0.0:8081")
+    WEB_WORKERS = int(os.environ.get("WEB_WORKERS", "3"))
+    # Greenlets (open client connections) a gevent worker accepts
+    WEB_WORKER_CONNECTIONS = int(os.environ.get("WEB_WORKER_CONNECTIONS", "1000"))
+    # MySQL connections the whole web tier may hold, split evenly between the workers. The default keeps the previous
+    # 5 connections per worker. This budget plus (SQLALCHEMY_POOL_SIZE + SQLALCHEMY_MAX_OVERFLOW) per celery worker
+    # process must stay under the MySQL max_connections
+    WEB_DB_CONNECTIONS = int(os.environ.get("WEB_DB_CONNECTIONS", str(5 * WEB_WORKERS)))
+    # DB pool of a worker, its share of WEB_DB_CONNECTIONS. The pool is sized to the requests a worker serves at once,
+    # so waiting for a connection should be rare and short
+    WEB_DB_POOL_SIZE = max(WEB_DB_CONNECTIONS // max(WEB_WORKERS, 1), 1)
+    WEB_DB_POOL_TIMEOUT = int(os.environ.get("WEB_DB_POOL_TIMEOUT", "10"))
+    # Requests a worker serves at once, each holding at most one DB connection. The rest are answered with a 503
+    # once they waited WEB_CONCURRENCY_WAIT_TIMEOUT seconds for a slot. 0 disables the limit.
+    WEB_MAX_CONCURRENT_REQUESTS = int(os.environ.get("WEB_MAX_CONCURRENT_REQUESTS", str(WEB_DB_POOL_SIZE)))
+    WEB_CONCURRENCY_WAIT_TIMEOUT = float(os.environ.get("WEB_CONCURRENCY_WAIT_TIMEOUT", "2"))
+    WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", "60"))
+    # File watching reloader, for local development only
+    WEB_RELOAD = os.environ.get("WEB_RELOAD", "false").lower() == "true"
+    # Import the app in the master before forking so workers share its memory pages
+    WEB_PRELOAD = os.environ.get("WEB_PRELOAD", "true").lower() == "true"
+
+
 class SQLAlchemyConfig:
     SQLALCHEMY_DATABASE_URI = DatabaseConfig.MYSQLDB_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_POOL_RECYCLE = int(os.environ.get("SQLALCHEMY_POOL_RECYCLE", "400"))
+    # Pool of every process using the database (celery workers, discovery..) but the web workers, which use
+    # WebServerConfig.WEB_DB_POOL_SIZE and WEB_DB_POOL_TIMEOUT
     SQLALCHEMY_POOL_TIMEOUT = int(os.environ.get("SQLALCHEMY_POOL_TIMEOUT", "450"))
     SQLALCHEMY_POOL_SIZE = int(os.environ.get("SQLALCHEMY_POOL_SIZE", "5"))
     SQLALCHEMY_MAX_OVERFLOW = int(os.environ.get("SQLALCHEMY_MAX_OVERFLOW", "0"))
@@ -61,6 +91,26 @@ class BrokerConfig:
     BROKER_NAME = os.environ.get("BROKER_NAME", "redis")
 
 
+class WorkflowProgressConfig:
+    # Redis pub/sub channel prefix on which workflow root and task status transitions are published
+    CHANNEL_PREFIX = os.environ.get("WORKFLOW_PROGRESS_CHANNEL_PREFIX", "workflow_progress")
+    # Seconds after which an idle event stream sends a keep-alive comment
+    HEARTBEAT_INTERVAL = int(os.environ.get("WORKFLOW_PROGRESS_HEARTBEAT_INTERVAL", "15"))
+    # Seconds after which an event stream is closed, clients reconnect with the standard EventSource retry
+    MAX_STREAM_DURATION = int(os.environ.get("WORKFLOW_PROGRESS_MAX_STREAM_DURATION", "900"))
+    # Events buffered per subscriber before the oldest ones are dropped
+    SUBSCRIBER_QUEUE_SIZE = int(os.environ.get("WORKFLOW_PROGRESS_SUBSCRIBER_QUEUE_SIZE", "100"))
+
+
+class CostResponseCacheConfig:
+    # Seconds a cached cost API response is kept in Redis, responses of older cost data generations simply expire
+    RESPONSE_TTL = int(os.environ.get("COST_RESPONSE_CACHE_TTL", "86400"))
+    # Cost API responses kept in memory per worker process
+    LOCAL_CACHE_SIZE = int(os.environ.get("COST_RESPONSE_LOCAL_CACHE_SIZE", "256"))
+    # Seconds a cost API response is kept in memory
+    LOCAL_CACHE_TTL = int(os.environ.get("COST_RESPONSE_LOCAL_CACHE_TTL", "300"))
+
+
 class VeleroConfig:
     VELERO_API_KEY = os.environ.get("ENV_DRASS_VELERO_API_KEY", "mykey123")
     VELERO_PARAMS = {
@@ -145,7 +195,34 @@ class MangosIBMGRPCClientConfigs(MangosGRPCClientConfigs):
     MANGOS_GRPC_URL = "{}:{}".format(MANGOS_GRPC_HOST, MANGOS_GRPC_PORT)
 
 
-class FlaskDevelopmentConfig(FlaskConfig, SQLAlchemyConfig):
+class CompressionConfig:
+    """
+    Response compression policy, see ibm.web.common.compression.CompressionPolicy
+    """
+    # Leave compression to the reverse proxy (see nginx/nginx.conf) instead of compressing in the gunicorn workers
+    COMPRESS_OFFLOAD_TO_PROXY = os.environ.get("COMPRESS_OFFLOAD_TO_PROXY", "false").lower() == "true"
+    # Responses smaller than this (in bytes) are not worth a compression pass, about one TCP segment
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1400"))
+    # Default level used for gzip/deflate and as brotli quality
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "5"))
+    # Levels per flask endpoint, the heaviest JSON payloads trade some ratio for a lot less CPU
+    COMPRESS_ENDPOINT_LEVELS = json.loads(os.environ.get("COMPRESS_ENDPOINT_LEVELS", "null")) or {
+        "workspace.list_ibm_resources": 1,
+        "ibm_reporting.get_ibm_cloud_report": 1,
+        "ibm_idle_resources.list_ibm_idle_resources": 1,
+        "ibm_resource_tracking.list_ibm_cost_tracking": 1,
+        "ibm_resource_tracking.list_ibm_recommendations": 1,
+    }
+    # Bodies bigger than this (in bytes) are compressed on the gevent hub threadpool so other greenlets keep running
+    COMPRESS_THREADPOOL_MIN_SIZE = int(os.environ.get("COMPRESS_THREADPOOL_MIN_SIZE", str(256 * 1024)))
+    # Number of compressed bodies of ETag'd responses (e.g. regional resource snapshots) cached per worker
+    COMPRESS_CACHE_SIZE = int(os.environ.get("COMPRESS_CACHE_SIZE", "64"))
+    # Endpoints whose strong ETag fully identifies the body, so their compressed bodies can be cached
+    COMPRESS_CACHED_ENDPOINTS = ["workspace.list_ibm_resources"]
+    COMPRESS_ALGORITHM = ["br", "gzip", "deflate"]
+
+
+class FlaskDevelopmentConfig(FlaskConfig, SQLAlchemyConfig, CompressionConfig, WebServerConfig):
     # Flask Configs
     DEBUG = True
     USE_SSL = os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
@@ -153,6 +230,12 @@ class FlaskDevelopmentConfig(FlaskConfig, SQLAlchemyConfig):
     # Port is not a flask env variable but is used in a custom logic to set the port for the flask server
     PORT = 8081
 
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **SQLAlchemyConfig.SQLALCHEMY_ENGINE_OPTIONS,
+        "pool_size": WebServerConfig.WEB_DB_POOL_SIZE,
+        "pool_timeout": WebServerConfig.WEB_DB_POOL_TIMEOUT
+    }
+
 
 class TranslationConfig:
     AWS_ENV_X_API_KEY = os.environ.get("AWS_ENV_X_API_KEY", "96c7062d-9cee-4696-aaf7-b913e4dd33fe")
@@ -165,6 +248,8 @@ class ConsumptionClientConfig:
     CONSUMPTION_APP_VERSION = os.environ.get("ENV_CONSUMPTION_APP_VERSION", "v1/consumption")
     CONSUMPTION_APP_API_KEY = os.environ.get("ENV_CONSUMPTION_APP_API_KEY", "testKey123")
     CONSUMPTION_APP_URL = f"{CONSUMPTION_APP_HOST}/{CONSUMPTION_APP_VERSION}"
+    # Consumption updates sent at the same time by the periodic stats task
+    CONSUMPTION_UPDATE_CONCURRENCY = int(os.environ.get("ENV_CONSUMPTION_UPDATE_CONCURRENCY", "8"))
 
 
 class SubscriptionClientConfig:
@@ -173,6 +258,47 @@ class SubscriptionClientConfig:
     SUBSCRIPTION_APP_VERSION = os.environ.get("ENV_SUBSCRIPTION_APP_VERSION", "v1")
     SUBSCRIPTION_APP_API_KEY = os.environ.get("ENV_SUBSCRIPTION_APP_API_KEY", "testKey123")
     SUBSCRIPTION_APP_URL = f"{SUBSCRIPTION_APP_HOST}/{SUBSCRIPTION_APP_VERSION}"
+    # Seconds the subscriptions of a project are reused for
+    SUBSCRIPTIONS_CACHE_TTL = int(os.environ.get("ENV_SUBSCRIPTIONS_CACHE_TTL", "3600"))
+
+
+class MonitoringConfig:
+    # Rows per page of the Sysdig data API, adapted between the bounds while paging
+    SYSDIG_PAGE_SIZE = int(os.environ.get("SYSDIG_PAGE_SIZE", "100"))
+    SYSDIG_MIN_PAGE_SIZE = int(os.environ.get("SYSDIG_MIN_PAGE_SIZE", "10"))
+    SYSDIG_MAX_PAGE_SIZE = int(os.environ.get("SYSDIG_MAX_PAGE_SIZE", "500"))
+    # Pages fetched at the same time per task
+    SYSDIG_PAGING_CONCURRENCY = int(os.environ.get("SYSDIG_PAGING_CONCURRENCY", "4"))
+    # Sysdig data API calls per second per worker process
+    SYSDIG_RATE_LIMIT = float(os.environ.get("SYSDIG_RATE_LIMIT", "5"))
+    # Attempts of a page failing with a server side or connection error
+    SYSDIG_PAGE_ATTEMPTS = int(os.environ.get("SYSDIG_PAGE_ATTEMPTS", "5"))
+    # Retries of a task whose paging still failed with such an error, resumed from its paging progress after a delay
+    SYSDIG_TASK_RETRIES = int(os.environ.get("SYSDIG_TASK_RETRIES", "3"))
+    SYSDIG_TASK_RETRY_DELAY = int(os.environ.get("SYSDIG_TASK_RETRY_DELAY", "120"))
+
+
+class SoftlayerConfig:
+    # Virtual guests whose usage metrics are fetched by the same workflow task
+    SOFTLAYER_METRICS_BATCH_SIZE = int(os.environ.get("SOFTLAYER_METRICS_BATCH_SIZE", "200"))
+    # Virtual guests whose usage metrics are fetched at the same time per workflow task
+    SOFTLAYER_METRICS_CONCURRENCY = int(os.environ.get("SOFTLAYER_METRICS_CONCURRENCY", "8"))
+    # Authenticated SoftLayer clients kept per worker process, one per account
+    SOFTLAYER_CLIENT_CACHE_SIZE = int(os.environ.get("SOFTLAYER_CLIENT_CACHE_SIZE", "64"))
+    # Seconds between two logs of the hits, misses, invalidations and size of the SoftLayer clients cache
+    SOFTLAYER_CLIENT_CACHE_LOG_INTERVAL = int(os.environ.get("SOFTLAYER_CLIENT_CACHE_LOG_INTERVAL", "600"))
+    # SoftLayer API calls per second per SoftLayer user, shared by all worker processes through Redis, SoftLayer allows
+    # around 50 per user
+    SOFTLAYER_RATE_LIMIT = float(os.environ.get("SOFTLAYER_RATE_LIMIT", "20"))
+    # Listings of an account fetched at the same time by the inventory sync, and attempts of a failing one
+    SOFTLAYER_SYNC_CONCURRENCY = int(os.environ.get("SOFTLAYER_SYNC_CONCURRENCY", "6"))
+    SOFTLAYER_SYNC_ATTEMPTS = int(os.environ.get("SOFTLAYER_SYNC_ATTEMPTS", "3"))
+    # Virtual guests fetched per API call when the virtual servers of an account are listed
+    SOFTLAYER_VIRTUAL_SERVERS_PAGE_SIZE = int(os.environ.get("SOFTLAYER_VIRTUAL_SERVERS_PAGE_SIZE", "100"))
+    # Translated VPC resources of a type persisted per workflow task result chunk by the classic to VPC migration
+    SOFTLAYER_SCHEMA_CHUNK_SIZE = int(os.environ.get("SOFTLAYER_SCHEMA_CHUNK_SIZE", "100"))
+    # Analyzed Vyatta 5600 configs kept per worker process, one per config text
+    SOFTLAYER_VYATTA_ANALYZER_CACHE_SIZE = int(os.environ.get("SOFTLAYER_VYATTA_ANALYZER_CACHE_SIZE", "16"))
 
 
 class IBMSecurityConfig:
@@ -181,6 +307,24 @@ class IBMSecurityConfig:
 
 class IBMCostConfig:
     IBM_COST_ANALYZER_SCHEDULER = int(os.environ.get("IBM_COST_ANALYZER_SCHEDULER", "24"))
+    # Billing months fetched at the same time per cloud
+    IBM_COST_FETCH_CONCURRENCY = int(os.environ.get("IBM_COST_FETCH_CONCURRENCY", "3"))
+    # Usage reports API calls per second per worker process
+    IBM_USAGE_REPORTS_RATE_LIMIT = float(os.environ.get("IBM_USAGE_REPORTS_RATE_LIMIT", "5"))
+    # Resources of a billing month written per transaction while its usage pages are fetched
+    IBM_COST_INGEST_BATCH_SIZE = int(os.environ.get("IBM_COST_INGEST_BATCH_SIZE", "1000"))
+    # Days after its end a billing month is not rated anymore, it is fetched a last time and marked final after that
+    IBM_COST_FINALIZATION_DAYS = int(os.environ.get("IBM_COST_FINALIZATION_DAYS", "5"))
+    # Seconds the lock serializing the writes of the daily costs and month to date totals of a billing month expires
+    # after if its holder died, and a cost ingestion batch waits for it
+    IBM_COST_LOCK_TIMEOUT = int(os.environ.get("IBM_COST_LOCK_TIMEOUT", "600"))
+    IBM_COST_LOCK_WAIT = int(os.environ.get("IBM_COST_LOCK_WAIT", "300"))
+    # Months of history kept per cost table, older rows are deleted once compacted into the monthly rollups. 0 keeps
+    # them forever, anything else is at least 3 months so the billing months still being synced are never touched
+    IBM_DAILY_COST_RETENTION_MONTHS = int(os.environ.get("IBM_DAILY_COST_RETENTION_MONTHS", "13"))
+    IBM_RESOURCE_INSTANCES_COST_RETENTION_MONTHS = int(
+        os.environ.get("IBM_RESOURCE_INSTANCES_COST_RETENTION_MONTHS", "25"))
+    IBM_RESOURCE_TRACKING_RETENTION_MONTHS = int(os.environ.get("IBM_RESOURCE_TRACKING_RETENTION_MONTHS", "25"))
 
 
 flask_config = {
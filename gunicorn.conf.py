@@ -0,0 +1,36 @@
+"""
+gunicorn settings of the web tier, see config.WebServerConfig
+"""
+from gevent import monkey
+
+# With preload_app the app is imported in the master before the gevent worker patches, patch first so the modules
+# imported by the app (ssl, threading, socket) are the cooperative ones
+monkey.patch_all()
+
+from config import FlaskConfig, WebServerConfig  # noqa: E402
+
+bind = WebServerConfig.WEB_BIND
+worker_class = "gevent"
+workers = WebServerConfig.WEB_WORKERS
+worker_connections = WebServerConfig.WEB_WORKER_CONNECTIONS
+timeout = WebServerConfig.WEB_TIMEOUT
+reload = WebServerConfig.WEB_RELOAD
+preload_app = WebServerConfig.WEB_PRELOAD and not WebServerConfig.WEB_RELOAD
+
+accesslog = "-"
+errorlog = "-"
+loglevel = FlaskConfig.LOGGING_LEVEL.lower()
+
+
+def post_fork(server, worker):
+    """
+    Connections opened by the master while preloading must not be shared between the forked workers
+    """
+    if not preload_app:
+        return
+
+    from app import app
+    from ibm.web import db
+
+    with app.app_context():
+        db.engine.dispose()
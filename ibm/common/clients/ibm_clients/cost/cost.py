@@ -3,9 +3,14 @@ import datetime
 from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
 from ibm_platform_services import UsageReportsV4
 
+from config import IBMCostConfig
+from ibm.common.rate_limiter import TokenBucketRateLimiter
 from ibm.discovery.common.consts import TIME_FORMAT
 from ..base_client import BaseClient
 
+# shared by all the clouds and billing months fetched by a worker process
+usage_reports_rate_limiter = TokenBucketRateLimiter(rate=IBMCostConfig.IBM_USAGE_REPORTS_RATE_LIMIT)
+
 
 class CostClient(BaseClient):
     """
@@ -21,15 +26,34 @@ class CostClient(BaseClient):
         This method make an API call to IBM, to retrieve cost and usage values according to dimension values
         provided as a list
         """
+        response_dict = self.get_cost_and_usages(ibm_api_key=ibm_api_key, ibm_account_id=ibm_account_id,
+                                                 billing_month=billing_month)
+        response_dict['resources'] = list(response_dict['resources'])
+        response_dict['last_synced_at'] = datetime.datetime.utcnow().replace(second=0).strftime(TIME_FORMAT)
+
+        return response_dict
+
+    def get_cost_and_usages(self, ibm_api_key, ibm_account_id, billing_month):
+        """
+        Same as `list_cost_and_usages` but 'resources' is a generator fetching the resource usage pages as they are
+        consumed, so they can be ingested while the next ones are fetched
+        """
         authenticator = IAMAuthenticator(apikey=ibm_api_key)
         usage_reports_service = UsageReportsV4(authenticator=authenticator)
+        usage_reports_rate_limiter.acquire()
         response_dict = dict()
         response_dict['summary'] = usage_reports_service.get_account_summary(
             account_id=ibm_account_id, billingmonth=billing_month).get_result()
-        offset = None
-        response_dict['resources'] = list()
+        response_dict['resources'] = self.__iter_resource_usage(usage_reports_service, ibm_account_id, billing_month)
+        response_dict['last_synced_at'] = datetime.datetime.utcnow().replace(second=0).strftime(TIME_FORMAT)
+
+        return response_dict
 
+    @staticmethod
+    def __iter_resource_usage(usage_reports_service, ibm_account_id, billing_month):
+        offset = None
         while True:
+            usage_reports_rate_limiter.acquire()
             resource_usage = usage_reports_service.get_resource_usage_account(account_id=ibm_account_id,
                                                                               billingmonth=billing_month,
                                                                               limit=200,
@@ -38,12 +62,8 @@ class CostClient(BaseClient):
             if not isinstance(resource_usage, dict):
                 continue
             if resource_usage and resource_usage.get('resources'):
-                response_dict['resources'].extend(resource_usage['resources'])
+                yield from resource_usage['resources']
             if resource_usage and resource_usage.get('next') and resource_usage['next'].get('offset'):
                 offset = resource_usage['next']['offset']
             else:
                 break
-
-        response_dict['last_synced_at'] = datetime.datetime.utcnow().replace(second=0).strftime(TIME_FORMAT)
-
-        return response_dict
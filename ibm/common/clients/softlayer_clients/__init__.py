@@ -7,12 +7,12 @@ from .network_gateways import SoftlayerNetworkGatewayClient
 from .security_groups import SoftlayerSecurityGroupClient
 from .ssh_keys import SoftlayerSshKeyClient
 from .ssl_certs import SoftlayerSslCertClient
-from .subnets import SoftlayerSubnetClient
+from .subnets import SoftlayerSubnetClient, SoftlayerSubnetIndex
 from .vyatta56analyzer import Vyatta56Analyzer
 
 __all__ = [
     "SoftlayerInstanceClient", "SoftlayerImageClient", "SoftlayerSslCertClient",
     "SoftlayerSubnetClient", "SoftlayerDedicateHostClient", "SoftlayerSshKeyClient",
     "SoftlayerSecurityGroupClient", "SoftlayerLoadBalancerClient", "Vyatta56Analyzer",
-    "SoftlayerNetworkGatewayClient", "SoftlayerMonitoringClient",
+    "SoftlayerNetworkGatewayClient", "SoftlayerMonitoringClient", "SoftlayerSubnetIndex",
 ]
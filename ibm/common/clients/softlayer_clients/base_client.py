@@ -1,34 +1,191 @@
+import copy
+import hashlib
 import logging
+import threading
+import time
 
 import SoftLayer
+from cachetools import LRUCache
 from SoftLayer import SoftLayerAPIError
 from tenacity import retry_if_exception_type, Retrying, stop_after_attempt, wait_random_exponential
 
+from config import SoftlayerConfig
 from ibm import get_db_session
 from ibm.common.clients.softlayer_clients.consts import BACK_OFF_FACTOR, INVALID_API_KEY_CODE, MAX_INTERVAL, RETRY, \
     SL_RATE_LIMIT_FAULT_CODE
 from ibm.common.clients.softlayer_clients.exceptions import SLAuthError, SLExecuteError, SLRateLimitExceededError
+from ibm.common.rate_limiter import RedisTokenBucketRateLimiter
+from ibm.common.workflow_progress import get_redis_client
 from ibm.models import SoftlayerCloud
 
 LOGGER = logging.getLogger(__name__)
 
+# (cloud_id, credentials_version) -> SoftLayer client, safe to share between threads (ThreadLocalTransport)
+softlayer_clients = LRUCache(maxsize=SoftlayerConfig.SOFTLAYER_CLIENT_CACHE_SIZE)
+softlayer_clients_lock = threading.Lock()
+softlayer_clients_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+softlayer_clients_logged_at = time.monotonic()
+# rate limit key of a SoftLayer user -> RedisTokenBucketRateLimiter shared by the clients of the user
+softlayer_rate_limiters = LRUCache(maxsize=SoftlayerConfig.SOFTLAYER_CLIENT_CACHE_SIZE)
+
+
+class ThreadLocalTransport:
+    """
+    SoftLayer transport wrapper making the calls of every thread (greenlet when monkey patched) with its own copy of
+    the transport, and so its own HTTP session, which is not safe to share between threads. The copies are dropped
+    with their thread.
+    """
+
+    def __init__(self, transport):
+        # never called itself, so it has no session its copies would share
+        self.transport = transport
+        self.local = threading.local()
+
+    def __call__(self, call):
+        transport = getattr(self.local, "transport", None)
+        if transport is None:
+            transport = self.local.transport = copy.copy(self.transport)
+
+        return transport(call)
+
+    def print_reproduceable(self, call):
+        return self.transport.print_reproduceable(call)
+
+
+class RateLimitedTransport:
+    """
+    SoftLayer transport wrapper taking a token of the rate limiter of the account before every API call, so
+    concurrent listings of all the workers stay under the SoftLayer rate limit instead of backing off after exceeding it
+    """
+
+    def __init__(self, transport, rate_limiter):
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+
+    def __call__(self, call):
+        self.rate_limiter.acquire()
+        return self.transport(call)
+
+    def print_reproduceable(self, call):
+        return self.transport.print_reproduceable(call)
+
+
+def get_softlayer_client(cloud_id, credentials_version=None):
+    """
+    Authenticated SoftLayer client of an account, created once per credentials version and shared by the threads of
+    the process, the clients of a SoftLayer user share its rate limiter in Redis
+    :param cloud_id: database id of entry of table "SoftlayerCloud"
+    :param credentials_version: SoftlayerCloud.credentials_version if the caller knows it, the cached client of the
+        version is returned without reading the account then
+    :raises SLAuthError: if the account does not exist
+    """
+    if credentials_version:
+        with softlayer_clients_lock:
+            client = softlayer_clients.get((cloud_id, credentials_version))
+            if client is not None:
+                softlayer_clients_stats["hits"] += 1
+
+        if client is not None:
+            log_softlayer_clients_cache_info()
+            return client
+
+    with get_db_session() as db_session:
+        softlayer_cloud = db_session.query(SoftlayerCloud).filter_by(id=cloud_id).first()
+        if not softlayer_cloud:
+            raise SLAuthError(cloud_id)
+
+        client_key = (cloud_id, softlayer_cloud.credentials_version)
+        softlayer_cloud_username = softlayer_cloud.username
+        with softlayer_clients_lock:
+            client = softlayer_clients.get(client_key)
+            if client is not None:
+                softlayer_clients_stats["hits"] += 1
+
+        if client is None:
+            client = SoftLayer.create_client_from_env(softlayer_cloud.username, softlayer_cloud.api_key)
+
+    with softlayer_clients_lock:
+        cached_client = softlayer_clients.get(client_key)
+        if cached_client is not None:
+            client = cached_client
+        else:
+            rate_limiter_key = get_softlayer_rate_limiter_key(softlayer_cloud_username)
+            rate_limiter = softlayer_rate_limiters.get(rate_limiter_key)
+            if not rate_limiter:
+                rate_limiter = softlayer_rate_limiters[rate_limiter_key] = RedisTokenBucketRateLimiter(
+                    get_redis_client(), rate_limiter_key, rate=SoftlayerConfig.SOFTLAYER_RATE_LIMIT)
+
+            client.transport = RateLimitedTransport(ThreadLocalTransport(client.transport), rate_limiter)
+            softlayer_clients_stats["misses"] += 1
+            # clients of the previous credentials of the account are never used again
+            for stale_client_key in [key for key in softlayer_clients if key[0] == cloud_id]:
+                del softlayer_clients[stale_client_key]
+            softlayer_clients[client_key] = client
+
+    log_softlayer_clients_cache_info()
+    return client
+
+
+def get_softlayer_rate_limiter_key(username):
+    """
+    Redis key of the token bucket of a SoftLayer user, SoftLayer limits the API calls per user so the accounts added
+    with the same username share it
+    """
+    return f"softlayer_rate_limit:{hashlib.sha256(username.encode('utf-8')).hexdigest()}"
+
+
+def invalidate_softlayer_client(cloud_id):
+    """
+    Drop the cached clients of an account, e.g. when its credentials are updated or rejected
+    :param cloud_id: database id of entry of table "SoftlayerCloud"
+    """
+    with softlayer_clients_lock:
+        for client_key in [client_key for client_key in softlayer_clients if client_key[0] == cloud_id]:
+            del softlayer_clients[client_key]
+            softlayer_clients_stats["invalidations"] += 1
+
+
+def get_softlayer_clients_cache_info():
+    """
+    :return: <dict> with the "hits", "misses" and "invalidations" of the cached clients so far and their "size"
+    """
+    with softlayer_clients_lock:
+        return {**softlayer_clients_stats, "size": len(softlayer_clients)}
+
+
+def log_softlayer_clients_cache_info():
+    """
+    Log the cache info of the SoftLayer clients of the process, at most once per SOFTLAYER_CLIENT_CACHE_LOG_INTERVAL
+    """
+    global softlayer_clients_logged_at
+
+    with softlayer_clients_lock:
+        if time.monotonic() - softlayer_clients_logged_at < SoftlayerConfig.SOFTLAYER_CLIENT_CACHE_LOG_INTERVAL:
+            return
+
+        softlayer_clients_logged_at = time.monotonic()
+
+    LOGGER.info(f"SoftLayer clients cache: {get_softlayer_clients_cache_info()}")
+
 
 class SoftLayerClient:
     """
     SoftLayerClient for softlayer apis
     """
 
-    def __init__(self, cloud_id):
+    def __init__(self, cloud_id, credentials_version=None):
         self.cloud_id = cloud_id
+        self.credentials_version = credentials_version
         self.retry = self.requests_retry()
+        self.__client = None
 
     @property
     def client(self):
-        with get_db_session() as db_session:
-            softlayer_cloud = db_session.query(SoftlayerCloud).filter_by(id=self.cloud_id).first()
-            if not softlayer_cloud:
-                raise SLAuthError(self.cloud_id)
-        return SoftLayer.create_client_from_env(softlayer_cloud.username, softlayer_cloud.api_key)
+        # resolved once per instance, instances live as long as a task so credential updates are picked up by the next
+        # one
+        if self.__client is None:
+            self.__client = get_softlayer_client(self.cloud_id, self.credentials_version)
+        return self.__client
 
     def requests_retry(self):
         self.retry = Retrying(
@@ -49,5 +206,6 @@ class SoftLayerClient:
             if ex.faultCode == SL_RATE_LIMIT_FAULT_CODE:
                 raise SLRateLimitExceededError(ex)
             elif ex.faultCode == INVALID_API_KEY_CODE:
+                invalidate_softlayer_client(self.cloud_id)
                 raise SLAuthError(self.cloud_id)
             raise SLExecuteError(ex)
@@ -18,8 +18,8 @@ class SoftlayerDedicateHostClient(SoftLayerClient):
     Client for Softlayer Dedicated Host related APIs
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerDedicateHostClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerDedicateHostClient, self).__init__(cloud_id, credentials_version)
         self.vs_manager = VSManager(client=self.client)
 
     def list_dedicated_hosts(self, instances=False, raw=False) -> List[Dict]:
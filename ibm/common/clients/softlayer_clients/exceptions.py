@@ -1,3 +1,6 @@
+from SoftLayer.exceptions import TransportError
+
+
 class SLAuthError(Exception):
     """This exception is raised if: Cloud's credentials are invalid."""
 
@@ -20,6 +23,8 @@ class SLExecuteError(Exception):
     def __init__(self, error):
         self.msg = error.reason
         self.error_code = error.faultCode
+        # the request did not get a response (connection error, timeout, HTTP error status), it may succeed again
+        self.is_transport_error = isinstance(error, TransportError)
         super(SLExecuteError, self).__init__(
             "Operation failed, FaultCode: {}, Reason:\n{}".format(self.error_code, self.msg))
 
@@ -12,8 +12,8 @@ class SoftlayerImageClient(SoftLayerClient):
     Client for Softlayer Images related APIs
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerImageClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerImageClient, self).__init__(cloud_id, credentials_version)
         self.image_manager = ImageManager(client=self.client)
 
     def get_classic_image_name(self, image_name):
@@ -1,6 +1,7 @@
 from SoftLayer import SoftLayerAPIError
 from SoftLayer.managers import VSManager
 
+from config import SoftlayerConfig
 from ibm.common.clients.softlayer_clients.base_client import SoftLayerClient
 from ibm.common.clients.softlayer_clients.consts import INVALID_API_KEY_CODE, SL_RATE_LIMIT_FAULT_CODE
 from ibm.common.clients.softlayer_clients.exceptions import SLAuthError, SLExecuteError, SLRateLimitExceededError
@@ -16,13 +17,26 @@ class SoftlayerInstanceClient(SoftLayerClient):
     Client for Softlayer Instance related APIs
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerInstanceClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerInstanceClient, self).__init__(cloud_id, credentials_version)
         self.vs_manager = VSManager(client=self.client)
 
-    def __parse_to_softlayer(self, vs_instance, subnets=None, address=None, ssh_keys_required=True,
+    def __get_subnet_index(self, subnets=None):
+        """
+        Index of the subnets network components are resolved against, the private subnets of the account are listed
+        once if not provided, and then a component without VLAN number or network identifier matches any of them, as
+        when they were listed per component
+        :param subnets: <list> of SoftLayerSubnet
+        """
+        from ibm.common.clients.softlayer_clients import SoftlayerSubnetClient, SoftlayerSubnetIndex
+        if subnets:
+            return SoftlayerSubnetIndex(subnets)
+
+        return SoftlayerSubnetIndex(
+            SoftlayerSubnetClient(self.cloud_id).list_private_subnets(), missing_matches_any=True)
+
+    def __parse_to_softlayer(self, vs_instance, subnet_index, address=None, ssh_keys_required=True,
                              security_groups_required=True):
-        from ibm.common.clients.softlayer_clients import SoftlayerSubnetClient
         if not (vs_instance["status"].get("keyName") == "ACTIVE" and vs_instance.get("operatingSystem")):
             return
 
@@ -69,17 +83,9 @@ class SoftlayerInstanceClient(SoftLayerClient):
             if network["primarySubnet"].get("addressSpace") == "PUBLIC":
                 sl_interface.is_public_interface = True
 
-            if subnets:
-                attached_subnet = [
-                    subnet for subnet in subnets
-                    if subnet.vif_id == network["networkVlan"].get("vlanNumber") and subnet.network_id == network[
-                        "primarySubnet"].get("networkIdentifier")]
-            else:
-                subnet_client = SoftlayerSubnetClient(self.cloud_id)
-                attached_subnet = subnet_client.list_private_subnets(
-                    vlan_no=network["networkVlan"].get("vlanNumber"),
-                    network_identifier=network["primarySubnet"].get("networkIdentifier"))
-
+            attached_subnet = subnet_index.get_subnets(
+                vlan_no=network["networkVlan"].get("vlanNumber"),
+                network_identifier=network["primarySubnet"].get("networkIdentifier"))
             if attached_subnet:
                 sl_interface.subnet = attached_subnet[0]
             if security_groups_required:
@@ -122,8 +128,10 @@ class SoftlayerInstanceClient(SoftLayerClient):
             raise SLExecuteError(ex)
         if not to_ibm:
             return instances
+
+        subnet_index = self.__get_subnet_index()
         for instance in instances:
-            instance_obj = self.__parse_to_softlayer(instance, subnets=False, address=False,
+            instance_obj = self.__parse_to_softlayer(instance, subnet_index=subnet_index, address=False,
                                                      ssh_keys_required=False,
                                                      security_groups_required=False)
             if instance_obj:
@@ -139,8 +147,8 @@ class SoftlayerInstanceClient(SoftLayerClient):
             instance = self.retry.call(self.vs_manager.get_instance, instance_id=instance_id, mask=mask)
             if to_ibm:
                 instance = self.__parse_to_softlayer(
-                    vs_instance=instance, subnets=False, address=False, ssh_keys_required=False,
-                    security_groups_required=False
+                    vs_instance=instance, subnet_index=self.__get_subnet_index(), address=False,
+                    ssh_keys_required=False, security_groups_required=False
                 )
                 softlayer_instance = {"volume_attachments": []}
                 softlayer_instance["original_image"] = instance.image.to_json()
@@ -223,21 +231,32 @@ class SoftlayerInstanceClient(SoftLayerClient):
     def list_virtual_servers(self, address=None, subnets=None, ssh_keys_required=True,
                              security_groups_required=True):
         """Retrieve a list of all virtual servers on the Account."""
-        details = {'address': address, 'subnets': subnets, 'ssh_keys_required': ssh_keys_required,
+        return list(self.iter_virtual_servers(
+            address=address, subnets=subnets, ssh_keys_required=ssh_keys_required,
+            security_groups_required=security_groups_required))
+
+    def iter_virtual_servers(self, address=None, subnets=None, ssh_keys_required=True,
+                             security_groups_required=True):
+        """
+        Parse the virtual servers of the Account while they are listed, SOFTLAYER_VIRTUAL_SERVERS_PAGE_SIZE per API call
+        :param subnets: <list> of SoftLayerSubnet network components are resolved against, the private subnets of
+        the Account are listed once if not provided
+        :return: generator of SoftLayerInstance
+        """
+        details = {'address': address, 'ssh_keys_required': ssh_keys_required,
                    'security_groups_required': security_groups_required}
-        instances_list = []
-        self.vs_manager = VSManager(client=self.client)
+        subnet_index = self.__get_subnet_index(subnets)
         try:
-            instances = self.retry.call(self.vs_manager.list_instances, mask=VIRTUAL_SERVER_MASK)
+            # VSManager.list_instances fetches every page before returning, iter_call fetches the next one when needed
+            for instance in self.client.iter_call(
+                    "Account", "getVirtualGuests", mask=VIRTUAL_SERVER_MASK,
+                    limit=SoftlayerConfig.SOFTLAYER_VIRTUAL_SERVERS_PAGE_SIZE):
+                instance_obj = self.__parse_to_softlayer(instance, subnet_index=subnet_index, **details)
+                if instance_obj:
+                    yield instance_obj
         except SoftLayerAPIError as ex:
             if ex.faultCode == SL_RATE_LIMIT_FAULT_CODE:
                 raise SLRateLimitExceededError(ex)
             elif ex.faultCode == INVALID_API_KEY_CODE:
                 raise SLAuthError(self.cloud_id)
             raise SLExecuteError(ex)
-        else:
-            for instance in instances:
-                instance_obj = self.__parse_to_softlayer(instance, **details)
-                if instance_obj:
-                    instances_list.append(instance_obj)
-            return instances_list
@@ -18,8 +18,8 @@ class SoftlayerLoadBalancerClient(SoftLayerClient):
     Client for Softlayer Load balancers related APIs
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerLoadBalancerClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerLoadBalancerClient, self).__init__(cloud_id, credentials_version)
         self.vs_manager = VSManager(client=self.client)
 
     def list_load_balancers(self, vs_instances=None) -> list:
@@ -7,8 +7,8 @@ class SoftlayerMonitoringClient(SoftLayerClient):
     Client for Softlayer Monitoring related APIs related to CPU usage, Memory Usage etc.
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerMonitoringClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerMonitoringClient, self).__init__(cloud_id, credentials_version)
 
     def get_memory_usage(self, guest, start_date, end_date, summary_period=SUMMARY_PERIOD_FOR_ONE_DAY):
         """Formats and executes an API call to get memory usage data for a VM on Classic
@@ -7,8 +7,8 @@ class SoftlayerNetworkGatewayClient(SoftLayerClient):
     Client for Softlayer Network Gateway related APIs related to Hardware, VLANs etc
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerNetworkGatewayClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerNetworkGatewayClient, self).__init__(cloud_id, credentials_version)
 
     def get_network_gateways(self):
         """
@@ -17,8 +17,8 @@ class SoftlayerPlacementGroupClient(SoftLayerClient):
     Client for Softlayer Placement Group related APIs.
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerPlacementGroupClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerPlacementGroupClient, self).__init__(cloud_id, credentials_version)
         self.pg_manager = PlacementManager(self.client)
 
     def list_placement_groups(self):
@@ -16,8 +16,8 @@ class SoftlayerSecurityGroupClient(SoftLayerClient):
     Client for Softlayer security group related APIs
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerSecurityGroupClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerSecurityGroupClient, self).__init__(cloud_id, credentials_version)
         self.vs_manager = VSManager(client=self.client)
 
     def list_security_groups(self) -> list:
@@ -15,8 +15,8 @@ class SoftlayerSshKeyClient(SoftLayerClient):
     Client for Softlayer SSH Keys related APIs
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerSshKeyClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerSshKeyClient, self).__init__(cloud_id, credentials_version)
         self.vs_manager = VSManager(client=self.client)
 
     def list_ssh_keys(self) -> list:
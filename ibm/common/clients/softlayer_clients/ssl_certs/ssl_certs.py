@@ -15,8 +15,8 @@ class SoftlayerSslCertClient(SoftLayerClient):
     Client for Softlayer SSl Certs related APIs
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerSslCertClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerSslCertClient, self).__init__(cloud_id, credentials_version)
         self.vs_manager = VSManager(client=self.client)
 
     def list_ssl_certs(self) -> dict:
@@ -1,5 +1,5 @@
-from .subnets import SoftlayerSubnetClient
+from .subnets import SoftlayerSubnetClient, SoftlayerSubnetIndex
 
 __all__ = [
-    "SoftlayerSubnetClient"
+    "SoftlayerSubnetClient", "SoftlayerSubnetIndex"
 ]
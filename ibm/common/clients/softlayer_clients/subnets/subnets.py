@@ -1,4 +1,5 @@
 import logging
+from collections import defaultdict
 
 from SoftLayer.exceptions import SoftLayerAPIError
 from SoftLayer.managers import NetworkManager, \
@@ -18,8 +19,8 @@ class SoftlayerSubnetClient(SoftLayerClient):
     Client for Softlayer Subnet related APIs
     """
 
-    def __init__(self, cloud_id):
-        super(SoftlayerSubnetClient, self).__init__(cloud_id)
+    def __init__(self, cloud_id, credentials_version=None):
+        super(SoftlayerSubnetClient, self).__init__(cloud_id, credentials_version)
         self.vs_manager = VSManager(client=self.client)
 
     def list_private_subnets(self, vlan_no=None, network_identifier=None) -> list:
@@ -56,3 +57,35 @@ class SoftlayerSubnetClient(SoftLayerClient):
             raise SLExecuteError(ex)
 
         return subnets_list
+
+
+class SoftlayerSubnetIndex:
+    """
+    Subnets indexed by (VLAN number, network identifier), to resolve the subnets of the network components of many
+    instances from a single listing
+    """
+
+    def __init__(self, subnets, missing_matches_any=False):
+        """
+        :param subnets: <list> of SoftLayerSubnet, e.g. from `SoftlayerSubnetClient.list_private_subnets`
+        :param missing_matches_any: a missing VLAN number or network identifier matches any, as the filters of
+        `SoftlayerSubnetClient.list_private_subnets` do, instead of only subnets without one
+        """
+        self.__all_subnets = list(subnets)
+        self.__missing_matches_any = missing_matches_any
+        self.__subnets = defaultdict(list)
+        for subnet in self.__all_subnets:
+            self.__subnets[(subnet.vif_id, subnet.network_id)].append(subnet)
+
+    def get_subnets(self, vlan_no, network_identifier) -> list:
+        """
+        Subnets on a VLAN with a network identifier, in listing order
+        """
+        if self.__missing_matches_any and not (vlan_no and network_identifier):
+            return [
+                subnet for subnet in self.__all_subnets
+                if not (vlan_no and vlan_no != subnet.vif_id)
+                and not (network_identifier and network_identifier != subnet.network_id)
+            ]
+
+        return self.__subnets.get((vlan_no, network_identifier), [])
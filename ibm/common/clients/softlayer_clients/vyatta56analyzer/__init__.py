@@ -1,3 +1,3 @@
-from .vyatta56analyzer import Vyatta56Analyzer
+from .vyatta56analyzer import get_vyatta56_analyzer, Vyatta56Analyzer
 
-__all__ = ["Vyatta56Analyzer"]
+__all__ = ["get_vyatta56_analyzer", "Vyatta56Analyzer"]
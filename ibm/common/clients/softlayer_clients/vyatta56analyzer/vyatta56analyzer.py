@@ -1,14 +1,167 @@
+import hashlib
+import threading
+from collections import defaultdict
+from copy import deepcopy
+from functools import wraps
+
+from cachetools import LRUCache
+
+from config import SoftlayerConfig
 from ibm.common.utils import calculate_address_range, get_network
 from ibm.models.softlayer.resources_models import SoftLayerAddressGroup, SoftLayerEspGroup, SoftLayerFirewall, \
     SoftLayerFirewallRule, SoftLayerIkeGroup, SoftLayerIpsec, SoftLayerIpsecTunnel, SoftLayerPortGroup, SoftLayerSubnet
 
+INTERFACES_PREFIX = "set interfaces bonding dp0bond0 "
+VIF_PREFIX = "set interfaces bonding dp0bond0 vif "
+NAT_SOURCE_RULE_PREFIX = "set service nat source rule "
+FIREWALL_PREFIX = "set security firewall "
+FIREWALL_NAME_PREFIX = "set security firewall name "
+ESP_GROUP_PREFIX = "set security vpn ipsec esp-group "
+IKE_GROUP_PREFIX = "set security vpn ipsec ike-group "
+IPSEC_PEER_PREFIX = "set security vpn ipsec site-to-site peer "
+ADDRESS_GROUP_PREFIX = "set resources group address-group "
+PORT_GROUP_PREFIX = "set resources group port-group "
+
+# sha256 of a config text -> Vyatta56Analyzer of it, shared by the analyses of the config within the worker process
+vyatta56_analyzers = LRUCache(maxsize=SoftlayerConfig.SOFTLAYER_VYATTA_ANALYZER_CACHE_SIZE)
+vyatta56_analyzers_lock = threading.Lock()
+
+
+def get_vyatta56_analyzer(configs):
+    """
+    Analyzer of a Vyatta 5600 config, created once per config text. A changed config hashes to another key so it is
+    analysed again, the analyzers of configs not used anymore are evicted
+    :param configs: <string> config text
+    :return: <object of Vyatta56Analyzer>
+    """
+    key = hashlib.sha256(configs.encode("utf-8")).hexdigest()
+    with vyatta56_analyzers_lock:
+        analyzer = vyatta56_analyzers.get(key)
+    if analyzer:
+        return analyzer
+
+    analyzer = Vyatta56Analyzer(configs)
+    with vyatta56_analyzers_lock:
+        return vyatta56_analyzers.setdefault(key, analyzer)
+
+
+def cached_analysis(method):
+    """
+    Cache the result of an analysis method of a Vyatta56Analyzer per arguments. Callers update the objects they get
+    (subnets, firewalls, VPNs..), every call gets a copy of the cached result
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in self._analyses:
+            self._analyses[key] = method(self, *args, **kwargs)
+
+        return deepcopy(self._analyses[key])
+
+    return wrapper
+
+
+def split_segment(rest):
+    """
+    Split the text following a prefix of a config line into its next segment and the text after it
+    :return: (segment, remaining text), None if the segment is not followed by a space
+    """
+    segment, space, remaining = rest.partition(" ")
+    if not space:
+        return
+
+    return segment, remaining
+
 
 class Vyatta56Analyzer(object):
+    """
+    Analyzer of a Vyatta 5600 config. The config lines are indexed once by path (interfaces, NAT source rules, security
+    firewall name/rule, VPN IPSec groups and peers, resources groups), query methods read the lines of a path in config
+    order instead of scanning the config, and match the same lines a `startswith` of the path would. Subnets,
+    firewalls and IPSec results are cached per arguments, use `get_vyatta56_analyzer` to share them between analyses.
+    """
     PROTOCOL_IGNORE_LIST = ["udplite"]
 
     def __init__(self, configs):
         self.configs = configs.split("\n")
+        # path -> <list> of split config lines (or (remaining text, split config line)), in config order
+        self.__paths = defaultdict(list)
+        self.__public_gateways = dict()
+        self.__address_groups = dict()
+        self.__port_groups = dict()
+        # see `cached_analysis`
+        self._analyses = dict()
+        self.__index_configs()
+
+    def __index_configs(self):
+        paths = self.__paths
+        for conf in self.configs:
+            if conf.startswith(INTERFACES_PREFIX):
+                split_conf = conf.strip().split()
+                paths["interfaces"].append(split_conf)
+                if conf.startswith(VIF_PREFIX):
+                    segments = split_segment(conf[len(VIF_PREFIX):])
+                    if segments and segments[1].startswith("firewall "):
+                        paths[("vif", segments[0], "firewall")].append(split_conf)
+
+            elif conf.startswith(NAT_SOURCE_RULE_PREFIX):
+                paths["nat source rule"].append(conf.strip().split())
+                segments = split_segment(conf[len(NAT_SOURCE_RULE_PREFIX):])
+                if segments:
+                    paths[("nat source rule", segments[0])].append(segments[1])
+
+            elif conf.startswith(FIREWALL_PREFIX):
+                split_conf = conf.strip().split()
+                segments = split_segment(conf[len(FIREWALL_PREFIX):])
+                if segments:
+                    paths[("firewall", segments[0])].append(split_conf)
+
+                if conf.startswith(FIREWALL_NAME_PREFIX):
+                    segments = split_segment(conf[len(FIREWALL_NAME_PREFIX):])
+                    if segments and segments[1].startswith("rule "):
+                        rule_segments = split_segment(segments[1][len("rule "):])
+                        if rule_segments:
+                            paths[("firewall name", segments[0], "rule", rule_segments[0])].append(
+                                (rule_segments[1], split_conf))
+
+            elif conf.startswith(ESP_GROUP_PREFIX) or conf.startswith(IKE_GROUP_PREFIX):
+                split_conf = conf.strip().split()
+                if len(split_conf) < 8:
+                    continue
+
+                group_type = "esp-group" if conf.startswith(ESP_GROUP_PREFIX) else "ike-group"
+                paths[group_type].append(split_conf)
+                paths[(group_type, split_conf[5].strip())].append(split_conf)
+
+            elif conf.startswith(IPSEC_PEER_PREFIX):
+                split_conf = conf.strip().split()
+                paths["site-to-site peer"].append(split_conf)
+                segments = split_segment(conf[len(IPSEC_PEER_PREFIX):])
+                if segments and segments[1].startswith("tunnel "):
+                    paths[("site-to-site peer", segments[0], "tunnel")].append(split_conf)
+
+            elif conf.startswith(ADDRESS_GROUP_PREFIX) or conf.startswith(PORT_GROUP_PREFIX):
+                group_type = "address-group" if conf.startswith(ADDRESS_GROUP_PREFIX) else "port-group"
+                segments = split_segment(conf[len(f"set resources group {group_type} "):])
+                if segments:
+                    paths[(group_type, segments[0])].append(conf.strip().split())
+
+        # NAT source rules with a source address, the first one of an address and the first one of an address group
+        # are the candidates `has_public_gateway` picks from
+        self.__nat_source_addresses = dict()
+        self.__nat_source_address_group = None
+        for position, split_conf in enumerate(paths["nat source rule"]):
+            if not (len(split_conf) >= 9 and split_conf[6] == "source" and split_conf[7] == "address"):
+                continue
 
+            address = split_conf[8].strip("'")
+            self.__nat_source_addresses.setdefault(address, (position, split_conf[5].strip("'")))
+            if self.__nat_source_address_group is None and any(
+                    len(group_conf) >= 7 for group_conf in paths.get(("address-group", address), [])):
+                self.__nat_source_address_group = (position, split_conf[5].strip("'"))
+
+    @cached_analysis
     def get_private_subnets(self):
         """
         Discover subnetworks from Vyatta5600 configs, in the format:
@@ -19,12 +172,8 @@ class Vyatta56Analyzer(object):
         :return:
         """
         subnets_list = list()
-        vif_id_list = list()
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith("set interfaces bonding dp0bond0 "):
-                continue
-
-            split_conf = conf.strip().split()
+        subnet_names = set()
+        for split_conf in self.__paths["interfaces"]:
             if len(split_conf) < 8:
                 continue
 
@@ -33,10 +182,8 @@ class Vyatta56Analyzer(object):
 
             vif_id = split_conf[5].strip().strip("'")
 
-            if vif_id not in vif_id_list:
-                vif_id_list.append(vif_id)
-
-            subnet_name = "subnet-{}-{}".format(split_conf[5], len([vif for vif in vif_id_list if vif == vif_id]))
+            # the name only depends on the VIF, so its first address is the one discovered as a subnet
+            subnet_name = "subnet-{}-1".format(split_conf[5])
             vyatta_subnet = SoftLayerSubnet(
                 name=subnet_name, vif_id=vif_id, address=split_conf[-1].strip().strip("'"),
                 network=get_network(split_conf[-1].strip().strip("'")),
@@ -45,7 +192,8 @@ class Vyatta56Analyzer(object):
             if self.has_public_gateway(vyatta_subnet.network):
                 vyatta_subnet.public_gateway = True
 
-            if vyatta_subnet.name not in [subnet.name for subnet in subnets_list]:
+            if vyatta_subnet.name not in subnet_names:
+                subnet_names.add(vyatta_subnet.name)
                 subnets_list.append(vyatta_subnet)
 
         for subnet in subnets_list:
@@ -53,18 +201,14 @@ class Vyatta56Analyzer(object):
 
         return subnets_list
 
+    @cached_analysis
     def get_attached_firewalls(self, vif_id):
         """
         Get attached firewalls with a VIF
         :return:
         """
         firewalls_list = list()
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith(
-                    "set interfaces bonding dp0bond0 vif {vif_id} firewall ".format(vif_id=vif_id)):
-                continue
-
-            split_conf = conf.strip().split()
+        for split_conf in self.__paths.get(("vif", str(vif_id), "firewall"), []):
             if len(split_conf) < 9:
                 continue
 
@@ -90,36 +234,26 @@ class Vyatta56Analyzer(object):
         set service nat source rule 100 translation address 'masquerade'
         :return:
         """
-        rule_number = None
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith("set service nat source rule "):
-                continue
-
-            split_conf = conf.strip().split()
-            if len(split_conf) < 9:
-                continue
-
-            if split_conf[6] == "source" and split_conf[7] == "address":
-                if network == split_conf[8].strip("'") or self.get_address_groups(split_conf[8].strip("'")):
-                    rule_number = split_conf[5].strip("'")
-                    break
-
-        if not rule_number:
-            return
-
-        interface_found, translation_found = False, False
-        for index, conf in enumerate(self.configs):
-            if conf.startswith("set service nat source rule {} outbound-interface 'dp0bond1'".format(rule_number)):
-                interface_found = True
-                break
-
-        for index, conf in enumerate(self.configs):
-            if conf.startswith("set service nat source rule {} translation address 'masquerade'".format(rule_number)):
-                translation_found = True
-                break
-
-        if interface_found and translation_found:
-            return True
+        if network in self.__public_gateways:
+            return self.__public_gateways[network]
+
+        # the first rule sourcing the network itself or any address group
+        candidates = [
+            candidate for candidate in [self.__nat_source_addresses.get(network), self.__nat_source_address_group]
+            if candidate
+        ]
+        rule_number = min(candidates)[1] if candidates else None
+
+        public_gateway = None
+        if rule_number:
+            rule_confs = self.__paths.get(("nat source rule", rule_number), [])
+            interface_found = any(conf.startswith("outbound-interface 'dp0bond1'") for conf in rule_confs)
+            translation_found = any(conf.startswith("translation address 'masquerade'") for conf in rule_confs)
+            if interface_found and translation_found:
+                public_gateway = True
+
+        self.__public_gateways[network] = public_gateway
+        return public_gateway
 
     def get_esp_groups(self, name=None):
         """
@@ -132,21 +266,12 @@ class Vyatta56Analyzer(object):
         set security vpn ipsec esp-group NetOrc_ESP_PROPOSAL proposal 1 encryption 'aes256'
         set security vpn ipsec esp-group NetOrc_ESP_PROPOSAL proposal 1 hash 'sha1'
         """
-        esp_groups_list = list()
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith("set security vpn ipsec esp-group "):
-                continue
-
-            split_conf = conf.strip().split()
-            if len(split_conf) < 8:
-                continue
-
+        esp_groups = dict()
+        for split_conf in self.__paths.get(("esp-group", name) if name else "esp-group", []):
             esp_group_name = split_conf[5].strip()
-            if name and name != esp_group_name:
-                continue
-
-            existing_esp_group = [esp_group for esp_group in esp_groups_list if esp_group.name == esp_group_name]
-            esp_group = existing_esp_group[0] if existing_esp_group else SoftLayerEspGroup(esp_group_name)
+            esp_group = esp_groups.get(esp_group_name)
+            if not esp_group:
+                esp_group = esp_groups[esp_group_name] = SoftLayerEspGroup(esp_group_name)
 
             if split_conf[6] == "lifetime":
                 esp_group.lifetime = split_conf[7].strip("'")
@@ -167,10 +292,7 @@ class Vyatta56Analyzer(object):
                 elif split_conf[8] == "hash":
                     esp_group.hash = split_conf[9].strip("'")
 
-            if not existing_esp_group:
-                esp_groups_list.append(esp_group)
-
-        return esp_groups_list
+        return list(esp_groups.values())
 
     def get_ike_groups(self, name=None):
         """
@@ -185,21 +307,12 @@ class Vyatta56Analyzer(object):
         set security vpn ipsec ike-group NetOrc_IKE_PROPOSAL proposal 1 hash 'sha1'
         :return:
         """
-        ike_groups_list = list()
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith("set security vpn ipsec ike-group "):
-                continue
-
-            split_conf = conf.strip().split()
-            if len(split_conf) < 8:
-                continue
-
+        ike_groups = dict()
+        for split_conf in self.__paths.get(("ike-group", name) if name else "ike-group", []):
             ike_group_name = split_conf[5].strip()
-            if name and name != ike_group_name:
-                continue
-
-            existing_ike_group = [ike_group for ike_group in ike_groups_list if ike_group.name == ike_group_name]
-            ike_group = existing_ike_group[0] if existing_ike_group else SoftLayerIkeGroup(ike_group_name)
+            ike_group = ike_groups.get(ike_group_name)
+            if not ike_group:
+                ike_group = ike_groups[ike_group_name] = SoftLayerIkeGroup(ike_group_name)
 
             if split_conf[6] == "lifetime":
                 ike_group.lifetime = split_conf[7].strip("'")
@@ -224,10 +337,9 @@ class Vyatta56Analyzer(object):
                 elif split_conf[8] == "hash":
                     ike_group.hash = split_conf[9].strip("'")
 
-            if not existing_ike_group:
-                ike_groups_list.append(ike_group)
-        return ike_groups_list
+        return list(ike_groups.values())
 
+    @cached_analysis
     def get_ipsec(self):
         """
         Get IPSec configured on v5600 device.
@@ -251,18 +363,16 @@ class Vyatta56Analyzer(object):
         set security vpn ipsec site-to-site peer 50.23.185.52 tunnel 2 remote prefix '10.28.103.64/26'
         :return:
         """
-        vpns_list = list()
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith("set security vpn ipsec site-to-site peer "):
-                continue
-
-            split_conf = conf.strip().split()
+        vpns = dict()
+        for split_conf in self.__paths["site-to-site peer"]:
             if len(split_conf) < 7:
                 continue
 
             peer_address = split_conf[6].strip()
-            existing_vpn = [vpn for vpn in vpns_list if vpn.peer_address == peer_address]
-            vpn = existing_vpn[0] if existing_vpn else SoftLayerIpsec(peer_address)
+            vpn = vpns.get(peer_address)
+            if not vpn:
+                vpn = vpns[peer_address] = SoftLayerIpsec(peer_address)
+                vpn.tunnels = self.get_ipsec_tunnels(peer_address)
 
             if len(split_conf) < 10:
                 if split_conf[7] == "default-esp-group":
@@ -276,12 +386,7 @@ class Vyatta56Analyzer(object):
                     if not split_conf[9].strip("'").startswith("********"):
                         vpn.pre_shared_secret = split_conf[9].strip("'")
 
-            vpn.tunnels = self.get_ipsec_tunnels(peer_address)
-
-            if not existing_vpn:
-                vpns_list.append(vpn)
-
-        return vpns_list
+        return list(vpns.values())
 
     def get_ipsec_tunnels(self, peer_address):
         """
@@ -292,29 +397,25 @@ class Vyatta56Analyzer(object):
         set security vpn ipsec site-to-site peer 50.23.185.52 tunnel 2 remote prefix '10.28.103.64/26'
         :return:
         """
-        ipsec_tunnels_list = list()
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith("set security vpn ipsec site-to-site peer {} tunnel ".format(peer_address)):
-                continue
-
-            split_conf = conf.strip().split()
+        ipsec_tunnels = dict()
+        for split_conf in self.__paths.get(("site-to-site peer", str(peer_address), "tunnel"), []):
             if len(split_conf) < 11:
                 continue
 
             tunnel_no = split_conf[8]
-            existing_tunnel = [tunnel for tunnel in ipsec_tunnels_list if tunnel.tunnel_no == tunnel_no]
-            ipsec_tunnel = existing_tunnel[0] if existing_tunnel else SoftLayerIpsecTunnel(tunnel_no)
+            ipsec_tunnel = ipsec_tunnels.get(tunnel_no)
+            if not ipsec_tunnel:
+                ipsec_tunnel = ipsec_tunnels[tunnel_no] = SoftLayerIpsecTunnel(tunnel_no)
+
             if split_conf[9] == "local":
                 ipsec_tunnel.discovered_local_cidrs = split_conf[11].strip("'")
 
             elif split_conf[9] == "remote":
                 ipsec_tunnel.remote_subnet = split_conf[11].strip("'")
 
-            if not existing_tunnel:
-                ipsec_tunnels_list.append(ipsec_tunnel)
-
-        return ipsec_tunnels_list
+        return list(ipsec_tunnels.values())
 
+    @cached_analysis
     def get_firewalls(self, name=None, direction=None, port=None, protocol=None, vif_id=None):
         """
         We can take the reference of firewall applied to VIF to create ACLs.
@@ -326,12 +427,10 @@ class Vyatta56Analyzer(object):
         set security firewall name TO-SERVICE rule 6 action 'accept'
         :return:
         """
-        vyatta_firewalls = list()
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith("set security firewall {name} ".format(name=name)):
-                continue
-
-            split_conf = conf.strip().split()
+        vyatta_firewalls = dict()
+        # rule numbers of a firewall already looked up, added to its rules or not
+        firewall_rule_nos = defaultdict(set)
+        for split_conf in self.__paths.get(("firewall", str(name)), []):
             if len(split_conf) < 7:
                 continue
 
@@ -339,31 +438,26 @@ class Vyatta56Analyzer(object):
             if name and name != fw_name:
                 continue
 
-            existing_vyatta_firewall = [fw for fw in vyatta_firewalls if fw.name == fw_name]
-            vyatta_firewall = existing_vyatta_firewall[0] if existing_vyatta_firewall else SoftLayerFirewall(
-                fw_name, direction, vif_id=vif_id)
+            vyatta_firewall = vyatta_firewalls.get(fw_name)
+            if not vyatta_firewall:
+                vyatta_firewall = vyatta_firewalls[fw_name] = SoftLayerFirewall(fw_name, direction, vif_id=vif_id)
 
             if split_conf[5].strip("'") == "rule":
                 rule_no = int(split_conf[6].strip())
-                if rule_no not in [rule.rule_no for rule in vyatta_firewall.rules]:
+                if rule_no not in firewall_rule_nos[fw_name]:
+                    firewall_rule_nos[fw_name].add(rule_no)
                     firewall_rule = self.get_firewall_rule(fw_name, rule_no, direction, port, protocol)
                     if firewall_rule:
                         vyatta_firewall.rules.append(firewall_rule)
 
-            if not existing_vyatta_firewall:
-                vyatta_firewalls.append(vyatta_firewall)
-
-        return vyatta_firewalls
+        return list(vyatta_firewalls.values())
 
     def get_rule_protocol(self, firewall_name, rule_no):
         protocol = "all"
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith(
-                    "set security firewall name {name} rule {rule_no} protocol ".format(name=firewall_name,
-                                                                                        rule_no=rule_no)):
+        for conf, split_conf in self.__paths.get(("firewall name", str(firewall_name), "rule", str(rule_no)), []):
+            if not conf.startswith("protocol "):
                 continue
 
-            split_conf = conf.strip().split()
             if len(split_conf) < 9:
                 continue
 
@@ -386,12 +480,7 @@ class Vyatta56Analyzer(object):
         :return:
         """
         fw_rule, ports = None, list()
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith(
-                    "set security firewall name {name} rule {rule_no} ".format(name=name, rule_no=rule_no)):
-                continue
-
-            split_conf = conf.strip().split()
+        for _, split_conf in self.__paths.get(("firewall name", str(name), "rule", str(rule_no)), []):
             if len(split_conf) < 9:
                 continue
 
@@ -485,28 +574,31 @@ class Vyatta56Analyzer(object):
         set resources group address-group AG-LAN-SCAN address '10.170.1.200'
         :return:
         """
-        address_group = None
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith(
-                    "set resources group address-group {name} ".format(name=name)):
-                continue
+        # addresses are parsed (and ranges expanded) once per group, every call gets its own group object
+        if name not in self.__address_groups:
+            addresses = None
+            for split_conf in self.__paths.get(("address-group", str(name)), []):
+                if len(split_conf) < 7:
+                    continue
 
-            split_conf = conf.strip().split()
-            if len(split_conf) < 7:
-                continue
+                if addresses is None:
+                    addresses = list()
 
-            if not address_group:
-                address_group = SoftLayerAddressGroup(name)
+                if split_conf[5] == "address":
+                    addresses.append(split_conf[6].strip("'"))
 
-            if split_conf[5] == "address":
-                address_group.addresses.append(split_conf[6].strip("'"))
+                elif split_conf[5] == "address-range":
+                    address_list = calculate_address_range(split_conf[6].strip("'"), split_conf[8].strip("'"))
+                    if address_list:
+                        addresses.extend(address_list)
 
-            elif split_conf[5] == "address-range":
-                address_list = calculate_address_range(split_conf[6].strip("'"), split_conf[8].strip("'"))
-                if address_list:
-                    address_group.addresses.extend(address_list)
+            self.__address_groups[name] = addresses
 
-        return address_group
+        addresses = self.__address_groups[name]
+        if addresses is None:
+            return
+
+        return SoftLayerAddressGroup(name, addresses=list(addresses))
 
     def get_port_groups(self, name):
         """
@@ -519,20 +611,22 @@ class Vyatta56Analyzer(object):
         set resources group port-group PG-FWD-SANSAY port '22568'
         :return:
         """
-        port_group = None
-        for index, conf in enumerate(self.configs):
-            if not conf.startswith(
-                    "set resources group port-group {name} ".format(name=name)):
-                continue
+        if name not in self.__port_groups:
+            ports = None
+            for split_conf in self.__paths.get(("port-group", str(name)), []):
+                if len(split_conf) < 7:
+                    continue
 
-            split_conf = conf.strip().split()
-            if len(split_conf) < 7:
-                continue
+                if ports is None:
+                    ports = list()
+
+                if split_conf[5] == "port":
+                    ports.append(split_conf[6].strip("'"))
 
-            if not port_group:
-                port_group = SoftLayerPortGroup(name)
+            self.__port_groups[name] = ports
 
-            if split_conf[5] == "port":
-                port_group.ports.append(split_conf[6].strip("'"))
+        ports = self.__port_groups[name]
+        if ports is None:
+            return
 
-        return port_group
+        return SoftLayerPortGroup(name, ports=list(ports))
@@ -1,4 +1,5 @@
 import os
+from types import MappingProxyType
 
 from config import IAMConfig
 from config import TranslationConfig
@@ -203,3 +204,70 @@ INT_MONTH_TO_STR = {
     11: "november",
     12: "december"
 }
+
+# hourly cost of the VPC Gen2 instance profiles
+VPC_GEN2_INSTANCE_PROFILES_COST_SHEET = {
+    "bx2-2x8": 0.096,
+    "bx2d-2x8": 0.104,
+    "bx2-4x16": 0.192,
+    "bx2d-4x16": 0.208,
+    "bx2-8x32": 0.384,
+    "bx2d-8x32": 0.417,
+    "bx2-16x64": 0.768,
+    "bx2d-16x64": 0.834,
+    "bx2-32x128": 1.536,
+    "bx2d-32x128": 1.668,
+    "bx2-48x192": 2.305,
+    "bx2d-48x192": 2.502,
+    "bx2-64x256": 3.073,
+    "bx2d-64x256": 3.336,
+    "bx2-96x384": 4.609,
+    "bx2d-96x384": 5.004,
+    "bx2-128x512": 6.146,
+    "bx2d-128x512": 6.672,
+    "cx2-2x4": 0.085,
+    "cx2d-2x4": 0.093,
+    "cx2-4x8": 0.170,
+    "cx2d-4x8": 0.186,
+    "cx2-8x16": 0.340,
+    "cx2d-8x16": 0.373,
+    "cx2-16x32": 0.680,
+    "cx2d-16x32": 0.746,
+    "cx2-32x64": 0.1360,
+    "cx2d-32x64": 1.492,
+    "cx2-48x96": 2.040,
+    "cx2d-48x96": 2.238,
+    "cx2-64x128": 2.721,
+    "cx2d-64x128": 2.984,
+    "cx2-96x192": 4.081,
+    "cx2d-96x192": 4.475,
+    "cx2-128x256": 5.441,
+    "cx2d-128x256": 5.967,
+    "mx2-2x16": 0.124,
+    "mx2d-2x16": 0.132,
+    "mx2-4x32": 0.248,
+    "mx2d-4x32": 0.265,
+    "mx2-8x64": 0.497,
+    "mx2d-8x64": 0.530,
+    "mx2-16x128": 0.994,
+    "mx2d-16x128": 1.059,
+    "mx2-32x256": 1.987,
+    "mx2d-32x256": 2.119,
+    "mx2-48x384": 2.981,
+    "mx2d-48x384": 3.178,
+    "mx2-64x512": 3.974,
+    "mx2d-64x512": 4.237,
+    "mx2-96x768": 5.961,
+    "mx2d-96x768": 6.356,
+    "mx2-128x1024": 7.949,
+    "mx2d-128x1024": 8.475
+}
+
+# (instance profile, recommended instance profile) -> potential cost savings in percentage, for the profiles of the
+# cost sheet
+POTENTIAL_COST_SAVINGS = MappingProxyType({
+    (instance_profile, recommended_instance_profile):
+        ((instance_profile_cost - recommended_instance_profile_cost) / instance_profile_cost) * 100
+    for instance_profile, instance_profile_cost in VPC_GEN2_INSTANCE_PROFILES_COST_SHEET.items()
+    for recommended_instance_profile, recommended_instance_profile_cost in VPC_GEN2_INSTANCE_PROFILES_COST_SHEET.items()
+})
@@ -0,0 +1,220 @@
+"""
+Caching of cost API responses keyed by a per cloud cost data generation.
+
+The generation of a cloud is a Redis counter bumped once changes to the cost data of the cloud (cost sync, idle
+resources, rightsizing, resource tracking) are committed. Responses are cached, in Redis and in process, under a key
+containing the generations of the clouds they are about, so a bump makes every cached response of the cloud
+unreachable and responses are never served from older data than the one they would be built from.
+
+Sessions bump the generations themselves when they commit writes to the cost models: flushed objects and UPDATE or
+DELETE statements, whose clouds are read from their `cloud_id = ...` criteria (all the clouds are bumped when it is
+missing). Bulk inserts bypass this, their writers bump the generations explicitly.
+"""
+import hashlib
+import json
+import logging
+import threading
+
+import redis
+from cachetools import TTLCache
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+
+from config import CostResponseCacheConfig
+from ibm.common.workflow_progress import get_redis_client
+from ibm.models import IBMCost, IBMCostPerTag, IBMCostTrackingRollup, IBMIdleResource, IBMResourceInstancesCost, \
+    IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost, IBMResourcesCost, IBMResourceTracking, \
+    IBMRightSizingRecommendation
+
+LOGGER = logging.getLogger(__name__)
+
+GENERATION_KEY_PREFIX = "cost_data_generation"
+# bumped by writes whose clouds are unknown, part of the key of every response
+ALL_CLOUDS_GENERATION_KEY = f"{GENERATION_KEY_PREFIX}:all"
+RESPONSE_KEY_PREFIX = "cost_api_response"
+# key of the clouds whose cost data a session changed, in its `info`, None in the set stands for all the clouds
+CHANGED_COST_DATA_CLOUD_IDS_KEY = "changed_cost_data_cloud_ids"
+
+COST_DATA_TABLES = frozenset(model.__tablename__ for model in [
+    IBMCost, IBMCostPerTag, IBMCostTrackingRollup, IBMIdleResource, IBMResourceInstancesCost,
+    IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost, IBMResourcesCost, IBMResourceTracking,
+    IBMRightSizingRecommendation
+])
+
+# entries expire, a process can not tell that a bump which failed made the ones of other processes stale
+local_responses = TTLCache(maxsize=CostResponseCacheConfig.LOCAL_CACHE_SIZE,
+                           ttl=CostResponseCacheConfig.LOCAL_CACHE_TTL)
+local_responses_lock = threading.Lock()
+
+
+def get_generation_key(cloud_id):
+    return f"{GENERATION_KEY_PREFIX}:{cloud_id}"
+
+
+def bump_cost_data_generation(*cloud_ids, all_clouds=False):
+    """
+    Invalidate the cached cost API responses of clouds, call it after committing changes to their cost data. The cached
+    responses are deleted if the generations can not be bumped.
+    :param cloud_ids: database ids of entries of table "Cloud"
+    :param all_clouds: invalidate the responses of all the clouds
+    """
+    if not (cloud_ids or all_clouds):
+        return
+
+    try:
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for cloud_id in cloud_ids:
+            pipeline.incr(get_generation_key(cloud_id))
+        if all_clouds:
+            pipeline.incr(ALL_CLOUDS_GENERATION_KEY)
+        pipeline.execute()
+    except redis.RedisError as ex:
+        LOGGER.warning(f"Bumping the cost data generation of clouds {cloud_ids or 'all'} failed. Trace: {ex}")
+        delete_cached_cost_responses()
+
+
+def delete_cached_cost_responses():
+    """
+    Delete every cached cost API response, of this process and in Redis
+    """
+    with local_responses_lock:
+        local_responses.clear()
+
+    try:
+        client = get_redis_client()
+        keys = []
+        for key in client.scan_iter(match=f"{RESPONSE_KEY_PREFIX}:*", count=1000):
+            keys.append(key)
+            if len(keys) >= 1000:
+                client.delete(*keys)
+                keys = []
+        if keys:
+            client.delete(*keys)
+    except redis.RedisError as ex:
+        LOGGER.error(f"Deleting the cached cost API responses failed, they expire in "
+                     f"{CostResponseCacheConfig.RESPONSE_TTL}s. Trace: {ex}")
+
+
+def get_cost_data_generations(cloud_ids):
+    """
+    :param cloud_ids: database ids of entries of table "Cloud"
+    :return: <list> of the generations of the clouds (including the bumps of all the clouds), None if Redis is not
+    available
+    """
+    if not cloud_ids:
+        return []
+
+    try:
+        *generations, all_clouds_generation = get_redis_client().mget(
+            [get_generation_key(cloud_id) for cloud_id in cloud_ids] + [ALL_CLOUDS_GENERATION_KEY])
+        return [int(generation or 0) + int(all_clouds_generation or 0) for generation in generations]
+    except redis.RedisError as ex:
+        LOGGER.warning(f"Reading the cost data generation of clouds {cloud_ids} failed. Trace: {ex}")
+
+
+def get_or_build_cost_data(namespace, clouds, params, build):
+    """
+    Data of a cost API from the cache, built and cached on a miss
+    :param namespace: name of the API, part of the cache key
+    :param clouds: <list> of (cloud_id, cloud_name) the data is about
+    :param params: <dict> of the (JSON serializable) parameters the data depends on
+    :param build: callable returning the JSON serializable data, None included
+    :return: the data
+    """
+    generations = get_cost_data_generations([cloud_id for cloud_id, _ in clouds])
+    if generations is None:
+        return build()
+
+    key_material = json.dumps([namespace, clouds, generations, params], sort_keys=True)
+    key = f"{RESPONSE_KEY_PREFIX}:{namespace}:{hashlib.sha256(key_material.encode('utf-8')).hexdigest()}"
+
+    with local_responses_lock:
+        cached = local_responses.get(key)
+    if cached is not None:
+        return cached["data"]
+
+    try:
+        cached_json = get_redis_client().get(key)
+    except redis.RedisError as ex:
+        LOGGER.warning(f"Reading cached cost API response {key} failed. Trace: {ex}")
+        cached_json = None
+
+    if cached_json:
+        cached = json.loads(cached_json)
+    else:
+        cached = {"data": build()}
+        try:
+            get_redis_client().set(key, json.dumps(cached), ex=CostResponseCacheConfig.RESPONSE_TTL)
+        except redis.RedisError as ex:
+            LOGGER.warning(f"Caching cost API response {key} failed. Trace: {ex}")
+
+    with local_responses_lock:
+        local_responses[key] = cached
+
+    return cached["data"]
+
+
+def _get_statement_cloud_ids(statement):
+    """
+    Clouds of the `cloud_id = <value>` criteria of an UPDATE or DELETE statement, None if it has none
+    """
+    if statement.whereclause is None:
+        return
+
+    cloud_ids = {
+        element.right.effective_value for element in visitors.iterate(statement.whereclause)
+        if isinstance(element, BinaryExpression) and element.operator is operators.eq
+        and getattr(element.left, "key", None) == "cloud_id" and isinstance(element.right, BindParameter)
+    }
+    return cloud_ids or None
+
+
+def _collect_flushed_cost_data_clouds(session, flush_context):
+    cloud_ids = session.info.setdefault(CHANGED_COST_DATA_CLOUD_IDS_KEY, set())
+    for obj in [*session.new, *session.dirty, *session.deleted]:
+        if getattr(obj, "__tablename__", None) not in COST_DATA_TABLES or \
+                (obj in session.dirty and not session.is_modified(obj)):
+            continue
+
+        # not loading anything, a deleted object may have been expired
+        cloud_id_attr = inspect(obj).attrs.cloud_id
+        cloud_ids.update(cloud_id_attr.history.deleted or [])
+        cloud_id = cloud_id_attr.loaded_value
+        cloud_ids.add(cloud_id if isinstance(cloud_id, str) else None)
+
+
+def _collect_executed_cost_data_clouds(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+
+    statement = orm_execute_state.statement
+    if statement.table.name not in COST_DATA_TABLES:
+        return
+
+    cloud_ids = orm_execute_state.session.info.setdefault(CHANGED_COST_DATA_CLOUD_IDS_KEY, set())
+    cloud_ids.update(_get_statement_cloud_ids(statement) or [None])
+
+
+def _bump_committed_cost_data_clouds(session):
+    cloud_ids = session.info.pop(CHANGED_COST_DATA_CLOUD_IDS_KEY, None)
+    if cloud_ids:
+        bump_cost_data_generation(*sorted(cloud_ids - {None}), all_clouds=None in cloud_ids)
+
+
+def _forget_cost_data_clouds(session):
+    session.info.pop(CHANGED_COST_DATA_CLOUD_IDS_KEY, None)
+
+
+def register_cost_data_generation_listeners():
+    """
+    Bump the cost data generations on the commits of the sessions of the process, call it once when the process starts
+    (API, workflow and discovery workers)
+    """
+    for identifier, listener in [
+        ("after_flush", _collect_flushed_cost_data_clouds), ("do_orm_execute", _collect_executed_cost_data_clouds),
+        ("after_commit", _bump_committed_cost_data_clouds), ("after_rollback", _forget_cost_data_clouds)
+    ]:
+        if not event.contains(Session, identifier, listener):
+            event.listen(Session, identifier, listener)
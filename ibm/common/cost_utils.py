@@ -0,0 +1,549 @@
+import logging
+import uuid
+from calendar import monthrange
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from redis.exceptions import LockError
+from sqlalchemy import case, exists, func, literal, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from config import IBMCostConfig
+from ibm.common.consts import VPC_GEN2_INSTANCE_PROFILES_COST_SHEET
+from ibm.common.resource_summaries import recompute_cloud_resource_summaries
+from ibm.common.utils import bulk_upsert
+from ibm.common.workflow_progress import get_redis_client
+from ibm.models import IBMCost, IBMCostTrackingRollup, IBMIdleResource, IBMInstance, IBMResourceInstancesCost, \
+    IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost, IBMResourceTracking, IBMRightSizingRecommendation
+
+LOGGER = logging.getLogger(__name__)
+
+
+@contextmanager
+def resource_instances_cost_lock(cloud_id, cost_id, blocking=True):
+    """
+    Lock, shared by the worker processes through Redis, serializing the transactions which write the daily costs and
+    month to date totals of a billing month of a cloud: the cost ingestion batches and the rebuild of the totals. The
+    block holds it until it exits, it opens its database session inside so that session reads what was committed
+    before the lock was acquired, and commits.
+    :param cloud_id: database id of entry of table "Cloud"
+    :param cost_id: database id of entry of table "IBMCost" of the billing month
+    :param blocking: wait IBM_COST_LOCK_WAIT seconds at most for the lock, do not wait if False
+    :raise LockError: if the lock is not acquired
+    """
+    lock = get_redis_client().lock(
+        f"ibm_resource_instances_cost_lock:{cloud_id}:{cost_id}", timeout=IBMCostConfig.IBM_COST_LOCK_TIMEOUT,
+        blocking_timeout=IBMCostConfig.IBM_COST_LOCK_WAIT
+    )
+    if not lock.acquire(blocking=blocking):
+        raise LockError(f"Resource instances cost of cost {cost_id} of cloud {cloud_id} locked")
+
+    try:
+        yield
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            LOGGER.warning(f"Resource instances cost lock of cost {cost_id} of cloud {cloud_id} expired while held")
+
+
+def update_resource_instances_cost(cloud_id, cost_id, m_resources_cost, m_ibm_cost_time, db_session,
+                                   chunk_size=1000):
+    """
+    Update cost and daily cost of Resource Instances of a billing month.
+    The existing costs and month to date totals of the CRNs of `m_resources_cost` are loaded with chunked queries, the
+    changes are computed in memory and written with chunked multi row statements. The caller commits, the daily costs
+    of a CRN are written together with its month to date total, so a month can be written in several batches of
+    resources, each in its own transaction. The caller holds `resource_instances_cost_lock` of the month for the
+    transaction, so the totals it reads are not rebuilt before it commits.
+    :param cloud_id: database id of entry of table "Cloud"
+    :param cost_id: database id of entry of table "IBMCost"
+    :param m_resources_cost: [{
+                            "month": "2022-12",
+                            "usage": [{
+                                "cost": 8.690458064516127,
+                                "unit": "GIGABYTE_MONTH_DISK",
+                                "price": [{
+                                "price": 0.58,
+                                "tier_model": "Granular Tier",
+                                "unitQuantity": "1",
+                                "quantity_tier": "1"
+                                }],
+                                "metric": "GIGABYTE_MONTHS_DISK",
+                                "quantity": 16.64838709677419,
+                                }, ......  #more metrics
+                                "resource_id": ""
+                                "resource_instance_id": "crn of resource"
+                                }]
+        or any iterable of them
+    :param m_ibm_cost_time: time in format "2022-12-08 05:26:38"
+    :param db_session: database session
+    :param chunk_size: max number of CRNs or ids per query
+    """
+    start_time = datetime.utcnow()
+    # the IBMCost may be new, it has to exist before its rows are written with plain statements
+    db_session.flush()
+
+    m_resources_cost = list(m_resources_cost)
+    keys = {(m_resource_cost['resource_id'], m_resource_cost['resource_instance_id'])
+            for m_resource_cost in m_resources_cost}
+    crns = sorted({crn for _, crn in keys})
+    mtd_cost_ids = sorted(
+        IBMResourceInstancesMTDCost.generate_id(cost_id, resource_id, crn) for resource_id, crn in keys)
+
+    # (resource_id, crn) -> [id, cost, estimated_cost]
+    db_instance_costs = {}
+    # (resource_id, crn) -> [created_at of the latest daily cost, date of the latest daily cost, sum of daily costs]
+    db_daily_costs = {}
+    for index in range(0, len(crns), chunk_size):
+        db_instance_costs.update({
+            (resource_id, crn): [id_, cost, estimated_cost]
+            for id_, resource_id, crn, cost, estimated_cost in db_session.query(
+                IBMResourceInstancesCost.id, IBMResourceInstancesCost.resource_id, IBMResourceInstancesCost.crn,
+                IBMResourceInstancesCost.cost, IBMResourceInstancesCost.estimated_cost
+            ).filter(
+                IBMResourceInstancesCost.cloud_id == cloud_id, IBMResourceInstancesCost.cost_id == cost_id,
+                IBMResourceInstancesCost.crn.in_(crns[index:index + chunk_size])
+            ).all()
+        })
+    for index in range(0, len(mtd_cost_ids), chunk_size):
+        db_daily_costs.update({
+            (resource_id, crn): [created_at, date_, mtd_cost]
+            for resource_id, crn, created_at, date_, mtd_cost in db_session.query(
+                IBMResourceInstancesMTDCost.resource_id, IBMResourceInstancesMTDCost.crn,
+                IBMResourceInstancesMTDCost.last_daily_cost_created_at,
+                IBMResourceInstancesMTDCost.last_daily_cost_date, IBMResourceInstancesMTDCost.mtd_cost
+            ).filter(IBMResourceInstancesMTDCost.id.in_(mtd_cost_ids[index:index + chunk_size])).all()
+        })
+
+    utcnow = datetime.utcnow()
+    current_month = f'{utcnow.year}-{utcnow.month}'
+    days_passed = datetime.now().day
+    current_date = date.today()
+    days_in_month = monthrange(current_date.year, current_date.month)[1]
+    current_time_datetime = datetime.strptime(m_ibm_cost_time, "%Y-%m-%d %H:%M:%S")
+    current_time_datetime_est = current_time_datetime - timedelta(hours=1)  # Subtracted 1 hour to cater delays
+
+    instance_cost_rows = {}
+    daily_cost_rows = []
+    mtd_cost_rows = {}
+    resources_count = 0
+    for m_resource_cost in m_resources_cost:
+        resources_count += 1
+        crn = m_resource_cost['resource_instance_id']
+        resource_id = m_resource_cost['resource_id']  # Resource ID is service name
+        m_month = m_resource_cost['month']
+        m_month_datetime = datetime(int(m_month.split('-')[0]), int(m_month.split('-')[1]), 1)
+        key = (resource_id, crn)
+
+        cost_mtd = 0.0
+        for usage_and_cost in m_resource_cost['usage']:
+            cost_mtd = round(sum([cost_mtd, float(usage_and_cost['cost'])]))
+
+        if resource_id == 'is.floating-ip':
+            estimated_cost = cost_mtd
+        elif current_month == m_month:
+            estimated_cost = round((cost_mtd / days_passed) * days_in_month)
+        else:
+            estimated_cost = round(cost_mtd)
+
+        # update Daily Cost
+        date_ = None
+        daily_cost = cost_mtd
+        db_daily_cost = db_daily_costs.get(key)
+        if db_daily_cost:
+            created_at, last_date, daily_mtd_cost = db_daily_cost
+            hour_lapsed = (current_time_datetime - created_at.replace(microsecond=0)).total_seconds() / 3600
+            if hour_lapsed > 24 and (last_date + timedelta(days=1)).month == m_month_datetime.month:
+                date_ = last_date + timedelta(days=1)
+                daily_cost = round(abs(cost_mtd - daily_mtd_cost))
+        elif current_time_datetime_est.date().day == 1 and \
+                current_time_datetime_est.date().month == m_month_datetime.month:
+            date_ = datetime(m_month_datetime.year, m_month_datetime.month, 1).date()
+        elif current_time_datetime_est.date().month == m_month_datetime.month:
+            date_ = current_time_datetime.date()
+
+        if date_:
+            created_at = datetime.utcnow()
+            daily_cost_rows.append({
+                "id": str(uuid.uuid4().hex),
+                "resource_id": resource_id,
+                "crn": crn,
+                "daily_cost": daily_cost,
+                "date": date_,
+                "created_at": created_at,
+                "cost_id": cost_id,
+                "cloud_id": cloud_id,
+            })
+            # also keeps a CRN repeated in the same response from getting a second daily cost
+            db_daily_costs[key] = [created_at, date_, (db_daily_cost[2] if db_daily_cost else 0.0) + daily_cost]
+            mtd_cost_rows[key] = get_mtd_cost_row(cloud_id, cost_id, resource_id, crn, *db_daily_costs[key])
+
+        db_instance_cost = db_instance_costs.get(key)
+        if db_instance_cost and db_instance_cost[1:] == [cost_mtd, estimated_cost] and key not in instance_cost_rows:
+            continue
+
+        if not db_instance_cost:
+            db_instance_cost = db_instance_costs[key] = [str(uuid.uuid4().hex), None, None]
+
+        instance_cost_rows[key] = {
+            "id": db_instance_cost[0],
+            "resource_id": resource_id,
+            "crn": crn,
+            "cost": cost_mtd,
+            "estimated_cost": estimated_cost,
+            "cost_id": cost_id,
+            "cloud_id": cloud_id,
+        }
+
+    bulk_upsert(db_session, IBMResourceInstancesCost, list(instance_cost_rows.values()),
+                update_columns=["cost", "estimated_cost"])
+    bulk_upsert(db_session, IBMResourceInstancesDailyCost, daily_cost_rows)
+    bulk_upsert(db_session, IBMResourceInstancesMTDCost, list(mtd_cost_rows.values()),
+                update_columns=["mtd_cost", "last_daily_cost_date", "last_daily_cost_created_at", "updated_at"])
+
+    LOGGER.info(
+        f"Cost of {resources_count} resource instances of cost {cost_id} processed in "
+        f"{(datetime.utcnow() - start_time).total_seconds()}s: {len(instance_cost_rows)} costs and "
+        f"{len(daily_cost_rows)} daily costs written"
+    )
+
+
+def get_mtd_cost_row(cloud_id, cost_id, resource_id, crn, last_daily_cost_created_at, last_daily_cost_date, mtd_cost):
+    return {
+        "id": IBMResourceInstancesMTDCost.generate_id(cost_id, resource_id, crn),
+        "resource_id": resource_id,
+        "crn": crn,
+        "mtd_cost": mtd_cost,
+        "last_daily_cost_date": last_daily_cost_date,
+        "last_daily_cost_created_at": last_daily_cost_created_at,
+        "updated_at": datetime.utcnow(),
+        "cost_id": cost_id,
+        "cloud_id": cloud_id,
+    }
+
+
+def rebuild_resource_instances_mtd_cost(cloud_id, db_session, cost_id=None, chunk_size=1000):
+    """
+    Check the month to date totals of a cloud against its daily costs, rewriting the totals which drifted and
+    deleting the ones without daily costs. Ingestion of the months checked must be locked out for the transaction with
+    `resource_instances_cost_lock`, its batches would otherwise be overwritten by totals read before they committed.
+    :param cloud_id: database id of entry of table "Cloud"
+    :param db_session: database session, the caller commits
+    :param cost_id: database id of entry of table "IBMCost" to only check one billing month
+    :param chunk_size: max number of rows per statement
+    :return: number of totals rewritten or deleted
+    """
+    filters = {"cloud_id": cloud_id}
+    if cost_id:
+        filters["cost_id"] = cost_id
+
+    db_mtd_costs = {
+        id_: [created_at, date_, mtd_cost]
+        for id_, created_at, date_, mtd_cost in db_session.query(
+            IBMResourceInstancesMTDCost.id, IBMResourceInstancesMTDCost.last_daily_cost_created_at,
+            IBMResourceInstancesMTDCost.last_daily_cost_date, IBMResourceInstancesMTDCost.mtd_cost
+        ).filter_by(**filters).all()
+    }
+
+    mtd_cost_rows = []
+    daily_cost_aggregates = db_session.query(
+        IBMResourceInstancesDailyCost.cost_id, IBMResourceInstancesDailyCost.resource_id,
+        IBMResourceInstancesDailyCost.crn, func.max(IBMResourceInstancesDailyCost.created_at),
+        func.max(IBMResourceInstancesDailyCost.date), func.sum(IBMResourceInstancesDailyCost.daily_cost)
+    ).filter_by(**filters).group_by(
+        IBMResourceInstancesDailyCost.cost_id, IBMResourceInstancesDailyCost.resource_id,
+        IBMResourceInstancesDailyCost.crn
+    ).all()
+    for daily_cost_cost_id, resource_id, crn, created_at, date_, mtd_cost in daily_cost_aggregates:
+        db_mtd_cost = db_mtd_costs.pop(IBMResourceInstancesMTDCost.generate_id(daily_cost_cost_id, resource_id, crn),
+                                       None)
+        if db_mtd_cost and db_mtd_cost[:2] == [created_at, date_] and abs(db_mtd_cost[2] - (mtd_cost or 0.0)) < 0.01:
+            continue
+
+        mtd_cost_rows.append(
+            get_mtd_cost_row(cloud_id, daily_cost_cost_id, resource_id, crn, created_at, date_, mtd_cost or 0.0)
+        )
+
+    bulk_upsert(db_session, IBMResourceInstancesMTDCost, mtd_cost_rows, chunk_size=chunk_size,
+                update_columns=["mtd_cost", "last_daily_cost_date", "last_daily_cost_created_at", "updated_at"])
+
+    stale_ids = list(db_mtd_costs.keys())
+    for index in range(0, len(stale_ids), chunk_size):
+        db_session.query(IBMResourceInstancesMTDCost).filter(
+            IBMResourceInstancesMTDCost.cloud_id == cloud_id,
+            IBMResourceInstancesMTDCost.id.in_(stale_ids[index:index + chunk_size])
+        ).delete(synchronize_session=False)
+
+    return len(mtd_cost_rows) + len(stale_ids)
+
+
+def get_latest_cost_id(cloud_id, db_session):
+    """
+    :return: database id of the entry of table "IBMCost" of the latest billing month of a cloud, None if there is none
+    """
+    return db_session.query(IBMCost.id).filter_by(cloud_id=cloud_id).order_by(
+        IBMCost.billing_month.desc()).limit(1).scalar()
+
+
+def update_recommendations_cost(cloud_id, db_session):
+    """
+    Refresh the estimated savings of the idle resources, with one joined UPDATE, and the costs and savings of the
+    rightsizing recommendations of a cloud from the resource instance costs of its latest billing month
+    :param cloud_id: database id of entry of table "Cloud"
+    :param db_session: database session, the caller commits
+    """
+    latest_cost_id = get_latest_cost_id(cloud_id, db_session)
+    if not latest_cost_id:
+        return
+
+    db_session.execute(
+        update(IBMIdleResource).where(
+            IBMIdleResource.cloud_id == cloud_id,
+            IBMResourceInstancesCost.cloud_id == cloud_id,
+            IBMResourceInstancesCost.cost_id == latest_cost_id,
+            IBMResourceInstancesCost.crn == IBMIdleResource.crn
+        ).values(
+            estimated_savings=func.round(IBMResourceInstancesCost.estimated_cost),
+            # a savings refresh does not re-mark the resource
+            marked_at=IBMIdleResource.marked_at
+        ).execution_options(synchronize_session=False)
+    )
+    update_rightsizing_recommendations_cost(cloud_id, db_session, latest_cost_id)
+    # the joined UPDATE bypasses the session, so the idle savings summary is not kept up to date by it
+    recompute_cloud_resource_summaries(cloud_id, db_session, models=[IBMIdleResource])
+
+
+def update_rightsizing_recommendations_cost(cloud_id, db_session, cost_id, recommendation_ids=None):
+    """
+    Refresh the monthly cost, estimated monthly cost and estimated monthly savings of the rightsizing recommendations
+    of a cloud from the resource instance costs of a billing month and the cost sheet of the instance profiles
+    :param cloud_id: database id of entry of table "Cloud"
+    :param db_session: database session, the caller commits
+    :param cost_id: database id of entry of table "IBMCost" of the billing month
+    :param recommendation_ids: only refresh these recommendations
+    """
+    # hourly cost of the current and recommended profiles, NULL for a profile missing from the cost sheet, which has
+    # no known savings
+    current_profile_cost = case(VPC_GEN2_INSTANCE_PROFILES_COST_SHEET,
+                                value=IBMRightSizingRecommendation.current_instance_type)
+    recommended_profile_cost = case(VPC_GEN2_INSTANCE_PROFILES_COST_SHEET,
+                                    value=IBMRightSizingRecommendation.recommended_instance_type)
+    potential_savings = func.coalesce((current_profile_cost - recommended_profile_cost) / current_profile_cost * 100, 0)
+    estimated_monthly_savings = func.round(IBMResourceInstancesCost.estimated_cost * potential_savings / 100, 2)
+
+    # the assignments only read the joined cost, MySQL does not order those of a multi table UPDATE
+    recommendations_update = update(IBMRightSizingRecommendation).where(
+        IBMRightSizingRecommendation.cloud_id == cloud_id,
+        IBMInstance.id == IBMRightSizingRecommendation.instance_id,
+        IBMResourceInstancesCost.crn == IBMInstance.crn,
+        IBMResourceInstancesCost.cloud_id == cloud_id,
+        IBMResourceInstancesCost.cost_id == cost_id
+    ).values(
+        monthly_cost=IBMResourceInstancesCost.estimated_cost,
+        estimated_monthly_cost=func.round(IBMResourceInstancesCost.estimated_cost - estimated_monthly_savings, 2),
+        estimated_monthly_savings=estimated_monthly_savings
+    ).execution_options(synchronize_session=False)
+    if recommendation_ids is not None:
+        recommendations_update = recommendations_update.where(IBMRightSizingRecommendation.id.in_(recommendation_ids))
+
+    db_session.execute(recommendations_update)
+
+
+def refresh_cost_tracking_rollups(cloud_id, db_session, start, end, spend=True, savings=True):
+    """
+    Recompute the daily and monthly rollups of a cloud for [start, end) from IBMCost, IBMResourceInstancesDailyCost and
+    IBMResourceTracking, with one INSERT ... SELECT ... ON DUPLICATE KEY UPDATE per granularity
+    :param cloud_id: database id of entry of table "Cloud"
+    :param db_session: database session, the caller commits
+    :param start: first day of the first month to refresh
+    :param end: first day of the month after the last month to refresh
+    :param spend: refresh the cost of the rollups
+    :param savings: refresh the savings and actions count of the rollups
+    """
+    rollups_query = db_session.query(IBMCostTrackingRollup).filter(
+        IBMCostTrackingRollup.cloud_id == cloud_id, IBMCostTrackingRollup.period_start >= start,
+        IBMCostTrackingRollup.period_start < end
+    )
+    reset_values = {}
+    if spend:
+        reset_values[IBMCostTrackingRollup.cost] = 0.0
+    if savings:
+        reset_values.update({IBMCostTrackingRollup.savings: 0.0, IBMCostTrackingRollup.actions_count: 0})
+    if not reset_values:
+        return
+
+    # a period whose source rows are gone must not keep its old value
+    rollups_query.update(reset_values, synchronize_session=False)
+
+    rollup_selects = []
+    if spend:
+        cost_ids_query = select(IBMCost.id).where(
+            IBMCost.cloud_id == cloud_id, IBMCost.billing_month >= start, IBMCost.billing_month < end
+        )
+        rollup_selects.append((["cost"], IBMCostTrackingRollup.GRANULARITY_DAILY, select(
+            IBMResourceInstancesDailyCost.date, func.sum(IBMResourceInstancesDailyCost.daily_cost), literal(0.0),
+            literal(0)
+        ).where(
+            IBMResourceInstancesDailyCost.cost_id.in_(cost_ids_query), IBMResourceInstancesDailyCost.date >= start,
+            IBMResourceInstancesDailyCost.date < end
+        ).group_by(IBMResourceInstancesDailyCost.date)))
+        rollup_selects.append((["cost"], IBMCostTrackingRollup.GRANULARITY_MONTHLY, select(
+            func.date(IBMCost.billing_month), func.sum(IBMCost.billable_cost), literal(0.0), literal(0)
+        ).where(
+            IBMCost.cloud_id == cloud_id, IBMCost.billing_month >= start, IBMCost.billing_month < end
+        ).group_by(IBMCost.billing_month)))
+
+    if savings:
+        for granularity, period_start in [
+            (IBMCostTrackingRollup.GRANULARITY_DAILY, func.date(IBMResourceTracking.action_taken_at)),
+            (IBMCostTrackingRollup.GRANULARITY_MONTHLY, func.date_format(IBMResourceTracking.action_taken_at,
+                                                                         "%Y-%m-01"))
+        ]:
+            rollup_selects.append((["savings", "actions_count"], granularity, select(
+                period_start, literal(0.0), func.sum(IBMResourceTracking.estimated_savings),
+                func.count(IBMResourceTracking.id)
+            ).where(
+                IBMResourceTracking.cloud_id == cloud_id, IBMResourceTracking.action_taken_at >= start,
+                IBMResourceTracking.action_taken_at < end
+            ).group_by(period_start)))
+
+    for update_columns, granularity, aggregate_select in rollup_selects:
+        aggregate = aggregate_select.subquery()
+        statement = mysql_insert(IBMCostTrackingRollup.__table__).from_select(
+            ["id", "granularity", "period_start", "cost", "savings", "actions_count", "updated_at", "cloud_id"],
+            select(
+                func.replace(func.uuid(), "-", ""), literal(granularity), *aggregate.c, func.utc_timestamp(),
+                literal(cloud_id)
+            )
+        )
+        statement = statement.on_duplicate_key_update(
+            updated_at=statement.inserted.updated_at,
+            **{column: statement.inserted[column] for column in update_columns}
+        )
+        db_session.execute(statement)
+
+    rollups_query.filter(
+        IBMCostTrackingRollup.cost == 0, IBMCostTrackingRollup.actions_count == 0
+    ).delete(synchronize_session=False)
+
+
+def get_retention_cutoff(retention_months):
+    """
+    First day of the oldest month kept with a retention of `retention_months` months, the current one included
+    :param retention_months: <int> months to keep, falsy to keep everything
+    :return: <datetime> or None if nothing expires
+    """
+    if not retention_months:
+        return
+
+    current_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return current_month - relativedelta(months=max(retention_months, 3) - 1)
+
+
+def get_cost_sync_cutoff():
+    """
+    First day of the oldest billing month cost syncs may ingest. Older months had their daily costs compacted into the
+    rollups or their resource instance costs purged (purge_expired_cost_data), syncing them again would bring the
+    purged rows back and rebuild the rollups from what is left of them.
+    :return: <datetime> or None if nothing expires
+    """
+    cutoffs = [cutoff for cutoff in [
+        get_retention_cutoff(IBMCostConfig.IBM_DAILY_COST_RETENTION_MONTHS),
+        get_retention_cutoff(IBMCostConfig.IBM_RESOURCE_INSTANCES_COST_RETENTION_MONTHS)
+    ] if cutoff]
+    return max(cutoffs) if cutoffs else None
+
+
+def delete_in_chunks(db_session, model, filters, chunk_size):
+    """
+    Delete the rows of a model matching filters, `chunk_size` rows per transaction
+    :return: number of rows deleted
+    """
+    deleted = 0
+    while True:
+        ids = [id_ for id_, in db_session.query(model.id).filter(*filters).limit(chunk_size).all()]
+        if not ids:
+            return deleted
+
+        # the filters are repeated for the cost data generation listener to tell the cloud of the rows
+        db_session.query(model).filter(model.id.in_(ids), *filters).delete(synchronize_session=False)
+        db_session.commit()
+        deleted += len(ids)
+
+
+def purge_expired_cost_data(cloud_id, db_session, chunk_size=5000):
+    """
+    Delete the daily costs, resource instance costs and resource tracking of a cloud older than their retention
+    (IBMCostConfig). Months are compacted into IBMCostTrackingRollup first if they are not already, the monthly spend
+    per service stays in IBMCost and IBMResourcesCost. Commits after every chunk so deletes never hold long locks.
+    :param cloud_id: database id of entry of table "Cloud"
+    :param db_session: database session
+    :param chunk_size: max number of rows deleted per transaction
+    :return: <dict> table name -> number of rows deleted
+    """
+    deleted = {}
+
+    daily_cost_cutoff = get_retention_cutoff(IBMCostConfig.IBM_DAILY_COST_RETENTION_MONTHS)
+    if daily_cost_cutoff:
+        expired_costs = db_session.query(IBMCost.id, IBMCost.billing_month).filter(
+            IBMCost.cloud_id == cloud_id, IBMCost.billing_month < daily_cost_cutoff,
+            exists().where(IBMResourceInstancesDailyCost.cost_id == IBMCost.id)
+        ).all()
+        for cost_id, billing_month in expired_costs:
+            month_start, month_end = billing_month, billing_month + relativedelta(months=1)
+            # a month whose purge was interrupted already has its rollups, they must not be rebuilt from what is left
+            compacted = db_session.query(IBMCostTrackingRollup.id).filter(
+                IBMCostTrackingRollup.cloud_id == cloud_id,
+                IBMCostTrackingRollup.granularity == IBMCostTrackingRollup.GRANULARITY_DAILY,
+                IBMCostTrackingRollup.period_start >= month_start.date(),
+                IBMCostTrackingRollup.period_start < month_end.date()
+            ).first()
+            if not compacted:
+                refresh_cost_tracking_rollups(cloud_id, db_session, month_start, month_end, savings=False)
+                db_session.commit()
+
+            for model in [IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost]:
+                deleted[model.__tablename__] = deleted.get(model.__tablename__, 0) + delete_in_chunks(
+                    db_session, model, [model.cloud_id == cloud_id, model.cost_id == cost_id], chunk_size
+                )
+
+    instances_cost_cutoff = get_retention_cutoff(IBMCostConfig.IBM_RESOURCE_INSTANCES_COST_RETENTION_MONTHS)
+    if instances_cost_cutoff:
+        expired_cost_ids = [cost_id for cost_id, in db_session.query(IBMCost.id).filter(
+            IBMCost.cloud_id == cloud_id, IBMCost.billing_month < instances_cost_cutoff
+        ).all()]
+        for cost_id in expired_cost_ids:
+            deleted[IBMResourceInstancesCost.__tablename__] = deleted.get(
+                IBMResourceInstancesCost.__tablename__, 0) + delete_in_chunks(
+                db_session, IBMResourceInstancesCost,
+                [IBMResourceInstancesCost.cloud_id == cloud_id, IBMResourceInstancesCost.cost_id == cost_id],
+                chunk_size
+            )
+
+    tracking_cutoff = get_retention_cutoff(IBMCostConfig.IBM_RESOURCE_TRACKING_RETENTION_MONTHS)
+    if tracking_cutoff:
+        expired_months = db_session.query(
+            func.date_format(IBMResourceTracking.action_taken_at, "%Y-%m-01")
+        ).filter(
+            IBMResourceTracking.cloud_id == cloud_id, IBMResourceTracking.action_taken_at < tracking_cutoff
+        ).group_by(func.date_format(IBMResourceTracking.action_taken_at, "%Y-%m-01")).all()
+        for month, in expired_months:
+            month_start = datetime.strptime(month, "%Y-%m-%d")
+            compacted = db_session.query(IBMCostTrackingRollup.id).filter_by(
+                cloud_id=cloud_id, granularity=IBMCostTrackingRollup.GRANULARITY_MONTHLY,
+                period_start=month_start.date()
+            ).filter(IBMCostTrackingRollup.actions_count > 0).first()
+            if not compacted:
+                refresh_cost_tracking_rollups(cloud_id, db_session, month_start,
+                                              month_start + relativedelta(months=1), spend=False)
+                db_session.commit()
+
+        deleted[IBMResourceTracking.__tablename__] = delete_in_chunks(
+            db_session, IBMResourceTracking,
+            [IBMResourceTracking.cloud_id == cloud_id, IBMResourceTracking.action_taken_at < tracking_cutoff],
+            chunk_size
+        )
+
+    return {table: count for table, count in deleted.items() if count}
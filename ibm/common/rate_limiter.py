@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+import redis
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread safe token bucket. `rate` tokens are added per second, up to `capacity` (bursts), and every call to the
+    limited API first takes a token with `acquire`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        assert rate > 0, "rate should be positive"
+
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.__tokens = self.capacity
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Block until `tokens` tokens are available and take them
+        """
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated_at) * self.rate)
+                self.__updated_at = now
+                if self.__tokens >= tokens:
+                    self.__tokens -= tokens
+                    return
+
+                wait = (tokens - self.__tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class RedisTokenBucketRateLimiter:
+    """
+    Token bucket shared through Redis by all the processes limiting the same `key`, so N workers together stay under
+    the limit of the API instead of N times it. The bucket is refilled and taken from atomically by a Lua script with
+    the clock of Redis. While Redis is unavailable the calls are limited by the `fallback` bucket of the process.
+    """
+    ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated_at, 0) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+    def __init__(self, redis_client, key, rate, capacity=None, fallback=None):
+        assert rate > 0, "rate should be positive"
+
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.fallback = fallback or TokenBucketRateLimiter(rate=rate, capacity=capacity)
+        self.__acquire_script = redis_client.register_script(self.ACQUIRE_SCRIPT)
+
+    def acquire(self, tokens=1):
+        """
+        Block until `tokens` tokens are available in the shared bucket and take them
+        """
+        while True:
+            try:
+                wait = float(self.__acquire_script(keys=[self.key], args=[self.rate, self.capacity, tokens]))
+            except redis.RedisError as ex:
+                LOGGER.warning(f"Taking a token of rate limiter {self.key} from Redis failed, limited per process. "
+                               f"Trace: {ex}")
+                self.fallback.acquire(tokens)
+                return
+
+            if wait <= 0:
+                return
+
+            time.sleep(wait)
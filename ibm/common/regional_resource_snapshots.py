@@ -0,0 +1,139 @@
+"""
+Invalidation of the regional resource snapshots (IBMRegionalResourceSnapshot) on writes of the resources they hold.
+
+Regions (or clouds, for resources shared by the regions of a cloud) whose resources a session inserts, updates or
+deletes are collected when it flushes. Right before it commits, in the same transaction, the version of their snapshots
+is bumped so a rolled back write does not invalidate anything, and once it committed a regeneration of the snapshots is
+enqueued. The stale snapshots are served until they are regenerated. Discovery regenerates the snapshots of the regions
+it syncs itself and does not register the listeners.
+"""
+import logging
+
+import redis
+from kombu.exceptions import OperationalError
+from sqlalchemy import event, inspect, or_
+from sqlalchemy.orm import Session
+
+import ibm.models
+from ibm.models import IBMRegion, IBMRegionalResourceSnapshot
+
+LOGGER = logging.getLogger(__name__)
+
+# keys of the region and cloud ids collected in the `info` of a session
+SNAPSHOT_REGION_IDS_KEY = "regional_resource_snapshot_region_ids"
+SNAPSHOT_CLOUD_IDS_KEY = "regional_resource_snapshot_cloud_ids"
+# key of the region ids of the snapshots to regenerate once the session committed
+STALE_SNAPSHOT_REGION_IDS_KEY = "stale_regional_resource_snapshot_region_ids"
+
+snapshot_models = set()
+
+
+def get_snapshot_models():
+    """
+    :return: <set> of the models the snapshots hold resources of, or references to
+    """
+    if not snapshot_models:
+        relationships = IBMRegion.__mapper__.relationships
+        snapshot_models.update(
+            relationships[relationship_name].mapper.class_
+            for _, relationship_name in IBMRegionalResourceSnapshot.REGIONAL_RESOURCE_COLLECTIONS
+        )
+        snapshot_models.update(
+            getattr(ibm.models, model_name) for model_name in IBMRegionalResourceSnapshot.NESTED_REFERENCE_MODELS
+        )
+
+    return snapshot_models
+
+
+def enqueue_regional_resource_snapshot_refresh(*region_ids):
+    """
+    Regenerate the snapshots of regions in the background, a region whose regeneration is already queued is skipped
+    :param region_ids: database ids of entries of table "IBMRegion"
+    """
+    from ibm.tasks.ibm.regional_resource_snapshot_tasks import refresh_ibm_regional_resource_snapshot
+
+    for region_id in region_ids:
+        try:
+            refresh_ibm_regional_resource_snapshot.delay(region_id)
+        except (OperationalError, redis.RedisError) as ex:
+            # served stale until the next request of the region enqueues it again, or the next discovery
+            LOGGER.warning(
+                f"Enqueuing the regional resource snapshot refresh of region {region_id} failed. Trace: {ex}")
+
+
+def _get_flushed_value(obj, key):
+    # without loading anything, a deleted object may have been expired
+    state = inspect(obj)
+    if key not in state.mapper.columns:
+        return
+
+    return state.dict.get(key) or next(iter(state.attrs[key].history.deleted), None)
+
+
+def _collect_snapshot_scopes(session, flush_context):
+    models = get_snapshot_models()
+    region_ids, cloud_ids = set(), set()
+    for objs in [session.new, session.deleted, session.dirty]:
+        for obj in objs:
+            if type(obj) not in models:
+                continue
+
+            region_id = _get_flushed_value(obj, "region_id")
+            if region_id:
+                region_ids.add(region_id)
+                continue
+
+            cloud_id = _get_flushed_value(obj, "cloud_id")
+            if cloud_id:
+                cloud_ids.add(cloud_id)
+
+    if region_ids:
+        session.info.setdefault(SNAPSHOT_REGION_IDS_KEY, set()).update(region_ids)
+    if cloud_ids:
+        session.info.setdefault(SNAPSHOT_CLOUD_IDS_KEY, set()).update(cloud_ids)
+
+
+def _mark_snapshots_stale(session):
+    # changes not flushed yet are flushed by the commit after this listener, collect their regions first
+    session.flush()
+    region_ids = session.info.pop(SNAPSHOT_REGION_IDS_KEY, set())
+    cloud_ids = session.info.pop(SNAPSHOT_CLOUD_IDS_KEY, set())
+    if not (region_ids or cloud_ids):
+        return
+
+    stale_region_ids = sorted(region_id for region_id, in session.query(IBMRegionalResourceSnapshot.region_id).filter(
+        or_(IBMRegionalResourceSnapshot.region_id.in_(sorted(region_ids)),
+            IBMRegionalResourceSnapshot.cloud_id.in_(sorted(cloud_ids)))
+    ).all())
+    if not stale_region_ids:
+        return
+
+    session.query(IBMRegionalResourceSnapshot).filter(
+        IBMRegionalResourceSnapshot.region_id.in_(stale_region_ids)
+    ).update({IBMRegionalResourceSnapshot.version: IBMRegionalResourceSnapshot.version + 1},
+             synchronize_session=False)
+    session.info.setdefault(STALE_SNAPSHOT_REGION_IDS_KEY, set()).update(stale_region_ids)
+
+
+def _refresh_stale_snapshots(session):
+    region_ids = session.info.pop(STALE_SNAPSHOT_REGION_IDS_KEY, None)
+    if region_ids:
+        enqueue_regional_resource_snapshot_refresh(*sorted(region_ids))
+
+
+def _forget_snapshot_scopes(session):
+    for key in [SNAPSHOT_REGION_IDS_KEY, SNAPSHOT_CLOUD_IDS_KEY, STALE_SNAPSHOT_REGION_IDS_KEY]:
+        session.info.pop(key, None)
+
+
+def register_regional_resource_snapshot_listeners():
+    """
+    Mark stale, and regenerate, the snapshots of the regions whose resources are written by the sessions of the
+    process, call it once when the process starts (API and workflow workers)
+    """
+    for identifier, listener in [
+        ("after_flush", _collect_snapshot_scopes), ("before_commit", _mark_snapshots_stale),
+        ("after_commit", _refresh_stale_snapshots), ("after_rollback", _forget_snapshot_scopes)
+    ]:
+        if not event.contains(Session, identifier, listener):
+            event.listen(Session, identifier, listener)
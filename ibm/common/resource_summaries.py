@@ -0,0 +1,259 @@
+"""
+Per cloud resource counts (and idle resource savings) in IBMCloudResourceSummary, read by the dashboard.
+
+Inserts, deletes and updates of the summarized models are turned into deltas when a session flushes, the expired values
+of the deleted and updated objects are loaded right before. The deltas of all the flushes of a transaction are added up
+and applied with a single upsert right before it commits, so the summary rows are only locked at the end of the
+transaction and a rolled back write changes nothing. The summarized attributes load the value they replace when they
+are set while expired, summaries of objects whose values are still unknown are recomputed before the commit instead.
+Bulk statements and database cascades bypass the session, summaries they change are recomputed by
+`recompute_cloud_resource_summaries` (by the writer where it is known, periodically otherwise).
+"""
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import NO_VALUE
+from sqlalchemy.orm.exc import ObjectDeletedError
+
+from ibm.models import IBMCloudResourceSummary, IBMDedicatedHost, IBMIdleResource, IBMImage, IBMInstance, \
+    IBMKubernetesCluster, IBMLoadBalancer, IBMNetworkAcl, IBMPublicGateway, IBMRightSizingRecommendation, \
+    IBMSecurityGroup, IBMSshKey, IBMSubnet, IBMVpcNetwork, IBMVpnGateway
+
+LOGGER = logging.getLogger(__name__)
+
+# key of the deltas collected in the `info` of a session, (cloud_id, model name) -> [count delta, total delta]
+RESOURCE_SUMMARY_DELTAS_KEY = "resource_summary_deltas"
+# key of the (cloud_id, model) whose summaries are recomputed, the values of a changed object were not known
+RESOURCE_SUMMARY_RECOMPUTES_KEY = "resource_summary_recomputes"
+
+# summarized model -> column values a resource needs to be counted
+SUMMARIZED_MODEL_FILTERS = {
+    IBMVpcNetwork: {},
+    IBMInstance: {},
+    IBMKubernetesCluster: {},
+    IBMDedicatedHost: {},
+    IBMImage: {"visibility": IBMImage.TYPE_VISIBLE_PRIVATE},
+    IBMNetworkAcl: {},
+    IBMSecurityGroup: {},
+    IBMVpnGateway: {},
+    IBMLoadBalancer: {},
+    IBMSshKey: {},
+    IBMPublicGateway: {},
+    IBMSubnet: {},
+    IBMIdleResource: {},
+    IBMRightSizingRecommendation: {},
+}
+
+# summarized model -> column summed into the total of the summary
+SUMMARIZED_MODEL_TOTAL_COLUMNS = {
+    IBMIdleResource: "estimated_savings",
+}
+
+
+def get_summary_keys(model):
+    """
+    :return: <list> of the attributes of a summarized model its summary value is computed from
+    """
+    keys = ["cloud_id", *SUMMARIZED_MODEL_FILTERS[model].keys()]
+    if model in SUMMARIZED_MODEL_TOTAL_COLUMNS:
+        keys.append(SUMMARIZED_MODEL_TOTAL_COLUMNS[model])
+
+    return keys
+
+
+def get_summary_value(obj, previous=False):
+    """
+    Count (0 or 1) and total an object adds to the summary of its cloud, without loading anything from the database
+    :param obj: <Object> of a summarized model
+    :param previous: use the values the object had before its pending changes
+    :return: (cloud_id, count, total), cloud_id is None if unknown, count and total are None if the other values are
+        not loaded (expired or set before they were loaded)
+    """
+    state = inspect(obj)
+    model = type(obj)
+    values = {}
+    for key in get_summary_keys(model):
+        if previous and key in state.committed_state:
+            values[key] = state.committed_state[key]
+        else:
+            values[key] = state.dict.get(key, NO_VALUE)
+
+    if values["cloud_id"] in [None, NO_VALUE]:
+        return None, None, None
+
+    if NO_VALUE in values.values():
+        return values["cloud_id"], None, None
+
+    if not all(values[key] == value for key, value in SUMMARIZED_MODEL_FILTERS[model].items()):
+        return values["cloud_id"], 0, 0.0
+
+    total_column = SUMMARIZED_MODEL_TOTAL_COLUMNS.get(model)
+    return values["cloud_id"], 1, (values[total_column] or 0.0) if total_column else 0.0
+
+
+def apply_resource_summary_deltas(connection, deltas):
+    """
+    Add count and total deltas to the summaries, creating missing ones
+    :param connection: connection of the transaction to apply the deltas in
+    :param deltas: <dict> (cloud_id, model name) -> [count delta, total delta]
+    """
+    rows = [
+        {
+            "id": str(uuid.uuid4().hex), "name": name, "count": count, "total": total,
+            "updated_at": datetime.utcnow(), "cloud_id": cloud_id
+        }
+        # a stable order keeps concurrent transactions locking the summary rows in the same order
+        for (cloud_id, name), (count, total) in sorted(deltas.items()) if count or total
+    ]
+    if not rows:
+        return
+
+    summaries_table = IBMCloudResourceSummary.__table__
+    statement = mysql_insert(summaries_table).values(rows)
+    statement = statement.on_duplicate_key_update(
+        count=summaries_table.c.count + statement.inserted.count,
+        total=summaries_table.c.total + statement.inserted.total,
+        updated_at=statement.inserted.updated_at
+    )
+    connection.execute(statement)
+
+
+def recompute_cloud_resource_summaries(cloud_id, db_session, models=None):
+    """
+    Recompute the summaries of a cloud from the resource tables
+    :param cloud_id: database id of entry of table "Cloud"
+    :param db_session: database session, the caller commits
+    :param models: <list> of summarized models to recompute, all of them if not provided
+    :return: <dict> model name -> (count, total) which drifted from the stored summaries
+    """
+    stored_summaries = {
+        name: (count, total) for name, count, total in db_session.query(
+            IBMCloudResourceSummary.name, IBMCloudResourceSummary.count, IBMCloudResourceSummary.total
+        ).filter_by(cloud_id=cloud_id).all()
+    }
+
+    drifted_summaries = {}
+    for model in models or SUMMARIZED_MODEL_FILTERS.keys():
+        total_column = SUMMARIZED_MODEL_TOTAL_COLUMNS.get(model)
+        count, total = db_session.query(
+            func.count(model.id), func.sum(getattr(model, total_column)) if total_column else func.sum(0)
+        ).filter_by(cloud_id=cloud_id, **SUMMARIZED_MODEL_FILTERS[model]).one()
+        count, total = int(count or 0), float(total or 0.0)
+
+        stored_count, stored_total = stored_summaries.get(model.__name__, (None, None))
+        if stored_count == count and abs(stored_total - total) < 0.01:
+            continue
+
+        drifted_summaries[model.__name__] = (count, total)
+
+    if drifted_summaries:
+        statement = mysql_insert(IBMCloudResourceSummary.__table__).values([
+            {
+                "id": str(uuid.uuid4().hex), "name": name, "count": count, "total": total,
+                "updated_at": datetime.utcnow(), "cloud_id": cloud_id
+            } for name, (count, total) in sorted(drifted_summaries.items())
+        ])
+        statement = statement.on_duplicate_key_update(
+            count=statement.inserted.count, total=statement.inserted.total, updated_at=statement.inserted.updated_at
+        )
+        db_session.execute(statement)
+
+    return drifted_summaries
+
+
+def _load_previous_summary_value(target, value, oldvalue, initiator):
+    # registered with active_history, so the value replaced is loaded if it was expired and the previous summary value
+    # of the object is known
+    pass
+
+
+def _load_summary_values(session, flush_context, instances):
+    # deleted and updated objects are often expired by a previous commit, their values are loaded while their rows are
+    # still there
+    for obj in [*session.deleted, *session.dirty]:
+        if type(obj) not in SUMMARIZED_MODEL_FILTERS:
+            continue
+
+        state = inspect(obj)
+        unloaded_keys = [key for key in get_summary_keys(type(obj)) if key in state.unloaded]
+        if not unloaded_keys:
+            continue
+
+        try:
+            for key in unloaded_keys:
+                getattr(obj, key)
+        except ObjectDeletedError:
+            # deleted by another transaction, which took it out of the summary
+            continue
+
+
+def _add_summary_deltas(session, deltas, obj, signs_and_previous):
+    values = [(sign, *get_summary_value(obj, previous=previous)) for sign, previous in signs_and_previous]
+    if any(cloud_id and count is None for _, cloud_id, count, _ in values):
+        # a value of the object is unknown, the summaries of its model are recomputed before the commit instead
+        session.info.setdefault(RESOURCE_SUMMARY_RECOMPUTES_KEY, set()).update(
+            (cloud_id, type(obj)) for _, cloud_id, _, _ in values if cloud_id
+        )
+        return
+
+    for sign, cloud_id, count, total in values:
+        if cloud_id:
+            deltas[(cloud_id, type(obj).__name__)][0] += sign * count
+            deltas[(cloud_id, type(obj).__name__)][1] += sign * total
+
+
+def _collect_flushed_summary_deltas(session, flush_context):
+    deltas = session.info.setdefault(RESOURCE_SUMMARY_DELTAS_KEY, defaultdict(lambda: [0, 0.0]))
+    for sign, objs in [(1, session.new), (-1, session.deleted)]:
+        for obj in objs:
+            if type(obj) in SUMMARIZED_MODEL_FILTERS:
+                _add_summary_deltas(session, deltas, obj, [(sign, sign < 0)])
+
+    for obj in session.dirty:
+        if type(obj) in SUMMARIZED_MODEL_FILTERS and session.is_modified(obj):
+            _add_summary_deltas(session, deltas, obj, [(-1, True), (1, False)])
+
+
+def _apply_collected_summary_deltas(session):
+    # changes not flushed yet are flushed by the commit after this listener, collect their deltas first
+    session.flush()
+    deltas = session.info.pop(RESOURCE_SUMMARY_DELTAS_KEY, None)
+    if deltas:
+        apply_resource_summary_deltas(session.connection(), deltas)
+
+    recomputes = session.info.pop(RESOURCE_SUMMARY_RECOMPUTES_KEY, None)
+    if recomputes:
+        models_per_cloud = defaultdict(list)
+        for cloud_id, model in recomputes:
+            models_per_cloud[cloud_id].append(model)
+
+        for cloud_id, models in sorted(models_per_cloud.items()):
+            recompute_cloud_resource_summaries(cloud_id, session, models=models)
+
+
+def _forget_summary_deltas(session):
+    session.info.pop(RESOURCE_SUMMARY_DELTAS_KEY, None)
+    session.info.pop(RESOURCE_SUMMARY_RECOMPUTES_KEY, None)
+
+
+def register_resource_summary_listeners():
+    """
+    Keep the summaries up to date with the writes of the sessions of the process, call it once when the process starts
+    (API, workflow and discovery workers)
+    """
+    for identifier, listener in [
+        ("before_flush", _load_summary_values), ("after_flush", _collect_flushed_summary_deltas),
+        ("before_commit", _apply_collected_summary_deltas), ("after_rollback", _forget_summary_deltas)
+    ]:
+        if not event.contains(Session, identifier, listener):
+            event.listen(Session, identifier, listener)
+
+    for model in SUMMARIZED_MODEL_FILTERS:
+        for key in get_summary_keys(model):
+            if not event.contains(getattr(model, key), "set", _load_previous_summary_value):
+                event.listen(getattr(model, key), "set", _load_previous_summary_value, active_history=True)
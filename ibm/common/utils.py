@@ -12,6 +12,7 @@ from Crypto.Random import get_random_bytes
 from dateutil.relativedelta import relativedelta
 from ibm_botocore.client import Config
 from ipcalc import Network
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 
 from config import ConsumptionClientConfig, SubscriptionClientConfig
 from ibm import LOGGER
@@ -247,6 +248,29 @@ def remove_duplicates(seq: list) -> list:
     return [x for x in seq if not (x in seen or seen_add(x))]
 
 
+def bulk_upsert(db_session, model, rows, update_columns=None, chunk_size=1000):
+    """
+    Write rows of a model with multi row INSERT statements of at most `chunk_size` rows. Rows whose primary (or a
+    unique) key already exists get their `update_columns` updated instead (ON DUPLICATE KEY UPDATE). The statement is
+    compiled once and executed with the rows of a chunk as parameters, the MySQL drivers send those as one multi row
+    INSERT.
+    :param db_session: database session, the caller commits
+    :param model: <Model> the rows belong to
+    :param rows: <list> of dicts of column name -> value, all with the same keys
+    :param update_columns: <list> of column names to update on duplicate keys, rows are only inserted if not provided
+    :param chunk_size: max number of rows per statement
+    :return: number of rows written
+    """
+    statement = mysql_insert(model.__table__)
+    if update_columns:
+        statement = statement.on_duplicate_key_update({column: statement.inserted[column] for column in update_columns})
+
+    for index in range(0, len(rows), chunk_size):
+        db_session.execute(statement, rows[index:index + chunk_size])
+
+    return len(rows)
+
+
 def transform_ibm_name(name):
     """
     This method transform a given string into IBM allowed string names. It does so by
@@ -0,0 +1,83 @@
+"""
+Publishing of WorkflowRoot and WorkflowTask status transitions on a Redis pub/sub channel per root.
+
+Transitions are collected on the SQLAlchemy session that changed them and only published once that session commits,
+so subscribers never see a status which was rolled back.
+"""
+import json
+import logging
+from datetime import datetime
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import object_session, Session
+
+from config import RedisConfig, WorkflowProgressConfig
+
+LOGGER = logging.getLogger(__name__)
+
+PENDING_EVENTS_KEY = "workflow_progress_events"
+
+_redis_client = None
+
+
+def get_redis_client():
+    global _redis_client
+
+    if not _redis_client:
+        _redis_client = redis.Redis.from_url(RedisConfig.REDIS_URL)
+
+    return _redis_client
+
+
+def get_workflow_progress_channel(root_id):
+    return f"{WorkflowProgressConfig.CHANNEL_PREFIX}:{root_id}"
+
+
+def queue_workflow_progress_event(obj, root_id, event_json):
+    """
+    Queue a status transition on the session of the changed object, to be published when the session commits
+    :param obj: <Object: WorkflowRoot or WorkflowTask> whose status changed
+    :param root_id: ID of the WorkflowRoot whose channel the event is published on
+    :param event_json: <dict> the event, its "event" key is used as the name of the server-sent event
+    """
+    session = object_session(obj)
+    if not (session and root_id):
+        return
+
+    event_json["root_id"] = root_id
+    event_json["timestamp"] = str(datetime.utcnow())
+    session.info.setdefault(PENDING_EVENTS_KEY, []).append(event_json)
+
+
+def publish_workflow_progress_events(events):
+    if not events:
+        return
+
+    try:
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for event_json in events:
+            pipeline.publish(get_workflow_progress_channel(event_json["root_id"]), json.dumps(event_json))
+        pipeline.execute()
+    except redis.RedisError as ex:
+        LOGGER.warning(f"Publishing {len(events)} workflow progress events failed. Trace: {ex}")
+
+
+def _publish_pending_events(session):
+    publish_workflow_progress_events(session.info.pop(PENDING_EVENTS_KEY, None))
+
+
+def _discard_pending_events(session):
+    session.info.pop(PENDING_EVENTS_KEY, None)
+
+
+def register_workflow_progress_listeners():
+    """
+    Publish the status transitions queued on the sessions of the process when they commit, call it once when the
+    process starts (API, workflow and discovery workers)
+    """
+    for identifier, listener in [
+        ("after_commit", _publish_pending_events), ("after_rollback", _discard_pending_events)
+    ]:
+        if not event.contains(Session, identifier, listener):
+            event.listen(Session, identifier, listener)
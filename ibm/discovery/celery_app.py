@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 from celery import Celery
+from celery.signals import celeryd_init
 
 from ibm.discovery.config import RedisConfigs
 
@@ -23,3 +24,14 @@ def create_celery_app():
     }
 
     return celery_app
+
+
+@celeryd_init.connect
+def register_session_listeners(**kwargs):
+    from ibm.common.cost_cache import register_cost_data_generation_listeners
+    from ibm.common.resource_summaries import register_resource_summary_listeners
+    from ibm.common.workflow_progress import register_workflow_progress_listeners
+
+    register_cost_data_generation_listeners()
+    register_resource_summary_listeners()
+    register_workflow_progress_listeners()
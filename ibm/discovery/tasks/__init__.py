@@ -18,6 +18,7 @@ from .load_balancers_tasks import update_lb_pool_members, update_load_balancer_l
     update_load_balancer_profiles, update_load_balancers, update_load_balancers_listeners_default_pool
 from .placement_groups_tasks import update_placement_groups
 from .public_gateways_tasks import update_public_gateways
+from .regional_resource_snapshot_tasks import update_regional_resource_snapshot
 from .resource_groups_tasks import update_resource_groups
 from .satellite_clusters_tasks import update_satellite_clusters, update_satellite_cluster_kube_configs
 from .security_groups_tasks import update_security_groups
@@ -65,6 +66,8 @@ __all__ = [
 
     "update_public_gateways",
 
+    "update_regional_resource_snapshot",
+
     "update_resource_groups",
 
     "update_security_groups",
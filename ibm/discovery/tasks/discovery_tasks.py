@@ -46,7 +46,7 @@ from ibm.discovery.tasks import (
     update_lb_pool_members, update_load_balancer_listeners, update_load_balancer_pools,
     update_load_balancers, update_load_balancers_listeners_default_pool,
     update_network_acls, update_operating_systems, update_placement_groups,
-    update_public_gateways, update_regions, update_resource_groups,
+    update_public_gateways, update_regional_resource_snapshot, update_regions, update_resource_groups,
     update_satellite_cluster_kube_configs, update_satellite_clusters,
     update_security_groups, update_snapshots, update_ssh_keys, update_subnet_reserved_ips,
     update_subnets, update_tags, update_transit_gateway_connections,
@@ -267,6 +267,7 @@ def ibm_run_region_discovery(cloud_id, region_name):
             resources.get(IBM_CLUSTER_NAMESPACE_PVCS, []),
             resources.get(IBM_CLUSTER_NAMESPACE_PODS, []), resources.get(IBM_CLUSTER_NAMESPACE_SVCS, [])
         )
+        update_regional_resource_snapshot(cloud_id, region_name)
         LOGGER.info(
             f"** IBM Region {region_name}** Cloud ID: **{cloud_id}** Cloud Name: **{cloud_name}** synced in: "
             f"{(datetime.utcnow() - start_time).total_seconds()} seconds")
@@ -384,6 +385,7 @@ def update_resource_catalog(cloud_id):
         cost_sq = session.query(IBMCost.id).filter_by(cloud_id=cloud_id).order_by(IBMCost.billing_month.desc()). \
             limit(2).subquery()
         resource_instances_obj = session.query(IBMResourceInstancesCost).filter(
+            IBMResourceInstancesCost.cloud_id == cloud_id,
             IBMResourceInstancesCost.cost_id.in_(session.query(cost_sq))).all()
 
         resource_crns = []
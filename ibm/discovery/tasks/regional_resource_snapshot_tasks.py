@@ -0,0 +1,25 @@
+import logging
+from datetime import datetime
+
+from ibm.discovery import get_db_session
+from ibm.models import IBMRegion, IBMRegionalResourceSnapshot
+
+LOGGER = logging.getLogger(__name__)
+
+
+def update_regional_resource_snapshot(cloud_id, region_name):
+    start_time = datetime.utcnow()
+    try:
+        with get_db_session() as session:
+            db_region = session.query(IBMRegion).filter_by(name=region_name, cloud_id=cloud_id).first()
+            if not db_region:
+                LOGGER.info(f"IBMRegion {region_name} not found")
+                return
+
+            IBMRegionalResourceSnapshot.refresh(session=session, region=db_region)
+    except Exception as ex:
+        LOGGER.exception(
+            f"Regional resource snapshot refresh failed for region {region_name} and cloud {cloud_id}. Trace: {ex}")
+        return
+
+    LOGGER.info("** Regional Resource Snapshot synced in: {}".format((datetime.utcnow() - start_time).total_seconds()))
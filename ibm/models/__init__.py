@@ -7,8 +7,9 @@ from ibm.models.ibm.cloud_models import IBMCloud, IBMCloudSetting, IBMCredential
     IBMServiceCredentialKey, IBMServiceCredentials
 from ibm.models.ibm.cloud_object_storage_models import IBMCloudObjectStorage, IBMCOSBucket, ibm_bucket_regions
 from ibm.models.ibm.cost_models import IBMCost, IBMResourcesCost, IBMResourceInstancesCost, \
-    IBMResourceInstancesDailyCost, IBMCostPerTag
-from ibm.models.ibm.dashboad_models import IBMDashboardSetting
+    IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost, IBMCostPerTag, \
+    IBMCostTrackingRollup
+from ibm.models.ibm.dashboad_models import IBMCloudResourceSummary, IBMDashboardSetting
 from ibm.models.ibm.dedicated_host_models import IBMDedicatedHost, IBMDedicatedHostDisk, IBMDedicatedHostGroup, \
     IBMDedicatedHostProfile
 from ibm.models.ibm.endpoint_gateway_models import IBMEndpointGateway, IBMEndpointGatewayTarget
@@ -29,6 +30,7 @@ from ibm.models.ibm.load_balancer_models import IBMListener, IBMListenerPolicy,
 from ibm.models.ibm.mixins import IBMCloudResourceMixin, IBMRegionalResourceMixin, IBMZonalResourceMixin
 from ibm.models.ibm.placement_group_models import IBMPlacementGroup
 from ibm.models.ibm.public_gateway_models import IBMPublicGateway
+from ibm.models.ibm.regional_resource_snapshot_models import IBMRegionalResourceSnapshot
 from ibm.models.ibm.resource_group_models import IBMResourceGroup
 from ibm.models.ibm.resource_log_models import IBMResourceLog
 from ibm.models.ibm.routing_table_models import IBMRoutingTable, IBMRoutingTableRoute
@@ -50,7 +52,8 @@ from ibm.models.idle_resources.idle_resource_models import IBMIdleResource
 from ibm.models.release_notes.release_notes_models import IBMReleaseNote
 from ibm.models.rightsizing.rightsizing_recommendations import IBMRightSizingRecommendation
 from ibm.models.softlayer.softlayer_cloud_models import SoftlayerCloud
-from ibm.models.workflow.workflow_models import WorkflowRoot, WorkflowsWorkspace, WorkflowTask
+from ibm.models.workflow.workflow_models import WorkflowRoot, WorkflowsWorkspace, WorkflowTask, \
+    WorkflowTaskResultChunk
 from ibm.models.ttl.ttl_models import TTLInterval
 from ibm.models.ibm.idle_resource_catalogue import IBMResourceControllerData
 
@@ -75,9 +78,10 @@ __all__ = [
 
     "IBMCloudObjectStorage", "IBMCOSBucket", "ibm_bucket_regions",
 
-    "IBMCost", "IBMResourcesCost", "IBMResourceInstancesCost", "IBMResourceInstancesDailyCost", "IBMCostPerTag",
+    "IBMCost", "IBMResourcesCost", "IBMResourceInstancesCost", "IBMResourceInstancesDailyCost",
+    "IBMResourceInstancesMTDCost", "IBMCostPerTag", "IBMCostTrackingRollup",
 
-    "IBMDashboardSetting",
+    "IBMCloudResourceSummary", "IBMDashboardSetting",
 
     "IBMDedicatedHost", "IBMDedicatedHostDisk", "IBMDedicatedHostGroup", "IBMDedicatedHostProfile",
 
@@ -104,6 +108,8 @@ __all__ = [
 
     "IBMPublicGateway",
 
+    "IBMRegionalResourceSnapshot",
+
     "IBMResourceGroup",
 
     "IBMResourceTracking",
@@ -150,5 +156,6 @@ __all__ = [
 
     "WorkflowRoot",
     "WorkflowTask",
+    "WorkflowTaskResultChunk",
     "WorkflowsWorkspace"
 ]
@@ -3,6 +3,7 @@ import uuid
 from datetime import datetime
 
 from sqlalchemy import Column, DateTime, ForeignKey, JSON, String, Float
+from sqlalchemy.schema import Index
 
 from config import PaginationConfig
 from ibm.models.base import Base
@@ -66,6 +67,8 @@ class IBMResourceTracking(IBMCloudResourceMixin, Base):
 
     region_id = Column(String(32), ForeignKey('ibm_regions.id', ondelete="SET NULL"), nullable=True)
 
+    __table_args__ = (Index("ix_ibm_resource_tracking_cloud_id_action_taken_at", "cloud_id", "action_taken_at"),)
+
     def __init__(self, resource_type, estimated_savings, action_type, resource_json):
         self.id = str(uuid.uuid4().hex)
         self.estimated_savings = estimated_savings
@@ -1,8 +1,10 @@
+import hashlib
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, String
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import Index, UniqueConstraint
 
 from ibm.web import db as ibmdb
 from ibm.common.consts import BILLING_MONTH_FORMAT
@@ -31,6 +33,8 @@ class IBMCost(IBMCloudResourceMixin, Base):
     non_billable_cost = Column(Float, nullable=False)
     billing_country_code = Column(String(255), nullable=False)
     billing_currency_code = Column(String(255), nullable=False)
+    # set once the billing month is closed and fetched, final months are not fetched again
+    final = Column(Boolean, default=False, server_default="0", nullable=False)
 
     resources = relationship("IBMResourcesCost", backref="ibm_cost", cascade="all, delete-orphan",
                              passive_deletes=True, lazy="dynamic", )
@@ -38,6 +42,8 @@ class IBMCost(IBMCloudResourceMixin, Base):
                                       passive_deletes=True, lazy="dynamic", )
     resource_instances_daily = relationship("IBMResourceInstancesDailyCost", backref="ibm_cost",
                                             passive_deletes=True, cascade="all, delete-orphan", lazy="dynamic", )
+    resource_instances_mtd = relationship("IBMResourceInstancesMTDCost", backref="ibm_cost",
+                                          passive_deletes=True, cascade="all, delete-orphan", lazy="dynamic", )
 
     def __init__(self, account_id, billing_month, billable_cost, non_billable_cost, billing_country_code,
                  billing_currency_code):
@@ -254,6 +260,8 @@ class IBMResourceInstancesCost(IBMCloudResourceMixin, Base):
 
     cost_id = Column(String(32), ForeignKey("ibm_costs.id", ondelete="CASCADE"))
 
+    __table_args__ = (Index("ix_ibm_resource_instances_cost_cloud_id_cost_id_crn", "cloud_id", "cost_id", "crn"),)
+
     def __init__(self, resource_id, cost, crn, estimated_cost):
         self.id = str(uuid.uuid4().hex)
         self.resource_id = resource_id
@@ -306,6 +314,10 @@ class IBMResourceInstancesDailyCost(IBMCloudResourceMixin, Base):
 
     cost_id = Column(String(32), ForeignKey("ibm_costs.id", ondelete="CASCADE"))
 
+    __table_args__ = (
+        Index("ix_ibm_resource_instances_daily_cost_cloud_id_cost_id_crn", "cloud_id", "cost_id", "crn"),
+    )
+
     def __init__(self, resource_id, daily_cost, crn, date):
         self.id = str(uuid.uuid4().hex)
         self.resource_id = resource_id
@@ -315,6 +327,94 @@ class IBMResourceInstancesDailyCost(IBMCloudResourceMixin, Base):
         self.date = date
 
 
+class IBMResourceInstancesMTDCost(IBMCloudResourceMixin, Base):
+    """
+    Running month to date total of the daily costs of a resource instance. It is written in the same transaction as
+    the IBMResourceInstancesDailyCost rows, so the next daily cost is derived without summing the daily history.
+    """
+    MTD_COST_KEY = "mtd_cost"
+    CRZ_BACKREF_NAME = "resource_mtd_cost"
+
+    __tablename__ = "ibm_resource_instances_mtd_cost"
+
+    id = Column(String(32), primary_key=True)
+    resource_id = Column(String(512), nullable=False)  # resource_id is service name
+    crn = Column(String(512), nullable=False)
+    mtd_cost = Column(Float, nullable=False)
+    last_daily_cost_date = Column(Date, nullable=False)
+    last_daily_cost_created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+    cost_id = Column(String(32), ForeignKey("ibm_costs.id", ondelete="CASCADE"))
+
+    def __init__(self, cost_id, resource_id, crn, mtd_cost, last_daily_cost_date, last_daily_cost_created_at):
+        self.id = self.generate_id(cost_id, resource_id, crn)
+        self.cost_id = cost_id
+        self.resource_id = resource_id
+        self.crn = crn
+        self.mtd_cost = mtd_cost
+        self.last_daily_cost_date = last_daily_cost_date
+        self.last_daily_cost_created_at = last_daily_cost_created_at
+        self.updated_at = datetime.utcnow()
+
+    @staticmethod
+    def generate_id(cost_id, resource_id, crn):
+        """
+        ID derived from the aggregated key, so aggregates are upserted by primary key (the key itself is too long
+        for a unique index). Same as MD5(CONCAT(cost_id, '|', resource_id, '|', crn)) in MySQL.
+        """
+        return hashlib.md5(f"{cost_id}|{resource_id}|{crn}".encode("utf-8")).hexdigest()
+
+
+class IBMCostTrackingRollup(IBMCloudResourceMixin, Base):
+    """
+    Spend and realized savings of a cloud pre-aggregated per day and per month. Spend comes from IBMCost (monthly) and
+    IBMResourceInstancesDailyCost (daily), savings and actions from IBMResourceTracking. Rows are recomputed from those
+    tables for a date range, never incremented, so a refresh is idempotent.
+    """
+    DATE_KEY = "date"
+    COST_KEY = "cost"
+    SAVINGS_KEY = "savings"
+    ACTIONS_COUNT_KEY = "actions_count"
+
+    GRANULARITY_DAILY = "daily"
+    GRANULARITY_MONTHLY = "monthly"
+
+    CRZ_BACKREF_NAME = "cost_tracking_rollups"
+
+    __tablename__ = "ibm_cost_tracking_rollups"
+
+    id = Column(String(32), primary_key=True)
+    granularity = Column(String(16), nullable=False)
+    period_start = Column(Date, nullable=False)
+    cost = Column(Float, nullable=False, default=0.0)
+    savings = Column(Float, nullable=False, default=0.0)
+    actions_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("cloud_id", "granularity", "period_start",
+                         name="uix_ibm_cost_tracking_rollup_cloud_id_granularity_period_start"),
+    )
+
+    def __init__(self, granularity, period_start, cost=0.0, savings=0.0, actions_count=0):
+        self.id = str(uuid.uuid4().hex)
+        self.granularity = granularity
+        self.period_start = period_start
+        self.cost = cost
+        self.savings = savings
+        self.actions_count = actions_count
+        self.updated_at = datetime.utcnow()
+
+    def to_savings_trend_json(self):
+        return {
+            self.DATE_KEY: str(self.period_start),
+            self.COST_KEY: self.cost,
+            "optimized_cost": abs(self.cost - self.savings) if self.cost else 0.0,
+            self.SAVINGS_KEY: self.savings
+        }
+
+
 class IBMCostPerTag(IBMCloudResourceMixin, Base):
     ID_KEY = "id"
     COST_KEY = "cost"
@@ -330,6 +430,8 @@ class IBMCostPerTag(IBMCloudResourceMixin, Base):
     cost = Column(Float, nullable=False)
     date = Column(DateTime, nullable=False)
 
+    __table_args__ = (UniqueConstraint("cloud_id", "name", "date", name="uix_ibm_cost_per_tag_cloud_id_name_date"),)
+
     def __init__(self, name, cost, date):
         self.id = str(uuid.uuid4().hex)
         self.name = name
@@ -1,6 +1,8 @@
 import uuid
+from datetime import datetime
 
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String
+from sqlalchemy.schema import UniqueConstraint
 
 from ibm.models.base import Base
 from ibm.models.ibm.mixins import IBMCloudResourceMixin
@@ -38,3 +40,32 @@ class IBMDashboardSetting(Base, IBMCloudResourceMixin):
             self.USER_ID_KEY: self.user_id,
             self.ORDER_KEY: self.order or 1
         }
+
+
+class IBMCloudResourceSummary(Base, IBMCloudResourceMixin):
+    """
+    Number of resources of a type (and their total estimated savings for idle resources) in a cloud, read by the
+    dashboard instead of counting the resource tables. See ibm.common.resource_summaries for how it is maintained.
+    """
+    NAME_KEY = "name"
+    COUNT_KEY = "count"
+    TOTAL_KEY = "total"
+
+    CRZ_BACKREF_NAME = "resource_summaries"
+
+    __tablename__ = "ibm_cloud_resource_summaries"
+
+    id = Column(String(32), primary_key=True)
+    name = Column(String(64), nullable=False)  # name of the summarized model
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (UniqueConstraint("cloud_id", "name", name="uix_ibm_cloud_resource_summary_cloud_id_name"),)
+
+    def __init__(self, name, count=0, total=0.0):
+        self.id = str(uuid.uuid4().hex)
+        self.name = name
+        self.count = count
+        self.total = total
+        self.updated_at = datetime.utcnow()
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.dialects.mysql import insert as mysql_insert, LONGTEXT
+from sqlalchemy.orm import deferred, undefer
+from sqlalchemy.schema import UniqueConstraint
+
+from ibm.models.base import Base
+from ibm.models.ibm.mixins import IBMRegionalResourceMixin
+
+
+class IBMRegionalResourceSnapshot(IBMRegionalResourceMixin, Base):
+    """
+    Pre-serialized document of all the regional resources of a region, served by the workspace
+    `all-regional-resources` API. Discovery regenerates it after every region sync and only rewrites it when the
+    content (and hence the etag) changes. Writes of the resources through the API bump its `version` (see
+    ibm.common.regional_resource_snapshots), the snapshot is stale until it is regenerated from that version and is
+    served meanwhile.
+    """
+    ID_KEY = "id"
+    ETAG_KEY = "etag"
+    GENERATED_AT_KEY = "generated_at"
+
+    CRZ_BACKREF_NAME = "regional_resource_snapshots"
+
+    # response key -> region relationship holding the resources, in the order they are written in the document
+    REGIONAL_RESOURCE_COLLECTIONS = (
+        ("vpc_networks", "vpc_networks"),
+        ("subnets", "subnets"),
+        ("public_gateways", "public_gateways"),
+        ("vpn_gateways", "vpn_gateways"),
+        ("ike_policies", "ike_policies"),
+        ("ipsec_policies", "ipsec_policies"),
+        ("instances", "instances"),
+        ("network_acls", "network_acls"),
+        ("security_groups", "security_groups"),
+        ("load_balancers", "load_balancers"),
+        ("dedicated_hosts", "dedicated_hosts"),
+        ("placement_groups", "placement_groups"),
+        ("ssh_keys", "ssh_keys"),
+        ("kubernetes_clusters", "ibm_kubernetes_clusters"),
+        ("draas_restore_clusters", "ibm_kubernetes_clusters"),
+        ("instance_profiles", "instance_profiles"),
+        ("images", "images"),
+        ("operating_systems", "operating_systems"),
+        ("cos_buckets", "cos_buckets"),
+        ("volumes", "volumes"),
+    )
+    # models whose references are nested in the documents of the resources, they are scoped by their region if they
+    # have one and by their cloud otherwise
+    NESTED_REFERENCE_MODELS = ("IBMZone", "IBMAddressPrefix", "IBMFloatingIP", "IBMResourceGroup")
+
+    __tablename__ = "ibm_regional_resource_snapshots"
+
+    id = Column(String(32), primary_key=True)
+    etag = Column(String(64), nullable=False)
+    document = deferred(Column(LONGTEXT, nullable=False))
+    generated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # bumped by the writes of the resources, the document is stale until it is generated from the current version
+    version = Column(Integer, default=0, server_default="0", nullable=False)
+    generated_version = Column(Integer, default=0, server_default="0", nullable=False)
+
+    __table_args__ = (UniqueConstraint("region_id", name="uix_ibm_regional_resource_snapshot_region_id"),)
+
+    def __init__(self, document, etag):
+        self.id = str(uuid.uuid4().hex)
+        self.document = document
+        self.etag = etag
+        self.generated_at = datetime.utcnow()
+
+    @classmethod
+    def generate_document(cls, region):
+        """
+        Serialize all the regional resources of a region collection by collection, so that only one collection is
+        held as python objects at a time.
+        :return: tuple of (document, etag)
+        """
+        sha = hashlib.sha1()
+        parts = []
+        for index, (key, relationship_name) in enumerate(cls.REGIONAL_RESOURCE_COLLECTIONS):
+            collection = json.dumps(
+                [resource.validate_json_for_schema() for resource in getattr(region, relationship_name).all()],
+                separators=(",", ":"), default=str
+            )
+            part = f'{"{" if not index else ","}{json.dumps(key)}:{collection}'
+            sha.update(part.encode("utf-8"))
+            parts.append(part)
+
+        parts.append("}")
+        return "".join(parts), sha.hexdigest()
+
+    @property
+    def is_stale(self):
+        return self.version != self.generated_version
+
+    @classmethod
+    def refresh(cls, session, region):
+        """
+        Regenerate the snapshot of a region, writing it only if the content changed or it is stale. The snapshot is
+        upserted, so concurrent refreshes of a region without a snapshot do not conflict on the region unique
+        constraint.
+        :return: the up to date snapshot
+        """
+        # read before the resources, a write committed after this leaves the snapshot stale
+        etag_and_versions = session.query(cls.etag, cls.version, cls.generated_version).filter_by(
+            region_id=region.id).first()
+        version = etag_and_versions.version if etag_and_versions else 0
+        document, etag = cls.generate_document(region)
+        if not etag_and_versions or etag_and_versions.etag != etag or version != etag_and_versions.generated_version:
+            statement = mysql_insert(cls.__table__).values(
+                id=str(uuid.uuid4().hex), etag=etag, document=document, generated_at=datetime.utcnow(),
+                version=version, generated_version=version, region_id=region.id, cloud_id=region.cloud_id
+            )
+            statement = statement.on_duplicate_key_update(
+                etag=statement.inserted.etag, document=statement.inserted.document,
+                generated_at=statement.inserted.generated_at, generated_version=statement.inserted.generated_version
+            )
+            session.execute(statement)
+            session.commit()
+
+        return session.query(cls).filter_by(region_id=region.id).options(undefer(cls.document)).one()
+
+    def to_reference_json(self):
+        return {
+            self.ID_KEY: self.id,
+            self.ETAG_KEY: self.etag,
+            self.GENERATED_AT_KEY: self.generated_at
+        }
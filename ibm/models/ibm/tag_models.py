@@ -19,7 +19,7 @@ class IBMTag(IBMCloudResourceMixin, Base):
     name = Column(String(500), nullable=False)
     tag_type = Column(String(50), nullable=False, default="user")
     resource_id = Column(String(32), nullable=False)
-    resource_crn = Column(String(255), nullable=False)
+    resource_crn = Column(String(255), nullable=False, index=True)
     resource_type = Column(String(32), nullable=False)
 
     CRZ_BACKREF_NAME = "tags"
@@ -2,6 +2,7 @@ import uuid
 from datetime import datetime
 
 from sqlalchemy import Column, DateTime, ForeignKey, Float, JSON, String
+from sqlalchemy.schema import Index
 
 from config import PaginationConfig
 from ibm.models.base import Base
@@ -33,6 +34,7 @@ class IBMIdleResource(IBMRegionalResourceMixin, Base):
 
     id = Column(String(32), primary_key=True)
     db_resource_id = Column(String(32), index=True, nullable=False)
+    crn = Column(String(512), index=True)
     reason = Column(String(150))
     resource_type = Column(String(50))
     source_type = Column(String(50), nullable=False)
@@ -43,6 +45,8 @@ class IBMIdleResource(IBMRegionalResourceMixin, Base):
 
     vpc_id = Column(String(32), ForeignKey("ibm_vpc_networks.id", ondelete="SET NULL"), nullable=True)
 
+    __table_args__ = (Index("ix_ibm_idle_resources_cloud_id_created_at", "cloud_id", "created_at"),)
+
     def __init__(self, db_resource_id, source_type, resource_json, resource_type, estimated_savings=None, reason=None):
         self.id = str(uuid.uuid4().hex)
         self.db_resource_id = db_resource_id
@@ -52,10 +56,12 @@ class IBMIdleResource(IBMRegionalResourceMixin, Base):
         self.resource_type = resource_type
         self.estimated_savings = estimated_savings
         self.created_at = datetime.utcnow()
+        self.crn = resource_json.get("crn")
 
     def update_db(self, obj, session=None):
         session = session if session else ibmdb.session
         self.resource_json = obj.to_idle_json(session)
+        self.crn = self.resource_json.get("crn")
         session.commit()
 
     @classmethod
@@ -3,6 +3,7 @@ import logging
 import uuid
 
 from sqlalchemy import Column, Float, ForeignKey, JSON, String, DateTime
+from sqlalchemy.schema import Index
 
 from config import PaginationConfig
 from ibm.models.base import Base
@@ -61,6 +62,8 @@ class IBMRightSizingRecommendation(IBMCloudResourceMixin, Base):
 
     instance_id = Column(String(32), ForeignKey("ibm_instances.id", ondelete="CASCADE"))
 
+    __table_args__ = (Index("ix_ibm_right_sizing_recommendations_cloud_id_created_at", "cloud_id", "created_at"),)
+
     def __init__(self, region, current_instance_type, current_instance_resource_details, monthly_cost, resource_id,
                  estimated_monthly_cost, estimated_monthly_savings, recommended_instance_type,
                  recommended_instance_resource_details, rightsizing_reason=None):
@@ -1,3 +1,4 @@
+import hashlib
 import uuid
 
 from sqlalchemy import Column, Enum, String
@@ -45,6 +46,13 @@ class SoftlayerCloud(Base):
     def api_key(self, unencrypted_api_key):
         self.__api_key = encrypt_api_key(unencrypted_api_key)
 
+    @property
+    def credentials_version(self):
+        """
+        Digest of the username and the encrypted api key, changes whenever the credentials are set again
+        """
+        return hashlib.sha256(f"{self.username}:{self.__api_key}".encode("utf-8")).hexdigest()
+
     def to_json(self):
         return {
             self.ID_KEY: self.id,
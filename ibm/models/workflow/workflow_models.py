@@ -4,11 +4,13 @@ This file hosts models for generic tasks tied to resources which run the whole f
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Boolean, cast, Column, DateTime, Enum, ForeignKey, JSON, String, Table, type_coerce
+from sqlalchemy import Boolean, cast, Column, DateTime, Enum, ForeignKey, inspect, Integer, JSON, String, Table, \
+    type_coerce, UniqueConstraint
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import backref, deferred, relationship
 
 from ibm.common.billing_utils import log_resource_billing_in_db
+from ibm.common.workflow_progress import queue_workflow_progress_event
 from ibm.models.base import Base
 
 workflow_tree_mappings = Table(
@@ -293,6 +295,8 @@ class WorkflowRoot(Base):
     # Whether or not the parent root should update its status to COMPLETED_SUCCESSFULY/COMPLETED_WITH_FAILURE before
     #  this task is completed
     hold_parent_status_update = Column(Boolean, default=False)
+    # Incremented whenever the status of the root or any of its tasks changes, backs the ETag of the workflow APIs
+    version = Column(Integer, default=0, server_default="0", nullable=False)
 
     parent_root_id = Column(String(32), ForeignKey('workflow_roots.id', ondelete="SET NULL"), nullable=True)
     workflows_workspace_id = Column(String(32), ForeignKey('workflows_workspaces.id', ondelete="SET NULL"),
@@ -346,6 +350,25 @@ class WorkflowRoot(Base):
         """
         assert isinstance(next_task, WorkflowTask)
         self.associated_tasks.append(next_task)
+        self.bump_version()
+
+    def bump_version(self):
+        """
+        Increment the version of a persisted root. The increment is done in SQL at flush time so that workers updating
+        different tasks of the same root concurrently never overwrite each other's bump.
+        """
+        if not inspect(self).persistent:
+            return
+
+        self.version = WorkflowRoot.version + 1
+
+    @property
+    def etag(self):
+        return self.generate_etag(self.id, self.version)
+
+    @staticmethod
+    def generate_etag(root_id, version):
+        return f"{root_id}-{version}"
 
     def add_callback_root(self, callback_root, hold_parent_status_update=False):
         """
@@ -435,6 +458,11 @@ class WorkflowRoot(Base):
             self.completed_at = datetime.utcnow()
 
         self.__status = new_status
+        self.bump_version()
+        queue_workflow_progress_event(
+            self, root_id=self.id, event_json={"event": self.__class__.__name__, self.ID_KEY: self.id,
+                                               self.STATUS_KEY: new_status}
+        )
 
     @property
     def next_roots(self):
@@ -525,6 +553,10 @@ class WorkflowTask(Base):
     IN_FOCUS_KEY = "in_focus"
     PREVIOUS_TASK_IDS_KEY = "previous_task_ids"
     NEXT_TASK_IDS_KEY = "next_task_ids"
+    # keys of the item counts per type of a result stored as chunks (see `add_result_chunk`), and of the path its items
+    # are read from in the JSON of the task
+    RESULT_CHUNK_TYPES_KEY = "result_chunk_types"
+    RESULT_CHUNKS_HREF_KEY = "result_chunks_href"
 
     # When the task is created but not initated yet
     STATUS_PENDING = "PENDING"
@@ -610,6 +642,11 @@ class WorkflowTask(Base):
         lazy='dynamic'
     )
 
+    result_chunks = relationship(
+        'WorkflowTaskResultChunk', backref="workflow_task", cascade="all, delete-orphan", passive_deletes=True,
+        lazy="dynamic"
+    )
+
     root_id = Column(String(32), ForeignKey('workflow_roots.id', ondelete="CASCADE"))
 
     def __init__(self, task_type, resource_type, resource_id=None, task_metadata=None):
@@ -670,6 +707,14 @@ class WorkflowTask(Base):
             self.completed_at = datetime.utcnow()
 
         self.__status = new_status
+        if self.root:
+            self.root.bump_version()
+            queue_workflow_progress_event(
+                self, root_id=self.root.id, event_json={
+                    "event": self.__class__.__name__, self.ID_KEY: self.id, self.STATUS_KEY: new_status,
+                    self.RESOURCE_TYPE_KEY: self.resource_type, self.TASK_TYPE_KEY: self.task_type
+                }
+            )
 
     @property
     def next_tasks(self):
@@ -687,6 +732,63 @@ class WorkflowTask(Base):
         """
         return self._previous_tasks
 
+    def add_result_chunk(self, result_type, chunk_index, items):
+        """
+        Persist a chunk of a result too big to be stored at once in `result`, chunks of a type are read in the order
+        of their index. Once all chunks are added, `set_chunked_result` records their counts as the `result`.
+        :param result_type: <string> type of the items, e.g. the resource type
+        :param chunk_index: <int> index of the chunk, e.g. a counter over all the chunks of the result
+        :param items: <list> of JSON serializable items
+        :return: <object of WorkflowTaskResultChunk>
+        """
+        chunk = WorkflowTaskResultChunk(result_type=result_type, chunk_index=chunk_index, items=items)
+        self.result_chunks.append(chunk)
+        return chunk
+
+    def set_chunked_result(self, result_types):
+        """
+        Record a result stored with `add_result_chunk` as the `result`, which only holds the items count per type,
+        the items are read with `iter_result_items`
+        :param result_types: <dict> of type to items count
+        """
+        self.result = {self.RESULT_CHUNK_TYPES_KEY: result_types}
+
+    @property
+    def is_result_chunked(self):
+        return isinstance(self.result, dict) and self.RESULT_CHUNK_TYPES_KEY in self.result
+
+    def iter_result_items(self, result_type, chunks_per_fetch=10):
+        """
+        Lazily read back the items of a type added with `add_result_chunk`, a few chunks are loaded at a time. Every
+        fetch is a query of its own, so other queries can run on the session while the items are consumed.
+        :param result_type: <string> type of the items
+        :param chunks_per_fetch: <int> chunks loaded per round trip to the database
+        :return: generator of items
+        """
+        last_chunk_index = -1
+        while True:
+            chunks = self.result_chunks.filter(
+                WorkflowTaskResultChunk.result_type == result_type,
+                WorkflowTaskResultChunk.chunk_index > last_chunk_index
+            ).order_by(WorkflowTaskResultChunk.chunk_index).limit(chunks_per_fetch).all()
+            for chunk in chunks:
+                last_chunk_index = chunk.chunk_index
+                yield from chunk.items
+
+            if len(chunks) < chunks_per_fetch:
+                return
+
+    def get_result_json(self):
+        """
+        `result` as returned by the API, a chunked result is not loaded: its items count per type is returned with the
+        path its items are read from, a type at a time
+        """
+        if not self.is_result_chunked:
+            return self.result
+
+        result_chunks_href = f"/v1/ibm/workflows/{self.root_id}/tasks/{self.id}/result-chunks/{{result_type}}"
+        return {**self.result, self.RESULT_CHUNKS_HREF_KEY: result_chunks_href}
+
     def to_json(self):
         return {
             self.ID_KEY: self.id,
@@ -696,7 +798,33 @@ class WorkflowTask(Base):
             self.RESOURCE_TYPE_KEY: self.resource_type,
             self.TASK_TYPE_KEY: self.task_type,
             self.TASK_METADATA_KEY: self.task_metadata,
-            self.RESULT_KEY: self.result,
+            self.RESULT_KEY: self.get_result_json(),
             self.PREVIOUS_TASK_IDS_KEY: [task.id for task in self.previous_tasks],
             self.NEXT_TASK_IDS_KEY: [task.id for task in self.next_tasks]
         }
+
+
+class WorkflowTaskResultChunk(Base):
+    """
+    This database model holds a chunk of the result of a task, for results too big to be stored as a single JSON
+    """
+    __tablename__ = 'workflow_task_result_chunks'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    result_type = Column(String(128), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    items = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+    workflow_task_id = Column(String(32), ForeignKey('workflow_tasks.id', ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(workflow_task_id, result_type, chunk_index,
+                         name="uix_workflow_task_result_chunk_task_id_type_index"),
+    )
+
+    def __init__(self, result_type, chunk_index, items):
+        self.result_type = result_type
+        self.chunk_index = chunk_index
+        self.items = items
+        self.created_at = datetime.utcnow()
@@ -1,7 +1,7 @@
 from datetime import timedelta
 
 from celery import Celery
-from celery.signals import worker_ready
+from celery.signals import celeryd_init, worker_ready
 from celery_singleton import clear_locks
 
 from config import RedisConfig
@@ -58,6 +58,11 @@ celery_app.conf.beat_schedule = {
         "schedule": timedelta(minutes=2),
         'options': {'queue': 'sync_queue'}
     },
+    "recompute_ibm_cloud_resource_summaries": {
+        "task": "recompute_ibm_cloud_resource_summaries",
+        "schedule": timedelta(hours=6),
+        'options': {'queue': 'sync_queue'}
+    },
     "run_vpc_expiry_manager": {
         "task": "run_vpc_expiry_manager",
         "schedule": 60,
@@ -78,6 +83,16 @@ celery_app.conf.beat_schedule = {
         "schedule": timedelta(hours=12),
         'options': {'queue': 'cost_analyzer_queue'}
     },
+    "run_mtd_cost_check_task": {
+        "task": "task_check_ibm_resource_instances_mtd_cost",
+        "schedule": timedelta(hours=24),
+        'options': {'queue': 'cost_analyzer_queue'}
+    },
+    "run_cost_data_retention_task": {
+        "task": "task_purge_ibm_expired_cost_data",
+        "schedule": timedelta(hours=24),
+        'options': {'queue': 'cost_analyzer_queue'}
+    },
 
 }
 
@@ -85,3 +100,16 @@ celery_app.conf.beat_schedule = {
 @worker_ready.connect
 def unlock_all(**kwargs):
     clear_locks(celery_app)
+
+
+@celeryd_init.connect
+def register_session_listeners(**kwargs):
+    from ibm.common.cost_cache import register_cost_data_generation_listeners
+    from ibm.common.regional_resource_snapshots import register_regional_resource_snapshot_listeners
+    from ibm.common.resource_summaries import register_resource_summary_listeners
+    from ibm.common.workflow_progress import register_workflow_progress_listeners
+
+    register_cost_data_generation_listeners()
+    register_regional_resource_snapshot_listeners()
+    register_resource_summary_listeners()
+    register_workflow_progress_listeners()
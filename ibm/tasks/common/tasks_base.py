@@ -12,6 +12,13 @@ class IBMWorkflowTasksBase(Singleton):
     def after_return(self, status, retval, task_id, args, kwargs, einfo):
         LOGGER.info('TASK FINISHED: {0.name}[{0.request.id}]'.format(self))
 
+    def retry(self, *args, **kwargs):
+        # the lock of the running task would make its retry a duplicate of itself and drop it
+        if not self.request.called_directly:
+            self.release_lock(task_args=self.request.args, task_kwargs=self.request.kwargs)
+
+        return super(IBMWorkflowTasksBase, self).retry(*args, **kwargs)
+
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         LOGGER.error('{0!r} failed: {1!r}'.format(task_id, exc))
         with get_db_session() as db_session:
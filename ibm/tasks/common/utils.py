@@ -1,10 +1,17 @@
 import logging
 
+from config import SoftlayerConfig
 from ibm.models import IBMAddressPrefix, IBMDedicatedHost, IBMPublicGateway, IBMVpcNetwork, IBMPlacementGroup
 from ibm.models.softlayer.resources_models import SoftLayerSshKey
 
 LOGGER = logging.getLogger(__name__)
 
+# resource types of the VPC schema generated for a SoftLayer account, in the order of the schema
+IBM_VPC_SCHEMA_RESOURCE_TYPES = [
+    "vpc_networks", "subnets", "address_prefixes", "security_groups", "public_gateways", "instances", "load_balancers",
+    "ssh_keys", "placement_groups", "dedicated_hosts", "vpn_gateways", "ike_policies", "ipsec_policies", "network_acls"
+]
+
 
 def get_softlayer_schema(vpc_data):
     """
@@ -23,15 +30,36 @@ def get_softlayer_schema(vpc_data):
 
 def generate_ibm_vpc_schema(data, vyatta_client=None, softlayer_cloud=None):
     """
-    This method generates an equivalent VPC schema for IBM, the following assumptions are made when migrating:
+    This method generates an equivalent VPC schema for IBM, see `iter_ibm_vpc_schema`
+    :return: <dict> of resource type to <list> of resources, None if there are no subnets
+    """
+    if not data.get("subnets", []):
+        return
+
+    vpc_json = {resource_type: [] for resource_type in IBM_VPC_SCHEMA_RESOURCE_TYPES}
+    for resource_type, resources in iter_ibm_vpc_schema(data, vyatta_client, softlayer_cloud):
+        vpc_json[resource_type].extend(resources)
+
+    return vpc_json
+
+
+def iter_ibm_vpc_schema(data, vyatta_client=None, softlayer_cloud=None, chunk_size=None):
+    """
+    This method generates an equivalent VPC schema for IBM in chunks, the following assumptions are made when migrating:
     1) {name, region, zone} are defined as 'dummy'
     2) Only one Public Gateways can be attached to a given zone in IBM
     3) One Vyatta is treated as a single VPC in IBM
-    :return:
+
+    The resources the other ones refer to (subnets, security groups, network interfaces..) are kept until the end, the
+    JSON of instances and load balancers is yielded as soon as a chunk of them is translated
+    :param chunk_size: resources per chunk
+    :return: generator of (resource type, <list> of at most `chunk_size` resources), nothing if there are no subnets
     """
     if not data.get("subnets", []):
         return
 
+    chunk_size = max(chunk_size or SoftlayerConfig.SOFTLAYER_SCHEMA_CHUNK_SIZE, 1)
+
     ibm_vpc_network = IBMVpcNetwork(name="wip-template", href=None, crn=None, status=None,
                                     resource_id=None, created_at=None)
     ibm_public_gateway = IBMPublicGateway(name="dummy-zone-pbgw", crn=None, href=None, status=None,
@@ -128,12 +156,10 @@ def generate_ibm_vpc_schema(data, vyatta_client=None, softlayer_cloud=None):
 
     instances_list = []
     network_interfaces_list = []
-    instance_id_to_obj_dict = {}
     for instance in data.get('instances', []):
         ibm_instance = instance.to_ibm()
         for ssh_key_ in ibm_instance.ssh_keys.all():
             ssh_key_.id = ssh_keys_id_obj_dict[ssh_key_.name].id
-        instance_id_to_obj_dict[ibm_instance.id] = ibm_instance
         if instance.dedicated_host:
             for ibm_dedicated_host in ibm_dedicated_hosts:
                 if ibm_dedicated_host.id == dh_classical_id_to_gen2_id[instance.dedicated_host["id"]]:
@@ -160,6 +186,13 @@ def generate_ibm_vpc_schema(data, vyatta_client=None, softlayer_cloud=None):
             network_interfaces_list.append(interface)
         instances_list.append(ibm_instance.from_softlayer_to_ibm_json(instance, vpc_id=ibm_vpc_network.id,
                                                                       softlayer_cloud=softlayer_cloud))
+        if len(instances_list) >= chunk_size:
+            yield "instances", instances_list
+            instances_list = []
+
+    if instances_list:
+        yield "instances", instances_list
+
     load_balancers_list = []
     for lb in data.get('load_balancers', []):
         ibm_load_balancer = lb.to_ibm()
@@ -181,6 +214,12 @@ def generate_ibm_vpc_schema(data, vyatta_client=None, softlayer_cloud=None):
 
         ibm_load_balancer.subnets = subnets_to_add
         load_balancers_list.append(ibm_load_balancer.from_softlayer_to_ibm_json())
+        if len(load_balancers_list) >= chunk_size:
+            yield "load_balancers", load_balancers_list
+            load_balancers_list = []
+
+    if load_balancers_list:
+        yield "load_balancers", load_balancers_list
 
     vpns = ibm_vpc_network.vpn_gateways.all()
     ike_policies = dict()
@@ -193,24 +232,26 @@ def generate_ibm_vpc_schema(data, vyatta_client=None, softlayer_cloud=None):
             if connection.ike_policy.id not in ike_policies:
                 ike_policies[connection.ike_policy.id] = connection.ike_policy.from_softlayer_to_ibm()
 
-    vpc_json = {
-        "vpc_networks": [ibm_vpc_network.from_softlayer_to_ibm()],
-        "subnets": [subnet.from_softlayer_to_ibm() for subnet in ibm_vpc_network.subnets.all()],
-        "address_prefixes": [address_prefix.from_softlayer_to_ibm() for address_prefix in address_prefixes_list],
-        "security_groups": [security_group.from_softlayer_to_ibm() for security_group in
-                            ibm_vpc_network.security_groups.all()],
-        "public_gateways": [public_gateway.from_softlayer_to_ibm() for public_gateway in
-                            ibm_vpc_network.public_gateways.all()],
-        "instances": instances_list,
-        "load_balancers": load_balancers_list,
-        "ssh_keys": ibm_ssh_keys,
-        "placement_groups": [placement_group.from_softlayer_to_ibm() for placement_group in ibm_placement_groups_list],
-        "dedicated_hosts": [dedicated_host.from_softlayer_to_ibm() for dedicated_host in ibm_dedicated_hosts],
-        "vpn_gateways": [vpn.from_softlayer_to_ibm() for vpn in vpns],
-        "ike_policies": [ike_policies[policy_id] for policy_id in ike_policies],
-        "ipsec_policies": [ipsec_policies[policy_id] for policy_id in ipsec_policies],
-        "network_acls": [subnet.network_acl.from_softlayer_to_ibm() for subnet in ibm_vpc_network.subnets.all()
-                         if subnet.network_acl],
+    remaining_resources = {
+        "vpc_networks": [ibm_vpc_network],
+        "subnets": ibm_vpc_network.subnets.all(),
+        "address_prefixes": address_prefixes_list,
+        "security_groups": ibm_vpc_network.security_groups.all(),
+        "public_gateways": ibm_vpc_network.public_gateways.all(),
+        "placement_groups": ibm_placement_groups_list,
+        "dedicated_hosts": ibm_dedicated_hosts,
+        "vpn_gateways": vpns,
+        "network_acls": [subnet.network_acl for subnet in ibm_vpc_network.subnets.all() if subnet.network_acl],
     }
+    for resource_type, resources in remaining_resources.items():
+        for index in range(0, len(resources), chunk_size):
+            yield resource_type, [resource.from_softlayer_to_ibm() for resource in resources[index:index + chunk_size]]
 
-    return vpc_json
+    translated_resources = {
+        "ssh_keys": ibm_ssh_keys,
+        "ike_policies": list(ike_policies.values()),
+        "ipsec_policies": list(ipsec_policies.values()),
+    }
+    for resource_type, resources in translated_resources.items():
+        for index in range(0, len(resources), chunk_size):
+            yield resource_type, resources[index:index + chunk_size]
@@ -1,20 +1,50 @@
 import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import as_completed, ThreadPoolExecutor
 
+from cachetools import TTLCache
 from consumption_client import Consumption
 from consumption_client.rest import ApiException
+from sqlalchemy import and_, exists, func
 from subscription_client import SubscriptionApi
 from subscription_client.rest import ApiException as subException
 
+from config import ConsumptionClientConfig, SubscriptionClientConfig
 from ibm import get_db_session
 from ibm.common.consts import ONPREM
 from ibm.common.utils import init_consumption_client, init_subscription_client
-from ibm.models import DisasterRecoveryBackup, IBMCloud, IBMIdleResource, IBMInstance, IBMVpcNetwork, WorkflowTask
+from ibm.models import DisasterRecoveryBackup, IBMCloud, IBMCloudSetting, IBMIdleResource, IBMInstance, \
+    IBMVpcNetwork, WorkflowTask
 from ibm.tasks.celery_app import celery_app as celery
 from ibm.tasks.common.tasks_base import IBMWorkflowTasksBase
 from ibm.tasks.draas_tasks.utils import get_consumption_resource_from_db
 
 LOGGER = logging.getLogger(__name__)
 
+# project_id -> subscriptions of the project
+subscriptions_cache = TTLCache(maxsize=1024, ttl=SubscriptionClientConfig.SUBSCRIPTIONS_CACHE_TTL)
+subscriptions_cache_lock = threading.Lock()
+
+
+def get_project_subscriptions(subscription_client, project_id):
+    """
+    Subscriptions of a project, fetched at most once per `SUBSCRIPTIONS_CACHE_TTL`. Errors and empty results are not
+    cached.
+    :raises subscription_client.rest.ApiException:
+    """
+    with subscriptions_cache_lock:
+        subscriptions = subscriptions_cache.get(project_id)
+    if subscriptions:
+        return subscriptions
+
+    subscriptions = subscription_client.get_subscriptions(project_id=project_id)
+    if subscriptions:
+        with subscriptions_cache_lock:
+            subscriptions_cache[project_id] = subscriptions
+
+    return subscriptions
+
 
 @celery.task(name="add_cost_consumption", base=IBMWorkflowTasksBase, queue='consumption_queue')
 def add_cost_consumption_task(workflow_task_id):
@@ -47,7 +77,7 @@ def add_cost_consumption_task(workflow_task_id):
 
     try:
         subscription_client = SubscriptionApi(init_subscription_client())
-        subscriptions = subscription_client.get_subscriptions(project_id=project_id)
+        subscriptions = get_project_subscriptions(subscription_client, project_id)
 
     except subException as ex:
         with get_db_session() as db_session:
@@ -114,59 +144,85 @@ def add_cost_consumption_task(workflow_task_id):
 def update_cost_consumption_stats_task():
     """
     This task sends the current count of idle and nodes to consumption.
+    The counts of all the clouds are read with one grouped query each, subscriptions are fetched once per project and
+    the consumption of the projects is sent concurrently. A failing project or cloud does not stop the others.
     """
     with get_db_session() as db_session:
+        clouds = db_session.query(
+            IBMCloud.id, IBMCloud.project_id, IBMCloud.metadata_, IBMCloudSetting.cost_optimization_enabled
+        ).outerjoin(IBMCloudSetting, IBMCloudSetting.cloud_id == IBMCloud.id).filter(
+            IBMCloud.deleted.is_(False), IBMCloud.status == IBMCloud.STATUS_VALID,
+            IBMCloudSetting.cost_optimization_enabled.isnot(False)
+        ).all()
+        if not clouds:
+            return
 
-        for cloud in db_session.query(IBMCloud).filter_by(deleted=False, status='VALID').all():
-            cloud_settings = cloud.settings
-            if cloud_settings and not cloud_settings.cost_optimization_enabled:
-                continue
-            metadata = dict()
-            project_id = cloud.project_id
-            email = cloud.metadata_.get("email")
-            resource_id = cloud.id
-
-            LOGGER.debug(f"Sending stats to consumption for cloud {cloud.id}")
-
-            cost_optimization_enable = cloud.ENABLE if cloud_settings.cost_optimization_enabled else cloud.DISABLE
-            idle_resources_resource_ids = db_session.query(IBMIdleResource.db_resource_id).filter_by(
-                cloud_id=cloud.id).all()
-
-            active_instance_ids = db_session.query(IBMInstance.id).filter_by(
-                cloud_id=cloud.id, status=IBMInstance.STATUS_RUNNING).filter(
-                IBMInstance.id.not_in(idle_resources_resource_ids)).all()
-            metadata['idle'] = len(idle_resources_resource_ids)
-            metadata['nodes'] = len(active_instance_ids)
-
+        idle_counts = dict(db_session.query(IBMIdleResource.cloud_id, func.count(IBMIdleResource.id)).group_by(
+            IBMIdleResource.cloud_id).all())
+        node_counts = dict(db_session.query(IBMInstance.cloud_id, func.count(IBMInstance.id)).filter(
+            IBMInstance.status == IBMInstance.STATUS_RUNNING,
+            ~exists().where(and_(IBMIdleResource.cloud_id == IBMInstance.cloud_id,
+                                 IBMIdleResource.db_resource_id == IBMInstance.id))
+        ).group_by(IBMInstance.cloud_id).all())
+
+    project_consumptions = defaultdict(list)
+    for cloud_id, project_id, cloud_metadata, cost_optimization_enabled in clouds:
+        project_consumptions[project_id].append({
+            "cloud_id": cloud_id,
+            "email": (cloud_metadata or {}).get("email"),
+            "service_function": IBMCloud.ENABLE if cost_optimization_enabled else IBMCloud.DISABLE,
+            "metadata": {"idle": idle_counts.get(cloud_id, 0), "nodes": node_counts.get(cloud_id, 0)}
+        })
+
+    subscription_client = SubscriptionApi(init_subscription_client())
+    consumption_client = init_consumption_client()
+    with ThreadPoolExecutor(max_workers=ConsumptionClientConfig.CONSUMPTION_UPDATE_CONCURRENCY) as executor:
+        futures_project_ids = {
+            executor.submit(send_project_cost_consumptions, subscription_client, consumption_client, project_id,
+                            consumptions): project_id
+            for project_id, consumptions in project_consumptions.items()
+        }
+        for future in as_completed(futures_project_ids):
             try:
-                subscription_client = SubscriptionApi(init_subscription_client())
-                subscriptions = subscription_client.get_subscriptions(project_id=project_id)
+                future.result()
+            except Exception as ex:
+                LOGGER.exception(f"Sending cost consumption of project {futures_project_ids[future]} failed: {ex}")
 
-            except subException as ex:
-                LOGGER.info(ex)
-                return
-
-            if not subscriptions:
-                LOGGER.info(f"No subscription found for project ID {project_id}")
-                return
 
-            LOGGER.info(f"Subscription successfully fetched with service ID : {subscriptions[0].service_id}")
+def send_project_cost_consumptions(subscription_client, consumption_client, project_id, consumptions):
+    """
+    Send the cost consumption of the clouds of a project
+    :param subscription_client: <SubscriptionApi> client
+    :param consumption_client: <ConsumptionApi> client
+    :param project_id: ID of the project
+    :param consumptions: <list> of {"cloud_id", "email", "service_function", "metadata"} of the clouds of the project
+    """
+    try:
+        subscriptions = get_project_subscriptions(subscription_client, project_id)
+    except subException as ex:
+        LOGGER.info(ex)
+        return
 
-            service_id = subscriptions[0].service_id
+    if not subscriptions:
+        LOGGER.info(f"No subscription found for project ID {project_id}")
+        return
 
-            try:
-                client = init_consumption_client()
-                consumption = Consumption(
-                    project_id=project_id, cloud_id=resource_id, cloud_type="IBM",
-                    service_function=cost_optimization_enable, service_id=service_id, resource_id=resource_id,
-                    resource_type="Global", service_type="Manage Account - Cost Optimization", metadata=metadata)
-                client.add_consumption(consumption=consumption, x_user_email=email)
-
-            except ApiException as ex:
-                LOGGER.info(ex)
-                return
+    service_id = subscriptions[0].service_id
+    for consumption_json in consumptions:
+        cloud_id = consumption_json["cloud_id"]
+        LOGGER.debug(f"Sending stats to consumption for cloud {cloud_id}")
+        try:
+            consumption = Consumption(
+                project_id=project_id, cloud_id=cloud_id, cloud_type="IBM",
+                service_function=consumption_json["service_function"], service_id=service_id, resource_id=cloud_id,
+                resource_type="Global", service_type="Manage Account - Cost Optimization",
+                metadata=consumption_json["metadata"])
+            consumption_client.add_consumption(consumption=consumption, x_user_email=consumption_json["email"])
+        except ApiException as ex:
+            LOGGER.info(ex)
+            continue
 
-            LOGGER.info(f"Cost Consumption Data added successfully for cloud with ID {cloud.id}")
+        LOGGER.info(f"Cost Consumption Data added successfully for cloud with ID {cloud_id}")
 
 
 @celery.task(name="add_backup_consumption", base=IBMWorkflowTasksBase, queue='consumption_queue')
@@ -1,6 +1,9 @@
-from .cost_analyzer_tasks import fetch_ibm_cloud_cost, task_run_ibm_fetch_cost
+from .cost_analyzer_tasks import fetch_ibm_cloud_cost, task_check_ibm_resource_instances_mtd_cost, \
+    task_purge_ibm_expired_cost_data, task_run_ibm_fetch_cost
 
 __all__ = [
     "fetch_ibm_cloud_cost",
+    "task_check_ibm_resource_instances_mtd_cost",
+    "task_purge_ibm_expired_cost_data",
     "task_run_ibm_fetch_cost"
 ]
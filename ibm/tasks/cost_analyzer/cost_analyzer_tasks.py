@@ -1,13 +1,22 @@
+from concurrent.futures import as_completed, ThreadPoolExecutor
 from datetime import datetime
 
+from dateutil.relativedelta import relativedelta
+
 from ibm_cloud_sdk_core import ApiException
+from redis.exceptions import LockError
 
+from config import IBMCostConfig
 from ibm import get_db_session, LOGGER
 from ibm.common.clients.ibm_clients import CostClient
 from ibm.common.consts import BILLING_MONTH_FORMAT
+from ibm.common.cost_cache import bump_cost_data_generation
+from ibm.common.cost_utils import get_cost_sync_cutoff, purge_expired_cost_data, \
+    rebuild_resource_instances_mtd_cost, refresh_cost_tracking_rollups, resource_instances_cost_lock
 from ibm.models import IBMCloud, IBMCost, WorkflowRoot, WorkflowTask
 from ibm.tasks.celery_app import celery_app as celery
-from .utils import update_cost, get_cost_billing_month
+from ibm.tasks.cost_per_tags_tasks.cost_per_tags_tasks import task_run_ibm_cost_per_tags_tracking
+from .utils import fetch_billing_month_cost, get_cost_billing_month, update_idle_resource_cost
 from ...common.clients.ibm_clients.exceptions import IBMAuthError, IBMConnectError, IBMExecuteError, \
     IBMInvalidRequestError
 
@@ -52,23 +61,30 @@ def fetch_ibm_cloud_cost(workflow_task_id):
             db_session.commit()
             LOGGER.error(workflow_task.message)
             return
-    try:
-        cost_client = CostClient(cloud_id=ibm_cloud.id)
-        billing_month_list = get_cost_billing_month()
-        curr_month = billing_month_list[-1]
-        prev_month = billing_month_list[-2]
-
-        for billing_month in billing_month_list:
-            billing_month_formatted = datetime.strptime(billing_month, BILLING_MONTH_FORMAT)
-            monthly_cost_obj = db_session.query(IBMCost).filter_by(cloud_id=ibm_cloud.id,
-                                                                   billing_month=billing_month_formatted).first()
 
-            if monthly_cost_obj is not None and (billing_month != curr_month and billing_month != prev_month):
-                continue
-            response_dict = cost_client.list_cost_and_usages(ibm_api_key=ibm_cloud.api_key,
-                                                             ibm_account_id=ibm_cloud.account_id,
-                                                             billing_month=billing_month)
-            update_cost(cloud_id=ibm_cloud.id, m_ibm_cost=response_dict)
+        ibm_api_key = ibm_cloud.api_key
+        ibm_account_id = ibm_cloud.account_id
+        # closed months are fetched one last time and marked final, only the others are (re)fetched
+        final_billing_months = {
+            billing_month.strftime(BILLING_MONTH_FORMAT) for billing_month, in
+            db_session.query(IBMCost.billing_month).filter_by(cloud_id=cloud_id, final=True).all()
+        }
+        sync_cutoff = get_cost_sync_cutoff()
+        billing_month_list = [
+            billing_month for billing_month in get_cost_billing_month()
+            if billing_month not in final_billing_months and
+            not (sync_cutoff and datetime.strptime(billing_month, BILLING_MONTH_FORMAT) < sync_cutoff)
+        ]
+    try:
+        cost_client = CostClient(cloud_id=cloud_id)
+        with ThreadPoolExecutor(max_workers=IBMCostConfig.IBM_COST_FETCH_CONCURRENCY) as executor:
+            futures = [
+                executor.submit(fetch_billing_month_cost, cost_client=cost_client, cloud_id=cloud_id,
+                                ibm_api_key=ibm_api_key, ibm_account_id=ibm_account_id, billing_month=billing_month)
+                for billing_month in billing_month_list
+            ]
+            for future in as_completed(futures):
+                future.result()
     except (IBMAuthError, IBMConnectError, IBMExecuteError, IBMInvalidRequestError, ApiException) as ex:
         with get_db_session() as db_session:
             workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
@@ -79,6 +95,11 @@ def fetch_ibm_cloud_cost(workflow_task_id):
             db_session.commit()
             LOGGER.error(workflow_task.message)
             return
+
+    if billing_month_list:
+        update_idle_resource_cost(cloud_id=cloud_id)
+        task_run_ibm_cost_per_tags_tracking(cloud_id=cloud_id)
+
     with get_db_session() as db_session:
         workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
         if not workflow_task:
@@ -87,3 +108,58 @@ def fetch_ibm_cloud_cost(workflow_task_id):
         workflow_task.status = WorkflowTask.STATUS_SUCCESSFUL
         db_session.commit()
         LOGGER.info(f"Cost for IBM Cloud {cloud_id} fetched successfully")
+
+
+@celery.task(name="task_check_ibm_resource_instances_mtd_cost", queue='cost_analyzer_queue')
+def task_check_ibm_resource_instances_mtd_cost():
+    """
+    Rebuild the month to date cost totals which drifted from the daily costs they aggregate, and recompute the cost
+    tracking rollups of the previous and the current month
+    """
+    current_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    with get_db_session() as db_session:
+        cloud_ids = [cloud_id for cloud_id, in db_session.query(IBMCloud.id).filter_by(deleted=False).all()]
+
+    for cloud_id in cloud_ids:
+        with get_db_session() as db_session:
+            cost_ids = [cost_id for cost_id, in db_session.query(IBMCost.id).filter_by(cloud_id=cloud_id).all()]
+
+        repaired = 0
+        for cost_id in cost_ids:
+            # a month being ingested is checked by the next run
+            try:
+                with resource_instances_cost_lock(cloud_id, cost_id, blocking=False), \
+                        get_db_session() as db_session:
+                    repaired += rebuild_resource_instances_mtd_cost(cloud_id=cloud_id, db_session=db_session,
+                                                                    cost_id=cost_id)
+                    db_session.commit()
+            except LockError:
+                LOGGER.info(f"Month to date cost totals of cost {cost_id} of IBM Cloud {cloud_id} not checked, the "
+                            f"month is being ingested")
+
+        with get_db_session() as db_session:
+            refresh_cost_tracking_rollups(cloud_id, db_session, current_month - relativedelta(months=1),
+                                          current_month + relativedelta(months=1))
+            db_session.commit()
+
+        bump_cost_data_generation(cloud_id)
+
+        if repaired:
+            LOGGER.info(f"{repaired} month to date cost totals of IBM Cloud {cloud_id} rebuilt")
+
+
+@celery.task(name="task_purge_ibm_expired_cost_data", queue='cost_analyzer_queue')
+def task_purge_ibm_expired_cost_data():
+    """
+    Delete the cost and resource tracking history older than the configured retention
+    """
+    with get_db_session() as db_session:
+        cloud_ids = [cloud_id for cloud_id, in db_session.query(IBMCloud.id).all()]
+
+    for cloud_id in cloud_ids:
+        with get_db_session() as db_session:
+            deleted = purge_expired_cost_data(cloud_id=cloud_id, db_session=db_session)
+
+        if deleted:
+            bump_cost_data_generation(cloud_id)
+            LOGGER.info(f"Expired cost data of IBM Cloud {cloud_id} deleted: {deleted}")
@@ -1,13 +1,16 @@
 import logging
-from calendar import monthrange
-from datetime import datetime, date, timedelta
-from dateutil.relativedelta import relativedelta
+from datetime import datetime, timedelta
+from itertools import islice
 
-from sqlalchemy import func
+from dateutil.relativedelta import relativedelta
 
+from config import IBMCostConfig
 from ibm import get_db_session
-from ibm.models import IBMCloud, IBMCost, IBMResourceInstancesCost, IBMResourceInstancesDailyCost
-from ibm.tasks.cost_per_tags_tasks.cost_per_tags_tasks import task_run_ibm_cost_per_tags_tracking
+from ibm.common.consts import BILLING_MONTH_FORMAT
+from ibm.common.cost_cache import bump_cost_data_generation
+from ibm.common.cost_utils import refresh_cost_tracking_rollups, resource_instances_cost_lock, \
+    update_recommendations_cost, update_resource_instances_cost
+from ibm.models import IBMCloud, IBMCost
 
 LOGGER = logging.getLogger(__name__)
 
@@ -29,7 +32,7 @@ def get_cost_billing_month() -> list:
     return months_list_str
 
 
-def update_cost(cloud_id, m_ibm_cost):
+def update_cost(cloud_id, m_ibm_cost, final=False):
     """
     Parse IBM cost related data, and store it into DB accordingly
     :param cloud_id:  database id of Cloud table entry
@@ -46,13 +49,15 @@ def update_cost(cloud_id, m_ibm_cost):
                         "usage": [{
                             ......
                             },
+        "resources" can also be a generator of the resources, which are then ingested as they are fetched, in batches of
+        IBM_COST_INGEST_BATCH_SIZE resources
+    :param final: the billing month is closed and will not be fetched again
     """
     start_time = datetime.utcnow()
     m_cost_time = m_ibm_cost.get('last_synced_at')
     cost = IBMCost.from_ibm_json_body(json_body=m_ibm_cost['summary'], cloud_id=cloud_id)
     billing_month = cost.billing_month
 
-    cost_obj = None
     with get_db_session() as db_session:
         cloud = db_session.query(IBMCloud).get(cloud_id)
         assert cloud
@@ -64,128 +69,57 @@ def update_cost(cloud_id, m_ibm_cost):
         else:
             cost.ibm_cloud = cloud
             cost_obj = cost
-        update_individual_cost(cloud_id=cloud_id, cost_id=cost_obj.id,
-                               m_resources_cost=m_ibm_cost['resources'],
-                               m_ibm_cost_time=m_cost_time, db_session=db_session)
         db_session.commit()
+        cost_id = cost_obj.id
+
+    # the usage pages are fetched while no connection is held, each batch of resources is written in its own
+    # transaction, locked against the rebuild of the month to date totals
+    m_resources_cost = iter(m_ibm_cost['resources'])
+    while True:
+        m_resources_cost_batch = list(islice(m_resources_cost, IBMCostConfig.IBM_COST_INGEST_BATCH_SIZE))
+        if not m_resources_cost_batch:
+            break
 
-    LOGGER.info(f"** IBMCost synced in: {(datetime.utcnow() - start_time).total_seconds()}")
-    update_idle_resource_cost(cloud_id=cloud_id)
-    task_run_ibm_cost_per_tags_tracking(cloud_id=cloud_id)
+        with resource_instances_cost_lock(cloud_id, cost_id), get_db_session() as db_session:
+            update_resource_instances_cost(cloud_id=cloud_id, cost_id=cost_id, m_resources_cost=m_resources_cost_batch,
+                                           m_ibm_cost_time=m_cost_time, db_session=db_session)
+            db_session.commit()
 
+    with get_db_session() as db_session:
+        # only marked final once all of its resources are written, a failed sync is fetched again
+        db_session.query(IBMCost).filter_by(id=cost_id, cloud_id=cloud_id).update({IBMCost.final: final},
+                                                                                  synchronize_session=False)
+        refresh_cost_tracking_rollups(cloud_id, db_session, billing_month, billing_month + relativedelta(months=1),
+                                      savings=False)
+        db_session.commit()
 
-def update_individual_cost(cloud_id, cost_id, m_resources_cost, m_ibm_cost_time, db_session):
+    bump_cost_data_generation(cloud_id)
+
+    LOGGER.info(f"** IBMCost {m_ibm_cost['summary'].get('month')} synced in: "
+                f"{(datetime.utcnow() - start_time).total_seconds()}")
+
+
+def is_billing_month_final(billing_month):
+    """
+    A billing month is not rated anymore IBM_COST_FINALIZATION_DAYS days after it ended
+    :param billing_month: month in format "2022-12"
     """
-    Update cost of Resource Instances
-    :param cloud_id: database id of entry of table "Cloud"
-    :param cost_id: database id of entry of table "IBMCost"
-    :param m_resources_cost: [{
-                            "month": "2022-12",
-                            "usage": [{
-                                "cost": 8.690458064516127,
-                                "unit": "GIGABYTE_MONTH_DISK",
-                                "price": [{
-                                "price": 0.58,
-                                "tier_model": "Granular Tier",
-                                "unitQuantity": "1",
-                                "quantity_tier": "1"
-                                }],
-                                "metric": "GIGABYTE_MONTHS_DISK",
-                                "quantity": 16.64838709677419,
-                                }, ......  #more metrics
-                                "resource_id": ""
-                                "resource_instance_id": "crn of resource"
-                                }]
-    :param m_ibm_cost_time: time in format "2022-12-08 05:26:38.374680"
-    :param db_session: database session
+    month_end = datetime.strptime(billing_month, BILLING_MONTH_FORMAT) + relativedelta(months=1)
+    return datetime.utcnow() >= month_end + timedelta(days=IBMCostConfig.IBM_COST_FINALIZATION_DAYS)
 
+
+def fetch_billing_month_cost(cost_client, cloud_id, ibm_api_key, ibm_account_id, billing_month):
     """
-    for m_resource_cost in m_resources_cost:
-        crn = m_resource_cost['resource_instance_id']
-        resource_id = m_resource_cost['resource_id']  # Resource ID is service name
-        m_month = m_resource_cost['month']
-        m_month_datetime = datetime(int(m_month.split('-')[0]), int(m_month.split('-')[1]), 1)
-
-        cost_mtd = 0.0
-        for usage_and_cost in m_resource_cost['usage']:
-            cost_mtd = round(sum([cost_mtd, float(usage_and_cost['cost'])]))
-
-        esitmated_cost = None
-        if resource_id == 'is.floating-ip':
-            esitmated_cost = cost_mtd
-        else:
-            time_now = datetime.now()
-            days_passed = time_now.day
-            current_date = date.today()
-            days_in_month = monthrange(current_date.year, current_date.month)[1]
-            utcnow = datetime.utcnow()
-            if f'{utcnow.year}-{utcnow.month}' == m_month:
-                esitmated_cost = round((cost_mtd / days_passed) * days_in_month)
-            else:
-                esitmated_cost = round(cost_mtd)
-
-        resource_instance_cost = IBMResourceInstancesCost(resource_id=resource_id, cost=cost_mtd,
-                                                          estimated_cost=esitmated_cost, crn=crn)
-        db_resource_instance_cost = db_session.query(IBMResourceInstancesCost).filter_by(
-            resource_id=resource_id, cloud_id=cloud_id, cost_id=cost_id, crn=crn).first()
-
-        # update Daily Cost
-        db_daily_cost_obj = db_session.query(IBMResourceInstancesDailyCost).filter_by(cloud_id=cloud_id,
-                                                                                      cost_id=cost_id,
-                                                                                      resource_id=resource_id,
-                                                                                      crn=crn) \
-            .order_by(IBMResourceInstancesDailyCost.created_at.desc()).first()
-        db_daily_mtd_cost = db_session.query(func.sum(IBMResourceInstancesDailyCost.daily_cost).label('cost')).\
-            filter_by(cloud_id=cloud_id, cost_id=cost_id, resource_id=resource_id, crn=crn).first().cost or 0.0
-        current_time_datetime = datetime.strptime(m_ibm_cost_time, "%Y-%m-%d %H:%M:%S")
-        if db_daily_cost_obj:
-            created_time = str(db_daily_cost_obj.created_at).split('.')[0]
-            created_datetime = datetime.strptime(str(created_time), "%Y-%m-%d %H:%M:%S")
-            hour_lapsed = (current_time_datetime - created_datetime).total_seconds() / 3600
-            if hour_lapsed > 24:
-                date_ = db_daily_cost_obj.date + timedelta(days=1)
-                if int(date_.month) == int(m_month.split('-')[1]):
-                    daily_cost = \
-                        IBMResourceInstancesDailyCost(resource_id=resource_id, crn=crn, date=date_,
-                                                      daily_cost=round(abs(cost_mtd - db_daily_mtd_cost)))
-                    daily_cost.cost_id = cost_id
-                    daily_cost.cloud_id = cloud_id
-                    db_session.add(daily_cost)
-        else:
-            current_time_datetime_est = current_time_datetime - timedelta(hours=1)  # Subtracted 1 hour to cater delays
-            date_ = None
-            if current_time_datetime_est.date().day == 1 and \
-                    current_time_datetime_est.date().month == m_month_datetime.month:
-                date_ = datetime(m_month_datetime.year, m_month_datetime.month, 1).date()
-            else:
-                if current_time_datetime_est.date().month == m_month_datetime.month:
-                    date_ = current_time_datetime.date()
-            if date_:
-                daily_cost = IBMResourceInstancesDailyCost(resource_id=resource_id, daily_cost=cost_mtd, crn=crn,
-                                                           date=date_)
-                daily_cost.cost_id = cost_id
-                daily_cost.cloud_id = cloud_id
-                db_session.add(daily_cost)
-
-        if db_resource_instance_cost:
-            db_resource_instance_cost.update_from_obj(resource_instance_cost)
-        else:
-            resource_instance_cost.cloud_id = cloud_id
-            resource_instance_cost.cost_id = cost_id
-            db_session.add(resource_instance_cost)
-        db_session.commit()
+    Fetch the cost of a billing month and ingest its resource usage pages as they are fetched
+    """
+    m_ibm_cost = cost_client.get_cost_and_usages(ibm_api_key=ibm_api_key, ibm_account_id=ibm_account_id,
+                                                 billing_month=billing_month)
+    update_cost(cloud_id=cloud_id, m_ibm_cost=m_ibm_cost, final=is_billing_month_final(billing_month))
 
 
 def update_idle_resource_cost(cloud_id):
-    from ibm.models import IBMIdleResource
-
     with get_db_session() as db_session:
-        idle_resources = db_session.query(IBMIdleResource).filter_by(cloud_id=cloud_id).all()
-        for idle_resource in idle_resources:
-            resource_json = idle_resource.resource_json
-            crn = resource_json.get('crn')
-            if crn:
-                cost = db_session.query(IBMResourceInstancesCost).filter_by(cloud_id=cloud_id, crn=crn).first()
-                if cost:
-                    idle_resource.estimated_savings = round(cost.estimated_cost)
+        update_recommendations_cost(cloud_id=cloud_id, db_session=db_session)
         db_session.commit()
+
+    bump_cost_data_generation(cloud_id)
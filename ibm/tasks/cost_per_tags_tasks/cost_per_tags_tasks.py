@@ -1,10 +1,11 @@
 import logging
 
-from sqlalchemy import func, and_
-from sqlalchemy.orm import aliased
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 
 from ibm import get_db_session
-from ibm.models import IBMCloud, IBMCost, IBMCostPerTag, IBMResourceInstancesCost, IBMTag
+from ibm.common.cost_cache import bump_cost_data_generation
+from ibm.models import IBMCloud, IBMCloudSetting, IBMCost, IBMCostPerTag, IBMResourceInstancesCost, IBMTag
 
 LOGGER = logging.getLogger(__name__)
 
@@ -13,47 +14,35 @@ def task_run_ibm_cost_per_tags_tracking(cloud_id=None):
     """
     This is a scheduled task which runs after 12 am , and retrieves the data from IBMTag and IBMResourceInstancesCost
     for IBMCostPerTag.
+    The cost per tag of a cloud and billing month is written with a single INSERT ... SELECT ... ON DUPLICATE KEY
+    UPDATE statement.
     """
     with get_db_session() as db_session:
+        cloud_ids_query = db_session.query(IBMCloud.id).join(IBMCloudSetting, IBMCloudSetting.cloud_id == IBMCloud.id)\
+            .filter(IBMCloudSetting.cost_optimization_enabled.is_(True))
         if cloud_id:
-            ibm_clouds = db_session.query(IBMCloud).filter_by(id=cloud_id).all()
-        else:
-            ibm_clouds = db_session.query(IBMCloud).all()
-
-        for ibm_cloud in ibm_clouds:
-            cloud_settings = ibm_cloud.settings
-            if not (cloud_settings and cloud_settings.cost_optimization_enabled):
-                continue
-
-            cloud_id = ibm_cloud.id
-            costs = db_session.query(IBMCost).filter_by(cloud_id=cloud_id).order_by(IBMCost.billing_month.desc()).\
-                limit(2).all()
-            # Create alias for IBMTag
-            ibm_tag_alias = aliased(IBMTag)
-
-            for cost_obj in costs:
+            cloud_ids_query = cloud_ids_query.filter(IBMCloud.id == cloud_id)
+
+        for cloud_id, in cloud_ids_query.all():
+            costs = db_session.query(IBMCost.id, IBMCost.billing_month).filter_by(cloud_id=cloud_id)\
+                .order_by(IBMCost.billing_month.desc()).limit(2).all()
+
+            for cost_id, billing_month in costs:
                 # Join IBMTag and IBMResourceInstancesCost on the crn column and group the results by name
-                query = (
-                    db_session.query(ibm_tag_alias.name, func.sum(IBMResourceInstancesCost.cost))
-                    .join(IBMResourceInstancesCost, and_(ibm_tag_alias.resource_crn == IBMResourceInstancesCost.crn,
-                                                         IBMResourceInstancesCost.cost_id == cost_obj.id))
-                    .group_by(ibm_tag_alias.name)
-                    .all()
+                cost_per_tag_select = select(
+                    func.replace(func.uuid(), "-", ""), IBMTag.name,
+                    func.round(func.sum(IBMResourceInstancesCost.cost)), literal(billing_month), literal(cloud_id)
+                ).join(
+                    IBMResourceInstancesCost, IBMTag.resource_crn == IBMResourceInstancesCost.crn
+                ).where(
+                    IBMResourceInstancesCost.cloud_id == cloud_id, IBMResourceInstancesCost.cost_id == cost_id
+                ).group_by(IBMTag.name)
+
+                statement = mysql_insert(IBMCostPerTag.__table__).from_select(
+                    ["id", "name", "cost", "date", "cloud_id"], cost_per_tag_select
                 )
-                for name, cost in query:
-                    cost = round(cost)
-                    # Check if an IBMCostPerTag object with the same name and month already exists
-                    month = cost_obj.billing_month
-                    existing_cost_per_tag = db_session.query(IBMCostPerTag)\
-                        .filter_by(name=name, cloud_id=cloud_id, date=month).first()
-
-                    if existing_cost_per_tag:
-                        # Update the cost of the existing object
-                        existing_cost_per_tag.cost = cost
-
-                    else:
-                        cost_per_tag = IBMCostPerTag(name=name, cost=cost, date=month)
-                        cost_per_tag.cloud_id = cloud_id
-                        db_session.add(cost_per_tag)
-
-                db_session.commit()
+                statement = statement.on_duplicate_key_update(cost=statement.inserted.cost)
+                db_session.execute(statement)
+
+            db_session.commit()
+            bump_cost_data_generation(cloud_id)
@@ -8,7 +8,8 @@ from .endpoint_gateways_tasks import create_endpoint_gateway, create_wait_endpoi
 from .floating_ip_tasks import create_floating_ip, create_wait_floating_ip, delete_floating_ip, delete_wait_floating_ip
 from .geography_tasks import update_geography
 from .ibm_cloud_tasks import add_account_id_to_cloud, add_ibm_monitoring_tokens, delete_ibm_cloud, \
-    sync_ibm_clouds_with_mangos, update_ibm_cloud, validate_ibm_monitoring_tokens, validate_update_cloud_api_key
+    recompute_ibm_cloud_resource_summaries, sync_ibm_clouds_with_mangos, update_ibm_cloud, \
+    validate_ibm_monitoring_tokens, validate_update_cloud_api_key
 from .ibm_images_tasks import create_ibm_image, create_image_conversion, create_wait_ibm_image, \
     create_wait_image_conversion, delete_image, delete_wait_image, store_ibm_custom_image, store_wait_ibm_custom_image
 from .ibm_instance_tasks import create_ibm_instance, create_ibm_instance_export_to_cos, create_ibm_instance_snapshot, \
@@ -49,8 +50,8 @@ from .placement_group_tasks import create_placement_group, create_wait_placement
 from .public_gateway_tasks import create_public_gateway, create_wait_public_gateway, delete_public_gateway, \
     delete_wait_public_gateway
 from .recommendations import generate_classic_recommendations_task, sync_classic_network_gateways_task, \
-    sync_classic_virtual_guest_bandwidth_usage_task, sync_classic_virtual_guest_cpu_usage_task, \
-    sync_classic_virtual_guest_memory_usage_task, sync_classic_virtual_guests_usage_task
+    sync_classic_virtual_guests_usage_metrics_task, sync_classic_virtual_guests_usage_task
+from .regional_resource_snapshot_tasks import refresh_ibm_regional_resource_snapshot
 from .resource_group_tasks import update_resource_groups
 from .routing_table_tasks import create_routing_table, create_wait_routing_table, delete_routing_table, \
     delete_wait_routing_table
@@ -84,10 +85,10 @@ from .vpns_tasks import create_vpn_connection, create_vpn_gateway, create_wait_v
 __all__ = [
     "start_wait_ibm_instance_task", "start_ibm_instance_task", "stop_wait_ibm_instance_task", "stop_ibm_instance_task",
     "delete_draas_blueprint", "create_draas_backup_iks", "delete_draas_backup",
-    "sync_classic_virtual_guest_memory_usage_task", "sync_classic_virtual_guest_cpu_usage_task",
+    "sync_classic_virtual_guests_usage_metrics_task",
     "sync_classic_virtual_guests_usage_task", "generate_classic_recommendations_task",
-    "sync_classic_network_gateways_task", "sync_classic_virtual_guest_bandwidth_usage_task",
-    "sync_ibm_clouds_with_mangos",
+    "sync_classic_network_gateways_task",
+    "sync_ibm_clouds_with_mangos", "recompute_ibm_cloud_resource_summaries", "refresh_ibm_regional_resource_snapshot",
     "create_address_prefix", "delete_address_prefix",
     "update_geography", "create_transit_gateway", "create_wait_transit_gateway",
     "create_transit_gateway_connection_prefix_filter", "create_transit_gateway_route_report",
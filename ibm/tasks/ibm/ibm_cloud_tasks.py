@@ -12,6 +12,7 @@ from ibm import get_db_session, LOGGER, mangos_ibm as mangos
 from ibm.common.clients.ibm_clients.cloud_account_details.account_details import CloudAccountDetailsClient
 from ibm.common.clients.ibm_clients.exceptions import IBMAuthError, IBMConnectError, IBMExecuteError, \
     IBMInvalidRequestError
+from ibm.common.resource_summaries import recompute_cloud_resource_summaries
 from ibm.models import IBMCloud, IBMMonitoringToken, IBMRegion, IBMResourceGroup, IBMZone, WorkflowTask
 from ibm.tasks.celery_app import celery_app as celery
 from ibm.tasks.common.tasks_base import IBMWorkflowTasksBase
@@ -437,6 +438,22 @@ def update_ibm_cloud(workflow_task_id):
         LOGGER.success(f"IBM Cloud '{ibm_cloud.id}' Updated successfully")
 
 
+@celery.task(name="recompute_ibm_cloud_resource_summaries", queue="sync_queue", base=Singleton)
+def recompute_ibm_cloud_resource_summaries():
+    """Recompute the dashboard resource summaries of the clouds which drifted from the resource tables"""
+
+    with get_db_session() as db_session:
+        cloud_ids = [cloud_id for cloud_id, in db_session.query(IBMCloud.id).filter_by(deleted=False).all()]
+
+    for cloud_id in cloud_ids:
+        with get_db_session() as db_session:
+            drifted_summaries = recompute_cloud_resource_summaries(cloud_id=cloud_id, db_session=db_session)
+            db_session.commit()
+
+        if drifted_summaries:
+            LOGGER.info(f"Resource summaries of IBM Cloud {cloud_id} recomputed: {drifted_summaries}")
+
+
 @celery.task(name="sync_ibm_clouds_with_mangos", base=Singleton)
 def sync_ibm_clouds_with_mangos():
     """Sync ibm clouds between mangos and vpc"""
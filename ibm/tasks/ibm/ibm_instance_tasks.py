@@ -6,14 +6,16 @@ from SoftLayer import SoftLayerAPIError
 from ibm_botocore.exceptions import ClientError
 from ibm_cloud_sdk_core import ApiException
 from ping3 import ping
-from sdcclient import SdMonitorClient
+from sqlalchemy import select
 
-from config import WorkerConfig
+from config import MonitoringConfig, WorkerConfig
 from ibm import get_db_session, LOGGER
 from ibm.common.clients.ibm_clients import COSClient, InstancesClient
 from ibm.common.clients.softlayer_clients import SoftlayerImageClient, SoftlayerInstanceClient
 from ibm.common.clients.softlayer_clients.exceptions import SLAuthError, SLExecuteError, SLInvalidRequestError, \
     SLRateLimitExceededError
+from ibm.common.cost_cache import bump_cost_data_generation
+from ibm.common.resource_summaries import apply_resource_summary_deltas
 from ibm.common.utils import get_cos_object_name, update_id_or_name_references
 from ibm.models import IBMCloud, IBMCOSBucket, IBMImage, IBMInstance, IBMInstanceDisk, IBMInstanceProfile, \
     IBMMonitoringToken, IBMNetworkInterface, IBMRegion, IBMResourceGroup, IBMResourceLog, IBMResourceTracking, \
@@ -24,8 +26,9 @@ from ibm.models.softlayer.resources_models import SoftLayerInstance
 from ibm.tasks.celery_app import celery_app as celery
 from ibm.tasks.common.tasks_base import IBMWorkflowTasksBase
 from ibm.tasks.ibm.consts import METRICS, METRICS_FOR_IDLE_INSTANCES, MONITORING_INSTANCE_URL
-from ibm.tasks.ibm.recommendations.consts import LOWEST_INSTANCE_PROFILE
-from ibm.tasks.ibm.recommendations.utils import get_cost_saving_instance_profile
+from ibm.tasks.ibm.monitoring_utils import get_paging_progress, MonitoringDataError, MonitoringDataPager, \
+    set_paging_progress
+from ibm.tasks.ibm.recommendations.utils import reconcile_rightsizing_recommendations
 from ibm.tasks.ibm.task_utils import get_relative_time_seconds, load_previous_associated_resources, \
     return_complete_instance_json
 from ibm.web.common.data_migration.volume_extraction_utils import construct_user_data_script
@@ -1747,8 +1750,9 @@ def update_instance(workflow_task_id):
         LOGGER.success(f"IBMInstance successfully updated with ID {instance_resource_id}")
 
 
-@celery.task(name="get_vsi_usage_task", base=IBMWorkflowTasksBase)
-def get_vsi_usage_data(workflow_task_id):
+@celery.task(name="get_vsi_usage_task", base=IBMWorkflowTasksBase, bind=True,
+             max_retries=MonitoringConfig.SYSDIG_TASK_RETRIES)
+def get_vsi_usage_data(self, workflow_task_id):
     """
     Get usage for ibm vsi's using monitoring apis.
     """
@@ -1787,155 +1791,118 @@ def get_vsi_usage_data(workflow_task_id):
             return
 
         token = monitoring_token.token
+        paging_progress = get_paging_progress(workflow_task)
 
-    url = MONITORING_INSTANCE_URL.format(region_name=region_name)
-    monitoring_client = SdMonitorClient(sdc_url=url, token=token)
-    results = []
-    got_data = True
-    start_time = get_relative_time_seconds(month_count=3)
-    page_from = 0
-    page_to = 49
-    paging_range = page_from + page_to
-    while got_data:
-        ok, res = monitoring_client.get_data(metrics=METRICS, start_ts=start_time, paging={"from": page_from,
-                                                                                           "to": page_to,
-                                                                                           "latest": True})
-        if not ok:
-            with get_db_session() as db_session:
-                workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
-                if not workflow_task:
-                    return
-
-                if res == "'ibm_resource_name' is not a Sysdig metric: Metric not found":
-                    workflow_task.status = WorkflowTask.STATUS_SUCCESSFUL
-                    db_session.commit()
-                    return
-
-                if res == "status code 401":
-                    monitoring_token = db_session.query(IBMMonitoringToken).filter_by(region_id=region_id,
-                                                                                      token=token).first()
-                    if not monitoring_token:
-                        workflow_task.status = WorkflowTask.STATUS_FAILED
-                        workflow_task.message = f"IBMMonitoringToken region_id: '{region_id}', token:{token} not found"
-                        db_session.commit()
-                        LOGGER.fail(workflow_task.message)
-                        return
-
-                    monitoring_token.status = IBMMonitoringToken.STATUS_INVALID
+    pager = MonitoringDataPager(
+        url=MONITORING_INSTANCE_URL.format(region_name=region_name), token=token, metrics=METRICS,
+        start_ts=get_relative_time_seconds(month_count=3), page_from=paging_progress.get("next_from", 0),
+        page_size=paging_progress.get("page_size")
+    )
+    try:
+        with get_db_session() as db_session:
+            workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
+            if not workflow_task:
+                return
 
+            region = db_session.query(IBMRegion).filter_by(id=region_id).first()
+            if not region:
                 workflow_task.status = WorkflowTask.STATUS_FAILED
-                workflow_task.message = str(res)
+                workflow_task.message = f"IBMRegion '{workflow_task.resource_id}' not found"
                 db_session.commit()
-                LOGGER.info(workflow_task.message)
+                LOGGER.error(workflow_task.message)
                 return
 
-        if not res.get('data'):
-            got_data = False
-            continue
-        if len(res.get('data')) < paging_range:
-            got_data = False
+            cloud_id = region.cloud_id
+            instances = dict()
+            for instance_id, instance_name, resource_id, instance_profile_id in db_session.query(
+                    IBMInstance.id, IBMInstance.name, IBMInstance.resource_id, IBMInstance.instance_profile_id
+            ).filter_by(region_id=region_id).all():
+                instances[instance_name] = (instance_id, resource_id, instance_profile_id)
+
+            region_instance_ids = select(IBMInstance.id).where(IBMInstance.region_id == region_id)
+            instance_profiles = {
+                instance_profile.id: instance_profile for instance_profile in db_session.query(
+                    IBMInstanceProfile).filter(IBMInstanceProfile.id.in_(
+                        select(IBMInstance.instance_profile_id).where(IBMInstance.region_id == region_id))).all()
+            }
+            idle_instance_ids = {
+                db_resource_id for db_resource_id, in db_session.query(IBMIdleResource.db_resource_id).filter_by(
+                    cloud_id=cloud_id).filter(IBMIdleResource.db_resource_id.in_(region_instance_ids)).all()
+            }
+            recommendations = {
+                instance_id: (recommendation_id, recommended_instance_type, recommended_instance_resource_details)
+                for recommendation_id, instance_id, recommended_instance_type, recommended_instance_resource_details
+                in db_session.query(
+                    IBMRightSizingRecommendation.id, IBMRightSizingRecommendation.instance_id,
+                    IBMRightSizingRecommendation.recommended_instance_type,
+                    IBMRightSizingRecommendation.recommended_instance_resource_details
+                ).filter_by(cloud_id=cloud_id).filter(
+                    IBMRightSizingRecommendation.instance_id.in_(region_instance_ids)).all()
+            }
 
-        results.append(res)
-        page_from = page_to + 1,
-        page_to = paging_range
+            # rows are processed page by page as they are fetched, the offset to resume from is committed with them
+            for rows, next_from in pager.pages():
+                reconcile_rightsizing_recommendations(
+                    db_session=db_session, cloud_id=cloud_id, region_name=region_name, usage_rows=rows,
+                    instances=instances, instance_profiles=instance_profiles, idle_instance_ids=idle_instance_ids,
+                    recommendations=recommendations
+                )
+                set_paging_progress(workflow_task, {"next_from": next_from, "page_size": pager.page_size})
+                db_session.commit()
 
-    with get_db_session() as db_session:
-        workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
-        if not workflow_task:
-            return
+            deleted = db_session.query(IBMRightSizingRecommendation).filter(
+                IBMRightSizingRecommendation.cloud_id == cloud_id, IBMRightSizingRecommendation.region == region_name,
+                IBMRightSizingRecommendation.instance_id.notin_(region_instance_ids)
+            ).delete(synchronize_session=False)
+            apply_resource_summary_deltas(db_session.connection(), {
+                (cloud_id, IBMRightSizingRecommendation.__name__): [-deleted, 0.0]
+            })
 
-        region = db_session.query(IBMRegion).filter_by(id=region_id).first()
-        if not region:
-            workflow_task.status = WorkflowTask.STATUS_FAILED
-            workflow_task.message = f"IBMRegion '{workflow_task.resource_id}' not found"
+            set_paging_progress(workflow_task)
+            workflow_task.status = WorkflowTask.STATUS_SUCCESSFUL
             db_session.commit()
-            LOGGER.error(workflow_task.message)
-            return
-
-        cloud = region.ibm_cloud
-        instances_name_obj_dict = dict()
-        instances_id_obj_dict = dict()
-        existing_instances = db_session.query(IBMInstance).filter_by(region_id=region_id).all()
-        for instance in existing_instances:
-            instances_name_obj_dict[instance.name] = instance
-            instances_id_obj_dict[instance.id] = instance
-
-        for res in results:
-            for d in res.get("data", []):
-                instance = instances_name_obj_dict.get(d['d'][0])
-                if not instance:
-                    LOGGER.error(f"Instance with name {d['d'][0]} not found in region {region_name}")
-                    continue
-
-                usage = {
-                    "cpu_usage_percentage": {"avg": f"{d['d'][1]}"},
-                    "memory_usage_percentage": {"avg": f"{d['d'][2]}"}
-                }  # TODO: this can be done dynamically. will do it later.
-                instance.usage = usage
-
-                if instance.instance_profile.name == LOWEST_INSTANCE_PROFILE:
-                    continue
-
-                if db_session.query(IBMIdleResource).filter_by(cloud_id=cloud.id, db_resource_id=instance.id).first():
-                    continue
-
-                low_memory_usage, low_cpu_usage = False, False
-                if float(usage['cpu_usage_percentage']['avg']) <= 20:
-                    low_cpu_usage = True
-                if float(usage['memory_usage_percentage']['avg']) <= 45:
-                    low_memory_usage = True
-
-                existing = db_session.query(IBMRightSizingRecommendation).filter_by(
-                    cloud_id=cloud.id, instance_id=instance.id).first()
-                if low_memory_usage or low_cpu_usage:
-                    recommended_instance_profile = get_cost_saving_instance_profile(
-                        instance.instance_profile, low_memory_usage, low_cpu_usage)
-                    if not recommended_instance_profile:
-                        if existing:
-                            db_session.delete(existing)
-                        continue
-                    if recommended_instance_profile == instance.instance_profile.name:
-                        if existing:
-                            db_session.delete(existing)
-                        continue
+            bump_cost_data_generation(cloud_id)
+    except MonitoringDataError as ex:
+        # the task stays running, the retry resumes from the paging progress committed so far
+        if ex.retryable and self.request.retries < self.max_retries:
+            LOGGER.info(f"Monitoring data of region {region_name} unavailable, retrying: {ex.message}")
+            raise self.retry(countdown=MonitoringConfig.SYSDIG_TASK_RETRY_DELAY)
 
-                    current_instance_resource_details = {'memory': instance.instance_profile.memory['value'],
-                                                         'vcpu': instance.instance_profile.vcpu_count['value']}
-                    recommended_instance_profile_split = recommended_instance_profile.split('-')[1].split('x')
-                    vcpu, memory = recommended_instance_profile_split[0], recommended_instance_profile_split[1]
-                    recommended_instance_resource_details = {'memory': memory, 'vcpu': vcpu}
-                    rightsizing_recommendation = IBMRightSizingRecommendation(
-                        region=region_name, current_instance_type=instance.instance_profile.name,
-                        current_instance_resource_details=current_instance_resource_details,
-                        recommended_instance_resource_details=recommended_instance_resource_details,
-                        monthly_cost=0.0, resource_id=instance.resource_id,
-                        estimated_monthly_cost=0.0, estimated_monthly_savings=0.0,
-                        recommended_instance_type=recommended_instance_profile)
-
-                    if existing:
-                        existing.update_db(rightsizing_recommendation)
-                    else:
-                        rightsizing_recommendation.ibm_instance = instance
-                        rightsizing_recommendation.ibm_cloud = cloud
-                elif existing:
-                    db_session.delete(existing)
+        with get_db_session() as db_session:
+            workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
+            if not workflow_task:
+                return
 
+            if ex.message == "'ibm_resource_name' is not a Sysdig metric: Metric not found":
+                set_paging_progress(workflow_task)
+                workflow_task.status = WorkflowTask.STATUS_SUCCESSFUL
                 db_session.commit()
+                return
 
-        stale_recommendations = db_session.query(IBMRightSizingRecommendation).filter_by(cloud_id=cloud.id,
-                                                                                         region=region_name).filter(
-            IBMRightSizingRecommendation.instance_id.notin_(instances_id_obj_dict)).all()
-        for stale_recommendation in stale_recommendations:
-            db_session.delete(stale_recommendation)
+            if ex.message == "status code 401":
+                monitoring_token = db_session.query(IBMMonitoringToken).filter_by(region_id=region_id,
+                                                                                  token=token).first()
+                if not monitoring_token:
+                    workflow_task.status = WorkflowTask.STATUS_FAILED
+                    workflow_task.message = f"IBMMonitoringToken region_id: '{region_id}', token:{token} not found"
+                    db_session.commit()
+                    LOGGER.fail(workflow_task.message)
+                    return
 
-        workflow_task.status = WorkflowTask.STATUS_SUCCESSFUL
-        db_session.commit()
+                monitoring_token.status = IBMMonitoringToken.STATUS_INVALID
+
+            workflow_task.status = WorkflowTask.STATUS_FAILED
+            workflow_task.message = ex.message
+            db_session.commit()
+            LOGGER.info(workflow_task.message)
+            return
 
     LOGGER.success(f"Usage in region {region_name} has been gathered successfully")
 
 
-@celery.task(name="get_idle_instances", base=IBMWorkflowTasksBase)
-def get_idle_instances(workflow_task_id):
+@celery.task(name="get_idle_instances", base=IBMWorkflowTasksBase, bind=True,
+             max_retries=MonitoringConfig.SYSDIG_TASK_RETRIES)
+def get_idle_instances(self, workflow_task_id):
     """
     Get usage for ibm vsi's using monitoring apis.
     """
@@ -1973,115 +1940,116 @@ def get_idle_instances(workflow_task_id):
             return
 
         token = monitoring_token.token
+        paging_progress = get_paging_progress(workflow_task)
 
-    url = MONITORING_INSTANCE_URL.format(region_name=region_name)
-    monitoring_client = SdMonitorClient(sdc_url=url, token=token)
-    results = []
-    got_data = True
-    start_time = get_relative_time_seconds(days_count=14)
-    page_from = 0
-    page_to = 49
-    paging_range = page_from + page_to
-    while got_data:
-        ok, res = monitoring_client.get_data(metrics=METRICS_FOR_IDLE_INSTANCES, start_ts=start_time,
-                                             paging={"from": page_from, "to": page_to, "latest": True})
-        if not ok:
-            with get_db_session() as db_session:
-                workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
-                if not workflow_task:
-                    return
-
-                if res == "status code 401":
-                    monitoring_token = db_session.query(IBMMonitoringToken).filter_by(region_id=region_id,
-                                                                                      token=token).first()
-                    if not monitoring_token:
-                        workflow_task.status = WorkflowTask.STATUS_FAILED
-                        workflow_task.message = f"IBMMonitoringToken region_id: '{region_id}', token:{token} not found"
-                        db_session.commit()
-                        LOGGER.info(workflow_task.message)
-                        return
-
-                    monitoring_token.status = IBMMonitoringToken.STATUS_INVALID
+    pager = MonitoringDataPager(
+        url=MONITORING_INSTANCE_URL.format(region_name=region_name), token=token, metrics=METRICS_FOR_IDLE_INSTANCES,
+        start_ts=get_relative_time_seconds(days_count=14), page_from=paging_progress.get("next_from", 0),
+        page_size=paging_progress.get("page_size")
+    )
+    # idle resources of instances still idle, found by the runs of the task so far
+    still_idle_rids = set(paging_progress.get("still_idle_rids", []))
+    try:
+        with get_db_session() as db_session:
+            workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
+            if not workflow_task:
+                return
 
+            region = db_session.query(IBMRegion).filter_by(id=region_id).first()
+            if not region:
                 workflow_task.status = WorkflowTask.STATUS_FAILED
-                workflow_task.message = str(res)
+                workflow_task.message = f"IBMRegion '{workflow_task.resource_id}' not found"
                 db_session.commit()
                 LOGGER.info(workflow_task.message)
                 return
 
-        if not res.get('data'):
-            got_data = False
-            continue
-        if len(res.get('data')) < paging_range:
-            got_data = False
+            cloud = region.ibm_cloud
+            instances_name_obj_dict = dict()
+            instances_id_obj_dict = dict()
+            idle_resources_rids = dict()
+            db_idle_resources = db_session.query(IBMIdleResource).filter_by(
+                cloud_id=cloud.id, region_id=region.id, source_type=IBMIdleResource.SOURCE_DISCOVERY,
+                resource_type=IBMInstance.__tablename__).all()
+            for db_idle_resource in db_idle_resources:
+                if db_idle_resource.db_resource_id not in still_idle_rids:
+                    idle_resources_rids[db_idle_resource.db_resource_id] = db_idle_resource
+
+            existing_instances = db_session.query(IBMInstance).filter_by(region_id=region_id).all()
+            for instance in existing_instances:
+                instances_name_obj_dict[instance.name] = instance
+                instances_id_obj_dict[instance.id] = instance
+
+            # rows are processed page by page as they are fetched, the offset to resume from is committed with them
+            for rows, next_from in pager.pages():
+                for d in rows:
+                    try:
+                        instance = instances_name_obj_dict.get(d['d'][0])
+                        if not instance:
+                            LOGGER.info(f"Instance with name {d['d'][0]} not found in region {region_name}")
+                            continue
+
+                        cpu_utilization = float(d['d'][1])
+                        in_network_traffic_bytes = float(d['d'][2])
+                        out_network_traffic_bytes = float(d['d'][3])
+                    except (ValueError, KeyError) as ex:
+                        LOGGER.debug(f"Exception raised while parsing : {ex} \n Data: {d}")
+                        continue
 
-        results.append(res)
-        page_from = page_to + 1,
-        page_to = paging_range
+                    if cpu_utilization <= 1 and ((in_network_traffic_bytes / (1024 * 1024)) +
+                                                 (out_network_traffic_bytes / (1024 * 1024))) <= 5:
+                        idle_resource = db_session.query(IBMIdleResource).filter_by(
+                            db_resource_id=instance.id).first()
+                        if not idle_resource:
+                            new_idle_resource = IBMIdleResource(
+                                db_resource_id=instance.id,
+                                source_type=IBMIdleResource.SOURCE_DISCOVERY,
+                                resource_type=instance.__tablename__,
+                                resource_json=instance.to_idle_json(session=db_session),
+                                reason="CPU Utilization is less than 1% and Network Traffic less than 5MB"
+                            )
+                            new_idle_resource.ibm_cloud = cloud
+                            new_idle_resource.region = region
+                            still_idle_rids.add(instance.id)
+                        else:
+                            idle_resource.update_db(instance, db_session)
+                            idle_resources_rids.pop(idle_resource.db_resource_id, None)
+                            still_idle_rids.add(idle_resource.db_resource_id)
+
+                set_paging_progress(workflow_task, {
+                    "next_from": next_from, "page_size": pager.page_size, "still_idle_rids": sorted(still_idle_rids)
+                })
+                db_session.commit()
 
-    with get_db_session() as db_session:
-        workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
-        if not workflow_task:
-            return
+            for idle_resource in idle_resources_rids.values():
+                db_session.delete(idle_resource)
 
-        region = db_session.query(IBMRegion).filter_by(id=region_id).first()
-        if not region:
-            workflow_task.status = WorkflowTask.STATUS_FAILED
-            workflow_task.message = f"IBMRegion '{workflow_task.resource_id}' not found"
+            set_paging_progress(workflow_task)
+            workflow_task.status = WorkflowTask.STATUS_SUCCESSFUL
             db_session.commit()
-            LOGGER.info(workflow_task.message)
-            return
+    except MonitoringDataError as ex:
+        # the task stays running, the retry resumes from the paging progress committed so far
+        if ex.retryable and self.request.retries < self.max_retries:
+            LOGGER.info(f"Monitoring data of region {region_name} unavailable, retrying: {ex.message}")
+            raise self.retry(countdown=MonitoringConfig.SYSDIG_TASK_RETRY_DELAY)
 
-        cloud = region.ibm_cloud
-        instances_name_obj_dict = dict()
-        instances_id_obj_dict = dict()
-        idle_resources_rids = dict()
-        db_idle_resources = db_session.query(IBMIdleResource).filter_by(cloud_id=cloud.id, region_id=region.id,
-                                                                        source_type=IBMIdleResource.SOURCE_DISCOVERY,
-                                                                        resource_type=IBMInstance.__tablename__).all()
-        for db_idle_resource in db_idle_resources:
-            idle_resources_rids[db_idle_resource.db_resource_id] = db_idle_resource
-
-        existing_instances = db_session.query(IBMInstance).filter_by(region_id=region_id).all()
-        for instance in existing_instances:
-            instances_name_obj_dict[instance.name] = instance
-            instances_id_obj_dict[instance.id] = instance
-
-        for res in results:
-            for d in res.get("data", []):
-                try:
-                    instance = instances_name_obj_dict.get(d['d'][0])
-                    if not instance:
-                        LOGGER.info(f"Instance with name {d['d'][0]} not found in region {region_name}")
-                        continue
+        with get_db_session() as db_session:
+            workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
+            if not workflow_task:
+                return
 
-                    cpu_utilization = float(d['d'][1])
-                    in_network_traffic_bytes = float(d['d'][2])
-                    out_network_traffic_bytes = float(d['d'][3])
-                except (ValueError, KeyError) as ex:
-                    LOGGER.debug(f"Exception raised while parsing : {ex} \n Data: {res}")
-                    continue
-
-                if cpu_utilization <= 1 and \
-                        ((in_network_traffic_bytes / (1024 * 1024)) + (out_network_traffic_bytes / (1024 * 1024))) <= 5:
-                    idle_resource = db_session.query(IBMIdleResource).filter_by(db_resource_id=instance.id).first()
-                    if not idle_resource:
-                        new_idle_resource = IBMIdleResource(
-                            db_resource_id=instance.id,
-                            source_type=IBMIdleResource.SOURCE_DISCOVERY,
-                            resource_type=instance.__tablename__,
-                            resource_json=instance.to_idle_json(session=db_session),
-                            reason="CPU Utilization is less than 1% and Network Traffic less than 5MB"
-                        )
-                        new_idle_resource.ibm_cloud = cloud
-                        new_idle_resource.region = region
-                    else:
-                        idle_resources_rids[idle_resource.db_resource_id].update_db(instance, db_session)
-                        del idle_resources_rids[idle_resource.db_resource_id]
-
-        for idle_resource in idle_resources_rids.values():
-            db_session.delete(idle_resource)
-            db_session.commit()
+            if ex.message == "status code 401":
+                monitoring_token = db_session.query(IBMMonitoringToken).filter_by(region_id=region_id,
+                                                                                  token=token).first()
+                if not monitoring_token:
+                    workflow_task.status = WorkflowTask.STATUS_FAILED
+                    workflow_task.message = f"IBMMonitoringToken region_id: '{region_id}', token:{token} not found"
+                    db_session.commit()
+                    LOGGER.info(workflow_task.message)
+                    return
 
-        workflow_task.status = WorkflowTask.STATUS_SUCCESSFUL
-        db_session.commit()
+                monitoring_token.status = IBMMonitoringToken.STATUS_INVALID
+
+            workflow_task.status = WorkflowTask.STATUS_FAILED
+            workflow_task.message = ex.message
+            db_session.commit()
+            LOGGER.info(workflow_task.message)
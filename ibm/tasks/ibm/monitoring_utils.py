@@ -0,0 +1,203 @@
+"""
+Paging through the rows (one per entity, e.g. instance) a query of the Sysdig data API of IBM Cloud Monitoring returns.
+
+Pages are windows of consecutive rows requested with `paging` {"from", "to"} (both inclusive). A few of them are
+fetched at the same time, under a rate limit shared by the worker process, and handed over in row order as soon as all
+the rows before them were, so callers process the rows while paging and can persist the offset to resume from. The
+first page with less rows than requested is the last one.
+"""
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from sdcclient import SdMonitorClient
+
+from config import MonitoringConfig
+from ibm.common.rate_limiter import TokenBucketRateLimiter
+
+LOGGER = logging.getLogger(__name__)
+
+# full pages in a row after which the page size is doubled
+PAGE_SIZE_GROWTH_STREAK = 4
+# key of the paging progress in the task_metadata of workflow tasks
+PAGING_PROGRESS_KEY = "monitoring_paging"
+
+monitoring_rate_limiter = TokenBucketRateLimiter(rate=MonitoringConfig.SYSDIG_RATE_LIMIT)
+
+
+class MonitoringDataError(Exception):
+    """
+    Error returned by the Sysdig data API, `message` is the error of SdMonitorClient
+    """
+
+    def __init__(self, message, retryable=False):
+        self.message = message
+        self.retryable = retryable
+        super(MonitoringDataError, self).__init__(message)
+
+
+def is_retryable_error(error):
+    """
+    Server side errors and throttling are worth retrying, the other ones (auth, unknown metric..) are not
+    :param error: error string returned by SdMonitorClient
+    """
+    error = str(error)
+    return error.startswith("status code 5") or error == "status code 429"
+
+
+class MonitoringDataPager:
+    """
+    Fetch the pages of a Sysdig data query concurrently and yield their rows in order.
+
+    A page failing with a retryable error is split in halves which are refetched after a backoff, and the size of the
+    next pages is halved too; the page size grows back, up to SYSDIG_MAX_PAGE_SIZE, after a streak of full pages.
+    """
+
+    def __init__(self, url, token, metrics, start_ts, page_from=0, page_size=None, concurrency=None):
+        """
+        :param url: Sysdig endpoint of the region
+        :param token: monitoring token of the region
+        :param metrics: metrics of the query, see SdMonitorClient.get_data
+        :param start_ts: start of the data window, negative for relative to now
+        :param page_from: offset of the first row to fetch, to resume paging
+        :param page_size: rows per page to start with
+        :param concurrency: pages fetched at the same time
+        """
+        self.url = url
+        self.token = token
+        self.metrics = metrics
+        self.start_ts = start_ts
+        self.page_from = page_from
+        self.page_size = min(max(page_size or MonitoringConfig.SYSDIG_PAGE_SIZE, MonitoringConfig.SYSDIG_MIN_PAGE_SIZE),
+                             MonitoringConfig.SYSDIG_MAX_PAGE_SIZE)
+        self.concurrency = max(concurrency or MonitoringConfig.SYSDIG_PAGING_CONCURRENCY, 1)
+        self.__clients = threading.local()
+
+    def __get_client(self):
+        # requests sessions are not meant to be shared between threads, every fetching thread gets its own client
+        client = getattr(self.__clients, "client", None)
+        if not client:
+            client = self.__clients.client = SdMonitorClient(sdc_url=self.url, token=self.token)
+
+        return client
+
+    def fetch_page(self, page_from, page_size, attempt=1):
+        """
+        Fetch a page, waiting for the rate limiter (and a backoff when it is retried)
+        :return: <list> of rows
+        :raises MonitoringDataError: if the API returned an error
+        """
+        if attempt > 1:
+            time.sleep(min(2 ** (attempt - 1), 30))
+
+        monitoring_rate_limiter.acquire()
+        try:
+            ok, res = self.__get_client().get_data(
+                metrics=self.metrics, start_ts=self.start_ts,
+                paging={"from": page_from, "to": page_from + page_size - 1, "latest": True}
+            )
+        except requests.RequestException as ex:
+            raise MonitoringDataError(str(ex), retryable=True)
+
+        if not ok:
+            raise MonitoringDataError(str(res), retryable=is_retryable_error(res))
+
+        return res.get("data") or []
+
+    def pages(self):
+        """
+        Yield the pages in row order
+        :return: generator of (<list> of rows, offset of the row following them)
+        :raises MonitoringDataError: on a non retryable error, or when a page ran out of attempts
+        """
+        next_from = self.page_from  # first row not yielded yet
+        next_window_from = self.page_from  # first row not requested yet
+        rows_count = None  # known once the last page is fetched
+        full_pages_streak = 0
+        # windows are (page_from, page_size, attempt)
+        retried_windows = []
+        fetching_windows = {}
+        fetched_pages = []  # heap of (page_from, rows)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            try:
+                while rows_count is None or next_from < rows_count:
+                    while len(fetching_windows) < self.concurrency:
+                        if retried_windows:
+                            window = retried_windows.pop()
+                            if rows_count is not None and window[0] >= rows_count:
+                                continue
+                        elif rows_count is None and len(fetching_windows) + len(fetched_pages) < 2 * self.concurrency:
+                            window = (next_window_from, self.page_size, 1)
+                            next_window_from += self.page_size
+                        else:
+                            break
+
+                        fetching_windows[executor.submit(self.fetch_page, *window)] = window
+
+                    done, _ = wait(fetching_windows, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        page_from, page_size, attempt = fetching_windows.pop(future)
+                        if rows_count is not None and page_from >= rows_count:
+                            continue
+
+                        try:
+                            rows = future.result()
+                        except MonitoringDataError as ex:
+                            if not ex.retryable or attempt >= MonitoringConfig.SYSDIG_PAGE_ATTEMPTS:
+                                raise
+
+                            LOGGER.info(f"Page {page_from}+{page_size} of {self.url} failed, retrying. Trace: {ex}")
+                            self.page_size = max(self.page_size // 2, MonitoringConfig.SYSDIG_MIN_PAGE_SIZE)
+                            full_pages_streak = 0
+                            if page_size >= 2 * MonitoringConfig.SYSDIG_MIN_PAGE_SIZE:
+                                half = page_size // 2
+                                retried_windows.append((page_from + half, page_size - half, attempt + 1))
+                                retried_windows.append((page_from, half, attempt + 1))
+                            else:
+                                retried_windows.append((page_from, page_size, attempt + 1))
+                            continue
+
+                        if len(rows) < page_size:
+                            rows_count = min(rows_count, page_from + len(rows)) if rows_count is not None \
+                                else page_from + len(rows)
+                        else:
+                            full_pages_streak += 1
+                            if full_pages_streak >= PAGE_SIZE_GROWTH_STREAK:
+                                self.page_size = min(self.page_size * 2, MonitoringConfig.SYSDIG_MAX_PAGE_SIZE)
+                                full_pages_streak = 0
+
+                        heapq.heappush(fetched_pages, (page_from, rows))
+
+                    while fetched_pages and fetched_pages[0][0] == next_from:
+                        page_from, rows = heapq.heappop(fetched_pages)
+                        next_from = page_from + len(rows)
+                        yield rows, next_from
+            finally:
+                for future in fetching_windows:
+                    future.cancel()
+
+
+def get_paging_progress(workflow_task):
+    """
+    Paging progress saved by a previous run of a workflow task
+    :return: <dict> with "next_from", "page_size" and whatever the task saved along, empty if starting over
+    """
+    return dict((workflow_task.task_metadata or {}).get(PAGING_PROGRESS_KEY) or {})
+
+
+def set_paging_progress(workflow_task, progress=None):
+    """
+    Save the paging progress of a workflow task, commit it with the processing of the rows it accounts for
+    :param progress: <dict> from `get_paging_progress`, None to clear it
+    """
+    task_metadata = dict(workflow_task.task_metadata or {})
+    if progress:
+        task_metadata[PAGING_PROGRESS_KEY] = progress
+    else:
+        task_metadata.pop(PAGING_PROGRESS_KEY, None)
+
+    workflow_task.task_metadata = task_metadata
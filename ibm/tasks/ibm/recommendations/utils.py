@@ -1,24 +1,24 @@
 import math
+import uuid
+from datetime import datetime
+from types import MappingProxyType
 
+from ibm import LOGGER
 from ibm.common.clients.softlayer_clients.instances.consts import BALANCED_INSTANCE_PROFILE_NAME, \
     COMPUTE_INSTANCE_PROFILE_NAME, MEMORY_INSTANCE_PROFILE_NAME
-from .consts import ALLOWED_THRESHOLD, LOWEST_INSTANCE_PROFILE, VPC_GEN2_INSTANCE_PROFILES_COST_SHEET
+from ibm.common.consts import POTENTIAL_COST_SAVINGS
+from ibm.common.cost_utils import get_latest_cost_id, update_rightsizing_recommendations_cost
+from ibm.common.resource_summaries import apply_resource_summary_deltas
+from ibm.common.utils import calculate_average
+from ibm.models import IBMInstance, IBMRightSizingRecommendation
 from ibm.models.ibm.instance_models import IBMInstanceProfile
+from .consts import ALLOWED_THRESHOLD, LOWEST_INSTANCE_PROFILE
 
 
-def get_cost_saving_instance_profile(instance_profile, low_memory_usage=False, low_cpu_usage=False):
+def compute_cost_saving_instance_profile(memory, cpu, low_memory_usage=False, low_cpu_usage=False):
     """
-    Recommend instance profile which best suits the requirements of application and save costs accordingly.
+    Downsized instance profile for the memory (GB) and vCPUs of an instance profile, None if there is none
     """
-
-    if isinstance(instance_profile, IBMInstanceProfile):
-        memory_dict, cpu_dict = instance_profile.memory, instance_profile.vcpu_count
-        memory = memory_dict['value']
-        cpu = cpu_dict['value']
-    else:
-        memory, cpu = instance_profile.max_memory, instance_profile.max_cpu
-        memory = math.ceil(memory / 1024)
-
     if low_memory_usage:
         index = ALLOWED_THRESHOLD.index(memory)
         memory = ALLOWED_THRESHOLD[index - 1]
@@ -47,13 +47,178 @@ def get_cost_saving_instance_profile(instance_profile, low_memory_usage=False, l
     return recommended_instance_profile
 
 
+# (memory GB, vCPUs, low memory usage, low cpu usage) -> downsized instance profile (None if there is none), for all
+# the sizes in ALLOWED_THRESHOLD
+COST_SAVING_INSTANCE_PROFILES = MappingProxyType({
+    (memory, cpu, low_memory_usage, low_cpu_usage): compute_cost_saving_instance_profile(
+        memory, cpu, low_memory_usage, low_cpu_usage)
+    for memory in ALLOWED_THRESHOLD for cpu in ALLOWED_THRESHOLD
+    for low_memory_usage in (False, True) for low_cpu_usage in (False, True)
+})
+
+
+def get_cost_saving_instance_profile(instance_profile, low_memory_usage=False, low_cpu_usage=False):
+    """
+    Recommend instance profile which best suits the requirements of application and save costs accordingly.
+    """
+
+    if isinstance(instance_profile, IBMInstanceProfile):
+        memory_dict, cpu_dict = instance_profile.memory, instance_profile.vcpu_count
+        memory = memory_dict['value']
+        cpu = cpu_dict['value']
+    else:
+        memory, cpu = instance_profile.max_memory, instance_profile.max_cpu
+        memory = math.ceil(memory / 1024)
+
+    try:
+        return COST_SAVING_INSTANCE_PROFILES[(memory, cpu, bool(low_memory_usage), bool(low_cpu_usage))]
+    except KeyError:
+        return compute_cost_saving_instance_profile(memory, cpu, low_memory_usage, low_cpu_usage)
+
+
+def reconcile_rightsizing_recommendations(db_session, cloud_id, region_name, usage_rows, instances, instance_profiles,
+                                          idle_instance_ids, recommendations):
+    """
+    Save the usage of the instances of monitoring usage rows and bring their rightsizing recommendations to the ones
+    the usage calls for, with bulk statements in the current transaction of the session
+    :param db_session: database session, the caller commits
+    :param cloud_id: database id of entry of table "Cloud"
+    :param region_name: name of the region of the instances
+    :param usage_rows: rows of the Sysdig data API, "d" being [instance name, avg cpu usage %, avg memory usage %]
+    :param instances: <dict> instance name -> (id, resource_id, instance_profile_id) of the instances of the region
+    :param instance_profiles: <dict> instance profile id -> IBMInstanceProfile
+    :param idle_instance_ids: <set> of ids of the instances which are idle resources, their recommendations are left as
+        they are
+    :param recommendations: <dict> instance id -> (id, recommended_instance_type,
+        recommended_instance_resource_details) of the existing recommendations, kept up to date
+    """
+    instance_usages, new_recommendations, updated_recommendations, deleted_recommendation_ids = [], [], [], []
+    for d in usage_rows:
+        instance = instances.get(d['d'][0])
+        if not instance:
+            LOGGER.error(f"Instance with name {d['d'][0]} not found in region {region_name}")
+            continue
+
+        instance_id, resource_id, instance_profile_id = instance
+        usage = {
+            "cpu_usage_percentage": {"avg": f"{d['d'][1]}"},
+            "memory_usage_percentage": {"avg": f"{d['d'][2]}"}
+        }
+        instance_usages.append({"id": instance_id, "usage": usage})
+
+        instance_profile = instance_profiles.get(instance_profile_id)
+        if not instance_profile or instance_profile.name == LOWEST_INSTANCE_PROFILE or \
+                instance_id in idle_instance_ids:
+            continue
+
+        low_cpu_usage = float(usage['cpu_usage_percentage']['avg']) <= 20
+        low_memory_usage = float(usage['memory_usage_percentage']['avg']) <= 45
+        recommended_instance_profile = None
+        if low_memory_usage or low_cpu_usage:
+            recommended_instance_profile = get_cost_saving_instance_profile(
+                instance_profile, low_memory_usage, low_cpu_usage)
+
+        existing = recommendations.get(instance_id)
+        if not recommended_instance_profile or recommended_instance_profile == instance_profile.name:
+            if existing:
+                deleted_recommendation_ids.append(existing[0])
+                del recommendations[instance_id]
+            continue
+
+        vcpu, memory = recommended_instance_profile.split('-')[1].split('x')
+        recommended_instance_resource_details = {'memory': memory, 'vcpu': vcpu}
+        if existing:
+            if (existing[1], existing[2]) != (recommended_instance_profile, recommended_instance_resource_details):
+                updated_recommendations.append({
+                    "id": existing[0], "recommended_instance_type": recommended_instance_profile,
+                    "recommended_instance_resource_details": recommended_instance_resource_details
+                })
+                recommendations[instance_id] = \
+                    (existing[0], recommended_instance_profile, recommended_instance_resource_details)
+            continue
+
+        recommendation_id = str(uuid.uuid4().hex)
+        new_recommendations.append({
+            "id": recommendation_id, "region": region_name,
+            "current_instance_type": instance_profile.name,
+            "current_instance_resource_details": {
+                'memory': instance_profile.memory['value'], 'vcpu': instance_profile.vcpu_count['value']
+            },
+            "monthly_cost": 0.0, "resource_id": resource_id, "estimated_monthly_cost": 0.0,
+            "estimated_monthly_savings": 0.0, "recommended_instance_type": recommended_instance_profile,
+            "recommended_instance_resource_details": recommended_instance_resource_details,
+            "rightsizing_reason": "Underutilized", "created_at": datetime.utcnow(), "instance_id": instance_id,
+            "cloud_id": cloud_id
+        })
+        recommendations[instance_id] = (recommendation_id, recommended_instance_profile,
+                                        recommended_instance_resource_details)
+
+    if instance_usages:
+        db_session.bulk_update_mappings(IBMInstance, instance_usages)
+    if new_recommendations:
+        db_session.bulk_insert_mappings(IBMRightSizingRecommendation, new_recommendations)
+    if updated_recommendations:
+        db_session.bulk_update_mappings(IBMRightSizingRecommendation, updated_recommendations)
+    if deleted_recommendation_ids:
+        db_session.query(IBMRightSizingRecommendation).filter(
+            IBMRightSizingRecommendation.cloud_id == cloud_id,
+            IBMRightSizingRecommendation.id.in_(deleted_recommendation_ids)).delete(synchronize_session=False)
+
+    # the costs of new recommendations and of the ones recommending another profile are filled in from the latest
+    # billing month right away instead of at the next cost sync
+    refreshed_recommendation_ids = [recommendation["id"] for recommendation in new_recommendations] + \
+        [recommendation["id"] for recommendation in updated_recommendations]
+    latest_cost_id = get_latest_cost_id(cloud_id, db_session) if refreshed_recommendation_ids else None
+    if latest_cost_id:
+        update_rightsizing_recommendations_cost(cloud_id, db_session, latest_cost_id,
+                                                recommendation_ids=refreshed_recommendation_ids)
+
+    # bulk statements bypass the session, the dashboard count is kept in step in the same transaction
+    apply_resource_summary_deltas(db_session.connection(), {
+        (cloud_id, IBMRightSizingRecommendation.__name__): [
+            len(new_recommendations) - len(deleted_recommendation_ids), 0.0
+        ]
+    })
+
+
 def get_potential_cost_savings(instance_profile, recommended_instance_profile):
     """
     Get Potential Costs Savings in percentage for recommended profile
     """
-    instance_profile_cost = VPC_GEN2_INSTANCE_PROFILES_COST_SHEET[instance_profile]
-    recommended_instance_profile_cost = VPC_GEN2_INSTANCE_PROFILES_COST_SHEET[recommended_instance_profile]
-    return ((instance_profile_cost - recommended_instance_profile_cost) / instance_profile_cost) * 100
+    return POTENTIAL_COST_SAVINGS[(instance_profile, recommended_instance_profile)]
+
+
+def get_virtual_guest_usage(monitoring_client, guest, start_date, end_date):
+    """
+    Get memory, CPU and bandwidth usage of a virtual guest on Classic, averaged the way the recommendations expect them
+    :param monitoring_client: SoftlayerMonitoringClient of the account of the guest
+    :param guest: <dict> with "metricTrackingObjectId" and "startCpus" of the guest
+    :return: <dict> with "MEMORY_USAGE", "CPU_USAGE", "inbound_bandwidth_usage" and "outbound_bandwidth_usage"
+    """
+    memory_usage = calculate_average(
+        monitoring_client.get_memory_usage(guest=guest, start_date=start_date, end_date=end_date))
+    if memory_usage.get('memory_usage'):
+        memory_usage = round((memory_usage['memory_usage'] / (2 ** 30) * 1024), 2)
+
+    cpu_usage = calculate_average(
+        monitoring_client.get_cpu_usage_per_cpu(guest=guest, start_date=start_date, end_date=end_date))
+
+    inbound_usage, outbound_usage = 0, 0
+    inbound_usage_average = calculate_average(monitoring_client.get_bandwidth_usage(
+        guest=guest, start_date=start_date, end_date=end_date, bandwidth_type="INBOUND"))
+    outbound_usage_average = calculate_average(monitoring_client.get_bandwidth_usage(
+        guest=guest, start_date=start_date, end_date=end_date, bandwidth_type="OUTBOUND"))
+    if inbound_usage_average.get('publicIn_net_octet'):
+        inbound_usage = round((inbound_usage_average['publicIn_net_octet'] / (2 ** 30) * 1024), 2)
+    if outbound_usage_average.get('publicOut_net_octet'):
+        outbound_usage = round((outbound_usage_average['publicOut_net_octet'] / (2 ** 30) * 1024), 2)
+
+    return {
+        "MEMORY_USAGE": memory_usage,
+        "CPU_USAGE": cpu_usage,
+        "inbound_bandwidth_usage": inbound_usage,
+        "outbound_bandwidth_usage": outbound_usage
+    }
 
 
 def generate_network_gateway_recommendations(softlayer_network_gateway):
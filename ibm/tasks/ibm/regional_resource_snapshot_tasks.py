@@ -0,0 +1,20 @@
+from celery_singleton import Singleton
+
+from ibm import get_db_session, LOGGER
+from ibm.models import IBMRegion, IBMRegionalResourceSnapshot
+from ibm.tasks.celery_app import celery_app as celery
+
+
+@celery.task(name="refresh_ibm_regional_resource_snapshot", queue="sync_queue", base=Singleton)
+def refresh_ibm_regional_resource_snapshot(region_id):
+    """Regenerate the regional resource snapshot of a region marked stale by writes of its resources"""
+
+    with get_db_session() as db_session:
+        region = db_session.query(IBMRegion).filter_by(id=region_id).first()
+        if not region:
+            LOGGER.info(f"IBMRegion {region_id} not found")
+            return
+
+        snapshot = IBMRegionalResourceSnapshot.refresh(session=db_session, region=region)
+        if snapshot.is_stale:
+            LOGGER.info(f"Regional resource snapshot of region {region_id} written to while it was regenerated")
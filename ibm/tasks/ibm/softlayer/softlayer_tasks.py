@@ -5,19 +5,19 @@ from copy import deepcopy
 from ibm import get_db_session
 from ibm.common.clients.ibm_clients import KubernetesClient
 from ibm.common.clients.ibm_clients.exceptions import IBMExecuteError
-from ibm.common.clients.softlayer_clients import SoftlayerDedicateHostClient, SoftlayerInstanceClient, \
-    SoftlayerLoadBalancerClient, SoftlayerSecurityGroupClient, SoftlayerSshKeyClient, SoftlayerSubnetClient
-from ibm.common.clients.softlayer_clients.exceptions import SLAuthError, SLExecuteError, SLInvalidRequestError
-from ibm.common.clients.softlayer_clients.placement_groups import SoftlayerPlacementGroupClient
-from ibm.common.clients.softlayer_clients.vyatta56analyzer import Vyatta56Analyzer
+from ibm.common.clients.softlayer_clients import SoftlayerSubnetClient
+from ibm.common.clients.softlayer_clients.exceptions import SLAuthError, SLExecuteError, SLInvalidRequestError, \
+    SLRateLimitExceededError
+from ibm.common.clients.softlayer_clients.vyatta56analyzer import get_vyatta56_analyzer
 from ibm.common.utils import transform_ibm_name
 from ibm.models import IBMCloud, IBMKubernetesCluster, IBMKubernetesClusterWorkerPool, \
     IBMKubernetesClusterWorkerPoolZone, SoftlayerCloud, WorkflowTask, WorkflowsWorkspace
 from ibm.tasks.celery_app import celery_app as celery
 from ibm.tasks.common.tasks_base import IBMWorkflowTasksBase
-from ibm.tasks.common.utils import generate_ibm_vpc_schema
+from ibm.tasks.common.utils import IBM_VPC_SCHEMA_RESOURCE_TYPES, iter_ibm_vpc_schema
+from ibm.tasks.ibm.softlayer.utils import list_softlayer_resources
 from ibm.web.ibm.kubernetes.utils import Kubernetes
-from ibm.web.ibm.workspaces.utils import create_workspace_workflow
+from ibm.web.ibm.workspaces.utils import create_workspace_workflow_from_result_chunks
 
 LOGGER = logging.getLogger(__name__)
 
@@ -48,25 +48,13 @@ def sync_softlayer_resources_task(workflow_task_id):
             LOGGER.info(workflow_task.message)
             return
 
+        credentials_version = softlayer_cloud.credentials_version
         vpc_data = dict()
 
     try:
-        subnet_client = SoftlayerSubnetClient(cloud_id)
-        security_group_client = SoftlayerSecurityGroupClient(cloud_id)
-        instance_client = SoftlayerInstanceClient(cloud_id)
-        placement_group_client = SoftlayerPlacementGroupClient(cloud_id)
-        load_balancer_client = SoftlayerLoadBalancerClient(cloud_id)
-        dedicated_host_client = SoftlayerDedicateHostClient(cloud_id)
-        ssh_key_client = SoftlayerSshKeyClient(cloud_id)
-        vpc_data['subnets'] = subnet_client.list_private_subnets()
-        vpc_data['security_groups'] = security_group_client.list_security_groups()
-        vpc_data['instances'] = instance_client.list_virtual_servers(subnets=vpc_data["subnets"])
-        vpc_data["placement_groups"] = placement_group_client.list_placement_groups()
-        vpc_data['load_balancers'] = load_balancer_client.list_load_balancers(vs_instances=vpc_data['instances'])
-        vpc_data['dedicated_hosts'] = dedicated_host_client.list_dedicated_hosts()
-        vpc_data['ssh_keys'] = ssh_key_client.list_ssh_keys()
-
-    except (SLAuthError, SLExecuteError, SLInvalidRequestError) as ex:
+        vpc_data.update(list_softlayer_resources(cloud_id, credentials_version))
+
+    except (SLAuthError, SLExecuteError, SLInvalidRequestError, SLRateLimitExceededError) as ex:
         with get_db_session() as db_session:
             workflow_task = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
             if not workflow_task:
@@ -82,7 +70,7 @@ def sync_softlayer_resources_task(workflow_task_id):
     vy56_analyser = None
     if configs:
         LOGGER.info("Starting VRA discovery for VYATTA-5600 Config File")
-        vy56_analyser = Vyatta56Analyzer(configs)
+        vy56_analyser = get_vyatta56_analyzer(configs)
         vpc_data['firewalls'] = list()
         vpc_data['subnets'].extend(vy56_analyser.get_private_subnets())
         for subnet in vpc_data['subnets']:
@@ -96,7 +84,6 @@ def sync_softlayer_resources_task(workflow_task_id):
                 if vpn.peer_address in firewall.destination_addresses:
                     vpn.subnet = transform_ibm_name(subnet.name)
 
-    ported_schema = generate_ibm_vpc_schema(vpc_data, vy56_analyser, softlayer_cloud=cloud_id)
     with get_db_session() as db_session:
         workflow_task: WorkflowTask = db_session.query(WorkflowTask).filter_by(id=workflow_task_id).first()
         if not workflow_task:
@@ -104,15 +91,26 @@ def sync_softlayer_resources_task(workflow_task_id):
 
         # TODO: check the use for this method. revisit this later
         # discovered_schema = get_softlayer_schema(vpc_data)
-        if workflow_task.next_tasks.all():
-            workflow_task.result = ported_schema
-        else:
-            ported_schema["name"] = "wip-template"
-            workspace = create_workspace_workflow(user=user, data=ported_schema, db_session=db_session, sketch=True,
-                                                  source_cloud=WorkflowsWorkspace.SOFTLAYER,
-                                                  workspace_type=WorkflowsWorkspace.TYPE_SOFTLAYER)
+        # The schema is persisted a chunk at a time (flushed chunks are not kept in the session) rather than as a single
+        # result, the next tasks and the API read it lazily with WorkflowTask.iter_result_items
+        workflow_task.result_chunks.delete()
+        result_types = {resource_type: 0 for resource_type in IBM_VPC_SCHEMA_RESOURCE_TYPES}
+        schema_chunks = iter_ibm_vpc_schema(vpc_data, vy56_analyser, softlayer_cloud=cloud_id)
+        for chunk_index, (resource_type, resources) in enumerate(schema_chunks):
+            workflow_task.add_result_chunk(resource_type, chunk_index, resources)
+            db_session.flush()
+            result_types[resource_type] += len(resources)
+
+        workflow_task.set_chunked_result(result_types)
+        if not workflow_task.next_tasks.all():
+            del vpc_data
+            workspace = create_workspace_workflow_from_result_chunks(
+                user=user, workflow_task=workflow_task, name="wip-template", db_session=db_session, sketch=True,
+                source_cloud=WorkflowsWorkspace.SOFTLAYER, workspace_type=WorkflowsWorkspace.TYPE_SOFTLAYER)
+            # the workspace holds the schema now, its resources are read from it
+            workflow_task.result_chunks.delete()
             workflow_task.result = {
-                "resource_json": json.dumps(workspace.to_json(), default=str)
+                "resource_json": json.dumps(workspace.to_reference_json(), default=str)
             }
         workflow_task.status = WorkflowTask.STATUS_SUCCESSFUL
         db_session.commit()
@@ -0,0 +1,87 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tenacity import retry_if_exception, Retrying, stop_after_attempt, wait_random_exponential
+
+from config import SoftlayerConfig
+from ibm.common.clients.softlayer_clients import SoftlayerDedicateHostClient, SoftlayerInstanceClient, \
+    SoftlayerLoadBalancerClient, SoftlayerSecurityGroupClient, SoftlayerSshKeyClient, SoftlayerSubnetClient
+from ibm.common.clients.softlayer_clients.consts import BACK_OFF_FACTOR, MAX_INTERVAL
+from ibm.common.clients.softlayer_clients.exceptions import SLExecuteError, SLRateLimitExceededError
+from ibm.common.clients.softlayer_clients.placement_groups import SoftlayerPlacementGroupClient
+
+LOGGER = logging.getLogger(__name__)
+
+
+def is_retryable_softlayer_error(ex):
+    """
+    :return: <bool> whether a SoftLayer call failed on the rate limit or on the transport, and may succeed again
+    """
+    return isinstance(ex, SLRateLimitExceededError) or (isinstance(ex, SLExecuteError) and ex.is_transport_error)
+
+
+def call_softlayer_listing(client, name, *args, **kwargs):
+    """
+    Call a listing of a SoftLayer client, retrying it on its own when it fails with a rate limit or transport error.
+    The clients convert the errors of their API calls without retrying them, this is the only retry of the listings.
+    :param client: SoftLayer client of the account
+    :param name: name of the listing method of the client
+    """
+    listing = getattr(client, name)
+    started_at = time.monotonic()
+    for attempt in Retrying(
+            stop=stop_after_attempt(SoftlayerConfig.SOFTLAYER_SYNC_ATTEMPTS),
+            retry=retry_if_exception(is_retryable_softlayer_error),
+            wait=wait_random_exponential(multiplier=BACK_OFF_FACTOR, max=MAX_INTERVAL),
+            reraise=True):
+        with attempt:
+            if attempt.retry_state.attempt_number > 1:
+                LOGGER.info(f"Retrying Softlayer listing '{name}', attempt {attempt.retry_state.attempt_number}")
+            result = listing(*args, **kwargs)
+
+    LOGGER.debug(f"Softlayer listing '{name}' took {time.monotonic() - started_at:.2f}s")
+    return result
+
+
+def list_softlayer_resources(cloud_id, credentials_version=None):
+    """
+    List the resources of a Softlayer Cloud the VPC schema is generated from, the independent listings concurrently
+    (the API calls of the account share its rate limiter)
+    :param cloud_id: database id of entry of table "SoftlayerCloud"
+    :param credentials_version: SoftlayerCloud.credentials_version, so the listings do not each read the account
+    :return: <dict> with "subnets", "security_groups", "instances", "placement_groups", "load_balancers",
+    "dedicated_hosts" and "ssh_keys"
+    """
+
+    def list_subnets_instances_load_balancers():
+        # instances are attached the listed subnet objects, and load balancers the listed instances
+        subnets = call_softlayer_listing(
+            SoftlayerSubnetClient(cloud_id, credentials_version), "list_private_subnets")
+        instances = call_softlayer_listing(
+            SoftlayerInstanceClient(cloud_id, credentials_version), "list_virtual_servers", subnets=subnets)
+        load_balancers = call_softlayer_listing(
+            SoftlayerLoadBalancerClient(cloud_id, credentials_version), "list_load_balancers", vs_instances=instances)
+        return {"subnets": subnets, "instances": instances, "load_balancers": load_balancers}
+
+    with ThreadPoolExecutor(max_workers=SoftlayerConfig.SOFTLAYER_SYNC_CONCURRENCY) as executor:
+        futures = {
+            "security_groups": executor.submit(
+                call_softlayer_listing, SoftlayerSecurityGroupClient(cloud_id, credentials_version),
+                "list_security_groups"),
+            "placement_groups": executor.submit(
+                call_softlayer_listing, SoftlayerPlacementGroupClient(cloud_id, credentials_version),
+                "list_placement_groups"),
+            "dedicated_hosts": executor.submit(
+                call_softlayer_listing, SoftlayerDedicateHostClient(cloud_id, credentials_version),
+                "list_dedicated_hosts"),
+            "ssh_keys": executor.submit(
+                call_softlayer_listing, SoftlayerSshKeyClient(cloud_id, credentials_version), "list_ssh_keys"),
+        }
+        chained_future = executor.submit(list_subnets_instances_load_balancers)
+
+        resources = chained_future.result()
+        for name, future in futures.items():
+            resources[name] = future.result()
+
+    return resources
@@ -87,8 +87,7 @@ from ibm.tasks.ibm import (add_account_id_to_cloud, add_ibm_monitoring_tokens,
                            reserve_ip_for_subnet, start_ibm_instance_task, start_wait_ibm_instance_task,
                            stop_ibm_instance_task, stop_wait_ibm_instance_task, store_ibm_custom_image,
                            store_wait_ibm_custom_image, sync_classic_kubernetes_task,
-                           sync_classic_network_gateways_task, sync_classic_virtual_guest_bandwidth_usage_task,
-                           sync_classic_virtual_guest_cpu_usage_task, sync_classic_virtual_guest_memory_usage_task,
+                           sync_classic_network_gateways_task, sync_classic_virtual_guests_usage_metrics_task,
                            sync_classic_virtual_guests_usage_task, sync_cluster_workloads, sync_cos,
                            sync_cos_bucket_objects, sync_cos_buckets, sync_credential_keys,
                            sync_endpoint_gateway_targets, sync_load_balancer_profiles, sync_orchestration_versions,
@@ -184,19 +183,9 @@ MAPPER = {
             "RUN": sync_classic_network_gateways_task
         },
     },
-    "SoftLayerInstanceMemoryUsage": {
+    "SoftLayerVirtualGuestsUsage": {
         WorkflowTask.TYPE_SYNC: {
-            "RUN": sync_classic_virtual_guest_memory_usage_task
-        },
-    },
-    "SoftLayerInstanceCPUUsage": {
-        WorkflowTask.TYPE_SYNC: {
-            "RUN": sync_classic_virtual_guest_cpu_usage_task
-        },
-    },
-    "SoftLayerInstanceBandwidthUsage": {
-        WorkflowTask.TYPE_SYNC: {
-            "RUN": sync_classic_virtual_guest_bandwidth_usage_task
+            "RUN": sync_classic_virtual_guests_usage_metrics_task
         },
     },
     "SoftLayerRecommendation": {
@@ -151,6 +151,7 @@ def workflow_executor(workflow_root_id):
                 # If picked by worker, completed and was successful
                 elif task.status == WorkflowTask.STATUS_SUCCESSFUL:
                     task.in_focus = False
+                    workflow_root.bump_version()
                     db_session.commit()
 
                     iteration_task_ids = [iteration_task.id for iteration_task in iteration_tasks]
@@ -1,10 +1,12 @@
 from apiflask import APIFlask
-from flask_compress import Compress
 from flask_sqlalchemy import SQLAlchemy
 
 from config import flask_config
+from ibm.web.common.compression import CompressionPolicy
+from ibm.web.common.concurrency import ConcurrencyLimiter
 
-compress = Compress()
+compress = CompressionPolicy()
+concurrency_limiter = ConcurrencyLimiter()
 
 db = SQLAlchemy()
 
@@ -16,9 +18,20 @@ def create_app(environment):
     app.config.from_object(config)
     app.logger.setLevel(config.LOGGING_LEVEL_MAPPED)
     compress.init_app(app)
+    concurrency_limiter.init_app(app)
     db.init_app(app)
     db.app = app
 
+    from ibm.common.cost_cache import register_cost_data_generation_listeners
+    from ibm.common.regional_resource_snapshots import register_regional_resource_snapshot_listeners
+    from ibm.common.resource_summaries import register_resource_summary_listeners
+    from ibm.common.workflow_progress import register_workflow_progress_listeners
+
+    register_cost_data_generation_listeners()
+    register_regional_resource_snapshot_listeners()
+    register_resource_summary_listeners()
+    register_workflow_progress_listeners()
+
     from .ibm.acls import ibm_acls as ibm_acls_blueprint
     from .ibm.address_prefixes import ibm_address_prefixes as ibm_address_prefixes_blueprint
     from .ibm.activity_tracking import ibm_activity_tracking as ibm_activity_tracking_blueprint
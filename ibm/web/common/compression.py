@@ -0,0 +1,104 @@
+"""
+Response compression policy on top of Flask-Compress.
+
+Compared to the Flask-Compress defaults this:
+- skips bodies smaller than `COMPRESS_MIN_SIZE`, and streamed or passthrough bodies which would have to be buffered
+- uses per endpoint levels from `COMPRESS_ENDPOINT_LEVELS`
+- compresses big bodies on the gevent hub threadpool instead of on the greenlet serving the request
+- caches compressed bodies of `COMPRESS_CACHED_ENDPOINTS` responses by their ETag
+- can be turned off in favour of compression in the reverse proxy with `COMPRESS_OFFLOAD_TO_PROXY`
+"""
+import gzip
+import zlib
+
+import brotli
+from cachetools import LRUCache
+from flask import current_app, request
+from flask_compress import Compress
+from gevent import get_hub
+from gevent.monkey import is_module_patched
+
+
+def compress_body(data, algorithm, level):
+    if algorithm == "gzip":
+        return gzip.compress(data, compresslevel=level)
+    elif algorithm == "deflate":
+        return zlib.compress(data, level)
+    elif algorithm == "br":
+        return brotli.compress(data, quality=level)
+
+    raise ValueError(f"Unsupported compression algorithm {algorithm}")
+
+
+def get_compressed_etags(etag):
+    """
+    Compressed responses have their ETag suffixed with the content encoding ("abc" -> "abc:gzip"), clients send those
+    back in `If-None-Match`
+    :param etag: the ETag set by the endpoint
+    :return: all the ETags a client could hold for the representation
+    """
+    return [etag] + [f"{etag}:{algorithm}" for algorithm in current_app.config["COMPRESS_ALGORITHM"]]
+
+
+class CompressionPolicy(Compress):
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS_OFFLOAD_TO_PROXY", False)
+        app.config.setdefault("COMPRESS_ENDPOINT_LEVELS", {})
+        app.config.setdefault("COMPRESS_CACHED_ENDPOINTS", ["workspace.list_ibm_resources"])
+        app.config.setdefault("COMPRESS_THREADPOOL_MIN_SIZE", 256 * 1024)
+        app.config.setdefault("COMPRESS_CACHE_SIZE", 64)
+        if app.config["COMPRESS_OFFLOAD_TO_PROXY"]:
+            app.config["COMPRESS_REGISTER"] = False
+
+        super().init_app(app)
+        self.compressed_bodies = LRUCache(maxsize=app.config["COMPRESS_CACHE_SIZE"])
+
+    def after_request(self, response):
+        app = self.app or current_app
+
+        vary = response.headers.get("Vary")
+        if not vary:
+            response.headers["Vary"] = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower():
+            response.headers["Vary"] = f"{vary}, Accept-Encoding"
+
+        algorithm = self._choose_compress_algorithm(request.headers.get("Accept-Encoding", ""))
+        if (algorithm is None or
+                response.mimetype not in app.config["COMPRESS_MIMETYPES"] or
+                response.status_code < 200 or
+                response.status_code >= 300 or
+                # streamed and passthrough (file) bodies would have to be buffered in full to be compressed here
+                response.is_streamed or
+                response.direct_passthrough or
+                "Content-Encoding" in response.headers or
+                (response.content_length is not None and response.content_length < app.config["COMPRESS_MIN_SIZE"])):
+            return response
+
+        etag, weak = response.get_etag()
+        cache_key = None
+        if etag and not weak and request.endpoint in app.config["COMPRESS_CACHED_ENDPOINTS"]:
+            cache_key = (request.endpoint, etag, algorithm)
+
+        compressed_content = self.compressed_bodies.get(cache_key) if cache_key else None
+        if compressed_content is None:
+            data = response.get_data()
+            if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+                return response
+
+            level = app.config["COMPRESS_ENDPOINT_LEVELS"].get(request.endpoint, app.config["COMPRESS_LEVEL"])
+            if len(data) >= app.config["COMPRESS_THREADPOOL_MIN_SIZE"] and is_module_patched("socket"):
+                # zlib and brotli release the GIL, running them in a real thread keeps the other greenlets serving
+                compressed_content = get_hub().threadpool.apply(compress_body, (data, algorithm, level))
+            else:
+                compressed_content = compress_body(data, algorithm, level)
+
+            if cache_key:
+                self.compressed_bodies[cache_key] = compressed_content
+
+        response.set_data(compressed_content)
+        response.headers["Content-Encoding"] = algorithm
+        response.headers["Content-Length"] = response.content_length
+        if etag:
+            response.set_etag(f"{etag}:{algorithm}", weak=weak)
+
+        return response
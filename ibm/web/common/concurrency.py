@@ -0,0 +1,45 @@
+"""
+Per worker limit on the requests served at once.
+
+A gevent worker accepts far more connections than its DB pool has connections. Without a limit the extra greenlets
+queue on the pool until SQLALCHEMY_POOL_TIMEOUT, with it they wait at most `WEB_CONCURRENCY_WAIT_TIMEOUT` seconds for a
+slot and are then answered with a 503 the client (or load balancer) can retry elsewhere.
+"""
+import logging
+import threading
+
+from apiflask import abort
+from flask import current_app, g
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ConcurrencyLimiter:
+    def __init__(self, app=None):
+        self.semaphore = None
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("WEB_MAX_CONCURRENT_REQUESTS", 0)
+        app.config.setdefault("WEB_CONCURRENCY_WAIT_TIMEOUT", 2)
+        if not app.config["WEB_MAX_CONCURRENT_REQUESTS"]:
+            return
+
+        # threading is monkey patched in gevent workers, which makes this a greenlet aware semaphore
+        self.semaphore = threading.BoundedSemaphore(app.config["WEB_MAX_CONCURRENT_REQUESTS"])
+        app.before_request(self.acquire_slot)
+        app.teardown_request(self.release_slot)
+
+    def acquire_slot(self):
+        if not self.semaphore.acquire(timeout=current_app.config["WEB_CONCURRENCY_WAIT_TIMEOUT"]):
+            LOGGER.warning(
+                f"Rejecting request, {current_app.config['WEB_MAX_CONCURRENT_REQUESTS']} requests already in progress"
+            )
+            abort(503, "Server is busy, please retry", headers={"Retry-After": "1"})
+
+        g.holds_concurrency_slot = True
+
+    def release_slot(self, exc=None):
+        if g.pop("holds_concurrency_slot", False):
+            self.semaphore.release()
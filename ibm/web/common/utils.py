@@ -1,9 +1,12 @@
 import logging
 
 from apiflask import abort
+from flask import request, Response
 from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.http import quote_etag
 
 from ibm.common.utils import verify_and_yield_references
+from ibm.web.common.compression import get_compressed_etags
 from ibm.models import IBMCloud, IBMInstance, IBMKubernetesCluster, IBMLoadBalancer, IBMPublicGateway, \
     IBMSubnet, IBMTag, IBMVpcNetwork, IBMVpnGateway, IBMZone, WorkflowRoot, WorkflowTask, IBMTransitGateway, \
     IBMTransitGatewayConnection, IBMVpnConnection
@@ -21,6 +24,32 @@ def get_paginated_response_json(items, pagination_obj):
     }
 
 
+def get_not_modified_response(etag):
+    """
+    Return a 304 response if the `If-None-Match` header of the current request matches the provided etag. The weak
+    comparison is used, as for GET requests, since proxies compressing responses (nginx gzip) weaken ETags
+    :param etag: current etag of the requested representation
+    :return: flask Response with status 304 or None if the client copy is stale
+    """
+    if not etag:
+        return
+
+    matched_etag = next(
+        (compressed_etag for compressed_etag in get_compressed_etags(etag)
+         if request.if_none_match.contains_weak(compressed_etag)), None
+    )
+    if not matched_etag:
+        return
+
+    response = Response(status=304)
+    response.set_etag(matched_etag)
+    return response
+
+
+def get_etag_headers(etag):
+    return {"ETag": quote_etag(etag)}
+
+
 def create_ibm_resource_creation_workflow(user, resource_type, data, db_session=None, validate=True, sketch=False,
                                           status=False):
     if not db_session:
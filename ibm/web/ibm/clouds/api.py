@@ -3,14 +3,16 @@ from datetime import datetime
 
 from apiflask import abort, APIBlueprint, auth_required, input, output
 from flask import Response
+from sqlalchemy import func
 
 from ibm import LOGGER
 from ibm.auth import auth, authenticate, authenticate_api_key
 from ibm.middleware import log_cost_activity
 from ibm.common.req_resp_schemas.schemas import get_pagination_schema, PaginationQuerySchema, WorkflowRootOutSchema
-from ibm.models import IBMCloud, IBMCloudObjectStorage, IBMCloudSetting, IBMCOSBucket, IBMCost, IBMDashboardSetting, \
-    IBMIdleResource, IBMLoadBalancerProfile, IBMMonitoringToken, IBMRegion, IBMResourceGroup, \
-    IBMRightSizingRecommendation, IBMServiceCredentialKey, IBMTag, IBMVpcNetwork, WorkflowRoot, WorkflowTask
+from ibm.models import IBMCloud, IBMCloudObjectStorage, IBMCloudResourceSummary, IBMCloudSetting, IBMCOSBucket, \
+    IBMCost, IBMDashboardSetting, IBMIdleResource, IBMLoadBalancerProfile, IBMMonitoringToken, IBMRegion, \
+    IBMResourceGroup, IBMRightSizingRecommendation, IBMServiceCredentialKey, IBMTag, IBMVpcNetwork, WorkflowRoot, \
+    WorkflowTask
 from ibm.web import db as ibmdb
 from ibm.web.common.utils import get_paginated_response_json
 from .mappers import IBM_DASHBOARD_RESOURCE_TYPE_MAPPER
@@ -331,19 +333,16 @@ def list_ibm_cloud_dashboard_settings(listing_query_schema, user):
             ibmdb.session.commit()
             dashboard_settings.append(dashboard_setting)
 
-    dashboard_settings_resp = list()
+    resource_counts = dict(ibmdb.session.query(
+        IBMCloudResourceSummary.name, func.sum(IBMCloudResourceSummary.count)).filter(
+        IBMCloudResourceSummary.cloud_id.in_([cloud.id for cloud in clouds])).group_by(
+        IBMCloudResourceSummary.name).all())
 
+    dashboard_settings_resp = list()
     for setting in dashboard_settings:
-        resource_count = 0
-        for cloud in clouds:
-            filter_kwargs = {"cloud_id": cloud.id}
-            if setting.name == "Custom Images":
-                filter_kwargs["visibility"] = "private"
-
-            model = IBM_DASHBOARD_RESOURCE_TYPE_MAPPER[setting.name]['resource_type']
-            resource_count += ibmdb.session.query(model).filter_by(**filter_kwargs).count()
+        model = IBM_DASHBOARD_RESOURCE_TYPE_MAPPER[setting.name]['resource_type']
         settings_json = setting.to_json()
-        settings_json["count"] = resource_count
+        settings_json["count"] = int(resource_counts.get(model.__name__) or 0)
         dashboard_settings_resp.append(settings_json)
     return {"items": dashboard_settings_resp}
 
@@ -407,15 +406,19 @@ def get_ibm_cloud_cost_optimization_summary(cloud_id, user):
         "recommendations": {
         }
     }
-    idle_resources_query = ibmdb.session.query(IBMIdleResource).filter_by(cloud_id=cloud.id)
-    estimated_savings = 0
-    for idle_resource in idle_resources_query:
-        estimated_savings += idle_resource.estimated_savings if idle_resource and idle_resource.estimated_savings else 0
-
-    cost_summary_json["recommendations"]["idle_resources"] = idle_resources_query.count()
-    rightsizing_count = ibmdb.session.query(IBMRightSizingRecommendation).filter_by(
-        cloud_id=cloud.id)
-    cost_summary_json["recommendations"]["rightsizing"] = rightsizing_count.count()
+    summaries = {
+        summary.name: summary for summary in ibmdb.session.query(IBMCloudResourceSummary).filter(
+            IBMCloudResourceSummary.cloud_id == cloud.id,
+            IBMCloudResourceSummary.name.in_([IBMIdleResource.__name__, IBMRightSizingRecommendation.__name__])
+        ).all()
+    }
+    idle_resources_summary = summaries.get(IBMIdleResource.__name__)
+    rightsizing_summary = summaries.get(IBMRightSizingRecommendation.__name__)
+    estimated_savings = idle_resources_summary.total if idle_resources_summary else 0
+
+    cost_summary_json["recommendations"]["idle_resources"] = idle_resources_summary.count if idle_resources_summary \
+        else 0
+    cost_summary_json["recommendations"]["rightsizing"] = rightsizing_summary.count if rightsizing_summary else 0
 
     tags = ibmdb.session.query(IBMTag).filter_by(cloud_id=cloud_id, resource_type='vpc').all()
     tag_resource_ids = [tag.resource_id for tag in tags]
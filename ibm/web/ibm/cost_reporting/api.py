@@ -2,13 +2,13 @@ import json
 import logging
 
 from apiflask import APIBlueprint, input
-from sqlalchemy import and_, extract, func
+from sqlalchemy import func
 
 from ibm.auth import authenticate, Response
 from ibm.common.consts import INT_MONTH_TO_STR, MONTHS_STR_TO_INT
 from ibm.common.utils import get_month_interval
-from ibm.models import IBMCloud, IBMCost, IBMResourceInstancesCost, IBMIdleResource, IBMResourceControllerData, \
-    IBMResourceTracking, IBMRightSizingRecommendation
+from ibm.models import IBMCloud, IBMCost, IBMCostTrackingRollup, IBMResourceInstancesCost, IBMIdleResource, \
+    IBMResourceControllerData, IBMRightSizingRecommendation
 from ibm.web import db as ibmdb
 from .schemas import IBMCostReportingQuerySchema
 
@@ -40,35 +40,33 @@ def get_ibm_cloud_report(cloud_query_params, user):
 
     start, end = get_month_interval(month)
     month = start.month
-    year = start.year
 
     cost_obj = ibmdb.session.query(IBMCost).filter_by(cloud_id=cloud_id, billing_month=start).first()
     if not cost_obj:
         LOGGER.info(f"No IBM Cloud Cost with ID {cloud_id} not found")
         return Response(status=204)
 
-    resource_instances_cost_crns_sq = \
-        ibmdb.session.query(IBMResourceInstancesCost.crn).filter_by(cost_id=cost_obj.id).subquery()
+    resource_instances_cost_crns_sq = ibmdb.session.query(IBMResourceInstancesCost.crn).filter_by(
+        cloud_id=cloud_id, cost_id=cost_obj.id).subquery()
 
-    idle_resource_saving = ibmdb.session.query(func.sum(IBMIdleResource.estimated_savings).label(
-        'idle_resource_saving')).filter(and_(extract('month', IBMIdleResource.created_at) == month,
-                                             extract('year', IBMIdleResource.created_at) == year)).filter_by(
-        cloud_id=cloud_id).all()
+    # range predicates on the indexed (cloud_id, created_at), EXTRACT(...) made MySQL evaluate every row of the cloud
+    idle_resource_saving, idle_resource_recommendation_count = ibmdb.session.query(
+        func.sum(IBMIdleResource.estimated_savings), func.count(IBMIdleResource.id)).filter(
+        IBMIdleResource.cloud_id == cloud_id, IBMIdleResource.created_at >= start,
+        IBMIdleResource.created_at < end).one()
 
-    right_sizing_saving = ibmdb.session.query(func.sum(IBMRightSizingRecommendation.estimated_monthly_savings).label(
-        'right_sizing_saving')).filter_by(cloud_id=cloud_id).filter(
-        and_(extract('month', IBMRightSizingRecommendation.created_at) == month,
-             extract('year', IBMRightSizingRecommendation.created_at) == year)).filter_by(
-        cloud_id=cloud_id).all()
+    right_sizing_saving, right_sizing_recommendation_count = ibmdb.session.query(
+        func.sum(IBMRightSizingRecommendation.estimated_monthly_savings),
+        func.count(IBMRightSizingRecommendation.id)).filter(
+        IBMRightSizingRecommendation.cloud_id == cloud_id, IBMRightSizingRecommendation.created_at >= start,
+        IBMRightSizingRecommendation.created_at < end).one()
 
-    savings_achieved = ibmdb.session.query(
-        func.sum(IBMResourceTracking.estimated_savings).label("estimated_savings")).filter(
-        and_(extract('month', IBMResourceTracking.action_taken_at) == month,
-             extract('year', IBMResourceTracking.action_taken_at) == year)).filter_by(cloud_id=cloud_id).all()
+    savings_rollup = ibmdb.session.query(IBMCostTrackingRollup).filter_by(
+        cloud_id=cloud_id, granularity=IBMCostTrackingRollup.GRANULARITY_MONTHLY, period_start=start.date()).first()
 
-    idle_resource_saving = idle_resource_saving[0][0] if idle_resource_saving[0][0] else 0.0
-    right_sizing_saving = right_sizing_saving[0][0] if right_sizing_saving[0][0] else 0.0
-    savings_achieved = savings_achieved[0][0] if savings_achieved[0][0] else 0.0
+    idle_resource_saving = idle_resource_saving or 0.0
+    right_sizing_saving = right_sizing_saving or 0.0
+    savings_achieved = savings_rollup.savings if savings_rollup else 0.0
     savings = idle_resource_saving + right_sizing_saving
 
     ibm_resources_created_this_month_json = []
@@ -84,20 +82,9 @@ def get_ibm_cloud_report(cloud_query_params, user):
         else:
             older_resources_costed_this_month_json.append(ibm_resource.to_reporting_json(month=start))
 
-    right_sizing_recommendation_count = ibmdb.session.query(IBMRightSizingRecommendation).filter(
-        and_(extract('month', IBMRightSizingRecommendation.created_at) == month,
-             extract('year', IBMRightSizingRecommendation.created_at) == year)).filter_by(
-        cloud_id=cloud_id).count() or 0
-
-    idle_resource_recommendation_count = ibmdb.session.query(IBMIdleResource).filter(
-        and_(extract('month', IBMIdleResource.created_at) == month,
-             extract('year', IBMIdleResource.created_at) == year)).filter_by(cloud_id=cloud_id).count() or 0
-
     total_recommendation_generated = right_sizing_recommendation_count + idle_resource_recommendation_count
 
-    actions_taken_at = ibmdb.session.query(IBMResourceTracking).filter(
-        and_(extract('month', IBMResourceTracking.action_taken_at) == month,
-             extract('year', IBMResourceTracking.action_taken_at) == year)).filter_by(cloud_id=cloud_id).count()
+    actions_taken_at = savings_rollup.actions_count if savings_rollup else 0
 
     cost_report_json = {
         "summary": {
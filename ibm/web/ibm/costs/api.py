@@ -6,6 +6,7 @@ from flask import request
 
 from ibm.auth import authenticate, Response
 from ibm.common.consts import MONTHS_STR_TO_INT
+from ibm.common.cost_cache import get_or_build_cost_data
 from ibm.common.req_resp_schemas.schemas import IBMResourceQuerySchema
 from ibm.common.utils import get_month_interval
 from ibm.models import IBMCloud, IBMCost, IBMCostPerTag, IBMResourcesCost
@@ -39,10 +40,14 @@ def get_ibm_cloud_account_cost_by_cloud_id(cloud_query_params, user):
         LOGGER.info(error)
         return Response(json.dumps({"error": error}), status=200)
 
-    costs = ibmdb.session.query(IBMCost).filter_by(cloud_id=cloud_id).all()
+    def build_cost_json():
+        cost = ibmdb.session.query(IBMCost).filter_by(cloud_id=cloud_id).first()
+        # a cloud without cost is an empty object, as it always was
+        return IBMCostOutSchema().dump(cost.to_json() if cost else None)
 
-    for cost in costs:
-        return cost.to_json()
+    # the cost is serialized once, when it is cached, @output documents it and passes the Response through as is
+    cost_json = get_or_build_cost_data("cost", [(ibm_cloud.id, ibm_cloud.name)], {}, build_cost_json)
+    return Response(json.dumps(cost_json), status=200, mimetype="application/json")
 
 
 @ibm_costs.route('/clouds/costs', methods=['GET'])
@@ -68,35 +73,45 @@ def get_ibm_cloud_account_cost(cloud_query_params, user):
         LOGGER.info(error)
         return Response(json.dumps({"error": error}), status=200)
 
-    cost_summary_list = list()
     month = request.args.get('month')
     if month and month.lower() not in MONTHS_STR_TO_INT.keys():
         return Response(status=400)
 
     start, end = get_month_interval(month)
-    for cloud in clouds:
-        cost_obj = ibmdb.session.query(IBMCost).filter_by(cloud_id=cloud.id, billing_month=start).first()
-        if not cost_obj:
-            continue
-
-        top_cost_per_tags = []
-        if cost_per_tags:
-            top_cost_per_tags = ibmdb.session.query(IBMCostPerTag).filter_by(date=start, cloud_id=cloud_id).\
-                order_by(IBMCostPerTag.cost.desc()).limit(10).all()
-            top_cost_per_tags = [top_cost_per_tag.to_reference_json() for top_cost_per_tag in top_cost_per_tags]
-
-        resource_costs = ibmdb.session.query(IBMResourcesCost).filter_by(cloud_id=cloud.id, cost_id=cost_obj.id).all()
-        ibm_cost = []
-        for cost in resource_costs:
-            ibm_cost.append({"name": cost.resource_name, "cost": cost.billable_cost})
-
-        cost_summary_list.append({
-            "cloud": {
-                "id": cloud.id,
-                "name": cloud.name
-            },
-            "details": top_cost_per_tags if cost_per_tags else ibm_cost,
-            "total_cost": cost_obj.billable_cost
-        })
+
+    def build_cost_summary_list():
+        cost_summary_list = list()
+        for cloud in clouds:
+            cost_obj = ibmdb.session.query(IBMCost).filter_by(cloud_id=cloud.id, billing_month=start).first()
+            if not cost_obj:
+                continue
+
+            top_cost_per_tags = []
+            if cost_per_tags:
+                top_cost_per_tags = ibmdb.session.query(IBMCostPerTag).filter_by(date=start, cloud_id=cloud_id).\
+                    order_by(IBMCostPerTag.cost.desc()).limit(10).all()
+                top_cost_per_tags = [top_cost_per_tag.to_reference_json() for top_cost_per_tag in top_cost_per_tags]
+
+            resource_costs = ibmdb.session.query(IBMResourcesCost).filter_by(
+                cloud_id=cloud.id, cost_id=cost_obj.id).all()
+            ibm_cost = []
+            for cost in resource_costs:
+                ibm_cost.append({"name": cost.resource_name, "cost": cost.billable_cost})
+
+            cost_summary_list.append({
+                "cloud": {
+                    "id": cloud.id,
+                    "name": cloud.name
+                },
+                "details": top_cost_per_tags if cost_per_tags else ibm_cost,
+                "total_cost": cost_obj.billable_cost
+            })
+
+        return cost_summary_list
+
+    cost_summary_list = get_or_build_cost_data(
+        "clouds_costs", [(cloud.id, cloud.name) for cloud in clouds],
+        {"start": str(start), "cost_per_tags": bool(cost_per_tags), "cloud_id": cloud_id}, build_cost_summary_list
+    )
 
     return Response(json.dumps(cost_summary_list), status=200, mimetype="application/json")
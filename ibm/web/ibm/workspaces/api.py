@@ -2,13 +2,17 @@ import logging
 from typing import List
 
 from apiflask import abort, APIBlueprint, input, output
+from flask import Response
+from sqlalchemy.orm import undefer
 
 from ibm.auth import authenticate
+from ibm.common.regional_resource_snapshots import enqueue_regional_resource_snapshot_refresh
 from ibm.common.req_resp_schemas.schemas import get_pagination_schema, IBMRegionalResourceRequiredListQuerySchema, \
     PaginationQuerySchema
-from ibm.models import IBMCloud, IBMRegion, WorkflowRoot, WorkflowsWorkspace
+from ibm.models import IBMCloud, IBMRegion, IBMRegionalResourceSnapshot, WorkflowRoot, WorkflowsWorkspace
 from ibm.web import db as ibmdb
-from ibm.web.common.utils import authorize_and_get_ibm_cloud, get_paginated_response_json, verify_and_get_region
+from ibm.web.common.utils import authorize_and_get_ibm_cloud, get_not_modified_response, \
+    get_paginated_response_json, verify_and_get_region
 from .schemas import IBMAllRegionalResourcesOutSchema, IBMExecuteRootsInSchema, IBMExecuteRootsOutSchema, \
     IBMWorkspaceCreationSchema, WorkflowsWorkspaceRefOutSchema, WorkflowsWorkspaceWithRootsOutSchema, \
     WorkspaceTypeQuerySchema
@@ -241,7 +245,9 @@ def delete_workspace(workspace_id, user):
 def list_ibm_resources(regional_res_query_params, user):
     """
     List all IBM Regional Resources
-    This requests list all IBM Regional resources for a given cloud and region
+    This requests list all IBM Regional resources for a given cloud and region. The response is served from the
+    snapshot discovery maintains for the region and supports conditional requests through `If-None-Match`. A snapshot
+    made stale by writes of the resources is served until it is regenerated in the background.
     """
     cloud_id = regional_res_query_params["cloud_id"]
     region_id = regional_res_query_params["region_id"]
@@ -249,36 +255,27 @@ def list_ibm_resources(regional_res_query_params, user):
     ibm_cloud = authorize_and_get_ibm_cloud(cloud_id=cloud_id, user=user)
     region = verify_and_get_region(ibm_cloud=ibm_cloud, region_id=region_id)
 
-    return {
-        "vpc_networks": [vpc_network.validate_json_for_schema() for vpc_network in region.vpc_networks.all()],
-        "subnets": [subnets.validate_json_for_schema() for subnets in region.subnets.all()],
-        "public_gateways": [public_gateway.validate_json_for_schema() for public_gateway in
-                            region.public_gateways.all()],
-        "vpn_gateways": [vpn_gateway.validate_json_for_schema() for vpn_gateway in region.vpn_gateways.all()],
-        "ike_policies": [ike_policy.validate_json_for_schema() for ike_policy in region.ike_policies.all()],
-        "ipsec_policies": [ipsec_policy.validate_json_for_schema() for ipsec_policy in region.ipsec_policies.all()],
-        "instances": [instance.validate_json_for_schema() for instance in region.instances.all()],
-        "network_acls": [network_acl.validate_json_for_schema() for network_acl in region.network_acls.all()],
-        "security_groups": [security_group.validate_json_for_schema() for security_group in
-                            region.security_groups.all()],
-        "load_balancers": [load_balancer.validate_json_for_schema() for load_balancer in region.load_balancers.all()],
-        "dedicated_hosts": [dedicated_host.validate_json_for_schema() for dedicated_host in
-                            region.dedicated_hosts.all()],
-        "placement_groups": [placement_group.validate_json_for_schema() for placement_group in
-                             region.placement_groups.all()],
-        "ssh_keys": [ssh_key.validate_json_for_schema() for ssh_key in region.ssh_keys.all()],
-        "kubernetes_clusters": [kubernetes_cluster.validate_json_for_schema() for kubernetes_cluster in
-                                region.ibm_kubernetes_clusters.all()],
-        "draas_restore_clusters": [kubernetes_cluster.validate_json_for_schema() for kubernetes_cluster in
-                                   region.ibm_kubernetes_clusters.all()],
-        "instance_profiles": [instance_profile.validate_json_for_schema() for instance_profile in
-                              region.instance_profiles.all()],
-        "images": [image.validate_json_for_schema() for image in region.images.all()],
-        "operating_systems": [operating_system.validate_json_for_schema() for operating_system in
-                              region.operating_systems.all()],
-        "cos_buckets": [cos_bucket.validate_json_for_schema() for cos_bucket in region.cos_buckets.all()],
-        "volumes": [volume.validate_json_for_schema() for volume in region.volumes.all()]
-    }
+    etag, version, generated_version = ibmdb.session.query(
+        IBMRegionalResourceSnapshot.etag, IBMRegionalResourceSnapshot.version,
+        IBMRegionalResourceSnapshot.generated_version
+    ).filter_by(region_id=region.id).first() or (None, None, None)
+    if version != generated_version:
+        # in case the regeneration enqueued by the write was lost
+        enqueue_regional_resource_snapshot_refresh(region.id)
+
+    not_modified_response = get_not_modified_response(etag)
+    if not_modified_response:
+        return not_modified_response
+
+    snapshot = ibmdb.session.query(IBMRegionalResourceSnapshot).filter_by(region_id=region.id).options(
+        undefer(IBMRegionalResourceSnapshot.document)).first()
+    if not snapshot:
+        # discovery has not generated the snapshot for this region yet
+        snapshot = IBMRegionalResourceSnapshot.refresh(session=ibmdb.session, region=region)
+
+    response = Response(snapshot.document, status=200, mimetype="application/json")
+    response.set_etag(snapshot.etag)
+    return response
 
 # TODO: sequential deletion of Workspace
 # How about reversing the tree of workspace and start deletion? :-)
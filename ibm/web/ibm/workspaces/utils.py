@@ -1,12 +1,13 @@
 import logging
 from copy import deepcopy
 
+from sqlalchemy import func, select
 from sqlalchemy.orm.exc import StaleDataError
 
 from ibm.models import IBMAddressPrefix, IBMDedicatedHost, IBMDedicatedHostGroup, IBMFloatingIP, IBMIKEPolicy, \
     IBMIPSecPolicy, IBMKubernetesCluster, IBMLoadBalancer, IBMNetworkAcl, IBMNetworkInterface, IBMPlacementGroup, \
     IBMPublicGateway, IBMRoutingTable, IBMSecurityGroup, IBMSshKey, IBMSubnet, IBMVpcNetwork, IBMVpnGateway, \
-    WorkflowRoot, WorkflowsWorkspace, WorkflowTask
+    WorkflowRoot, WorkflowsWorkspace, WorkflowTask, WorkflowTaskResultChunk
 from ibm.web import db as ibmdb
 from ibm.web.common.utils import compose_ibm_resource_attachment_workflow, create_ibm_resource_creation_workflow, \
     create_kubernetes_restore_workflow
@@ -46,10 +47,16 @@ def get_attachment_resource_name(attachment_obj):
 
 
 def create_workspace_workflow(user, data, db_session=None, sketch=False, backup_id=None,
-                              source_cloud=None, workspace_type=None):
+                              source_cloud=None, workspace_type=None, fe_request_data=None):
+    """
+    :param data: <dict> of resource type to resources (any iterable, each is iterated once)
+    :param fe_request_data: fe_request_data of the workspace if not a copy of `data`
+    """
     if not source_cloud:
         source_cloud = "IBM"
-    workspace = WorkflowsWorkspace(name=data["name"], fe_request_data=deepcopy(data), user_id=user["id"],
+    if fe_request_data is None:
+        fe_request_data = deepcopy(data)
+    workspace = WorkflowsWorkspace(name=data["name"], fe_request_data=fe_request_data, user_id=user["id"],
                                    project_id=user["project_id"], sketch=sketch, source_cloud=source_cloud,
                                    workspace_type=workspace_type)
     roots = []
@@ -534,6 +541,44 @@ def create_workspace_workflow(user, data, db_session=None, sketch=False, backup_
     return workspace
 
 
+def create_workspace_workflow_from_result_chunks(user, workflow_task, name, db_session, sketch=False,
+                                                 source_cloud=None, workspace_type=None):
+    """
+    Create a workspace from the resources of a task result stored as chunks (see `WorkflowTask.add_result_chunk`)
+    without loading them at once: the resources of a type are read while their roots are created, and the database
+    assembles the fe_request_data of the workspace from the chunks
+    :param workflow_task: <object of WorkflowTask> with a chunked result of resource type to resources
+    :param name: name of the workspace
+    """
+    result_types = workflow_task.result[WorkflowTask.RESULT_CHUNK_TYPES_KEY]
+    data = {"name": name}
+    data.update({
+        result_type: workflow_task.iter_result_items(result_type) for result_type, items_count in result_types.items()
+        if items_count
+    })
+    fe_request_data = {"name": name}
+    fe_request_data.update({result_type: [] for result_type in result_types})
+    workspace = create_workspace_workflow(
+        user=user, data=data, db_session=db_session, sketch=sketch, source_cloud=source_cloud,
+        workspace_type=workspace_type, fe_request_data=fe_request_data
+    )
+
+    chunks = db_session.query(WorkflowTaskResultChunk.id, WorkflowTaskResultChunk.result_type).filter_by(
+        workflow_task_id=workflow_task.id).order_by(WorkflowTaskResultChunk.chunk_index).all()
+    for chunk_id, result_type in chunks:
+        path = f"$.{result_type}"
+        chunk_items = select(WorkflowTaskResultChunk.items).where(WorkflowTaskResultChunk.id == chunk_id)
+        db_session.query(WorkflowsWorkspace).filter_by(id=workspace.id).update({
+            WorkflowsWorkspace.fe_request_data: func.json_set(
+                WorkflowsWorkspace.fe_request_data, path, func.json_merge_preserve(
+                    func.json_extract(WorkflowsWorkspace.fe_request_data, path), chunk_items.scalar_subquery())
+            )
+        }, synchronize_session=False)
+
+    db_session.commit()
+    return workspace
+
+
 def get_resource_ids(data: dict, key: str):
     return [obj["id"] for obj in data.get(key, [])]
 
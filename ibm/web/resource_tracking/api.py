@@ -1,6 +1,5 @@
 import json
 import logging
-from collections import OrderedDict
 
 from apiflask import APIBlueprint
 from flask import request, Response
@@ -10,9 +9,10 @@ from sqlalchemy import func
 from config import PaginationConfig
 from ibm.auth import authenticate
 from ibm.common.consts import MONTHS_STR_TO_INT
+from ibm.common.cost_cache import get_or_build_cost_data
 from ibm.common.utils import get_month_interval
-from ibm.models import IBMCost, IBMCloud, IBMResourceTracking, IBMResourceInstancesCost, \
-    IBMResourceInstancesDailyCost as DailyCost, IBMRightSizingRecommendation, IBMIdleResource
+from ibm.models import IBMCost, IBMCostTrackingRollup, IBMCloud, IBMResourceTracking, IBMResourceInstancesCost, \
+    IBMRightSizingRecommendation, IBMIdleResource
 from ibm.web import db as ibmdb
 
 LOGGER = logging.getLogger(__name__)
@@ -83,68 +83,27 @@ def list_ibm_cost_tracking(cloud_id, user):
     start, end = get_month_interval(month)
     granularity = request.args.get('granularity')
     if granularity and granularity == 'monthly':
-        monthly_cost_obj = ibmdb.session.query(func.sum(IBMCost.billable_cost).label('total_cost'),
-                                               func.date(IBMCost.billing_month).label('date')). \
-            filter_by(cloud_id=cloud_id).group_by(IBMCost.billing_month)
-        if not monthly_cost_obj:
-            return Response(status=204)
-        monthly_costs = [{str(cost.date): cost.total_cost} for cost in monthly_cost_obj]
-        monthly_costs_dict = dict(cost_obj for monthly_cost in monthly_costs for cost_obj in monthly_cost.items())
-
-        monthly_savings = ibmdb.session.query(
-            func.date_format(func.date(IBMResourceTracking.action_taken_at), "%Y%-%m%-%01").label('date'),
-            func.sum(IBMResourceTracking.estimated_savings).label('savings')) \
-            .filter_by(cloud_id=cloud_id).group_by(
-            IBMResourceTracking.action_taken_at).all()
-        monthly_savings_costs = [{monthly_saving.date: monthly_saving.savings} for monthly_saving in monthly_savings]
-        monthly_savings_dict = dict(
-            cost_obj for monthly_saving in monthly_savings_costs for cost_obj in monthly_saving.items())
-
-        monthly_savings_trend = []
-        for key, value in monthly_costs_dict.items():
-            estim_savings = monthly_savings_dict.get(key, 0.0)
-            monthly_savings_trend.append({'date': str(key), 'cost': value, 'optimized_cost': abs(value - estim_savings),
-                                          'savings': estim_savings})
-            if monthly_savings_dict.get(key) is not None:
-                monthly_savings_dict.pop(key)
-
-        for key, value in monthly_savings_dict.items():
-            monthly_savings_trend.append({'date': str(key), 'cost': 0.0, 'optimized_cost': 0.0, 'savings': value})
-
+        monthly_rollups = ibmdb.session.query(IBMCostTrackingRollup).filter_by(
+            cloud_id=cloud_id, granularity=IBMCostTrackingRollup.GRANULARITY_MONTHLY).order_by(
+            IBMCostTrackingRollup.period_start).all()
+        monthly_savings_trend = [monthly_rollup.to_savings_trend_json() for monthly_rollup in monthly_rollups]
         return Response(json.dumps(monthly_savings_trend), status=200, mimetype="application/json")
 
-    cost_obj = ibmdb.session.query(IBMCost).filter_by(cloud_id=cloud_id, billing_month=start).first()
+    cost_obj = ibmdb.session.query(IBMCost.id).filter_by(cloud_id=cloud_id, billing_month=start).first()
     if not cost_obj:
         return Response(status=204)
 
-    daily_cost = ibmdb.session.query(DailyCost.date.label('date'), func.sum(DailyCost.daily_cost).label('cost')). \
-        filter_by(cost_id=cost_obj.id).group_by(DailyCost.date).all()
-
-    daily_savings = ibmdb.session.query(func.date(IBMResourceTracking.action_taken_at).label('date'),
-                                        func.sum(IBMResourceTracking.estimated_savings).label('savings')) \
-        .filter_by(cloud_id=cloud_id).filter(IBMResourceTracking.action_taken_at >= start,
-                                             IBMResourceTracking.action_taken_at < end).group_by(
-        IBMResourceTracking.action_taken_at).all()
-    if not (daily_cost or daily_savings):
+    daily_rollups = ibmdb.session.query(IBMCostTrackingRollup).filter(
+        IBMCostTrackingRollup.cloud_id == cloud_id,
+        IBMCostTrackingRollup.granularity == IBMCostTrackingRollup.GRANULARITY_DAILY,
+        IBMCostTrackingRollup.period_start >= start, IBMCostTrackingRollup.period_start < end).order_by(
+        IBMCostTrackingRollup.period_start).all()
+    if not daily_rollups:
         LOGGER.info(f"No IBM Cost Tracking for cloud with ID: {cloud_id}")
         return Response("COST_TRACKING_WITH_CLOUD_ID_NOT_FOUND", status=204)
 
-    daily_cost_dict = dict((x, y) for x, y in daily_cost)
-    daily_savings_dict = dict((x, y) for x, y in daily_savings)
-
-    daily_savings_trend = {}
-    for key, value in daily_cost_dict.items():
-        estim_savings = daily_savings_dict.get(key, 0.0)
-        daily_savings_trend[str(key)] = \
-            {'date': str(key), 'cost': value, 'optimized_cost': abs(value - estim_savings), 'savings': estim_savings}
-        if daily_savings_dict.get(key) is not None:
-            daily_savings_dict.pop(key)
-
-    for key, value in daily_savings_dict.items():
-        daily_savings_trend[str(key)] = {'date': str(key), 'cost': 0.0, 'optimized_cost': 0.0, 'savings': value}
-
-    daily_savings_trend = dict(OrderedDict(sorted(daily_savings_trend.items())))
-    return Response(json.dumps(list(daily_savings_trend.values())), status=200, mimetype="application/json")
+    daily_savings_trend = [daily_rollup.to_savings_trend_json() for daily_rollup in daily_rollups]
+    return Response(json.dumps(daily_savings_trend), status=200, mimetype="application/json")
 
 
 @ibm_resource_tracking.get('/clouds/<cloud_id>/resources-cost')
@@ -171,31 +130,39 @@ def list_ibm_resources_cost(cloud_id, user):
         return Response(status=400)
 
     start, end = get_month_interval(month)
-    cost_obj = ibmdb.session.query(IBMCost).filter_by(cloud_id=cloud_id, billing_month=start).first()
-    if not cost_obj:
-        return Response(status=204)
 
-    total_cost = cost_obj.billable_cost
+    def build_cost_by_resource():
+        cost_obj = ibmdb.session.query(IBMCost).filter_by(cloud_id=cloud_id, billing_month=start).first()
+        if not cost_obj:
+            return
 
-    costs = ibmdb.session.query(
-        IBMResourceInstancesCost.resource_id, func.sum(IBMResourceInstancesCost.cost).label('cost')).group_by(
-        IBMResourceInstancesCost.resource_id).filter_by(cloud_id=cloud_id, cost_id=cost_obj.id).all()
+        total_cost = cost_obj.billable_cost
 
-    cost_by_resource = list()
-    total_resources_cost = 0.0
-    for cost in costs:
-        name = IBMResourceInstancesCost.resource_id_resource_type_mapper.get(cost.resource_id, "Others")
-        if name != 'Others':
-            cost_by_resource.append({"name": name, "cost": cost.cost})
-            total_resources_cost = total_resources_cost + cost.cost
+        costs = ibmdb.session.query(
+            IBMResourceInstancesCost.resource_id, func.sum(IBMResourceInstancesCost.cost).label('cost')).group_by(
+            IBMResourceInstancesCost.resource_id).filter_by(cloud_id=cloud_id, cost_id=cost_obj.id).all()
 
-    if total_cost != total_resources_cost:
-        cost_by_resource.append({"name": "Others", "cost": total_cost - total_resources_cost})
+        resources_cost = list()
+        total_resources_cost = 0.0
+        for cost in costs:
+            name = IBMResourceInstancesCost.resource_id_resource_type_mapper.get(cost.resource_id, "Others")
+            if name != 'Others':
+                resources_cost.append({"name": name, "cost": cost.cost})
+                total_resources_cost = total_resources_cost + cost.cost
 
-    cost_by_resource = {
-        "total_cost": total_cost,
-        "cost_by_resource": cost_by_resource
-    }
+        if total_cost != total_resources_cost:
+            resources_cost.append({"name": "Others", "cost": total_cost - total_resources_cost})
+
+        return {
+            "total_cost": total_cost,
+            "cost_by_resource": resources_cost
+        }
+
+    cost_by_resource = get_or_build_cost_data(
+        "resources_cost", [(ibm_cloud.id, ibm_cloud.name)], {"start": str(start)}, build_cost_by_resource
+    )
+    if not cost_by_resource:
+        return Response(status=204)
 
     return Response(json.dumps(cost_by_resource), status=200, mimetype="application/json")
 
@@ -224,45 +191,57 @@ def list_ibm_recommendation_cost(cloud_id, user):
         return Response(status=400)
 
     start, end = get_month_interval(month)
-    right_sizing_saving = ibmdb.session.query(func.sum(IBMRightSizingRecommendation.estimated_monthly_savings).label(
-        'right_sizing_saving')).filter_by(cloud_id=cloud_id).filter(
-        IBMRightSizingRecommendation.created_at >= start,
-        IBMRightSizingRecommendation.created_at < end).first().right_sizing_saving or 0.0
-
-    rightsizing_achieved_savings = ibmdb.session.query(func.sum(IBMResourceTracking.estimated_savings).label(
-        'savings')).filter_by(cloud_id=cloud_id, action_type=IBMResourceTracking.RIGHT_SIZED).filter(
-        IBMResourceTracking.action_taken_at >= start, IBMResourceTracking.action_taken_at < end).first().savings or 0.0
-
-    idle_resource_saving = ibmdb.session.query(
-        func.sum(IBMIdleResource.estimated_savings).label('idle_resource_saving')).filter_by(
-        cloud_id=cloud_id).filter(
-        IBMIdleResource.created_at >= start,
-        IBMIdleResource.created_at < end).first().idle_resource_saving or 0.0
 
-    idle_resource_achieved_savings = ibmdb.session.query(func.sum(IBMResourceTracking.estimated_savings).label(
-        'savings')).filter_by(cloud_id=cloud_id, action_type=IBMResourceTracking.DELETED).filter(
-        IBMResourceTracking.action_taken_at >= start, IBMResourceTracking.action_taken_at < end).first().savings or 0.0
+    def build_savings_by_recommendations():
+        right_sizing_saving = ibmdb.session.query(
+            func.sum(IBMRightSizingRecommendation.estimated_monthly_savings).label('right_sizing_saving')).filter_by(
+            cloud_id=cloud_id).filter(
+            IBMRightSizingRecommendation.created_at >= start,
+            IBMRightSizingRecommendation.created_at < end).first().right_sizing_saving or 0.0
+
+        rightsizing_achieved_savings = ibmdb.session.query(func.sum(IBMResourceTracking.estimated_savings).label(
+            'savings')).filter_by(cloud_id=cloud_id, action_type=IBMResourceTracking.RIGHT_SIZED).filter(
+            IBMResourceTracking.action_taken_at >= start,
+            IBMResourceTracking.action_taken_at < end).first().savings or 0.0
+
+        idle_resource_saving = ibmdb.session.query(
+            func.sum(IBMIdleResource.estimated_savings).label('idle_resource_saving')).filter_by(
+            cloud_id=cloud_id).filter(
+            IBMIdleResource.created_at >= start,
+            IBMIdleResource.created_at < end).first().idle_resource_saving or 0.0
+
+        idle_resource_achieved_savings = ibmdb.session.query(func.sum(IBMResourceTracking.estimated_savings).label(
+            'savings')).filter_by(cloud_id=cloud_id, action_type=IBMResourceTracking.DELETED).filter(
+            IBMResourceTracking.action_taken_at >= start,
+            IBMResourceTracking.action_taken_at < end).first().savings or 0.0
+
+        total_cost = right_sizing_saving + idle_resource_saving + rightsizing_achieved_savings + \
+            idle_resource_achieved_savings
+        if total_cost == 0.0:
+            return
+
+        return {
+            "total_cost": total_cost,
+            "savings_by_recommendations": [
+                {
+                    "name": "Rightsizing",
+                    "cost": right_sizing_saving + rightsizing_achieved_savings
+                },
+                {
+                    "name": "Idle Resources",
+                    "cost": idle_resource_saving + idle_resource_achieved_savings
+                },
+            ]
+        }
 
-    total_cost = right_sizing_saving + idle_resource_saving + rightsizing_achieved_savings + \
-        idle_resource_achieved_savings
-    if total_cost == 0.0:
+    savings_by_recommendations = get_or_build_cost_data(
+        "saving_recommendation_cost", [(ibm_cloud.id, ibm_cloud.name)], {"start": str(start), "end": str(end)},
+        build_savings_by_recommendations
+    )
+    if not savings_by_recommendations:
         LOGGER.info(f"No Savings by Recommendation for cloud with ID: {cloud_id}")
         return Response("SAVINGS_BY_RECOMMENDATION_WITH_CLOUD_ID_NOT_FOUND", status=204)
 
-    savings_by_recommendations = {
-        "total_cost": total_cost,
-        "savings_by_recommendations": [
-            {
-                "name": "Rightsizing",
-                "cost": right_sizing_saving + rightsizing_achieved_savings
-            },
-            {
-                "name": "Idle Resources",
-                "cost": idle_resource_saving + idle_resource_achieved_savings
-            },
-        ]
-    }
-
     return Response(json.dumps(savings_by_recommendations), status=200, mimetype="application/json")
 
 
@@ -1,5 +1,9 @@
 import logging
+from datetime import datetime
 
+from dateutil.relativedelta import relativedelta
+
+from ibm.common.cost_utils import refresh_cost_tracking_rollups
 from ibm.models import IBMVolume, IBMResourceTracking, IBMFloatingIP, IBMPublicGateway, IBMVpnGateway, IBMImage, \
     IBMDedicatedHost, IBMEndpointGateway, IBMLoadBalancer, IBMIdleResource, IBMSnapshot, IBMInstance
 
@@ -51,4 +55,10 @@ def create_resource_tracking_object(db_resource, action_type, session=None):
         new_resource_tracking_obj.region = region
         new_resource_tracking_obj.ibm_cloud = db_resource.ibm_cloud
         session.delete(idle_resource)
+        session.flush()
+
+        action_taken_at = new_resource_tracking_obj.action_taken_at
+        month_start = datetime(action_taken_at.year, action_taken_at.month, 1)
+        refresh_cost_tracking_rollups(db_resource.cloud_id, session, month_start,
+                                      month_start + relativedelta(months=1), spend=False)
         session.commit()
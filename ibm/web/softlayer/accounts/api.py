@@ -3,6 +3,7 @@ import logging
 from apiflask import abort, APIBlueprint, input, output
 
 from ibm.auth import authenticate
+from ibm.common.clients.softlayer_clients.base_client import invalidate_softlayer_client
 from ibm.common.req_resp_schemas.schemas import get_pagination_schema, PaginationQuerySchema, WorkflowRootOutSchema
 from ibm.models import SoftlayerCloud, WorkflowRoot, WorkflowTask
 from ibm.web import db as ibmdb
@@ -123,6 +124,7 @@ def delete_softlayer_cloud(account_id, user):
 
     ibmdb.session.delete(account)
     ibmdb.session.commit()
+    invalidate_softlayer_client(account_id)
     message = f"Softlayer Account {account_id} deleted Successfully"
     LOGGER.info(message)
     return message, 204
@@ -155,6 +157,7 @@ def update_softlayer_account(account_id, data, user):
         softlayer_cloud_account.api_key = data["api_key"]
     softlayer_cloud_account.status = SoftlayerCloud.STATUS_AUTHENTICATING
     ibmdb.session.commit()
+    invalidate_softlayer_client(softlayer_cloud_account.id)
 
     workflow_root = WorkflowRoot(
         user_id=user["id"],
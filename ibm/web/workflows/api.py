@@ -1,15 +1,16 @@
 import logging
 
 from apiflask import abort, APIBlueprint, doc, input, output
-from flask import Response
+from flask import Response, stream_with_context
 
 from config import PaginationConfig
 from ibm.auth import authenticate, authenticate_api_key
 from ibm.common.req_resp_schemas.schemas import get_pagination_schema, PaginationQuerySchema, WorkflowRootOutSchema
 from ibm.models import IBMCloud, WorkflowRoot, WorkflowTask
 from ibm.web import db as ibmdb
-from ibm.web.common.utils import get_paginated_response_json
-from ibm.web.workflows.utils import get_resource_json
+from ibm.web.common.utils import get_etag_headers, get_not_modified_response, get_paginated_response_json
+from ibm.web.workflows.utils import generate_result_items_json, generate_workflow_progress_stream, get_resource_json, \
+    get_workflow_root_etag, workflow_progress_listener
 from .schemas import WorkflowRootInfocusTasksOutOutSchema, WorkflowRootListQuerySchema, \
     WorkflowRootWithTasksOutSchema, WorkflowTaskOutSchema
 
@@ -94,7 +95,13 @@ def list_workflows(pagination_query_params, workflow_query_params, user):
 def get_workflow(root_id, user):
     """
     Get a workflow by ID
+    Supports conditional requests through `If-None-Match`, a 304 is returned while the workflow is unchanged.
     """
+    etag = get_workflow_root_etag(root_id=root_id, user=user)
+    not_modified_response = get_not_modified_response(etag)
+    if not_modified_response:
+        return not_modified_response
+
     workflow_root = ibmdb.session.query(WorkflowRoot).filter_by(
         id=root_id, user_id=user["id"], project_id=user["project_id"], root_type=WorkflowRoot.ROOT_TYPE_NORMAL
     ).first()
@@ -117,7 +124,7 @@ def get_workflow(root_id, user):
                     resp["message"] = "Some resources are deleted and some are pending due to load balancer is not" \
                                       " in stable state. Please try again after 15 (ten) minutes"
 
-    return resp
+    return resp, 200, get_etag_headers(workflow_root.etag)
 
 
 @ibm_workflows.route('/workflows/<root_id>/in-focus', methods=['GET'])
@@ -126,7 +133,13 @@ def get_workflow(root_id, user):
 def list_in_focus_tasks(root_id, user):
     """
     List all in_focus task for a WorkflowRoot
+    Supports conditional requests through `If-None-Match`, a 304 is returned while the workflow is unchanged.
     """
+    etag = get_workflow_root_etag(root_id=root_id, user=user)
+    not_modified_response = get_not_modified_response(etag)
+    if not_modified_response:
+        return not_modified_response
+
     workflow_root = ibmdb.session.query(WorkflowRoot).filter_by(
         id=root_id, user_id=user["id"], project_id=user["project_id"], root_type=WorkflowRoot.ROOT_TYPE_NORMAL
     ).first()
@@ -136,7 +149,38 @@ def list_in_focus_tasks(root_id, user):
 
     resp = workflow_root.to_json()
     resp["in_focus_tasks"] = [task.to_json() for task in workflow_root.in_focus_tasks],
-    return resp
+    return resp, 200, get_etag_headers(workflow_root.etag)
+
+
+@ibm_workflows.route('/workflows/<root_id>/events', methods=['GET'])
+@authenticate
+@doc(
+    responses={
+        200: "Successful - `text/event-stream` of the status transitions of the WorkflowRoot and its tasks"
+    }
+)
+def stream_workflow_events(root_id, user):
+    """
+    Stream status transitions of a workflow
+    This request opens a server-sent events stream which pushes the status transitions of the WorkflowRoot and its
+    tasks as they happen. The first event carries the current status of the root and the stream ends once the root
+    completes. Task events only carry the new status, fetch the task for its message and result.
+    """
+    subscriber = workflow_progress_listener.subscribe(root_id)
+    root_status = ibmdb.session.query(WorkflowRoot.status).filter_by(
+        id=root_id, user_id=user["id"], project_id=user["project_id"], root_type=WorkflowRoot.ROOT_TYPE_NORMAL
+    ).scalar()
+    if not root_status:
+        workflow_progress_listener.unsubscribe(root_id, subscriber)
+        LOGGER.info(f"No WorkflowRoot task exists with this ID {root_id}")
+        abort(404)
+
+    response = Response(
+        generate_workflow_progress_stream(root_id=root_id, root_status=root_status, subscriber=subscriber),
+        status=200, mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    response.call_on_close(lambda: workflow_progress_listener.unsubscribe(root_id, subscriber))
+    return response
 
 
 @ibm_workflows.route('/workflows/<root_id>/tasks/<task_id>', methods=['GET'])
@@ -145,6 +189,38 @@ def list_in_focus_tasks(root_id, user):
 def get_workflow_task(root_id, task_id, user):
     """
     Get WorkflowTask provided root_id and task_id
+    Supports conditional requests through `If-None-Match`, a 304 is returned while the workflow is unchanged.
+    """
+    # the root of the user and the task in it are looked up without loading them, a 304 is only returned for them
+    etag = get_workflow_root_etag(root_id=root_id, user=user)
+    if not (etag and ibmdb.session.query(WorkflowTask.id).filter_by(id=task_id, root_id=root_id).first()):
+        LOGGER.info(f"No WorkflowTask task exists with this ID {task_id}")
+        return abort(404)
+
+    not_modified_response = get_not_modified_response(etag)
+    if not_modified_response:
+        return not_modified_response
+
+    workflow_task = ibmdb.session.query(WorkflowTask).filter_by(id=task_id, root_id=root_id).first()
+    if not workflow_task:
+        LOGGER.info(f"No WorkflowTask task exists with this ID {task_id}")
+        return abort(404)
+
+    return workflow_task.to_json(), 200, get_etag_headers(workflow_task.root.etag)
+
+
+@ibm_workflows.route('/workflows/<root_id>/tasks/<task_id>/result-chunks/<result_type>', methods=['GET'])
+@authenticate
+@doc(
+    responses={
+        200: "Successful - JSON list of the items of the type, streamed a few chunks at a time"
+    }
+)
+def list_workflow_task_result_items(root_id, task_id, result_type, user):
+    """
+    List the items of a type of a WorkflowTask result stored as chunks
+    Results too big to be returned with the task (see `result_chunks_href` in its result) are read from here, a type
+    at a time.
     """
     workflow_task = ibmdb.session.query(WorkflowTask).filter_by(id=task_id, root_id=root_id).first()
     if not workflow_task or (workflow_task.root.user_id != user["id"]) or \
@@ -153,7 +229,13 @@ def get_workflow_task(root_id, task_id, user):
         LOGGER.info(f"No WorkflowTask task exists with this ID {task_id}")
         return abort(404)
 
-    return workflow_task.to_json()
+    if not (workflow_task.is_result_chunked and
+            result_type in workflow_task.result[WorkflowTask.RESULT_CHUNK_TYPES_KEY]):
+        LOGGER.info(f"No result chunks of type {result_type} exist for WorkflowTask {task_id}")
+        return abort(404)
+
+    return Response(stream_with_context(generate_result_items_json(workflow_task, result_type)), status=200,
+                    mimetype="application/json")
 
 
 @ibm_workflows.route('/workflows/<root_id>/clouds/<cloud_id>', methods=['GET'])
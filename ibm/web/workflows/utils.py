@@ -1,4 +1,13 @@
+import json
+import queue
+import threading
+import time
+
+import redis
+
+from config import WorkflowProgressConfig
 from ibm import LOGGER, models
+from ibm.common.workflow_progress import get_redis_client
 from ibm.models import WorkflowRoot, WorkflowTask
 from ibm.web import db as ibmdb
 from ibm.web.softlayer.recommendations.utils import get_resource_json_for_recommendations
@@ -52,3 +61,132 @@ def get_resource_json(workflow_root):
         LOGGER.error(str(ex))
     finally:
         return resource_json
+
+
+def get_workflow_root_etag(root_id, user):
+    """
+    Get the current ETag of a WorkflowRoot of the user by only reading its version, without loading the root or its
+    tasks
+    :param root_id: ID of the WorkflowRoot
+    :param user: the authenticated user
+    :return: <string> the ETag or None if the user does not have such a root
+    """
+    version = ibmdb.session.query(WorkflowRoot.version).filter_by(
+        id=root_id, user_id=user["id"], project_id=user["project_id"], root_type=WorkflowRoot.ROOT_TYPE_NORMAL
+    ).scalar()
+    if version is None:
+        return
+
+    return WorkflowRoot.generate_etag(root_id, version)
+
+
+class WorkflowProgressListener:
+    """
+    Fans out workflow progress events of the Redis pub/sub channels to the event streams open in this process.
+
+    A single pattern subscription (and hence a single Redis connection) is shared by all the streams of a worker, each
+    stream only holds a bounded queue. Under the gevent workers the listener thread and the queues are cooperative, so
+    an idle stream costs a parked greenlet and no database connection.
+    """
+    RECONNECT_INTERVAL = 5
+
+    def __init__(self):
+        self.__subscribers = dict()
+        self.__lock = threading.Lock()
+        self.__thread = None
+
+    def subscribe(self, root_id):
+        subscriber = queue.Queue(maxsize=WorkflowProgressConfig.SUBSCRIBER_QUEUE_SIZE)
+        with self.__lock:
+            self.__subscribers.setdefault(root_id, set()).add(subscriber)
+            if not (self.__thread and self.__thread.is_alive()):
+                self.__thread = threading.Thread(target=self.__listen, name="workflow-progress-listener", daemon=True)
+                self.__thread.start()
+
+        return subscriber
+
+    def unsubscribe(self, root_id, subscriber):
+        with self.__lock:
+            subscribers = self.__subscribers.get(root_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self.__subscribers.pop(root_id, None)
+
+    def __dispatch(self, root_id, event_json):
+        with self.__lock:
+            subscribers = list(self.__subscribers.get(root_id, []))
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event_json)
+            except queue.Full:
+                # a stalled client only loses its oldest events, it can always re-sync from the workflow APIs
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(event_json)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def __listen(self):
+        pattern = f"{WorkflowProgressConfig.CHANNEL_PREFIX}:*"
+        while True:
+            try:
+                pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(pattern)
+                for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+
+                    event_json = json.loads(message["data"])
+                    self.__dispatch(event_json["root_id"], event_json)
+            except (redis.RedisError, ValueError, KeyError) as ex:
+                LOGGER.error(f"Workflow progress listener failed, reconnecting. Trace: {ex}")
+                time.sleep(self.RECONNECT_INTERVAL)
+
+
+workflow_progress_listener = WorkflowProgressListener()
+
+
+def generate_workflow_progress_stream(root_id, root_status, subscriber):
+    """
+    Generate server-sent events for the status transitions of a WorkflowRoot and its tasks. The stream never touches
+    the database, it ends when the root completes or after `MAX_STREAM_DURATION` seconds.
+    :param root_id: ID of the WorkflowRoot
+    :param root_status: status of the WorkflowRoot read after the subscriber was registered
+    :param subscriber: <queue.Queue> from `workflow_progress_listener.subscribe`
+    :return: generator of server-sent event strings
+    """
+    completed_statuses = [WorkflowRoot.STATUS_C_SUCCESSFULLY, WorkflowRoot.STATUS_C_W_FAILURE]
+
+    yield f"retry: {WorkflowProgressConfig.HEARTBEAT_INTERVAL * 1000}\n"
+    yield "event: {}\ndata: {}\n\n".format(WorkflowRoot.__name__, json.dumps(
+        {"event": WorkflowRoot.__name__, WorkflowRoot.ID_KEY: root_id, WorkflowRoot.STATUS_KEY: root_status,
+         "root_id": root_id}))
+    if root_status in completed_statuses:
+        return
+
+    deadline = time.monotonic() + WorkflowProgressConfig.MAX_STREAM_DURATION
+    while time.monotonic() < deadline:
+        try:
+            event_json = subscriber.get(timeout=WorkflowProgressConfig.HEARTBEAT_INTERVAL)
+        except queue.Empty:
+            yield ": keep-alive\n\n"
+            continue
+
+        yield f"event: {event_json['event']}\ndata: {json.dumps(event_json)}\n\n"
+        if event_json["event"] == WorkflowRoot.__name__ and event_json[WorkflowRoot.STATUS_KEY] in completed_statuses:
+            return
+
+
+def generate_result_items_json(workflow_task, result_type):
+    """
+    Generate the JSON list of the items of a type of a result stored as chunks, the chunks are read while the list is
+    streamed
+    :param workflow_task: <object of WorkflowTask> with a chunked result
+    :param result_type: <string> type of the items
+    :return: generator of JSON strings
+    """
+    yield "["
+    for index, item in enumerate(workflow_task.iter_result_items(result_type)):
+        yield f"{',' if index else ''}{json.dumps(item, default=str)}"
+    yield "]"
@@ -0,0 +1,106 @@
+import uuid
+from datetime import datetime
+from unittest import mock
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ibm.common import cost_cache
+from ibm.models import IBMCost, IBMIdleResource, IBMInstance, IBMResourceTracking
+from tests.utils import DatabaseTestCase, new_object
+
+CLOUD_ID = "cloud"
+OTHER_CLOUD_ID = "other-cloud"
+
+
+class CostDataGenerationListenersTestCase(DatabaseTestCase):
+    MODELS = [IBMCost, IBMIdleResource, IBMInstance, IBMResourceTracking]
+
+    def setUp(self):
+        super(CostDataGenerationListenersTestCase, self).setUp()
+        for cloud_id in [CLOUD_ID, OTHER_CLOUD_ID]:
+            self.db_session.add(self.new_idle_resource(cloud_id, f"{cloud_id}-volume"))
+        self.db_session.commit()
+
+        cost_cache.register_cost_data_generation_listeners()
+        self.addCleanup(self.remove_listeners)
+        patcher = mock.patch.object(cost_cache, "bump_cost_data_generation")
+        self.bump_cost_data_generation = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def remove_listeners():
+        for identifier, listener in [
+            ("after_flush", cost_cache._collect_flushed_cost_data_clouds),
+            ("do_orm_execute", cost_cache._collect_executed_cost_data_clouds),
+            ("after_commit", cost_cache._bump_committed_cost_data_clouds),
+            ("after_rollback", cost_cache._forget_cost_data_clouds)
+        ]:
+            event.remove(Session, identifier, listener)
+
+    @staticmethod
+    def new_idle_resource(cloud_id, db_resource_id):
+        idle_resource = IBMIdleResource(db_resource_id=db_resource_id, source_type=IBMIdleResource.SOURCE_DISCOVERY,
+                                        resource_json={}, resource_type="ibm_volumes")
+        idle_resource.cloud_id = cloud_id
+        return idle_resource
+
+    def test_flushed_objects_bump_their_clouds_on_commit(self):
+        self.db_session.add(self.new_idle_resource(CLOUD_ID, "volume"))
+        self.db_session.flush()
+        self.bump_cost_data_generation.assert_not_called()
+
+        self.db_session.commit()
+        self.bump_cost_data_generation.assert_called_once_with(CLOUD_ID, all_clouds=False)
+
+    def test_expired_deleted_object_bumps_its_cloud(self):
+        idle_resource = self.db_session.query(IBMIdleResource).filter_by(cloud_id=OTHER_CLOUD_ID).one()
+        self.db_session.expire(idle_resource)
+        self.db_session.delete(idle_resource)
+        self.db_session.commit()
+
+        self.bump_cost_data_generation.assert_called_once_with(OTHER_CLOUD_ID, all_clouds=False)
+
+    def test_bulk_statements_bump_the_clouds_of_their_criteria(self):
+        self.db_session.query(IBMIdleResource).filter_by(cloud_id=CLOUD_ID, db_resource_id="volume").delete()
+        self.db_session.commit()
+        self.bump_cost_data_generation.assert_called_once_with(CLOUD_ID, all_clouds=False)
+
+        self.bump_cost_data_generation.reset_mock()
+        self.db_session.query(IBMIdleResource).filter_by(db_resource_id="volume").delete()
+        self.db_session.commit()
+        self.bump_cost_data_generation.assert_called_once_with(all_clouds=True)
+
+    def test_other_models_and_rolled_back_writes_bump_nothing(self):
+        self.db_session.add(new_object(
+            IBMInstance, id="instance", name="instance", resource_id="instance", crn="crn:instance",
+            created_at=datetime.utcnow(), status="running", href="href", bandwidth=1000, memory=8, startable=True,
+            ibm_status_reasons=[], vcpu={}, region_id="region", cloud_id=CLOUD_ID
+        ))
+        self.db_session.commit()
+
+        self.db_session.add(new_object(IBMResourceTracking, id=uuid.uuid4().hex, resource_type="IBMInstance",
+                                       estimated_savings=1.0, action_type="DELETED", resource_json={},
+                                       action_taken_at=datetime.utcnow(), cloud_id=CLOUD_ID))
+        self.db_session.flush()
+        self.db_session.rollback()
+        self.db_session.commit()
+
+        self.bump_cost_data_generation.assert_not_called()
+
+
+class BumpCostDataGenerationTestCase(DatabaseTestCase):
+
+    def test_cached_responses_are_deleted_if_the_bump_fails(self):
+        redis_client = mock.Mock()
+        redis_client.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+        redis_client.scan_iter.return_value = iter([f"{cost_cache.RESPONSE_KEY_PREFIX}:cost:{index}"
+                                                    for index in range(1500)])
+        cost_cache.local_responses["key"] = {"data": "stale"}
+
+        with mock.patch.object(cost_cache, "get_redis_client", return_value=redis_client):
+            cost_cache.bump_cost_data_generation(CLOUD_ID)
+
+        self.assertEqual(len(cost_cache.local_responses), 0)
+        self.assertEqual([len(call.args) for call in redis_client.delete.call_args_list], [1000, 500])
@@ -0,0 +1,199 @@
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from dateutil.relativedelta import relativedelta
+
+from config import IBMCostConfig
+from ibm.common import cost_utils
+from ibm.common.cost_utils import delete_in_chunks, get_cost_sync_cutoff, get_retention_cutoff, \
+    purge_expired_cost_data
+from ibm.discovery.tasks import cost_tasks
+from ibm.models import IBMCost, IBMCostTrackingRollup, IBMResourceInstancesCost, IBMResourceInstancesDailyCost, \
+    IBMResourceInstancesMTDCost, IBMResourceTracking
+from tests.utils import DatabaseTestCase, new_object
+
+CLOUD_ID = "cloud"
+OTHER_CLOUD_ID = "other-cloud"
+
+
+def get_month(months_ago):
+    return datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0) - relativedelta(
+        months=months_ago)
+
+
+class GetRetentionCutoffTestCase(DatabaseTestCase):
+
+    def test_keeps_everything_without_retention(self):
+        self.assertIsNone(get_retention_cutoff(0))
+        self.assertIsNone(get_retention_cutoff(None))
+
+    def test_keeps_retention_months_with_the_current_one(self):
+        self.assertEqual(get_retention_cutoff(13), get_month(12))
+
+    def test_never_expires_the_months_being_synced(self):
+        for retention_months in [1, 2, 3]:
+            self.assertEqual(get_retention_cutoff(retention_months), get_month(2))
+
+    def test_cost_syncs_stop_at_the_shortest_retention(self):
+        with mock.patch.object(IBMCostConfig, "IBM_DAILY_COST_RETENTION_MONTHS", 4), \
+                mock.patch.object(IBMCostConfig, "IBM_RESOURCE_INSTANCES_COST_RETENTION_MONTHS", 6):
+            self.assertEqual(get_cost_sync_cutoff(), get_month(3))
+
+        with mock.patch.object(IBMCostConfig, "IBM_DAILY_COST_RETENTION_MONTHS", 0), \
+                mock.patch.object(IBMCostConfig, "IBM_RESOURCE_INSTANCES_COST_RETENTION_MONTHS", 6):
+            self.assertEqual(get_cost_sync_cutoff(), get_month(5))
+
+        with mock.patch.object(IBMCostConfig, "IBM_DAILY_COST_RETENTION_MONTHS", 0), \
+                mock.patch.object(IBMCostConfig, "IBM_RESOURCE_INSTANCES_COST_RETENTION_MONTHS", 0):
+            self.assertIsNone(get_cost_sync_cutoff())
+
+    def test_discovery_cost_sync_skips_expired_months(self):
+        m_ibm_costs = [{"last_synced_at": "2022-12-08 05:26:38", "response": [
+            {"summary": {"month": get_month(months_ago).strftime("%Y-%m")}, "resources": []}
+            for months_ago in [5, 1]
+        ]}]
+        with mock.patch.object(IBMCostConfig, "IBM_DAILY_COST_RETENTION_MONTHS", 3), \
+                mock.patch.object(cost_tasks.IBMCost, "from_ibm_json_body",
+                                  side_effect=lambda json_body, cloud_id: mock.Mock(
+                                      billing_month=datetime.strptime(json_body["month"], "%Y-%m"))), \
+                mock.patch.object(cost_tasks, "get_db_session"), \
+                mock.patch.object(cost_tasks, "resource_instances_cost_lock"), \
+                mock.patch.object(cost_tasks, "update_resource_instances_cost") as update_resource_instances_cost, \
+                mock.patch.object(cost_tasks, "refresh_cost_tracking_rollups") as refresh_cost_tracking_rollups, \
+                mock.patch.object(cost_tasks, "bump_cost_data_generation"), \
+                mock.patch.object(cost_tasks, "update_idle_resource_cost"), \
+                mock.patch.object(cost_tasks, "task_run_ibm_cost_per_tags_tracking"):
+            cost_tasks.update_cost(CLOUD_ID, m_ibm_costs)
+
+        self.assertEqual(update_resource_instances_cost.call_count, 1)
+        self.assertEqual(refresh_cost_tracking_rollups.call_args.args[2], get_month(1))
+
+
+class PurgeExpiredCostDataTestCase(DatabaseTestCase):
+    MODELS = [
+        IBMCost, IBMResourceInstancesCost, IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost,
+        IBMResourceTracking, IBMCostTrackingRollup
+    ]
+    MONTHS = 6
+    ROWS_PER_MONTH = 3
+
+    def setUp(self):
+        super(PurgeExpiredCostDataTestCase, self).setUp()
+        for cloud_id in [CLOUD_ID, OTHER_CLOUD_ID]:
+            for months_ago in range(self.MONTHS):
+                self.add_month(cloud_id, months_ago)
+
+        # the purge of 3 months ago was interrupted once its rollups were written
+        self.db_session.add(new_object(
+            IBMCostTrackingRollup, id=uuid.uuid4().hex, granularity=IBMCostTrackingRollup.GRANULARITY_DAILY,
+            period_start=get_month(3).date(), updated_at=datetime.utcnow(), cloud_id=CLOUD_ID
+        ))
+        self.db_session.commit()
+
+        for patcher in [
+            mock.patch.object(IBMCostConfig, "IBM_DAILY_COST_RETENTION_MONTHS", 3),
+            mock.patch.object(IBMCostConfig, "IBM_RESOURCE_INSTANCES_COST_RETENTION_MONTHS", 5),
+            mock.patch.object(IBMCostConfig, "IBM_RESOURCE_TRACKING_RETENTION_MONTHS", 1),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # INSERT ... SELECT ... ON DUPLICATE KEY UPDATE is MySQL only, the months it is called for are checked instead
+        patcher = mock.patch.object(cost_utils, "refresh_cost_tracking_rollups")
+        self.refresh_cost_tracking_rollups = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_month(self, cloud_id, months_ago):
+        month = get_month(months_ago)
+        cost = new_object(
+            IBMCost, id=uuid.uuid4().hex, account_id="account", billing_month=month, billable_cost=1.0,
+            non_billable_cost=0.0, billing_country_code="USA", billing_currency_code="USD", cloud_id=cloud_id
+        )
+        self.db_session.add(cost)
+        for index in range(self.ROWS_PER_MONTH):
+            crn = f"crn:{index}"
+            self.db_session.add_all([
+                new_object(IBMResourceInstancesCost, id=uuid.uuid4().hex, resource_id="is.instance", crn=crn,
+                           cost=1.0, estimated_cost=1.0, cost_id=cost.id, cloud_id=cloud_id),
+                new_object(IBMResourceInstancesDailyCost, id=uuid.uuid4().hex, resource_id="is.instance", crn=crn,
+                           daily_cost=1.0, date=(month + timedelta(days=index)).date(), created_at=month,
+                           cost_id=cost.id, cloud_id=cloud_id),
+                new_object(IBMResourceInstancesMTDCost,
+                           id=IBMResourceInstancesMTDCost.generate_id(cost.id, "is.instance", crn),
+                           resource_id="is.instance", crn=crn, mtd_cost=1.0, last_daily_cost_date=month.date(),
+                           last_daily_cost_created_at=month, updated_at=month, cost_id=cost.id, cloud_id=cloud_id),
+                new_object(IBMResourceTracking, id=uuid.uuid4().hex, resource_type="IBMInstance",
+                           estimated_savings=1.0, action_type="DELETED", resource_json={},
+                           action_taken_at=month + timedelta(days=index), cloud_id=cloud_id),
+            ])
+
+    def count_months(self, model, month_column, cloud_id=CLOUD_ID):
+        """
+        :return: <set> of the months ago the rows of a model of a cloud are in, IBMCost.billing_month for the rows
+            of a cost
+        """
+        query = self.db_session.query(month_column).select_from(model).filter(model.cloud_id == cloud_id)
+        if model is not IBMCost and month_column.class_ is IBMCost:
+            query = query.join(IBMCost, IBMCost.id == model.cost_id)
+
+        current_month = get_month(0)
+        months = set()
+        for value, in query.all():
+            months.add((current_month.year - value.year) * 12 + current_month.month - value.month)
+
+        return months
+
+    def test_purge(self):
+        deleted = purge_expired_cost_data(CLOUD_ID, self.db_session, chunk_size=2)
+
+        self.assertEqual(deleted, {
+            IBMResourceInstancesDailyCost.__tablename__: 3 * self.ROWS_PER_MONTH,
+            IBMResourceInstancesMTDCost.__tablename__: 3 * self.ROWS_PER_MONTH,
+            IBMResourceInstancesCost.__tablename__: 1 * self.ROWS_PER_MONTH,
+            IBMResourceTracking.__tablename__: 3 * self.ROWS_PER_MONTH,
+        })
+        # daily costs are kept 3 months, resource instance costs 5 months and the resource tracking, whose retention
+        # is below the floor, 3 months as well
+        self.assertEqual(self.count_months(IBMResourceInstancesDailyCost, IBMResourceInstancesDailyCost.date),
+                         {0, 1, 2})
+        self.assertEqual(
+            self.count_months(IBMResourceInstancesMTDCost, IBMResourceInstancesMTDCost.last_daily_cost_date),
+            {0, 1, 2})
+        self.assertEqual(self.count_months(IBMResourceInstancesCost, IBMCost.billing_month),
+                         set(range(self.MONTHS)) - {5})
+        self.assertEqual(self.count_months(IBMResourceTracking, IBMResourceTracking.action_taken_at), {0, 1, 2})
+        # the monthly spend is never deleted, nor is anything of other clouds
+        self.assertEqual(self.count_months(IBMCost, IBMCost.billing_month), set(range(self.MONTHS)))
+        for model, month_column in [
+            (IBMResourceInstancesDailyCost, IBMResourceInstancesDailyCost.date),
+            (IBMResourceTracking, IBMResourceTracking.action_taken_at)
+        ]:
+            self.assertEqual(self.count_months(model, month_column, OTHER_CLOUD_ID), set(range(self.MONTHS)))
+
+        # expired months are compacted into the rollups before their rows are deleted, unless they already were
+        refreshed = [(call.args[2], call.kwargs) for call in self.refresh_cost_tracking_rollups.call_args_list]
+        self.assertCountEqual(refreshed, [
+            (get_month(4), {"savings": False}), (get_month(5), {"savings": False}),
+            (get_month(3), {"spend": False}), (get_month(4), {"spend": False}), (get_month(5), {"spend": False}),
+        ])
+
+    def test_purge_again_deletes_nothing(self):
+        purge_expired_cost_data(CLOUD_ID, self.db_session, chunk_size=2)
+        self.refresh_cost_tracking_rollups.reset_mock()
+
+        self.assertEqual(purge_expired_cost_data(CLOUD_ID, self.db_session, chunk_size=2), {})
+        self.refresh_cost_tracking_rollups.assert_not_called()
+
+    def test_delete_in_chunks(self):
+        with mock.patch.object(self.db_session, "commit", wraps=self.db_session.commit) as commit:
+            deleted = delete_in_chunks(self.db_session, IBMResourceTracking,
+                                       [IBMResourceTracking.cloud_id == CLOUD_ID], chunk_size=4)
+
+        rows_count = self.MONTHS * self.ROWS_PER_MONTH
+        self.assertEqual(deleted, rows_count)
+        # a transaction per chunk
+        self.assertEqual(commit.call_count, -(-rows_count // 4))
+        self.assertEqual(self.db_session.query(IBMResourceTracking).filter_by(cloud_id=CLOUD_ID).count(), 0)
+        self.assertEqual(self.db_session.query(IBMResourceTracking).filter_by(cloud_id=OTHER_CLOUD_ID).count(),
+                         rows_count)
@@ -0,0 +1,138 @@
+from datetime import datetime
+from unittest import mock
+
+from celery.exceptions import Retry
+
+from config import MonitoringConfig
+from ibm.models import IBMCloud, IBMIdleResource, IBMInstance, IBMMonitoringToken, IBMRegion, WorkflowTask
+from ibm.tasks.ibm import ibm_instance_tasks
+from ibm.tasks.ibm.monitoring_utils import get_paging_progress, MonitoringDataError, MonitoringDataPager
+from tests.utils import DatabaseTestCase, new_object
+
+IDLE_USAGE = [0.5, 1024.0, 1024.0]
+BUSY_USAGE = [80.0, 1024.0 ** 3, 1024.0 ** 3]
+
+
+class GetIdleInstancesTestCase(DatabaseTestCase):
+    MODELS = [IBMCloud, IBMRegion, IBMMonitoringToken, IBMInstance, IBMIdleResource, WorkflowTask]
+
+    def setUp(self):
+        super(GetIdleInstancesTestCase, self).setUp()
+        cloud = new_object(IBMCloud, id="cloud", name="cloud", api_key="key", user_id="user", project_id="project",
+                           status=IBMCloud.STATUS_VALID)
+        region = new_object(IBMRegion, id="region", name="us-south", endpoint="endpoint", href="href",
+                            ibm_status=IBMRegion.IBM_STATUS_AVAILABLE, cloud_id=cloud.id)
+        monitoring_token = IBMMonitoringToken(token="token")
+        monitoring_token.status = IBMMonitoringToken.STATUS_VALID
+        monitoring_token.region_id = region.id
+        self.db_session.add_all([cloud, region, monitoring_token])
+        for name in ["idle-1", "idle-2", "busy", "was-idle"]:
+            self.db_session.add(new_object(
+                IBMInstance, id=name, name=name, resource_id=name, crn=f"crn:{name}", created_at=datetime.utcnow(),
+                status="running", href="href", bandwidth=1000, memory=8, startable=True, ibm_status_reasons=[],
+                vcpu={}, region_id=region.id, cloud_id=cloud.id
+            ))
+
+        # left from a previous sync, the instance is not idle anymore
+        was_idle = IBMIdleResource(db_resource_id="was-idle", source_type=IBMIdleResource.SOURCE_DISCOVERY,
+                                   resource_json={"id": "was-idle"}, resource_type=IBMInstance.__tablename__)
+        was_idle.cloud_id = cloud.id
+        was_idle.region_id = region.id
+        workflow_task = WorkflowTask(task_type="SYNC", resource_type=IBMRegion.__name__, resource_id=region.id)
+        self.workflow_task_id = workflow_task.id
+        self.db_session.add_all([was_idle, workflow_task])
+        self.db_session.commit()
+
+        # one row per page, the monitoring data API fails once right after the first page
+        self.rows = [
+            {"d": ["idle-1", *IDLE_USAGE]}, {"d": ["busy", *BUSY_USAGE]}, {"d": ["idle-2", *IDLE_USAGE]}
+        ]
+        self.fail_from = 1
+        self.fail_error = "status code 400"
+
+        for patcher in [
+            mock.patch.object(MonitoringConfig, "SYSDIG_PAGE_SIZE", 1),
+            mock.patch.object(MonitoringConfig, "SYSDIG_MIN_PAGE_SIZE", 1),
+            mock.patch.object(MonitoringConfig, "SYSDIG_PAGING_CONCURRENCY", 1),
+            mock.patch.object(MonitoringDataPager, "fetch_page", self.fetch_page),
+            mock.patch.object(IBMInstance, "to_idle_json", lambda instance, session=None: {"id": instance.id}),
+            mock.patch.object(ibm_instance_tasks, "get_db_session", self.get_db_session),
+            mock.patch.object(ibm_instance_tasks, "bump_cost_data_generation"),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fetch_page(self, page_from, page_size, attempt=1):
+        if page_from == self.fail_from:
+            self.fail_from = None
+            raise MonitoringDataError(self.fail_error, retryable=self.fail_error.startswith("status code 5"))
+
+        return self.rows[page_from:page_from + page_size]
+
+    def get_idle_resource_ids(self):
+        with self.get_db_session() as db_session:
+            return {
+                db_resource_id for db_resource_id, in db_session.query(IBMIdleResource.db_resource_id).all()
+            }
+
+    def get_workflow_task(self, db_session):
+        return db_session.query(WorkflowTask).filter_by(id=self.workflow_task_id).one()
+
+    def test_resumes_from_checkpoint(self):
+        ibm_instance_tasks.get_idle_instances.run(self.workflow_task_id)
+
+        with self.get_db_session() as db_session:
+            workflow_task = self.get_workflow_task(db_session)
+            self.assertEqual(workflow_task.status, WorkflowTask.STATUS_FAILED)
+            self.assertEqual(get_paging_progress(workflow_task),
+                             {"next_from": 1, "page_size": 1, "still_idle_rids": ["idle-1"]})
+        self.assertEqual(self.get_idle_resource_ids(), {"idle-1", "was-idle"})
+
+        ibm_instance_tasks.get_idle_instances.run(self.workflow_task_id)
+
+        with self.get_db_session() as db_session:
+            workflow_task = self.get_workflow_task(db_session)
+            self.assertEqual(workflow_task.status, WorkflowTask.STATUS_SUCCESSFUL)
+            self.assertEqual(get_paging_progress(workflow_task), {})
+        # the instance found idle before the failure keeps its idle resource although the resumed run did not see it
+        self.assertEqual(self.get_idle_resource_ids(), {"idle-1", "idle-2"})
+
+    def test_full_run(self):
+        self.fail_from = None
+        ibm_instance_tasks.get_idle_instances.run(self.workflow_task_id)
+
+        with self.get_db_session() as db_session:
+            self.assertEqual(self.get_workflow_task(db_session).status, WorkflowTask.STATUS_SUCCESSFUL)
+        self.assertEqual(self.get_idle_resource_ids(), {"idle-1", "idle-2"})
+
+    @mock.patch.object(MonitoringConfig, "SYSDIG_PAGE_ATTEMPTS", 1)
+    def test_retryable_error_retries_the_running_task(self):
+        self.fail_error = "status code 503"
+        with mock.patch.object(ibm_instance_tasks.get_idle_instances, "retry", side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                ibm_instance_tasks.get_idle_instances.run(self.workflow_task_id)
+
+        retry.assert_called_once_with(countdown=MonitoringConfig.SYSDIG_TASK_RETRY_DELAY)
+        with self.get_db_session() as db_session:
+            workflow_task = self.get_workflow_task(db_session)
+            self.assertEqual(workflow_task.status, WorkflowTask.STATUS_RUNNING)
+            self.assertEqual(get_paging_progress(workflow_task),
+                             {"next_from": 1, "page_size": 1, "still_idle_rids": ["idle-1"]})
+
+        # the retry resumes where the failed run stopped
+        ibm_instance_tasks.get_idle_instances.run(self.workflow_task_id)
+
+        with self.get_db_session() as db_session:
+            self.assertEqual(self.get_workflow_task(db_session).status, WorkflowTask.STATUS_SUCCESSFUL)
+        self.assertEqual(self.get_idle_resource_ids(), {"idle-1", "idle-2"})
+
+    @mock.patch.object(MonitoringConfig, "SYSDIG_PAGE_ATTEMPTS", 1)
+    def test_retryable_error_fails_the_task_once_retries_are_exhausted(self):
+        self.fail_error = "status code 503"
+        with mock.patch.object(ibm_instance_tasks.get_idle_instances, "max_retries", 0):
+            ibm_instance_tasks.get_idle_instances.run(self.workflow_task_id)
+
+        with self.get_db_session() as db_session:
+            workflow_task = self.get_workflow_task(db_session)
+            self.assertEqual(workflow_task.status, WorkflowTask.STATUS_FAILED)
+            self.assertEqual(workflow_task.message, "status code 503")
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from config import MonitoringConfig
+from ibm.common.rate_limiter import TokenBucketRateLimiter
+from ibm.tasks.ibm import monitoring_utils
+from ibm.tasks.ibm.monitoring_utils import MonitoringDataError, MonitoringDataPager
+
+
+class FakeSysdigServer(ThreadingHTTPServer):
+    """
+    Sysdig data API serving `rows_count` rows ordered by name, pages starting at a row of `failing_froms` fail once
+    """
+    daemon_threads = True
+
+    def __init__(self, rows_count, failing_froms=(), error_status=503, delay=0.02):
+        super(FakeSysdigServer, self).__init__(("127.0.0.1", 0), FakeSysdigHandler)
+        self.rows = [{"d": [f"instance-{index:05}", float(index)]} for index in range(rows_count)]
+        self.failing_froms = set(failing_froms)
+        self.error_status = error_status
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # (from, to, status) of the requests, in the order they were answered
+        self.requests = []
+        self.served_rows = Counter()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeSysdigHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        page_from, page_to = body["paging"]["from"], body["paging"]["to"]
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+            failed = page_from in server.failing_froms
+            server.failing_froms.discard(page_from)
+            server.requests.append((page_from, page_to, server.error_status if failed else 200))
+            rows = [] if failed else server.rows[page_from:page_to + 1]
+            server.served_rows.update(row["d"][0] for row in rows)
+
+        if failed:
+            self.send_response(server.error_status)
+            self.end_headers()
+            return
+
+        content = json.dumps({"data": rows}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class MonitoringDataPagerTestCase(unittest.TestCase):
+    CONCURRENCY = 4
+
+    def setUp(self):
+        for patcher in [
+            mock.patch.object(MonitoringConfig, "SYSDIG_PAGE_SIZE", 100),
+            mock.patch.object(MonitoringConfig, "SYSDIG_MIN_PAGE_SIZE", 10),
+            mock.patch.object(MonitoringConfig, "SYSDIG_MAX_PAGE_SIZE", 400),
+            mock.patch.object(MonitoringConfig, "SYSDIG_PAGE_ATTEMPTS", 3),
+            # no backoff and no rate limit, the fake server is the only thing slowing the pages down
+            mock.patch.object(monitoring_utils, "time", mock.Mock()),
+            mock.patch.object(monitoring_utils, "monitoring_rate_limiter", TokenBucketRateLimiter(rate=10000)),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start_server(self, *args, **kwargs):
+        server = FakeSysdigServer(*args, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def new_pager(self, server, page_from=0):
+        return MonitoringDataPager(url=server.url, token="token", metrics=[], start_ts=-600, page_from=page_from,
+                                   concurrency=self.CONCURRENCY)
+
+    def collect(self, pager):
+        rows, next_froms = [], []
+        for page_rows, next_from in pager.pages():
+            rows.extend(page_rows)
+            next_froms.append(next_from)
+
+        return rows, next_froms
+
+    def test_pages_are_fetched_concurrently_and_yielded_in_order(self):
+        server = self.start_server(rows_count=4321, failing_froms={300})
+
+        rows, next_froms = self.collect(self.new_pager(server))
+
+        self.assertEqual(rows, server.rows)
+        self.assertEqual(next_froms, sorted(set(next_froms)))
+        self.assertEqual(next_froms[-1], 4321)
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.max_in_flight, self.CONCURRENCY)
+        # every row is served by exactly one successful page
+        self.assertEqual(set(server.served_rows.values()), {1})
+        self.assertEqual(len(server.served_rows), 4321)
+
+        # the failed page is refetched in halves
+        self.assertIn((300, 399, 503), server.requests)
+        self.assertIn((300, 349, 200), server.requests)
+        self.assertIn((350, 399, 200), server.requests)
+        # the next pages are halved too, and grow up to the max size after streaks of full pages
+        page_sizes = [page_to - page_from + 1 for page_from, page_to, _ in server.requests if page_from >= 400]
+        self.assertIn(50, page_sizes)
+        self.assertEqual(max(page_sizes), MonitoringConfig.SYSDIG_MAX_PAGE_SIZE)
+        self.assertLess(page_sizes.index(50), page_sizes.index(MonitoringConfig.SYSDIG_MAX_PAGE_SIZE))
+
+    def test_resumes_from_offset(self):
+        server = self.start_server(rows_count=250)
+
+        rows, next_froms = self.collect(self.new_pager(server, page_from=120))
+
+        self.assertEqual(rows, server.rows[120:])
+        self.assertEqual(next_froms[-1], 250)
+        self.assertEqual(min(page_from for page_from, _, _ in server.requests), 120)
+
+    def test_non_retryable_error_stops_paging(self):
+        server = self.start_server(rows_count=1000, failing_froms={200}, error_status=400)
+        rows = []
+
+        with self.assertRaises(MonitoringDataError) as context:
+            for page_rows, _ in self.new_pager(server).pages():
+                rows.extend(page_rows)
+
+        self.assertEqual(context.exception.message, "status code 400")
+        self.assertFalse(context.exception.retryable)
+        # only rows preceding the failed page, in order, were handed over
+        self.assertEqual(rows, server.rows[:len(rows)])
+        self.assertLessEqual(len(rows), 200)
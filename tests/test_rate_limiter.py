@@ -0,0 +1,36 @@
+from unittest import mock
+
+import redis
+
+from ibm.common import rate_limiter
+from ibm.common.rate_limiter import RedisTokenBucketRateLimiter
+from tests.utils import DatabaseTestCase
+
+
+class RedisTokenBucketRateLimiterTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super(RedisTokenBucketRateLimiterTestCase, self).setUp()
+        self.redis_client = mock.Mock()
+        self.acquire_script = self.redis_client.register_script.return_value
+        self.fallback = mock.Mock()
+        self.rate_limiter = RedisTokenBucketRateLimiter(self.redis_client, "key", rate=10, fallback=self.fallback)
+
+        patcher = mock.patch.object(rate_limiter.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_waits_for_the_shared_bucket(self):
+        self.acquire_script.side_effect = ["0.25", "0"]
+        self.rate_limiter.acquire()
+
+        self.sleep.assert_called_once_with(0.25)
+        self.acquire_script.assert_called_with(keys=["key"], args=[10, 10, 1])
+        self.fallback.acquire.assert_not_called()
+
+    def test_limits_per_process_while_redis_is_unavailable(self):
+        self.acquire_script.side_effect = redis.ConnectionError("down")
+        self.rate_limiter.acquire(2)
+
+        self.fallback.acquire.assert_called_once_with(2)
+        self.sleep.assert_not_called()
@@ -0,0 +1,85 @@
+from datetime import datetime
+from unittest import mock
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ibm.common import regional_resource_snapshots
+from ibm.models import IBMRegionalResourceSnapshot, IBMResourceGroup, IBMSshKey
+from tests.utils import DatabaseTestCase, new_object
+
+CLOUD_ID = "cloud"
+
+
+class RegionalResourceSnapshotListenersTestCase(DatabaseTestCase):
+    MODELS = [IBMRegionalResourceSnapshot, IBMResourceGroup, IBMSshKey]
+
+    def setUp(self):
+        super(RegionalResourceSnapshotListenersTestCase, self).setUp()
+        for region_id in ["region-1", "region-2"]:
+            self.db_session.add(new_object(
+                IBMRegionalResourceSnapshot, id=region_id, etag="etag", document="{}", generated_at=datetime.utcnow(),
+                version=0, generated_version=0, region_id=region_id, cloud_id=CLOUD_ID
+            ))
+        self.db_session.add(new_object(IBMResourceGroup, id="resource-group", name="default", cloud_id=CLOUD_ID))
+        self.db_session.commit()
+
+        regional_resource_snapshots.register_regional_resource_snapshot_listeners()
+        self.addCleanup(self.remove_listeners)
+        patcher = mock.patch.object(regional_resource_snapshots, "enqueue_regional_resource_snapshot_refresh")
+        self.enqueue_refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def remove_listeners():
+        for identifier, listener in [
+            ("after_flush", regional_resource_snapshots._collect_snapshot_scopes),
+            ("before_commit", regional_resource_snapshots._mark_snapshots_stale),
+            ("after_commit", regional_resource_snapshots._refresh_stale_snapshots),
+            ("after_rollback", regional_resource_snapshots._forget_snapshot_scopes)
+        ]:
+            event.remove(Session, identifier, listener)
+
+    def get_stale_region_ids(self):
+        with self.get_db_session() as db_session:
+            return {
+                snapshot.region_id for snapshot in db_session.query(IBMRegionalResourceSnapshot).all()
+                if snapshot.is_stale
+            }
+
+    def add_ssh_key(self, region_id):
+        self.db_session.add(new_object(
+            IBMSshKey, id=f"{region_id}-key", name="key", crn="crn", href="href", resource_id="key",
+            status="created", length=IBMSshKey.KEY_LENGTH_2048, public_key="public-key", finger_print="finger-print",
+            region_id=region_id, cloud_id=CLOUD_ID
+        ))
+
+    def test_written_region_is_stale_and_refreshed_after_commit(self):
+        self.add_ssh_key("region-1")
+        self.db_session.flush()
+        self.enqueue_refresh.assert_not_called()
+
+        self.db_session.commit()
+        self.assertEqual(self.get_stale_region_ids(), {"region-1"})
+        self.enqueue_refresh.assert_called_once_with("region-1")
+
+        # the previous document is kept until it is regenerated
+        with self.get_db_session() as db_session:
+            self.assertEqual(db_session.query(IBMRegionalResourceSnapshot.document).filter_by(
+                region_id="region-1").scalar(), "{}")
+
+    def test_nested_model_of_the_cloud_makes_all_its_regions_stale(self):
+        self.db_session.query(IBMResourceGroup).filter_by(id="resource-group").one().name = "renamed"
+        self.db_session.commit()
+
+        self.assertEqual(self.get_stale_region_ids(), {"region-1", "region-2"})
+        self.enqueue_refresh.assert_called_once_with("region-1", "region-2")
+
+    def test_rolled_back_write_changes_nothing(self):
+        self.add_ssh_key("region-2")
+        self.db_session.flush()
+        self.db_session.rollback()
+        self.db_session.commit()
+
+        self.assertEqual(self.get_stale_region_ids(), set())
+        self.enqueue_refresh.assert_not_called()
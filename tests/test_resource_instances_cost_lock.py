@@ -0,0 +1,114 @@
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from redis.exceptions import LockError, LockNotOwnedError
+
+from ibm.common import cost_utils
+from ibm.common.cost_utils import resource_instances_cost_lock
+from ibm.models import IBMCloud, IBMCost, IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost
+from ibm.tasks.cost_analyzer import cost_analyzer_tasks
+from tests.utils import DatabaseTestCase, new_object
+
+CLOUD_ID = "cloud"
+
+
+class FakeRedisLock:
+    """
+    Lock of a FakeRedis, never waits: a lock held by another holder is not acquired
+    """
+
+    def __init__(self, redis_client, name):
+        self.redis_client = redis_client
+        self.name = name
+
+    def acquire(self, blocking=None):
+        if self.name in self.redis_client.held:
+            return False
+
+        self.redis_client.held[self.name] = self
+        return True
+
+    def release(self):
+        if self.redis_client.held.get(self.name) is not self:
+            raise LockNotOwnedError("lock expired")
+
+        del self.redis_client.held[self.name]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.held = {}
+
+    def lock(self, name, timeout=None, blocking_timeout=None):
+        return FakeRedisLock(self, name)
+
+
+class ResourceInstancesCostLockTestCase(DatabaseTestCase):
+    MODELS = [IBMCloud, IBMCost, IBMResourceInstancesDailyCost, IBMResourceInstancesMTDCost]
+
+    def setUp(self):
+        super(ResourceInstancesCostLockTestCase, self).setUp()
+        self.redis_client = FakeRedis()
+        self.db_session.add(new_object(IBMCloud, id=CLOUD_ID, name="cloud", api_key="key", user_id="user",
+                                       project_id="project", status=IBMCloud.STATUS_VALID, deleted=False))
+        self.cost_ids = [self.add_month(months_ago) for months_ago in range(2)]
+        self.db_session.commit()
+
+        for patcher in [
+            mock.patch.object(cost_utils, "get_redis_client", return_value=self.redis_client),
+            mock.patch.object(cost_analyzer_tasks, "get_db_session", self.get_db_session),
+            mock.patch.object(cost_analyzer_tasks, "refresh_cost_tracking_rollups"),
+            mock.patch.object(cost_analyzer_tasks, "bump_cost_data_generation"),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def add_month(self, months_ago):
+        month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(
+            days=31 * months_ago)
+        cost_id = uuid.uuid4().hex
+        self.db_session.add_all([
+            new_object(IBMCost, id=cost_id, account_id="account", billing_month=month, billable_cost=1.0,
+                       non_billable_cost=0.0, billing_country_code="USA", billing_currency_code="USD",
+                       cloud_id=CLOUD_ID),
+            new_object(IBMResourceInstancesDailyCost, id=uuid.uuid4().hex, resource_id="is.instance", crn="crn",
+                       daily_cost=5.0, date=month.date(), created_at=month, cost_id=cost_id, cloud_id=CLOUD_ID),
+            # drifted from the daily costs
+            new_object(IBMResourceInstancesMTDCost,
+                       id=IBMResourceInstancesMTDCost.generate_id(cost_id, "is.instance", "crn"),
+                       resource_id="is.instance", crn="crn", mtd_cost=1.0, last_daily_cost_date=month.date(),
+                       last_daily_cost_created_at=month, updated_at=month, cost_id=cost_id, cloud_id=CLOUD_ID),
+        ])
+        return cost_id
+
+    def get_mtd_costs(self):
+        with self.get_db_session() as db_session:
+            return dict(db_session.query(IBMResourceInstancesMTDCost.cost_id, IBMResourceInstancesMTDCost.mtd_cost))
+
+    def test_lock_is_held_until_the_block_exits(self):
+        with resource_instances_cost_lock(CLOUD_ID, self.cost_ids[0]):
+            with self.assertRaises(LockError):
+                with resource_instances_cost_lock(CLOUD_ID, self.cost_ids[0], blocking=False):
+                    self.fail("acquired twice")
+
+            # other months are not locked
+            with resource_instances_cost_lock(CLOUD_ID, self.cost_ids[1], blocking=False):
+                pass
+
+        with resource_instances_cost_lock(CLOUD_ID, self.cost_ids[0], blocking=False):
+            pass
+        self.assertEqual(self.redis_client.held, {})
+
+    def test_lock_expired_while_held_does_not_fail_the_block(self):
+        with resource_instances_cost_lock(CLOUD_ID, self.cost_ids[0]):
+            self.redis_client.held.clear()
+
+    def test_months_being_ingested_are_not_rebuilt(self):
+        with resource_instances_cost_lock(CLOUD_ID, self.cost_ids[0]):
+            cost_analyzer_tasks.task_check_ibm_resource_instances_mtd_cost()
+
+        self.assertEqual(self.get_mtd_costs(), {self.cost_ids[0]: 1.0, self.cost_ids[1]: 5.0})
+
+        cost_analyzer_tasks.task_check_ibm_resource_instances_mtd_cost()
+        self.assertEqual(self.get_mtd_costs(), {self.cost_ids[0]: 5.0, self.cost_ids[1]: 5.0})
@@ -0,0 +1,81 @@
+from datetime import datetime
+from unittest import mock
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ibm.common import resource_summaries
+from ibm.models import IBMCloudResourceSummary, IBMIdleResource
+from tests.utils import DatabaseTestCase, new_object
+
+CLOUD_ID = "cloud"
+OTHER_CLOUD_ID = "other-cloud"
+
+
+class ResourceSummaryListenersTestCase(DatabaseTestCase):
+    MODELS = [IBMCloudResourceSummary, IBMIdleResource]
+
+    def setUp(self):
+        super(ResourceSummaryListenersTestCase, self).setUp()
+        self.db_session.add(new_object(
+            IBMIdleResource, id="idle-resource", db_resource_id="instance", source_type="vpc+", resource_json={},
+            resource_type="IBMInstance", estimated_savings=12.5, marked_at=datetime.utcnow(),
+            created_at=datetime.utcnow(), cloud_id=CLOUD_ID
+        ))
+        self.db_session.commit()
+
+        resource_summaries.register_resource_summary_listeners()
+        self.addCleanup(self.remove_listeners)
+        # ON DUPLICATE KEY UPDATE adding to the current values is MySQL only, the deltas are checked instead
+        patcher = mock.patch.object(resource_summaries, "apply_resource_summary_deltas")
+        self.apply_resource_summary_deltas = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def remove_listeners():
+        for identifier, listener in [
+            ("before_flush", resource_summaries._load_summary_values),
+            ("after_flush", resource_summaries._collect_flushed_summary_deltas),
+            ("before_commit", resource_summaries._apply_collected_summary_deltas),
+            ("after_rollback", resource_summaries._forget_summary_deltas)
+        ]:
+            event.remove(Session, identifier, listener)
+
+        for model in resource_summaries.SUMMARIZED_MODEL_FILTERS:
+            for key in resource_summaries.get_summary_keys(model):
+                event.remove(getattr(model, key), "set", resource_summaries._load_previous_summary_value)
+
+    def get_applied_deltas(self):
+        self.apply_resource_summary_deltas.assert_called_once()
+        return {key: tuple(delta) for key, delta in self.apply_resource_summary_deltas.call_args.args[1].items()}
+
+    def test_expired_deleted_object_leaves_the_summary_of_its_cloud(self):
+        idle_resource = self.db_session.query(IBMIdleResource).filter_by(id="idle-resource").one()
+        self.db_session.expire(idle_resource)
+        self.db_session.delete(idle_resource)
+        self.db_session.commit()
+
+        self.assertEqual(self.get_applied_deltas(), {(CLOUD_ID, "IBMIdleResource"): (-1, -12.5)})
+
+    def test_object_moved_while_expired_leaves_the_summary_of_its_previous_cloud(self):
+        idle_resource = self.db_session.query(IBMIdleResource).filter_by(id="idle-resource").one()
+        self.db_session.expire(idle_resource)
+        idle_resource.cloud_id = OTHER_CLOUD_ID
+        self.db_session.commit()
+
+        self.assertEqual(self.get_applied_deltas(), {
+            (CLOUD_ID, "IBMIdleResource"): (-1, -12.5), (OTHER_CLOUD_ID, "IBMIdleResource"): (1, 12.5)
+        })
+
+    def test_unknown_values_recompute_the_summaries_of_the_model(self):
+        idle_resource = self.db_session.query(IBMIdleResource).filter_by(id="idle-resource").one()
+        with mock.patch.object(resource_summaries, "get_summary_value", return_value=(CLOUD_ID, None, None)):
+            self.db_session.delete(idle_resource)
+            self.db_session.flush()
+
+        self.db_session.commit()
+        self.apply_resource_summary_deltas.assert_not_called()
+        self.assertEqual(self.db_session.query(
+            IBMCloudResourceSummary.cloud_id, IBMCloudResourceSummary.name, IBMCloudResourceSummary.count,
+            IBMCloudResourceSummary.total
+        ).all(), [(CLOUD_ID, "IBMIdleResource", 0, 0.0)])
@@ -0,0 +1,75 @@
+import threading
+from unittest import mock
+
+from ibm.common.clients.softlayer_clients import base_client
+from ibm.common.clients.softlayer_clients.base_client import get_softlayer_client, get_softlayer_clients_cache_info, \
+    invalidate_softlayer_client, ThreadLocalTransport
+from tests.utils import DatabaseTestCase
+
+CLOUD_ID = "cloud"
+
+
+class RecordingTransport:
+    def __call__(self, call):
+        return self
+
+
+class SoftLayerClientsCacheTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super(SoftLayerClientsCacheTestCase, self).setUp()
+        self.softlayer_cloud = mock.Mock(username="user", api_key="key", credentials_version="v1")
+        self.db_session = mock.MagicMock()
+        self.db_session.query.return_value.filter_by.return_value.first.side_effect = lambda: self.softlayer_cloud
+
+        for patcher in [
+            mock.patch.object(base_client, "softlayer_clients", {}),
+            mock.patch.object(base_client, "softlayer_rate_limiters", {}),
+            mock.patch.object(base_client, "get_redis_client"),
+            mock.patch.object(base_client, "softlayer_clients_stats", {"hits": 0, "misses": 0, "invalidations": 0}),
+            mock.patch.object(base_client, "get_db_session", return_value=mock.MagicMock(
+                __enter__=mock.Mock(return_value=self.db_session))),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_known_credentials_version_is_served_without_reading_the_account(self):
+        client = get_softlayer_client(CLOUD_ID)
+        self.db_session.query.reset_mock()
+
+        self.assertIs(get_softlayer_client(CLOUD_ID, "v1"), client)
+        self.db_session.query.assert_not_called()
+        self.assertEqual(get_softlayer_clients_cache_info(), {"hits": 1, "misses": 1, "invalidations": 0, "size": 1})
+
+    def test_new_credentials_replace_the_client_of_the_account(self):
+        client = get_softlayer_client(CLOUD_ID, "v1")
+        self.softlayer_cloud.credentials_version = "v2"
+
+        # a task that read the previous credentials keeps their client until the new ones are first used
+        self.assertIs(get_softlayer_client(CLOUD_ID, "v1"), client)
+        new_client = get_softlayer_client(CLOUD_ID)
+        self.assertIsNot(new_client, client)
+        self.assertIs(get_softlayer_client(CLOUD_ID, "v2"), new_client)
+        self.assertEqual(list(base_client.softlayer_clients), [(CLOUD_ID, "v2")])
+
+        invalidate_softlayer_client(CLOUD_ID)
+        self.assertEqual(get_softlayer_clients_cache_info()["size"], 0)
+
+    def test_threads_share_the_client_but_not_its_transport(self):
+        transport = ThreadLocalTransport(RecordingTransport())
+        used_transports = []
+
+        def call():
+            used_transports.extend([transport("request"), transport("request")])
+
+        threads = [threading.Thread(target=call) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(used_transports), 4)
+        self.assertIs(used_transports[0], used_transports[1])
+        self.assertIsNot(used_transports[0], used_transports[2])
+        self.assertIs(used_transports[2], used_transports[3])
+        self.assertNotIn(transport.transport, used_transports)
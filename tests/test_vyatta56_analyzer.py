@@ -0,0 +1,99 @@
+import json
+import os
+import re
+import unittest
+
+from ibm.common.clients.softlayer_clients.vyatta56analyzer.vyatta56analyzer import Vyatta56Analyzer
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "vyatta56")
+
+
+def to_data(obj):
+    """
+    Plain data (dicts, lists and values) of the objects an analyzer returns, to compare them
+    """
+    if isinstance(obj, (list, tuple)):
+        return [to_data(item) for item in obj]
+
+    if hasattr(obj, "__dict__"):
+        return {key: to_data(value) for key, value in vars(obj).items()}
+
+    return obj
+
+
+def analyse(analyzer):
+    """
+    Results of all the queries of an analyzer for the names, VIFs, networks and rules its config refers to
+    :return: <dict> query -> plain data of its result
+    """
+    configs = "\n".join(analyzer.configs)
+    firewall_rules = sorted(set(re.findall(r"^set security firewall name (\S+) rule (\d+) ", configs, re.M)))
+    firewall_names = sorted({name for name, _ in firewall_rules} | {"MISSING-FW"})
+    vif_ids = sorted(set(re.findall(r"^\s*set interfaces bonding dp0bond0 vif (\S+) ", configs, re.M)))
+    networks = sorted(set(re.findall(r" address '([\d.]+/\d+)'", configs)))
+    group_names = sorted(set(re.findall(r"^set resources group \S+ (\S+) ", configs, re.M)) | {"MISSING-GROUP"})
+    ports = sorted(set(re.findall(r" port '(\w+)'", configs))) + ["65000"]
+
+    results = {
+        "get_private_subnets": to_data(analyzer.get_private_subnets()),
+        "get_ipsec": to_data(analyzer.get_ipsec()),
+        "get_esp_groups": to_data(analyzer.get_esp_groups()),
+        "get_ike_groups": to_data(analyzer.get_ike_groups()),
+        "get_firewalls": to_data(analyzer.get_firewalls()),
+    }
+    for vif_id in vif_ids:
+        results[f"get_attached_firewalls {vif_id}"] = to_data(analyzer.get_attached_firewalls(vif_id))
+    for network in networks:
+        results[f"has_public_gateway {network}"] = analyzer.has_public_gateway(network)
+    for name in group_names:
+        results[f"get_address_groups {name}"] = to_data(analyzer.get_address_groups(name))
+        results[f"get_port_groups {name}"] = to_data(analyzer.get_port_groups(name))
+    for name in firewall_names:
+        results[f"get_firewalls {name}"] = to_data(analyzer.get_firewalls(name, "inbound", vif_id="10"))
+        for protocol in ["tcp", "udp"]:
+            results[f"get_firewalls {name} {protocol}"] = to_data(
+                analyzer.get_firewalls(name, "outbound", protocol=protocol))
+        for port in ports:
+            results[f"get_firewalls {name} port {port}"] = to_data(analyzer.get_firewalls(name, "inbound", port=port))
+    for name, rule_no in firewall_rules:
+        results[f"get_rule_protocol {name} {rule_no}"] = analyzer.get_rule_protocol(name, rule_no)
+        results[f"get_firewall_rule {name} {rule_no}"] = to_data(
+            analyzer.get_firewall_rule(name, int(rule_no), "inbound"))
+
+    return results
+
+
+class Vyatta56AnalyzerTestCase(unittest.TestCase):
+    """
+    The results of the queries on sample configs, compared with the ones recorded in <config name>.json
+    """
+    maxDiff = None
+
+    def assert_analysis(self, config_name):
+        with open(os.path.join(DATA_DIR, f"{config_name}.conf")) as configs_file:
+            configs = configs_file.read()
+        with open(os.path.join(DATA_DIR, f"{config_name}.json")) as expected_file:
+            expected = json.load(expected_file)
+
+        results = json.loads(json.dumps(analyse(Vyatta56Analyzer(configs))))
+        self.assertEqual(sorted(results.keys()), sorted(expected.keys()))
+        for query, result in results.items():
+            self.assertEqual(result, expected[query], query)
+
+    def test_gateway(self):
+        self.assert_analysis("gateway")
+
+    def test_edge_cases(self):
+        self.assert_analysis("edge_cases")
+
+    def test_results_are_copies(self):
+        with open(os.path.join(DATA_DIR, "gateway.conf")) as configs_file:
+            configs = configs_file.read()
+        analyzer = Vyatta56Analyzer(configs)
+
+        # callers update the objects they get
+        subnets = analyzer.get_private_subnets()
+        subnets[0].public_gateway = True
+        subnets.pop()
+        self.assertEqual(to_data(analyzer.get_private_subnets()),
+                         to_data(Vyatta56Analyzer(configs).get_private_subnets()))
@@ -0,0 +1,42 @@
+from unittest import mock
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ibm.common import workflow_progress
+from ibm.common.workflow_progress import PENDING_EVENTS_KEY, register_workflow_progress_listeners
+from tests.utils import DatabaseTestCase
+
+
+class WorkflowProgressListenersTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super(WorkflowProgressListenersTestCase, self).setUp()
+        # twice, as by the API and a worker importing each other
+        register_workflow_progress_listeners()
+        register_workflow_progress_listeners()
+        self.addCleanup(self.remove_listeners)
+        patcher = mock.patch.object(workflow_progress, "publish_workflow_progress_events")
+        self.publish_events = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def remove_listeners():
+        event.remove(Session, "after_commit", workflow_progress._publish_pending_events)
+        event.remove(Session, "after_rollback", workflow_progress._discard_pending_events)
+
+    def test_events_are_published_once_after_commit(self):
+        events = [{"event": "status", "root_id": "root"}]
+        self.db_session.info[PENDING_EVENTS_KEY] = list(events)
+        self.db_session.commit()
+
+        self.publish_events.assert_called_once_with(events)
+        self.assertNotIn(PENDING_EVENTS_KEY, self.db_session.info)
+
+    def test_rolled_back_events_are_discarded(self):
+        self.db_session.connection()
+        self.db_session.info[PENDING_EVENTS_KEY] = [{"event": "status", "root_id": "root"}]
+        self.db_session.rollback()
+        self.db_session.commit()
+
+        self.publish_events.assert_called_once_with(None)
@@ -0,0 +1,60 @@
+import json
+
+from ibm.models import WorkflowTask
+from ibm.models.base import Base
+from ibm.models.workflow.workflow_models import workflow_tree_mappings, WorkflowTaskResultChunk
+from ibm.web.workflows.utils import generate_result_items_json
+from tests.utils import DatabaseTestCase
+
+
+class WorkflowTaskResultChunksTestCase(DatabaseTestCase):
+    MODELS = [WorkflowTask, WorkflowTaskResultChunk]
+
+    def setUp(self):
+        super().setUp()
+        Base.metadata.create_all(self.engine, tables=[workflow_tree_mappings])
+
+    def add_task(self, chunks):
+        workflow_task = WorkflowTask(task_type=WorkflowTask.TYPE_SYNC, resource_type="SoftlayerCloud")
+        self.db_session.add(workflow_task)
+        result_types = {"instances": 0, "subnets": 0, "ssh_keys": 0}
+        for chunk_index, (result_type, items) in enumerate(chunks):
+            workflow_task.add_result_chunk(result_type, chunk_index, items)
+            self.db_session.flush()
+            result_types[result_type] += len(items)
+
+        workflow_task.set_chunked_result(result_types)
+        self.db_session.commit()
+        task_id = workflow_task.id
+        self.db_session.expunge_all()
+        return self.db_session.query(WorkflowTask).filter_by(id=task_id).one()
+
+    def test_items_are_read_in_chunk_order(self):
+        workflow_task = self.add_task([
+            ("instances", [{"id": 1}, {"id": 2}]), ("subnets", [{"id": 3}]), ("instances", [{"id": 4}]),
+            ("instances", [{"id": 5}])
+        ])
+
+        for chunks_per_fetch in [1, 2, 10]:
+            self.assertEqual(list(workflow_task.iter_result_items("instances", chunks_per_fetch=chunks_per_fetch)),
+                             [{"id": 1}, {"id": 2}, {"id": 4}, {"id": 5}])
+        self.assertEqual(list(workflow_task.iter_result_items("ssh_keys")), [])
+        self.assertEqual(json.loads("".join(generate_result_items_json(workflow_task, "subnets"))), [{"id": 3}])
+
+    def test_json_holds_the_counts_and_the_chunks_reference(self):
+        workflow_task = self.add_task([("instances", [{"id": 1}, {"id": 2}]), ("subnets", [{"id": 3}])])
+
+        self.assertEqual(workflow_task.to_json()[WorkflowTask.RESULT_KEY], {
+            WorkflowTask.RESULT_CHUNK_TYPES_KEY: {"instances": 2, "subnets": 1, "ssh_keys": 0},
+            WorkflowTask.RESULT_CHUNKS_HREF_KEY:
+                f"/v1/ibm/workflows/None/tasks/{workflow_task.id}/result-chunks/{{result_type}}"
+        })
+
+    def test_result_stored_at_once_is_returned_as_is(self):
+        workflow_task = WorkflowTask(task_type=WorkflowTask.TYPE_SYNC, resource_type="SoftlayerCloud")
+        workflow_task.result = {"resource_json": "{}"}
+        self.db_session.add(workflow_task)
+        self.db_session.commit()
+
+        self.assertFalse(workflow_task.is_result_chunked)
+        self.assertEqual(workflow_task.to_json()[WorkflowTask.RESULT_KEY], {"resource_json": "{}"})
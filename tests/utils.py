@@ -0,0 +1,102 @@
+"""
+Helpers for tests running the database code against an in memory SQLite database instead of MySQL
+"""
+import unittest
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy.dialects.mysql.dml import OnDuplicateClause
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import configure_mappers, sessionmaker
+from sqlalchemy.sql.expression import ClauseElement, ColumnClause, literal
+
+from ibm.models.base import Base
+
+
+@compiles(LONGTEXT, "sqlite")
+def compile_longtext(type_, compiler, **kwargs):
+    return "TEXT"
+
+
+@compiles(OnDuplicateClause, "sqlite")
+def compile_on_duplicate_key_update(on_duplicate, compiler, **kwargs):
+    """
+    ON DUPLICATE KEY UPDATE of MySQL as the upsert of SQLite, which applies to any unique key without a conflict
+    target. The values of the inserted row are the ones of the "excluded" row.
+    """
+    statement = compiler.current_executable
+    clauses = []
+    for column in statement.table.c:
+        if column.key not in on_duplicate.update:
+            continue
+
+        value = on_duplicate.update[column.key]
+        if isinstance(value, ColumnClause) and value.table is on_duplicate.inserted_alias:
+            value_text = f"excluded.{compiler.preparer.quote(value.name)}"
+        else:
+            value_text = compiler.process(value if isinstance(value, ClauseElement) else literal(value))
+        clauses.append(f"{compiler.preparer.quote(column.name)} = {value_text}")
+
+    # without a WHERE, SQLite reads the ON of an INSERT ... SELECT as a join constraint
+    where = " WHERE true" if statement.select is not None and not statement.select._where_criteria else ""
+    return f"{where} ON CONFLICT DO UPDATE SET " + ", ".join(clauses)
+
+
+def mysql_date_format(value, format_):
+    """
+    DATE_FORMAT of MySQL, for the formats which are the same with strftime
+    """
+    return datetime.fromisoformat(value).strftime(format_) if value else None
+
+
+def register_mysql_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function("date_format", 2, mysql_date_format)
+    dbapi_connection.create_function("uuid", 0, lambda: str(uuid.uuid4()))
+    dbapi_connection.create_function("utc_timestamp", 0, lambda: str(datetime.utcnow()))
+
+
+def new_object(model, **values):
+    """
+    Object of a model with only the given values, without going through its constructor
+    """
+    obj = model.__mapper__.class_manager.new_instance()
+    for key, value in values.items():
+        setattr(obj, key, value)
+
+    return obj
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Test case with an in memory SQLite database holding the tables of MODELS
+    """
+    MODELS = []
+
+    def setUp(self):
+        configure_mappers()
+        self.engine = create_engine("sqlite://")
+        event.listen(self.engine, "connect", register_mysql_functions)
+        Base.metadata.create_all(self.engine, tables=[model.__table__ for model in self.MODELS])
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.db_session = self.session_factory()
+
+    def tearDown(self):
+        self.db_session.close()
+        self.engine.dispose()
+
+    @contextmanager
+    def get_db_session(self):
+        """
+        Same as ibm.get_db_session, for the SQLite database
+        """
+        session = self.session_factory()
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()